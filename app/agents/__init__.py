@@ -3,12 +3,13 @@ AI Agents for automated gather creation
 """
 from .gather_content_generator import generate_content_batch
 from .duplicate_detector import deduplicate_items, check_semantic_similarity
-from .quality_analyzer import analyze_department_quality
+from .quality_analyzer import analyze_department_quality, IncrementalQualityScorer
 
 __all__ = [
     "generate_content_batch",
     "deduplicate_items",
     "check_semantic_similarity",
-    "analyze_department_quality"
+    "analyze_department_quality",
+    "IncrementalQualityScorer"
 ]
 
@@ -5,15 +5,17 @@ Keeps newer items, discards older duplicates
 """
 import os
 import structlog
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Union
 import hashlib
 
+from ..storage.gather_item_store import GatherItemStore
+
 logger = structlog.get_logger(__name__)
 
 
 def deduplicate_items(
     new_items: List[Dict[str, Any]],
-    existing_items: List[Dict[str, Any]],
+    existing_items: Union[List[Dict[str, Any]], GatherItemStore],
     department: str
 ) -> List[Dict[str, Any]]:
     """
@@ -22,7 +24,7 @@ def deduplicate_items(
     
     Args:
         new_items: Newly generated items to check
-        existing_items: Existing items in the database
+        existing_items: Existing items in the database (list or GatherItemStore)
         department: Department slug for filtering
     
     Returns:
@@ -45,10 +47,13 @@ def deduplicate_items(
     duplicates_found = 0
     
     # Filter existing items to same department for more relevant comparison
-    dept_existing = [
-        item for item in existing_items
-        if item.get('automationMetadata', {}).get('department') == department
-    ]
+    if isinstance(existing_items, GatherItemStore):
+        dept_existing = existing_items.department_items(department)
+    else:
+        dept_existing = [
+            item for item in existing_items
+            if item.get('automationMetadata', {}).get('department') == department
+        ]
     
     logger.info(
         "Filtered existing items by department",
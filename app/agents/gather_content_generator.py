@@ -6,7 +6,9 @@ import os
 import json
 import re
 import structlog
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Union
+
+from ..storage.gather_item_store import GatherItemStore
 
 logger = structlog.get_logger(__name__)
 
@@ -14,7 +16,7 @@ logger = structlog.get_logger(__name__)
 def generate_content_batch(
     project_id: str,
     department: Dict[str, Any],
-    existing_context: List[Dict[str, Any]],
+    existing_context: Union[List[Dict[str, Any]], GatherItemStore],
     previous_departments: List[Dict[str, Any]],
     model: str
 ) -> List[Dict[str, Any]]:
@@ -25,7 +27,7 @@ def generate_content_batch(
     Args:
         project_id: Project identifier
         department: Department configuration dict
-        existing_context: Existing gather items + brain context
+        existing_context: Existing gather items + brain context (list or GatherItemStore)
         previous_departments: Results from previously processed departments
         model: OpenRouter model to use (from department.defaultModel)
     
@@ -66,7 +68,11 @@ def generate_content_batch(
             ])
         
         # Format existing gather items (last 20 for context)
-        existing_summary = _format_gather_items(existing_context[-20:] if len(existing_context) > 20 else existing_context)
+        if isinstance(existing_context, GatherItemStore):
+            recent_context = existing_context.last(20)
+        else:
+            recent_context = existing_context[-20:] if len(existing_context) > 20 else existing_context
+        existing_summary = _format_gather_items(recent_context)
         
         # Build the prompt
         prompt = f"""You are generating gather items for the **{dept_name}** department in a movie production project.
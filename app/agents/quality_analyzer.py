@@ -3,16 +3,30 @@ Quality Analyzer for Department Gather Items
 Analyzes quality score for a department's gather items
 """
 import os
+import hashlib
 import structlog
-from typing import Dict, Any, List
+from collections import deque
+from typing import Dict, Any, List, Optional, Union
+
+from ..storage.gather_item_store import GatherItemStore
 
 logger = structlog.get_logger(__name__)
 
+# Number of recent item summaries kept as compact prior state per department
+RECENT_SUMMARIES_LIMIT = 10
+
+# Newest unassessed items kept per department for the next LLM assessment
+PENDING_ITEMS_LIMIT = 20
+
+# Keys of the newest items checkpointed per department (older items are
+# recognized by their createdAt watermark)
+RECENT_KEYS_LIMIT = 50
+
 
 def analyze_department_quality(
     project_id: str,
     department: Dict[str, Any],
-    gather_items: List[Dict[str, Any]]
+    gather_items: Union[List[Dict[str, Any]], GatherItemStore]
 ) -> float:
     """
     Analyze quality score for a department's gather items
@@ -20,7 +34,8 @@ def analyze_department_quality(
     Args:
         project_id: Project identifier
         department: Department configuration
-        gather_items: All gather items (will filter by department)
+        gather_items: All gather items (list filtered by department, or a
+            GatherItemStore looked up by department)
     
     Returns:
         Quality score (0-100)
@@ -29,10 +44,13 @@ def analyze_department_quality(
     dept_name = department.get('name', dept_slug)
     
     # Filter items for this department
-    dept_items = [
-        item for item in gather_items
-        if item.get('automationMetadata', {}).get('department') == dept_slug
-    ]
+    if isinstance(gather_items, GatherItemStore):
+        dept_items = gather_items.department_items(dept_slug)
+    else:
+        dept_items = [
+            item for item in gather_items
+            if item.get('automationMetadata', {}).get('department') == dept_slug
+        ]
     
     if not dept_items:
         logger.info(
@@ -162,25 +180,39 @@ def _calculate_mock_quality(items: List[Dict[str, Any]]) -> float:
     if not items:
         return 0.0
     
+    return _heuristic_quality(
+        count=len(items),
+        total_length=sum(len(item.get('content', '')) for item in items),
+        summary_count=sum(1 for item in items if item.get('summary'))
+    )
+
+
+def _heuristic_quality(count: int, total_length: int, summary_count: int) -> float:
+    """
+    Heuristic quality score from aggregate item features
+    """
+    if count == 0:
+        return 0.0
+    
     # Simple heuristic: base score + bonus for quantity and content length
     base_score = 50.0
     
     # Bonus for number of items (up to 20 points)
-    item_bonus = min(len(items) * 2, 20)
+    item_bonus = min(count * 2, 20)
     
     # Bonus for content length (up to 20 points)
-    avg_length = sum(len(item.get('content', '')) for item in items) / len(items)
+    avg_length = total_length / count
     length_bonus = min(avg_length / 50, 20)  # 1000 chars = 20 points
     
     # Bonus for having summaries (up to 10 points)
-    summary_bonus = sum(1 for item in items if item.get('summary')) / len(items) * 10
+    summary_bonus = summary_count / count * 10
     
     score = base_score + item_bonus + length_bonus + summary_bonus
     score = min(score, 100.0)
     
     logger.info(
         "Calculated mock quality score",
-        items_count=len(items),
+        items_count=count,
         score=score,
         item_bonus=item_bonus,
         length_bonus=length_bonus,
@@ -189,3 +221,360 @@ def _calculate_mock_quality(items: List[Dict[str, Any]]) -> float:
     
     return score
 
+
+class IncrementalQualityScorer:
+    """
+    Incremental quality scorer for department gather items
+    
+    Keeps a per-department item index and running feature aggregates
+    (counts, length stats, summary coverage) so each iteration only has to
+    look at the newly added items. The last LLM assessment is reused as long
+    as no new items arrive, and follow-up LLM calls only receive the newest
+    PENDING_ITEMS_LIMIT new items plus a compact summary of the prior state.
+    Checkpoints hold the aggregates, a createdAt watermark and the keys of
+    the newest items, not every item key.
+    """
+    
+    def __init__(self):
+        self._departments: Dict[str, Dict[str, Any]] = {}
+        self.indexed = False
+    
+    def _department_state(self, dept_slug: str) -> Dict[str, Any]:
+        """Get or create the aggregate state for a department"""
+        if dept_slug not in self._departments:
+            self._departments[dept_slug] = {
+                'item_keys': set(),
+                'recent_keys': deque(maxlen=RECENT_KEYS_LIMIT),
+                'watermark': None,
+                'checkpoint_watermark': None,
+                'count': 0,
+                'total_length': 0,
+                'min_length': None,
+                'max_length': 0,
+                'summary_count': 0,
+                'recent_summaries': deque(maxlen=RECENT_SUMMARIES_LIMIT),
+                'pending': deque(maxlen=PENDING_ITEMS_LIMIT),
+                'pending_count': 0,
+                'llm_score': None,
+                'llm_items_count': 0
+            }
+        return self._departments[dept_slug]
+    
+    def index_items(
+        self,
+        gather_items: Union[List[Dict[str, Any]], GatherItemStore]
+    ) -> None:
+        """
+        Index existing gather items by department (one pass over the list)
+        
+        Args:
+            gather_items: All gather items of the project
+        """
+        if isinstance(gather_items, GatherItemStore):
+            for dept_slug in gather_items.departments():
+                self.add_items(dept_slug, gather_items.department_items(dept_slug))
+            self.indexed = True
+            return
+        
+        by_department: Dict[str, List[Dict[str, Any]]] = {}
+        for item in gather_items:
+            dept_slug = item.get('automationMetadata', {}).get('department')
+            if dept_slug:
+                by_department.setdefault(dept_slug, []).append(item)
+        
+        for dept_slug, items in by_department.items():
+            self.add_items(dept_slug, items)
+        
+        self.indexed = True
+    
+    def add_items(self, dept_slug: str, items: List[Dict[str, Any]]) -> int:
+        """
+        Add items to a department's index and update running aggregates
+        
+        Args:
+            dept_slug: Department slug
+            items: Items belonging to the department
+        
+        Returns:
+            Number of items that were not indexed yet
+        """
+        state = self._department_state(dept_slug)
+        added = 0
+        
+        for item in items:
+            key = _item_key(item)
+            created_at = _created_at_key(item)
+            if key in state['item_keys'] or (
+                created_at and state['checkpoint_watermark']
+                and created_at <= state['checkpoint_watermark']
+            ):
+                continue
+            
+            content_length = len(item.get('content', ''))
+            state['item_keys'].add(key)
+            state['recent_keys'].append(key)
+            if created_at and (state['watermark'] is None or created_at > state['watermark']):
+                state['watermark'] = created_at
+            state['count'] += 1
+            state['total_length'] += content_length
+            state['max_length'] = max(state['max_length'], content_length)
+            if state['min_length'] is None or content_length < state['min_length']:
+                state['min_length'] = content_length
+            if item.get('summary'):
+                state['summary_count'] += 1
+                state['recent_summaries'].append(item['summary'][:100])
+            state['pending'].append(item)
+            state['pending_count'] += 1
+            added += 1
+        
+        return added
+    
+    def features(self, dept_slug: str) -> Dict[str, Any]:
+        """
+        Get running feature aggregates for a department
+        """
+        state = self._department_state(dept_slug)
+        count = state['count']
+        return {
+            'count': count,
+            'avg_length': state['total_length'] / count if count else 0.0,
+            'min_length': state['min_length'] or 0,
+            'max_length': state['max_length'],
+            'summary_coverage': state['summary_count'] / count if count else 0.0,
+            'pending_count': state['pending_count'],
+            'previous_score': state['llm_score']
+        }
+    
+    def score(self, project_id: str, department: Dict[str, Any]) -> float:
+        """
+        Score a department using only the items added since the last assessment
+        
+        Args:
+            project_id: Project identifier
+            department: Department configuration
+        
+        Returns:
+            Quality score (0-100)
+        """
+        dept_slug = department['slug']
+        dept_name = department.get('name', dept_slug)
+        state = self._department_state(dept_slug)
+        
+        if state['count'] == 0:
+            logger.info(
+                "No items found for department",
+                department=dept_slug
+            )
+            return 0.0
+        
+        # Reuse the prior assessment when nothing was added since
+        if state['llm_score'] is not None and state['llm_items_count'] == state['count']:
+            logger.info(
+                "Reusing previous quality assessment",
+                department=dept_slug,
+                quality_score=state['llm_score']
+            )
+            return state['llm_score']
+        
+        heuristic = _heuristic_quality(
+            state['count'], state['total_length'], state['summary_count']
+        )
+        score = self._assess(dept_slug, dept_name, department, state)
+        
+        # The aggregates already account for the pending items either way
+        state['pending'].clear()
+        state['pending_count'] = 0
+        
+        if score is None:
+            return heuristic
+        state['llm_score'] = score
+        state['llm_items_count'] = state['count']
+        return score
+    
+    def _assess(
+        self,
+        dept_slug: str,
+        dept_name: str,
+        department: Dict[str, Any],
+        state: Dict[str, Any]
+    ) -> Optional[float]:
+        """
+        Ask the LLM for an updated score
+        
+        Returns:
+            Quality score, or None when the heuristic has to be used
+        """
+        try:
+            # Import CodeBuffSDK (lazy import)
+            try:
+                from codebuff import CodeBuffSDK
+            except ImportError:
+                logger.warning("CodeBuffSDK not available, using mock quality score")
+                return None
+            
+            # Check if API key is available
+            api_key = os.getenv('OPENROUTER_API_KEY')
+            if not api_key:
+                logger.warning("OPENROUTER_API_KEY not set, using mock quality score")
+                return None
+            
+            sdk = CodeBuffSDK(
+                api_key=api_key,
+                model="anthropic/claude-3-haiku"  # Fast model for quality checks
+            )
+            
+            prompt = self._build_incremental_prompt(dept_name, department, state)
+            
+            response = sdk.chat.completions.create(
+                messages=[{"role": "user", "content": prompt}],
+                max_tokens=10,
+                temperature=0.0  # Deterministic
+            )
+            
+            content = response.choices[0].message.content.strip()
+            
+            try:
+                score = min(max(float(content), 0.0), 100.0)
+            except ValueError:
+                logger.warning(
+                    "Failed to parse quality score",
+                    department=dept_slug,
+                    response=content
+                )
+                return None
+            
+            logger.info(
+                "Incremental quality analysis complete",
+                department=dept_slug,
+                quality_score=score,
+                new_items=state['pending_count'],
+                items_count=state['count']
+            )
+            return score
+        
+        except Exception as e:
+            logger.error(
+                "Error analyzing quality",
+                department=dept_slug,
+                error=str(e),
+                exc_info=True
+            )
+            return None
+    
+    def _build_incremental_prompt(
+        self,
+        dept_name: str,
+        department: Dict[str, Any],
+        state: Dict[str, Any]
+    ) -> str:
+        """
+        Build a prompt with the new items and a compact summary of prior state
+        """
+        features = self.features(department['slug'])
+        
+        if state['llm_score'] is not None:
+            prior_state = (
+                f"- Previous score: {state['llm_score']:.0f}/100 "
+                f"for {state['llm_items_count']} items\n"
+            )
+        else:
+            prior_state = "- No previous assessment\n"
+        
+        prior_state += (
+            f"- Items so far: {features['count']} "
+            f"(avg {features['avg_length']:.0f} chars, "
+            f"min {features['min_length']}, max {features['max_length']})\n"
+            f"- Summary coverage: {features['summary_coverage']:.0%}\n"
+            f"- Recent topics: {'; '.join(state['recent_summaries']) or 'N/A'}"
+        )
+        
+        return f"""Update the quality assessment of gather items for the **{dept_name}** department.
+
+**Department**: {dept_name}
+**Description**: {department.get('description', 'N/A')}
+
+**Prior State**:
+{prior_state}
+
+**New Items** ({state['pending_count']}, newest {len(state['pending'])} shown):
+{_format_items_for_analysis(list(state['pending']))}
+
+**Evaluation Criteria**:
+1. **Coverage** (30%): Do items cover diverse aspects of {dept_name}?
+2. **Depth** (25%): Are items detailed and actionable?
+3. **Relevance** (25%): Are items specific to {dept_name}'s needs?
+4. **Quality** (20%): Are items well-written and clear?
+
+**Task**: Considering the prior state and the new items together, rate the
+overall quality of ALL {features['count']} items on a scale of 0-100.
+
+Return ONLY the numeric score (e.g., 85). No explanation."""
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Serialize scorer state (e.g. for checkpointing orchestrated runs)
+        Item keys are reduced to the newest RECENT_KEYS_LIMIT plus the
+        createdAt watermark, and pending items to their scoring fields.
+        """
+        return {
+            'indexed': self.indexed,
+            'departments': {
+                dept_slug: {
+                    **{key: value for key, value in state.items() if key != 'item_keys'},
+                    'recent_keys': list(state['recent_keys']),
+                    'recent_summaries': list(state['recent_summaries']),
+                    'pending': [
+                        {
+                            'summary': item.get('summary', ''),
+                            'content': item.get('content', '')[:200],
+                            'automationMetadata': {
+                                'iteration': item.get('automationMetadata', {}).get('iteration')
+                            }
+                        }
+                        for item in state['pending']
+                    ]
+                }
+                for dept_slug, state in self._departments.items()
+            }
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> "IncrementalQualityScorer":
+        """
+        Restore a scorer from to_dict() output
+        """
+        scorer = cls()
+        if not data:
+            return scorer
+        
+        scorer.indexed = data.get('indexed', False)
+        for dept_slug, state in data.get('departments', {}).items():
+            restored = scorer._department_state(dept_slug)
+            restored.update(state)
+            restored['recent_keys'] = deque(state.get('recent_keys', []), maxlen=RECENT_KEYS_LIMIT)
+            restored['item_keys'] = set(restored['recent_keys'])
+            restored['checkpoint_watermark'] = state.get('watermark')
+            restored['recent_summaries'] = deque(
+                state.get('recent_summaries', []), maxlen=RECENT_SUMMARIES_LIMIT
+            )
+            restored['pending'] = deque(state.get('pending', []), maxlen=PENDING_ITEMS_LIMIT)
+        return scorer
+
+
+def _created_at_key(item: Dict[str, Any]) -> Optional[str]:
+    """
+    Comparable createdAt of a gather item (datetimes or ISO strings)
+    """
+    value = item.get('createdAt')
+    if value is None:
+        return None
+    return value.isoformat() if hasattr(value, 'isoformat') else str(value)
+
+
+def _item_key(item: Dict[str, Any]) -> str:
+    """
+    Stable identity of a gather item (Mongo ID, or content hash before saving)
+    """
+    if item.get('_id'):
+        return str(item['_id'])
+    return hashlib.md5(item.get('content', '').encode()).hexdigest()
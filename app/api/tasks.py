@@ -2,19 +2,24 @@
 Tasks API endpoints for AI Movie Task Service
 Follows constitutional requirements for API design and security
 """
-from datetime import datetime
+from datetime import datetime, timedelta
 from uuid import uuid4
 import uuid
 from fastapi import APIRouter, Depends, HTTPException, Path
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
+from celery import group, Signature
+from celery.result import AsyncResult
 import structlog
 
 from ..models.task import (
     TaskSubmissionRequest,
     TaskSubmissionResponse,
+    BatchTaskSubmissionRequest,
+    BatchTaskSubmissionResponse,
     TaskStatusResponse,
     TaskStatus,
     TaskType,
+    TaskPriority,
     Task
 )
 from ..middleware.auth import verify_api_key, validate_task_id
@@ -27,11 +32,27 @@ from ..tasks import (
 from ..clients.brain_client import BrainServiceClient
 from ..config.settings import settings
 from ..config.monitoring import get_task_metrics, check_task_health
-from ..storage import task_storage
+from ..storage import task_storage, payload_store, runtime_stats
+from ..scheduling import (
+    fair_share_dispatcher,
+    admission_controller,
+    QueueFullError,
+    estimate_wait,
+    estimate_completion,
+    get_queue_concurrency,
+    image_batcher
+)
+from ..celery_app import get_celery_priority
+from ..gpu.placement import gpu_placement
 
 logger = structlog.get_logger()
 router = APIRouter()
 
+# task_data fields passed by reference when large (the task resolves them)
+CLAIM_CHECK_FIELDS = {
+    TaskType.EVALUATE_DEPARTMENT: ('gather_data', 'previous_evaluations'),
+}
+
 
 @router.post("/tasks/submit", response_model=TaskSubmissionResponse, status_code=201)
 async def submit_task(
@@ -49,59 +70,163 @@ async def submit_task(
         priority=task_request.priority
     )
     
-    # Generate unique task ID
-    task_id = uuid4()
-    
-    # Create task instance
-    task = Task(
-        task_id=task_id,
-        project_id=task_request.project_id,
-        task_type=task_request.task_type,
-        status=TaskStatus.QUEUED,
-        priority=task_request.priority,
-        task_data=task_request.task_data,
-        callback_url=task_request.callback_url,
-        metadata=task_request.metadata,
-        created_at=datetime.utcnow(),
-        estimated_duration=300,  # Default estimate
-        queue_position=1  # TODO: Calculate actual queue position
+    # Submit task to appropriate Celery queue based on task type; payloads are
+    # only offloaded once the task is accepted, so rejections leave none behind
+    task_signature = _task_signature(task_request, task_request.task_data)
+    _admit([task_signature])
+    task_data = _claim_check(task_request)
+    if task_data is not task_request.task_data:
+        task_signature = _task_signature(task_request, task_data)
+    estimate = _estimate(task_signature)
+    task_result = _dispatch(task_request, task_signature)
+
+    task_storage.increment_metric("total_tasks")
+
+    return _record_submission(task_request, task_data, task_result, estimate)
+
+
+@router.post("/tasks/submit/batch", response_model=BatchTaskSubmissionResponse, status_code=201)
+async def submit_task_batch(
+    batch_request: BatchTaskSubmissionRequest,
+    api_key: str = Depends(verify_api_key)
+) -> BatchTaskSubmissionResponse:
+    """
+    Submit several tasks in one request
+    All tasks are validated first, then enqueued together as a Celery group
+    so they can start in parallel
+    """
+    logger.info(
+        "Batch task submission received",
+        task_count=len(batch_request.tasks),
+        project_ids=sorted({task.project_id for task in batch_request.tasks})
     )
-    
-    # Submit task to appropriate Celery queue based on task type
-    task_result = None
 
+    task_signatures = [_task_signature(task, task.task_data) for task in batch_request.tasks]
+    _admit(task_signatures)
+    task_data_list = [_claim_check(task) for task in batch_request.tasks]
+    task_signatures = [
+        signature if task_data is task.task_data else _task_signature(task, task_data)
+        for task, task_data, signature in zip(batch_request.tasks, task_data_list, task_signatures)
+    ]
+    estimates = [_estimate(signature) for signature in task_signatures]
+
+    # Image requests wait for a micro-batch and fair-share queues hold tasks
+    # per project; the rest start together as a group
+    batched = [image_batcher.handles(signature) for signature in task_signatures]
+    held = [
+        not is_batched and fair_share_dispatcher.handles(signature)
+        for signature, is_batched in zip(task_signatures, batched)
+    ]
+    direct_signatures = [
+        _place(signature)
+        for signature, is_held, is_batched in zip(task_signatures, held, batched)
+        if not is_held and not is_batched
+    ]
+    direct_results = iter(group(direct_signatures).apply_async().results if direct_signatures else [])
+    task_results = [
+        image_batcher.submit(signature) if is_batched
+        else fair_share_dispatcher.submit(task.project_id, signature) if is_held
+        else next(direct_results)
+        for task, signature, is_held, is_batched in zip(batch_request.tasks, task_signatures, held, batched)
+    ]
+
+    task_storage.increment_metric("total_tasks", len(task_signatures))
+
+    return BatchTaskSubmissionResponse(tasks=[
+        _record_submission(task_request, task_data, task_result, estimate)
+        for task_request, task_data, task_result, estimate
+        in zip(batch_request.tasks, task_data_list, task_results, estimates)
+    ])
+
+
+@router.get("/tasks/queues", status_code=200)
+async def get_queues(
+    api_key: str = Depends(verify_api_key)
+) -> Dict[str, Any]:
+    """
+    Get queue depths and admission limits
+
+    Submissions to a queue whose depth has reached its limit are rejected
+    with 429 and a Retry-After header
+    """
+    return {
+        "queues": admission_controller.get_queue_status(),
+        "retry_after": settings.admission_retry_after,
+        "timestamp": datetime.utcnow().isoformat() + "Z"
+    }
+
+
+def _admit(task_signatures: List[Signature]) -> None:
+    """
+    Check the target queues can take the tasks
+
+    Raises:
+        HTTPException: 429 with Retry-After if a queue is at its limit
+    """
+    try:
+        admission_controller.check_all(
+            fair_share_dispatcher.queue_for(signature) for signature in task_signatures
+        )
+    except QueueFullError as e:
+        raise HTTPException(
+            status_code=429,
+            detail=f"Queue {e.queue} is at capacity ({e.depth}/{e.limit} tasks), retry later",
+            headers={"Retry-After": str(e.retry_after)}
+        )
+
+
+def _claim_check(task_request: TaskSubmissionRequest) -> Dict[str, Any]:
+    """
+    Store large task_data fields in the payload store and return task_data
+    with references, so the payload is not copied into the broker message
+    and the task hash
+    """
+    fields = CLAIM_CHECK_FIELDS.get(task_request.task_type)
+    if not fields:
+        return task_request.task_data
+    return payload_store.offload(task_request.task_data, fields)
+
+
+def _task_signature(task_request: TaskSubmissionRequest, task_data: Dict[str, Any]) -> Signature:
+    """
+    Build the Celery signature for a submission request, carrying the
+    broker priority for the request's TaskPriority
+
+    Raises:
+        HTTPException: If the task type is not supported
+    """
     if task_request.task_type == TaskType.GENERATE_VIDEO:
-        task_result = process_video_generation.delay(
+        task_signature = process_video_generation.s(
             project_id=task_request.project_id,
-            scene_data=task_request.task_data.get('scene_data', {}),
-            video_params=task_request.task_data.get('video_params', {}),
+            scene_data=task_data.get('scene_data', {}),
+            video_params=task_data.get('video_params', {}),
             callback_url=task_request.callback_url,
             metadata=task_request.metadata
         )
     elif task_request.task_type == TaskType.GENERATE_IMAGE:
-        task_result = process_image_generation.delay(
+        task_signature = process_image_generation.s(
             project_id=task_request.project_id,
-            image_prompt=task_request.task_data.get('prompt', ''),
-            image_params=task_request.task_data.get('image_params', {}),
+            image_prompt=task_data.get('prompt', ''),
+            image_params=task_data.get('image_params', {}),
             callback_url=task_request.callback_url,
             metadata=task_request.metadata
         )
     elif task_request.task_type == TaskType.PROCESS_AUDIO:
-        task_result = process_audio_generation.delay(
+        task_signature = process_audio_generation.s(
             project_id=task_request.project_id,
-            audio_prompt=task_request.task_data.get('prompt', ''),
-            audio_params=task_request.task_data.get('audio_params', {}),
+            audio_prompt=task_data.get('prompt', ''),
+            audio_params=task_data.get('audio_params', {}),
             callback_url=task_request.callback_url,
             metadata=task_request.metadata
         )
     elif task_request.task_type == TaskType.EVALUATE_DEPARTMENT:
-        task_result = evaluate_department.delay(
+        task_signature = evaluate_department.s(
             project_id=task_request.project_id,
-            department_slug=task_request.task_data.get('department_slug'),
-            department_number=task_request.task_data.get('department_number'),
-            gather_data=task_request.task_data.get('gather_data', []),
-            previous_evaluations=task_request.task_data.get('previous_evaluations', []),
-            threshold=task_request.task_data.get('threshold', 80),
+            department_slug=task_data.get('department_slug'),
+            department_number=task_data.get('department_number'),
+            gather_data=task_data.get('gather_data', []),
+            previous_evaluations=task_data.get('previous_evaluations', []),
+            threshold=task_data.get('threshold', 80),
             callback_url=task_request.callback_url,
             metadata=task_request.metadata
         )
@@ -111,6 +236,74 @@ async def submit_task(
             detail=f"Unsupported task type: {task_request.task_type}"
         )
 
+    return task_signature.set(priority=get_celery_priority(task_request.priority))
+
+
+def _dispatch(task_request: TaskSubmissionRequest, task_signature: Signature) -> AsyncResult:
+    """
+    Send a task to the broker, add it to an image generation micro-batch (a
+    batch on a fair-share queue is held as one unit), or hold it in its
+    project's fair-share queue
+    """
+    if image_batcher.handles(task_signature):
+        return image_batcher.submit(task_signature)
+    if fair_share_dispatcher.handles(task_signature):
+        return fair_share_dispatcher.submit(task_request.project_id, task_signature)
+    return _place(task_signature).apply_async()
+
+
+def _place(task_signature: Signature) -> Signature:
+    """Route a GPU task to a device queue when routing by device"""
+    return gpu_placement.place(task_signature, fair_share_dispatcher.queue_for(task_signature))
+
+
+def _estimate(task_signature: Signature) -> Dict[str, int]:
+    """
+    Queue position and timing estimate for a task about to be enqueued
+
+    The position counts broker messages at the same or a more urgent priority
+    step; the duration is the rolling average run time of the task.
+    """
+    queue = fair_share_dispatcher.queue_for(task_signature)
+    priority_step = task_signature.options.get('priority', get_celery_priority(TaskPriority.NORMAL))
+    queue_position = admission_controller.reserve(queue, priority_step) or 1
+    estimated_duration = runtime_stats.estimate_duration(task_signature.task)
+
+    return {
+        'queue_position': queue_position,
+        'estimated_duration': estimated_duration,
+        'wait': estimate_wait(queue_position, estimated_duration, get_queue_concurrency(queue))
+    }
+
+
+def _record_submission(
+    task_request: TaskSubmissionRequest,
+    task_data: Dict[str, Any],
+    task_result: Optional[AsyncResult],
+    estimate: Dict[str, int]
+) -> TaskSubmissionResponse:
+    """
+    Save an enqueued task to storage and build its submission response
+    """
+    created_at = datetime.utcnow()
+    estimated_start = created_at + timedelta(seconds=estimate['wait'])
+
+    # Create task instance
+    task = Task(
+        task_id=uuid4(),
+        project_id=task_request.project_id,
+        task_type=task_request.task_type,
+        status=TaskStatus.QUEUED,
+        priority=task_request.priority,
+        task_data=task_data,
+        callback_url=task_request.callback_url,
+        metadata=task_request.metadata,
+        created_at=created_at,
+        estimated_duration=estimate['estimated_duration'],
+        queue_position=estimate['queue_position'],
+        estimated_start=estimated_start
+    )
+
     # Update task with actual Celery task ID
     if task_result:
         task.task_id = uuid.UUID(task_result.id)
@@ -119,9 +312,6 @@ async def submit_task(
     # Save task to storage
     task_storage.save_task(task)
 
-    # Increment metrics
-    task_storage.increment_metric("total_tasks")
-
     logger.info(
         "Task submitted successfully",
         task_id=str(task.task_id),
@@ -135,7 +325,8 @@ async def submit_task(
         project_id=task_request.project_id,
         estimated_duration=task.estimated_duration,
         queue_position=task.queue_position,
-        created_at=task.created_at
+        created_at=task.created_at,
+        estimated_completion=estimated_start + timedelta(seconds=task.estimated_duration)
     )
 
 
@@ -184,17 +375,26 @@ async def get_task_status(
             logger.warning("Could not retrieve brain service context",
                          task_id=validated_task_id, error=str(e))
 
+        # Stored submission record: project, queue position and estimates
+        stored_task = task_storage.get_task(validated_task_id) or {}
+        progress = task_result.info.get('progress', 0) if isinstance(task_result.info, dict) else 0
+
         # Build response with available information
         response_data = {
             "task_id": validated_task_id,
+            "project_id": stored_task.get("project_id", ""),
             "status": status,
-            "progress": task_result.info.get('progress', 0) if task_result.info else 0,
+            "progress": progress,
+            "current_step": stored_task.get("current_step") or status.value,
             "result": task_result.result if task_result.successful() else None,
             "error": str(task_result.info) if task_result.failed() else None,
             "created_at": brain_context.get('processing_start_time') if brain_context else datetime.utcnow().isoformat(),
             "updated_at": datetime.utcnow().isoformat()
         }
 
+        if int(stored_task.get("estimated_duration") or 0):
+            response_data.update(_status_estimate(stored_task, status, progress))
+
         return TaskStatusResponse(**response_data)
 
     except Exception as e:
@@ -205,6 +405,27 @@ async def get_task_status(
         )
 
 
+def _status_estimate(stored_task: Dict[str, Any], status: TaskStatus, progress: float) -> Dict[str, Any]:
+    """
+    Queue position and updated ETA for a stored task
+    """
+    created_at = datetime.fromisoformat(stored_task["created_at"])
+    estimated_start = stored_task.get("estimated_start")
+    estimated_duration = int(stored_task["estimated_duration"])
+
+    return {
+        "queue_position": int(stored_task.get("queue_position") or 0) if status == TaskStatus.QUEUED else None,
+        "estimated_duration": estimated_duration,
+        "estimated_completion": estimate_completion(
+            status=status,
+            created_at=created_at,
+            estimated_duration=estimated_duration,
+            estimated_start=datetime.fromisoformat(estimated_start) if estimated_start else None,
+            progress=progress
+        )
+    }
+
+
 @router.delete("/tasks/{task_id}/cancel")
 async def cancel_task(
     task_id: str = Path(..., description="Task UUID"),
@@ -297,7 +518,9 @@ async def cancel_task(
 
         # Check if task exists and is cancellable
         if task_result.state == 'PENDING':
-            # Task is queued, revoke it
+            # Task is queued, revoke it (and drop it if fair-share still holds it)
+            if settings.fair_share_enabled:
+                fair_share_dispatcher.discard(validated_task_id)
             celery_app.control.revoke(
                 validated_task_id,
                 terminate=False,  # Don't terminate if not started
@@ -427,7 +650,7 @@ async def get_metrics(
     Returns current metrics including:
     - Total tasks processed
     - Success/failure rates
-    - Average task durations
+    - Average task durations and p50/p95/p99 per task
     - Currently running tasks
 
     Args:
@@ -441,6 +664,9 @@ async def get_metrics(
     # Get metrics from Redis storage
     redis_metrics = task_storage.get_metrics()
 
+    # Durations and running tasks published by the workers
+    fleet_metrics = get_task_metrics()
+
     total_tasks = redis_metrics.get("total_tasks", 0)
     completed_tasks = redis_metrics.get("completed_tasks", 0)
     failed_tasks = redis_metrics.get("failed_tasks", 0)
@@ -453,8 +679,9 @@ async def get_metrics(
         "cancelled_tasks": redis_metrics.get("cancelled_tasks", 0),
         "success_rate": (completed_tasks / total_tasks * 100) if total_tasks > 0 else 0,
         "failure_rate": (failed_tasks / total_tasks * 100) if total_tasks > 0 else 0,
-        "average_durations": {},
-        "currently_running": redis_metrics.get("currently_running", 0)
+        "average_durations": fleet_metrics["average_durations"],
+        "duration_percentiles": fleet_metrics["duration_percentiles"],
+        "currently_running": fleet_metrics["currently_running"]
     }
 
     return {
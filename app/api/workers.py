@@ -7,6 +7,7 @@ from typing import Dict, Any, List
 import structlog
 
 from ..middleware.auth import verify_api_key
+from ..config.worker_status import worker_status_monitor
 
 logger = structlog.get_logger()
 router = APIRouter()
@@ -21,14 +22,7 @@ async def get_workers_status(
     Constitutional requirement: Performance and reliability monitoring
     """
     logger.info("Worker status requested")
-    
-    # TODO: Retrieve worker status from Redis/Celery
-    # TODO: Calculate GPU utilization metrics
-    
-    # Return mock data for now to satisfy contract
-    return {
-        "workers": [],
-        "total_workers": 0,
-        "active_workers": 0,
-        "gpu_utilization": 0.0
-    }
\ No newline at end of file
+
+    # Served from the snapshot refreshed in the background (see
+    # app/config/worker_status.py), so polling never waits on the broker
+    return worker_status_monitor.get_status()
@@ -2,8 +2,10 @@
 Celery application configuration for AI Movie Task Service
 Follows constitutional requirements for distributed task processing
 """
+from typing import Union
 from celery import Celery
 from .config import settings, CELERY_CONFIG
+from .models.task import TaskPriority
 
 # Create Celery application instance
 celery_app = Celery("ai_movie_tasks")
@@ -17,13 +19,36 @@ celery_app.conf.task_routes = {
     'app.tasks.image_tasks.*': {'queue': 'gpu_medium'},
     'app.tasks.audio_tasks.*': {'queue': 'cpu_intensive'},
     'automated_gather_creation': {'queue': 'cpu_intensive'},
+    'automated_gather_department_step': {'queue': 'cpu_intensive'},
 }
 
+# Priority scheduling on the Redis broker: each queue is split into
+# per-priority lists ("<queue>:<step>") and lower steps are served first.
+# queue_order_strategy='priority' makes workers drain the queues in the order
+# given by --queues, so a worker listing cpu_intensive first serves pending
+# evaluations before bulk GPU jobs.
+TASK_PRIORITY_LEVELS = {
+    TaskPriority.HIGH: 0,
+    TaskPriority.NORMAL: 5,
+    TaskPriority.LOW: 9,
+}
+
+celery_app.conf.broker_transport_options = {
+    'priority_steps': list(range(10)),
+    'sep': ':',
+    'queue_order_strategy': 'priority',
+}
+celery_app.conf.task_default_priority = TASK_PRIORITY_LEVELS[TaskPriority.NORMAL]
+celery_app.conf.task_inherit_parent_priority = True
+
 # Worker configuration for GPU management
 celery_app.conf.worker_concurrency = 2  # Adjust based on GPU memory
 celery_app.conf.worker_prefetch_multiplier = 1  # Prevent memory issues
-celery_app.conf.worker_max_tasks_per_child = 10  # Restart worker after 10 tasks (prevent memory leaks)
-celery_app.conf.worker_max_memory_per_child = 2048000  # 2GB memory limit per worker (in KB)
+# Pool processes are replaced by memory use, not task count: GPU processes keep
+# models resident between tasks (app/gpu/models.py), and recycling them every
+# few tasks would reload multi-GB weights
+celery_app.conf.worker_max_tasks_per_child = settings.worker_max_tasks_per_child or None
+celery_app.conf.worker_max_memory_per_child = settings.worker_max_memory_per_child  # KB of RSS (2GB default)
 
 # Task execution settings
 celery_app.conf.task_acks_late = True
@@ -38,10 +63,12 @@ celery_app.conf.result_compression = 'gzip'
 # Task-specific timeout configuration
 celery_app.conf.task_time_limits = {
     'automated_gather_creation': 600,  # 10 minutes hard timeout
+    'automated_gather_department_step': 120,  # 2 minutes per orchestrated iteration
 }
 
 celery_app.conf.task_soft_time_limits = {
     'automated_gather_creation': 540,  # 9 minutes soft timeout (warning)
+    'automated_gather_department_step': 110,
 }
 
 # Retry configuration for automated_gather_creation
@@ -71,6 +98,22 @@ except ImportError:
     # Tasks not yet implemented, that's expected during testing phase
     pass
 
+# Signal handlers: task metrics and runtime statistics, fair-share
+# dispatch releasing held tasks when running ones finish, GPU telemetry
+# sampling on worker nodes, GPU memory released by finished tasks, pool
+# processes pinned to devices, resident models unloaded on exit and worker
+# nodes consuming the queues of the models they hold
+from .config import monitoring  # noqa: E402,F401
+from .scheduling import fair_share  # noqa: E402,F401
+from .gpu import telemetry, admission, placement, models, affinity  # noqa: E402,F401
+
+
+def get_celery_priority(priority: Union[TaskPriority, int]) -> int:
+    """Map a TaskPriority to the broker priority step"""
+    return TASK_PRIORITY_LEVELS.get(
+        TaskPriority(priority), TASK_PRIORITY_LEVELS[TaskPriority.NORMAL]
+    )
+
 
 def get_celery_app() -> Celery:
     """Get configured Celery application instance"""
@@ -3,12 +3,14 @@ Client modules for external service integrations
 """
 from .brain_client import BrainServiceClient
 from . import mongodb_client
+from . import gather_cache
 from . import payload_client
 from . import websocket_client
 
 __all__ = [
     "BrainServiceClient",
     "mongodb_client",
+    "gather_cache",
     "payload_client",
     "websocket_client"
 ]
\ No newline at end of file
@@ -12,6 +12,8 @@ import uuid
 import structlog
 from contextlib import asynccontextmanager
 
+from ..config.prometheus import track_call
+
 logger = structlog.get_logger(__name__)
 
 class BrainServiceConnectionError(Exception):
@@ -123,11 +125,12 @@ class BrainServiceClient:
         self.pending_requests[self.request_id] = future
 
         try:
-            await self.websocket.send(json.dumps(request))
-            logger.debug("Sent brain service request", method=method, request_id=self.request_id)
+            with track_call("brain", method):
+                await self.websocket.send(json.dumps(request))
+                logger.debug("Sent brain service request", method=method, request_id=self.request_id)
 
-            # Wait for response with timeout
-            response = await asyncio.wait_for(future, timeout=self.timeout)
+                # Wait for response with timeout
+                response = await asyncio.wait_for(future, timeout=self.timeout)
             result = response.get("result", {})
 
             logger.debug("Received brain service response", method=method, request_id=self.request_id)
@@ -0,0 +1,335 @@
+"""
+Gather Item Cache
+Per-project in-memory cache of gather items kept fresh from MongoDB
+
+The first read loads the whole collection once; afterwards only deltas cross
+the network. Deltas come from a MongoDB change stream when the deployment
+supports it (replica set / sharded cluster), otherwise from polling for
+documents whose lastUpdated moved past the newest value already read from
+MongoDB (or the load time, if no document has one), less
+gather_cache_poll_overlap seconds for clock skew between writers. Items this
+process writes itself do not move that watermark. Polling cannot observe
+deletions; change streams can.
+
+Each process keeps at most gather_cache_max_projects caches, dropping the
+least recently used ones and those idle for gather_cache_idle_ttl seconds.
+"""
+import time
+import threading
+import structlog
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional
+
+from ..config.settings import settings
+from ..config.prometheus import record_cache
+from .mongodb_client import (
+    get_gather_collection,
+    iter_gather_items,
+    GATHER_CONTEXT_PROJECTION
+)
+
+logger = structlog.get_logger(__name__)
+
+# Per-project caches of this process, least recently used first
+_gather_caches: "OrderedDict[str, GatherItemCache]" = OrderedDict()
+_gather_caches_lock = threading.Lock()
+
+
+class GatherItemCache:
+    """
+    Cached gather items for one project, newest first
+    """
+
+    def __init__(
+        self,
+        project_id: str,
+        projection: Optional[Dict[str, Any]] = None,
+        use_change_streams: Optional[bool] = None,
+        poll_interval: Optional[float] = None
+    ):
+        self.project_id = project_id
+        self.projection = projection if projection is not None else GATHER_CONTEXT_PROJECTION
+        self.use_change_streams = (
+            settings.gather_cache_change_streams
+            if use_change_streams is None else use_change_streams
+        )
+        self.poll_interval = (
+            settings.gather_cache_poll_interval
+            if poll_interval is None else poll_interval
+        )
+
+        self._items: Dict[str, Dict[str, Any]] = {}
+        self._sorted: Optional[List[Dict[str, Any]]] = None
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._last_updated = None
+        self._last_poll = 0.0
+        self.last_used = time.monotonic()
+        self._stream = None
+        self._watch_thread: Optional[threading.Thread] = None
+        self._watching = False
+        self._closed = False
+
+    @property
+    def mode(self) -> str:
+        """Current freshness mode: 'change_stream' or 'polling'"""
+        return 'change_stream' if self._watching else 'polling'
+
+    def get_items(self) -> List[Dict[str, Any]]:
+        """
+        Get all cached gather items, newest first
+
+        Returns:
+            List of gather items (shared dicts, do not mutate)
+        """
+        record_cache("gather_items", hit=self._loaded)
+        if not self._loaded:
+            self.load()
+        elif not self._watching:
+            self._poll()
+
+        with self._lock:
+            if self._sorted is None:
+                self._sorted = sorted(
+                    self._items.values(),
+                    key=lambda item: _sort_key(item.get('createdAt')),
+                    reverse=True
+                )
+            return list(self._sorted)
+
+    def load(self) -> None:
+        """
+        Load the full collection once and start watching for changes
+        """
+        start = time.monotonic()
+        # Writers stamp lastUpdated with utcnow; anything written during the
+        # load (or before a change stream is open) is fetched again by a poll
+        loaded_at = datetime.utcnow()
+        items = list(iter_gather_items(self.project_id, projection=self.projection))
+
+        with self._lock:
+            self._items = {}
+            for item in items:
+                self._upsert(item)
+            if self._last_updated is None:
+                self._last_updated = loaded_at
+            self._loaded = True
+            self._last_poll = time.monotonic()
+
+        logger.info(
+            "Loaded gather item cache",
+            project_id=self.project_id,
+            count=len(items),
+            load_time=time.monotonic() - start
+        )
+
+        if self.use_change_streams:
+            self._start_watcher()
+            if self._watching:
+                # Catch up on items written between the read and opening the stream
+                self._poll(force=True)
+
+    def add_items(self, items: List[Dict[str, Any]]) -> None:
+        """
+        Apply items written by this process without waiting for the next delta
+        """
+        with self._lock:
+            for item in items:
+                # Other writers' earlier items may not have been polled yet
+                self._upsert(self._project(item), advance_watermark=False)
+
+    def close(self) -> None:
+        """Stop watching for changes"""
+        self._closed = True
+        self._watching = False
+        stream = self._stream
+        if stream is not None:
+            try:
+                stream.close()
+            except Exception:
+                pass
+
+    def _start_watcher(self) -> None:
+        """
+        Open a change stream and consume it in a daemon thread
+        Falls back to polling if the deployment does not support change streams
+        """
+        pipeline = [{'$project': {
+            'operationType': 1,
+            'documentKey': 1,
+            **{f'fullDocument.{field}': 1 for field in self.projection}
+        }}]
+
+        try:
+            collection = get_gather_collection(self.project_id)
+            self._stream = collection.watch(pipeline, full_document='updateLookup')
+        except Exception as e:
+            logger.info(
+                "Change streams unavailable, polling gather collection",
+                project_id=self.project_id,
+                error=str(e)
+            )
+            return
+
+        self._watching = True
+        self._watch_thread = threading.Thread(
+            target=self._consume_stream,
+            name=f"gather-cache-{self.project_id}",
+            daemon=True
+        )
+        self._watch_thread.start()
+
+    def _consume_stream(self) -> None:
+        """Apply change events until the stream is closed or fails"""
+        try:
+            for change in self._stream:
+                self._apply_change(change)
+        except Exception as e:
+            if not self._closed:
+                logger.warning(
+                    "Gather change stream stopped, falling back to polling",
+                    project_id=self.project_id,
+                    error=str(e)
+                )
+        finally:
+            self._watching = False
+
+    def _apply_change(self, change: Dict[str, Any]) -> None:
+        """Apply one change stream event"""
+        operation = change.get('operationType')
+        item_id = str(change.get('documentKey', {}).get('_id'))
+
+        with self._lock:
+            if operation in ('insert', 'update', 'replace'):
+                document = change.get('fullDocument')
+                if document:
+                    document['_id'] = str(document.get('_id', item_id))
+                    self._upsert(document)
+            elif operation == 'delete':
+                if self._items.pop(item_id, None) is not None:
+                    self._sorted = None
+
+    def _poll(self, force: bool = False) -> None:
+        """Fetch documents updated since the newest lastUpdated read from MongoDB"""
+        now = time.monotonic()
+        if not force and now - self._last_poll < self.poll_interval:
+            return
+        self._last_poll = now
+
+        since = self._last_updated
+        if isinstance(since, datetime):
+            # Overlap the previous poll; re-read items are simply replaced
+            since -= timedelta(seconds=settings.gather_cache_poll_overlap)
+        query = {'lastUpdated': {'$gt': since}}
+
+        try:
+            changed = list(iter_gather_items(
+                self.project_id, query=query, projection=self.projection
+            ))
+        except Exception as e:
+            logger.warning(
+                "Failed to poll gather item changes",
+                project_id=self.project_id,
+                error=str(e)
+            )
+            return
+
+        if changed:
+            with self._lock:
+                for item in changed:
+                    self._upsert(item)
+            logger.debug(
+                "Applied polled gather item changes",
+                project_id=self.project_id,
+                count=len(changed)
+            )
+
+    def _upsert(self, item: Dict[str, Any], advance_watermark: bool = True) -> None:
+        """Insert or replace an item (lock must be held)"""
+        self._items[str(item.get('_id'))] = item
+        self._sorted = None
+
+        last_updated = item.get('lastUpdated')
+        if advance_watermark and last_updated is not None and (
+            self._last_updated is None or last_updated > self._last_updated
+        ):
+            self._last_updated = last_updated
+
+    def _project(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        """Reduce a full document to the cached projection"""
+        projected = {key: item[key] for key in self.projection if key in item}
+        projected['_id'] = str(item.get('_id'))
+        return projected
+
+
+def _sort_key(value: Any) -> str:
+    """Sort key for createdAt values (datetimes or ISO strings)"""
+    if value is None:
+        return ''
+    return value.isoformat() if hasattr(value, 'isoformat') else str(value)
+
+
+def get_gather_cache(project_id: str) -> GatherItemCache:
+    """
+    Get or create the gather item cache for a project
+
+    Caches idle for longer than gather_cache_idle_ttl, and the least recently
+    used ones beyond gather_cache_max_projects, are closed and dropped.
+    """
+    now = time.monotonic()
+    evicted = []
+
+    with _gather_caches_lock:
+        cache = _gather_caches.get(project_id)
+        if cache is None:
+            cache = GatherItemCache(project_id)
+            _gather_caches[project_id] = cache
+        _gather_caches.move_to_end(project_id)
+        cache.last_used = now
+
+        for other_id, other in list(_gather_caches.items()):
+            over_limit = len(_gather_caches) > settings.gather_cache_max_projects
+            idle = now - other.last_used > settings.gather_cache_idle_ttl
+            if other_id == project_id or not (over_limit or idle):
+                continue
+            evicted.append(_gather_caches.pop(other_id))
+
+    for other in evicted:
+        other.close()
+        logger.debug("Evicted gather item cache", project_id=other.project_id)
+
+    return cache
+
+
+def read_cached_gather_items(project_id: str) -> List[Dict[str, Any]]:
+    """
+    Read gather items through the project cache
+    Falls back to an empty list (like read_gather_items) on errors
+
+    Args:
+        project_id: Project identifier
+
+    Returns:
+        List of gather items, newest first
+    """
+    try:
+        return get_gather_cache(project_id).get_items()
+    except Exception as e:
+        logger.error(
+            "Error reading cached gather items",
+            project_id=project_id,
+            error=str(e),
+            exc_info=True
+        )
+        return []
+
+
+def clear_gather_caches() -> None:
+    """
+    Close and drop all gather caches of this process (useful for testing)
+    """
+    with _gather_caches_lock:
+        for cache in _gather_caches.values():
+            cache.close()
+        _gather_caches.clear()
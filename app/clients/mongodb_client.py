@@ -4,23 +4,52 @@ Handles reading and writing gather items to MongoDB
 """
 import os
 import structlog
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Iterator
 from datetime import datetime
 
 try:
-    from pymongo import MongoClient
+    from pymongo import MongoClient, ASCENDING, DESCENDING
     from bson import ObjectId
     PYMONGO_AVAILABLE = True
 except ImportError:
     PYMONGO_AVAILABLE = False
     MongoClient = None
     ObjectId = None
+    ASCENDING, DESCENDING = 1, -1
+
+from ..config.prometheus import track_call
 
 logger = structlog.get_logger(__name__)
 
 # MongoDB connection
 _mongo_client: Optional[Any] = None
 
+# Collections whose indexes were already ensured by this process
+_indexed_collections: set = set()
+
+# Default cursor batch size for streamed reads
+DEFAULT_BATCH_SIZE = 500
+
+# Indexes backing the gather item queries below
+GATHER_INDEXES = [
+    [('createdAt', DESCENDING)],
+    [('automationMetadata.department', ASCENDING), ('createdAt', DESCENDING)],
+    [('isAutomated', ASCENDING), ('createdAt', DESCENDING)],
+    [('lastUpdated', DESCENDING)],
+]
+
+# Projection for callers that only need text context (generation, dedup, scoring).
+# Drops large fields such as extractedText.
+GATHER_CONTEXT_PROJECTION = {
+    'content': 1,
+    'summary': 1,
+    'context': 1,
+    'isAutomated': 1,
+    'automationMetadata': 1,
+    'createdAt': 1,
+    'lastUpdated': 1,
+}
+
 
 def get_mongo_client():
     """
@@ -50,29 +79,82 @@ def get_gather_collection(project_id: str):
     db = client[db_name]
     
     collection_name = f"aladdin-gather-{project_id}"
-    return db[collection_name]
+    collection = db[collection_name]
+    ensure_gather_indexes(collection)
+    return collection
+
+
+def ensure_gather_indexes(collection) -> None:
+    """
+    Create the gather item indexes once per collection per process
+    (createdAt, automationMetadata.department, isAutomated, lastUpdated)
+    """
+    if collection.name in _indexed_collections:
+        return
+    
+    try:
+        for keys in GATHER_INDEXES:
+            collection.create_index(keys, background=True)
+        _indexed_collections.add(collection.name)
+        logger.info("Ensured gather item indexes", collection=collection.name)
+    except Exception as e:
+        logger.warning(
+            "Failed to ensure gather item indexes",
+            collection=collection.name,
+            error=str(e)
+        )
+
+
+def iter_gather_items(
+    project_id: str,
+    query: Optional[Dict[str, Any]] = None,
+    projection: Optional[Dict[str, Any]] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE
+) -> Iterator[Dict[str, Any]]:
+    """
+    Stream gather items for a project, newest first
+    
+    Documents are fetched from the server in batches of batch_size, so only
+    one batch is held in memory at a time. Errors are raised to the caller.
+    
+    Args:
+        project_id: Project identifier
+        query: MongoDB filter (default: all items)
+        projection: Fields to return (default: full documents)
+        batch_size: Cursor batch size
+    
+    Yields:
+        Gather items with string IDs
+    """
+    collection = get_gather_collection(project_id)
+    cursor = collection.find(query or {}, projection).sort(
+        'createdAt', DESCENDING
+    ).batch_size(batch_size)
+    
+    for item in cursor:
+        if '_id' in item:
+            item['_id'] = str(item['_id'])
+        yield item
 
 
-def read_gather_items(project_id: str) -> List[Dict[str, Any]]:
+def read_gather_items(
+    project_id: str,
+    projection: Optional[Dict[str, Any]] = None
+) -> List[Dict[str, Any]]:
     """
     Read all gather items for a project
     
     Args:
         project_id: Project identifier
+        projection: Fields to return (default: full documents)
     
     Returns:
         List of gather items
     """
     try:
-        collection = get_gather_collection(project_id)
-        
         # Query all items, sorted by creation date
-        items = list(collection.find({}).sort('createdAt', -1))
-        
-        # Convert ObjectId to string
-        for item in items:
-            if '_id' in item:
-                item['_id'] = str(item['_id'])
+        with track_call("mongodb", "read_gather_items"):
+            items = list(iter_gather_items(project_id, projection=projection))
         
         logger.info(
             "Read gather items from MongoDB",
@@ -151,7 +233,8 @@ def save_to_gather_db(
             docs.append(doc)
         
         # Insert documents
-        result = collection.insert_many(docs)
+        with track_call("mongodb", "insert_gather_items"):
+            result = collection.insert_many(docs)
         
         # Add IDs to items
         for i, item_id in enumerate(result.inserted_ids):
@@ -178,7 +261,8 @@ def save_to_gather_db(
 
 def get_items_by_department(
     project_id: str,
-    department: str
+    department: str,
+    projection: Optional[Dict[str, Any]] = None
 ) -> List[Dict[str, Any]]:
     """
     Get gather items for a specific department
@@ -186,21 +270,17 @@ def get_items_by_department(
     Args:
         project_id: Project identifier
         department: Department slug
+        projection: Fields to return (default: full documents)
     
     Returns:
         List of gather items for the department
     """
     try:
-        collection = get_gather_collection(project_id)
-        
-        items = list(collection.find({
-            'automationMetadata.department': department
-        }).sort('createdAt', -1))
-        
-        # Convert ObjectId to string
-        for item in items:
-            if '_id' in item:
-                item['_id'] = str(item['_id'])
+        items = list(iter_gather_items(
+            project_id,
+            query={'automationMetadata.department': department},
+            projection=projection
+        ))
         
         logger.info(
             "Read department gather items",
@@ -222,27 +302,26 @@ def get_items_by_department(
         return []
 
 
-def get_automated_items(project_id: str) -> List[Dict[str, Any]]:
+def get_automated_items(
+    project_id: str,
+    projection: Optional[Dict[str, Any]] = None
+) -> List[Dict[str, Any]]:
     """
     Get only automated gather items
     
     Args:
         project_id: Project identifier
+        projection: Fields to return (default: full documents)
     
     Returns:
         List of automated gather items
     """
     try:
-        collection = get_gather_collection(project_id)
-        
-        items = list(collection.find({
-            'isAutomated': True
-        }).sort('createdAt', -1))
-        
-        # Convert ObjectId to string
-        for item in items:
-            if '_id' in item:
-                item['_id'] = str(item['_id'])
+        items = list(iter_gather_items(
+            project_id,
+            query={'isAutomated': True},
+            projection=projection
+        ))
         
         logger.info(
             "Read automated gather items",
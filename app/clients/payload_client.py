@@ -1,14 +1,41 @@
 """
 Payload CMS Client
 Handles querying departments and triggering evaluations
+
+HTTP connections are pooled (keep-alive) per process, and department configs
+are cached per project for a TTL; once the TTL expires the cached list is
+revalidated with its ETag so an unchanged list costs a 304 instead of a
+full download. Async variants share the same cache and are safe to call
+from a per-worker event loop.
 """
 import os
-import requests
+import time
+import asyncio
+import threading
+import weakref
+import httpx
 import structlog
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+
+from ..config.settings import settings
+from ..config.prometheus import record_cache
 
 logger = structlog.get_logger(__name__)
 
+REQUEST_TIMEOUT = 30.0
+POOL_LIMITS = httpx.Limits(max_connections=20, max_keepalive_connections=10)
+
+# Statuses meaning the batch endpoint is missing, so single submissions are used
+BATCH_UNSUPPORTED_STATUSES = (404, 405)
+
+
+class EvaluationTriggersThrottled(Exception):
+    """The task service rejected evaluation triggers because its queue is full"""
+
+    def __init__(self, retry_after: float):
+        self.retry_after = retry_after
+        super().__init__(f"Evaluation triggers throttled, retry after {retry_after}s")
+
 
 def get_payload_api_url() -> str:
     """
@@ -28,48 +55,235 @@ def get_payload_headers() -> Dict[str, str]:
     }
 
 
-def query_departments_for_automation(project_id: str) -> List[Dict[str, Any]]:
+class PayloadClient:
     """
-    Query departments with gatherCheck=true, sorted by codeDepNumber
-    DYNAMIC: No hardcoded departments
-    
-    Args:
-        project_id: Project identifier
-    
-    Returns:
-        List of department configurations
+    Pooled Payload CMS / task service client with a department cache
     """
-    try:
-        api_url = get_payload_api_url()
+
+    def __init__(self, department_cache_ttl: Optional[float] = None):
+        self.department_cache_ttl = (
+            settings.payload_department_cache_ttl
+            if department_cache_ttl is None else department_cache_ttl
+        )
+        self._client: Optional[httpx.Client] = None
+        self._client_pid: Optional[int] = None
+        self._async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._department_cache: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def client(self) -> httpx.Client:
+        """Process-local pooled sync client (recreated after fork)"""
+        pid = os.getpid()
+        if self._client is None or self._client_pid != pid:
+            self._client = httpx.Client(timeout=REQUEST_TIMEOUT, limits=POOL_LIMITS)
+            self._client_pid = pid
+        return self._client
+
+    def async_client(self) -> httpx.AsyncClient:
+        """Pooled async client bound to the running event loop"""
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(timeout=REQUEST_TIMEOUT, limits=POOL_LIMITS)
+            self._async_clients[loop] = client
+        return client
+
+    def close(self) -> None:
+        """Close the sync client (async clients close with their loop)"""
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+    def clear_department_cache(self, project_id: Optional[str] = None) -> None:
+        """Drop cached departments for a project, or for all projects"""
+        with self._lock:
+            if project_id is None:
+                self._department_cache.clear()
+            else:
+                self._department_cache.pop(project_id, None)
+
+    def query_departments(self, project_id: str) -> List[Dict[str, Any]]:
+        """
+        Query departments with gatherCheck=true, sorted by codeDepNumber
+
+        Args:
+            project_id: Project identifier
+
+        Returns:
+            List of department configurations
+        """
+        cached = self._fresh_departments(project_id)
+        if cached is not None:
+            return cached
+
+        url, headers, params = self._departments_request(project_id)
+        try:
+            response = self.client.get(url, headers=headers, params=params)
+            return self._handle_departments_response(project_id, response)
+        except Exception as e:
+            return self._departments_fallback(project_id, e)
+
+    async def query_departments_async(self, project_id: str) -> List[Dict[str, Any]]:
+        """
+        Async variant of query_departments
+        """
+        cached = self._fresh_departments(project_id)
+        if cached is not None:
+            return cached
+
+        url, headers, params = self._departments_request(project_id)
+        try:
+            response = await self.async_client().get(url, headers=headers, params=params)
+            return self._handle_departments_response(project_id, response)
+        except Exception as e:
+            return self._departments_fallback(project_id, e)
+
+    def trigger_evaluation(self, project_id: str, department_number: int) -> bool:
+        """
+        Trigger department evaluation via task service
+
+        Args:
+            project_id: Project identifier
+            department_number: Department code number
+
+        Returns:
+            True if triggered successfully
+        """
+        url, headers, payload = self._evaluation_request(project_id, department_number)
+        try:
+            response = self.client.post(url, json=payload, headers=headers)
+            return self._handle_evaluation_response(project_id, department_number, response)
+        except Exception as e:
+            return self._evaluation_failed(project_id, department_number, e)
+
+    async def trigger_evaluation_async(self, project_id: str, department_number: int) -> bool:
+        """
+        Async variant of trigger_evaluation
+        """
+        url, headers, payload = self._evaluation_request(project_id, department_number)
+        try:
+            response = await self.async_client().post(url, json=payload, headers=headers)
+            return self._handle_evaluation_response(project_id, department_number, response)
+        except Exception as e:
+            return self._evaluation_failed(project_id, department_number, e)
+
+    def trigger_evaluations(self, project_id: str, department_numbers: List[int]) -> bool:
+        """
+        Trigger evaluations for several departments with one batch request
+        Falls back to one request per department if the batch request was not
+        delivered (connection failure) or the batch endpoint is missing (404,
+        405); after a timeout or a 5xx the service may have enqueued the batch,
+        so nothing is resent
+
+        Args:
+            project_id: Project identifier
+            department_numbers: Department code numbers
+
+        Returns:
+            True if every evaluation was triggered
+
+        Raises:
+            EvaluationTriggersThrottled: The service's queue is full (429)
+        """
+        if not department_numbers:
+            return True
+
+        url, headers, payload = self._evaluation_batch_request(project_id, department_numbers)
+        try:
+            response = self.client.post(url, json=payload, headers=headers)
+            return self._handle_evaluation_batch_response(project_id, department_numbers, response)
+        except Exception as e:
+            if not self._evaluation_batch_failed(project_id, department_numbers, e):
+                return False
+
+        results = [self.trigger_evaluation(project_id, number) for number in department_numbers]
+        return all(results)
+
+    async def trigger_evaluations_async(self, project_id: str, department_numbers: List[int]) -> bool:
+        """
+        Async variant of trigger_evaluations
+        """
+        if not department_numbers:
+            return True
+
+        url, headers, payload = self._evaluation_batch_request(project_id, department_numbers)
+        try:
+            response = await self.async_client().post(url, json=payload, headers=headers)
+            return self._handle_evaluation_batch_response(project_id, department_numbers, response)
+        except Exception as e:
+            if not self._evaluation_batch_failed(project_id, department_numbers, e):
+                return False
+
+        results = await asyncio.gather(*[
+            self.trigger_evaluation_async(project_id, number) for number in department_numbers
+        ])
+        return all(results)
+
+    def _fresh_departments(self, project_id: str) -> Optional[List[Dict[str, Any]]]:
+        """Cached departments if still within the TTL"""
+        with self._lock:
+            entry = self._department_cache.get(project_id)
+            if entry and time.monotonic() - entry['fetched_at'] < self.department_cache_ttl:
+                record_cache("payload_departments", hit=True)
+                return list(entry['departments'])
+        record_cache("payload_departments", hit=False)
+        return None
+
+    def _departments_request(self, project_id: str):
+        """URL, headers (with If-None-Match when cached) and params"""
+        url = f"{get_payload_api_url()}/departments"
         headers = get_payload_headers()
-        
-        # Query Payload CMS for departments
-        url = f"{api_url}/departments"
         params = {
             'where[gatherCheck][equals]': 'true',
             'where[isActive][equals]': 'true',
             'sort': 'codeDepNumber',
             'limit': 1000  # Support up to 1000 departments
         }
-        
+
+        with self._lock:
+            entry = self._department_cache.get(project_id)
+            if entry and entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+
         logger.info(
             "Querying departments from Payload",
             project_id=project_id,
-            url=url
+            url=url,
+            revalidating='If-None-Match' in headers
         )
-        
-        response = requests.get(url, headers=headers, params=params, timeout=30)
+        return url, headers, params
+
+    def _handle_departments_response(
+        self,
+        project_id: str,
+        response: httpx.Response
+    ) -> List[Dict[str, Any]]:
+        """Apply a departments response to the cache and return the list"""
+        with self._lock:
+            entry = self._department_cache.get(project_id)
+            if response.status_code == 304 and entry:
+                entry['fetched_at'] = time.monotonic()
+                logger.info(
+                    "Departments not modified, using cache",
+                    project_id=project_id,
+                    count=len(entry['departments'])
+                )
+                return list(entry['departments'])
+
         response.raise_for_status()
-        
+
         data = response.json()
         departments = data.get('docs', [])
-        
+
         logger.info(
             "Retrieved departments from Payload",
             project_id=project_id,
             count=len(departments)
         )
-        
+
         # Extract relevant fields
         processed_departments = []
         for dept in departments:
@@ -84,93 +298,383 @@ def query_departments_for_automation(project_id: str) -> List[Dict[str, Any]]:
                 'defaultModel': dept.get('defaultModel', 'anthropic/claude-sonnet-4.5'),
                 'coordinationSettings': dept.get('coordinationSettings', {})
             })
-        
-        return processed_departments
-        
-    except requests.exceptions.RequestException as e:
+
+        with self._lock:
+            self._department_cache[project_id] = {
+                'departments': processed_departments,
+                'etag': response.headers.get('ETag'),
+                'fetched_at': time.monotonic()
+            }
+
+        return list(processed_departments)
+
+    def _departments_fallback(self, project_id: str, error: Exception) -> List[Dict[str, Any]]:
+        """Serve stale cached departments, or mock departments, on errors"""
         logger.error(
             "Error querying departments from Payload",
             project_id=project_id,
-            error=str(e),
+            error=str(error),
             exc_info=True
         )
+
+        with self._lock:
+            entry = self._department_cache.get(project_id)
+            if entry:
+                logger.warning(
+                    "Using stale cached departments",
+                    project_id=project_id,
+                    count=len(entry['departments'])
+                )
+                return list(entry['departments'])
+
         # Return mock departments for testing
         return _get_mock_departments()
-    except Exception as e:
-        logger.error(
-            "Unexpected error querying departments",
+
+    def _evaluation_request(self, project_id: str, department_number: int):
+        """URL, headers and payload for an evaluation submission"""
+        url, headers = _task_service_request('/api/v1/tasks/submit')
+        payload = _evaluation_payload(project_id, department_number)
+
+        logger.info(
+            "Triggering department evaluation",
             project_id=project_id,
-            error=str(e),
-            exc_info=True
+            department_number=department_number
         )
-        return _get_mock_departments()
+        return url, headers, payload
 
-
-def trigger_department_evaluation(project_id: str, department_number: int) -> bool:
-    """
-    Trigger department evaluation via task service
-    
-    Args:
-        project_id: Project identifier
-        department_number: Department code number
-    
-    Returns:
-        True if triggered successfully
-    """
-    try:
-        # Get task service URL
-        task_service_url = os.getenv('TASK_SERVICE_URL', 'http://localhost:8001')
-        task_api_key = os.getenv('CELERY_API_KEY', '')
-        
-        url = f"{task_service_url}/api/v1/tasks/submit"
-        headers = {
-            'Content-Type': 'application/json',
-            'X-API-Key': task_api_key
-        }
-        
+    def _evaluation_batch_request(self, project_id: str, department_numbers: List[int]):
+        """URL, headers and payload for a batch evaluation submission"""
+        url, headers = _task_service_request('/api/v1/tasks/submit/batch')
         payload = {
-            'project_id': project_id,
-            'task_type': 'evaluate_department',
-            'task_data': {
-                'department_slug': f'dept_{department_number}',  # Will be resolved by evaluation task
-                'department_number': department_number,
-                'gather_data': [],  # Will be fetched by evaluation task
-                'threshold': 80
-            }
+            'tasks': [
+                _evaluation_payload(project_id, number) for number in department_numbers
+            ]
         }
-        
+
         logger.info(
-            "Triggering department evaluation",
+            "Triggering department evaluations",
             project_id=project_id,
-            department_number=department_number
+            department_numbers=department_numbers
         )
-        
-        response = requests.post(url, json=payload, headers=headers, timeout=30)
+        return url, headers, payload
+
+    def _handle_evaluation_response(
+        self,
+        project_id: str,
+        department_number: int,
+        response: httpx.Response
+    ) -> bool:
+        """Check an evaluation submission response"""
         response.raise_for_status()
-        
+
         result = response.json()
         task_id = result.get('task_id')
-        
+
         logger.info(
             "Department evaluation triggered",
             project_id=project_id,
             department_number=department_number,
             task_id=task_id
         )
-        
+
+        return True
+
+    def _handle_evaluation_batch_response(
+        self,
+        project_id: str,
+        department_numbers: List[int],
+        response: httpx.Response
+    ) -> bool:
+        """Check a batch evaluation submission response"""
+        response.raise_for_status()
+
+        result = response.json()
+        task_ids = [task.get('task_id') for task in result.get('tasks', [])]
+
+        logger.info(
+            "Department evaluations triggered",
+            project_id=project_id,
+            department_numbers=department_numbers,
+            task_ids=task_ids
+        )
+
         return True
-        
-    except Exception as e:
+
+    def _evaluation_batch_failed(
+        self,
+        project_id: str,
+        department_numbers: List[int],
+        error: Exception
+    ) -> bool:
+        """
+        Log a failed batch submission
+
+        Returns:
+            True if the batch certainly enqueued nothing, so the departments
+            can be triggered one by one
+
+        Raises:
+            EvaluationTriggersThrottled: The service's queue is full (429)
+        """
+        retry_after = _throttled_retry_after(error)
+        if retry_after is not None:
+            logger.warning(
+                "Evaluation triggers throttled by the task service",
+                project_id=project_id,
+                department_numbers=department_numbers,
+                retry_after=retry_after
+            )
+            raise EvaluationTriggersThrottled(retry_after) from error
+
+        if _batch_not_delivered(error):
+            logger.warning(
+                "Batch evaluation trigger failed, triggering departments one by one",
+                project_id=project_id,
+                department_numbers=department_numbers,
+                error=str(error)
+            )
+            return True
+
+        logger.error(
+            "Batch evaluation trigger failed and may have been enqueued, not resending",
+            project_id=project_id,
+            department_numbers=department_numbers,
+            error=str(error)
+        )
+        return False
+
+    def _evaluation_failed(self, project_id: str, department_number: int, error: Exception) -> bool:
+        """Log a failed evaluation submission"""
         logger.error(
             "Error triggering department evaluation",
             project_id=project_id,
             department_number=department_number,
-            error=str(e),
+            error=str(error),
             exc_info=True
         )
         return False
 
 
+def _batch_not_delivered(error: Exception) -> bool:
+    """Check whether a failed batch request never reached the service or its endpoint"""
+    if isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout)):
+        return True
+    return (
+        isinstance(error, httpx.HTTPStatusError)
+        and error.response.status_code in BATCH_UNSUPPORTED_STATUSES
+    )
+
+
+def _throttled_retry_after(error: Exception) -> Optional[float]:
+    """Retry-After seconds of a 429 response, or None for other errors"""
+    if not isinstance(error, httpx.HTTPStatusError) or error.response.status_code != 429:
+        return None
+    try:
+        return float(error.response.headers.get('Retry-After', ''))
+    except ValueError:
+        return settings.evaluation_trigger_max_delay
+
+
+def _task_service_request(path: str):
+    """URL and headers for a task service endpoint"""
+    task_service_url = os.getenv('TASK_SERVICE_URL', 'http://localhost:8001')
+    task_api_key = os.getenv('CELERY_API_KEY', '')
+
+    url = f"{task_service_url}{path}"
+    headers = {
+        'Content-Type': 'application/json',
+        'X-API-Key': task_api_key
+    }
+    return url, headers
+
+
+def _evaluation_payload(project_id: str, department_number: int) -> Dict[str, Any]:
+    """Task submission payload for a department evaluation"""
+    return {
+        'project_id': project_id,
+        'task_type': 'evaluate_department',
+        'task_data': {
+            'department_slug': f'dept_{department_number}',  # Will be resolved by evaluation task
+            'department_number': department_number,
+            'gather_data': [],  # Will be fetched by evaluation task
+            'threshold': 80
+        }
+    }
+
+
+class EvaluationTriggerBatcher:
+    """
+    Queue of department evaluation triggers for one project
+
+    Departments that finish close together are submitted with one batch
+    request. The queue is flushed once it holds max_batch departments or its
+    oldest entry has waited max_delay seconds; callers check this with
+    flush_if_due() at natural boundaries (e.g. after each iteration) and call
+    flush() when the run ends. Triggers the task service throttles (429) stay
+    queued until its Retry-After has passed. The queue serializes with
+    to_dict() so it can be checkpointed with multi-step runs.
+    """
+
+    def __init__(
+        self,
+        project_id: str,
+        max_batch: Optional[int] = None,
+        max_delay: Optional[float] = None
+    ):
+        self.project_id = project_id
+        self.max_batch = (
+            settings.evaluation_trigger_batch_size if max_batch is None else max_batch
+        )
+        self.max_delay = (
+            settings.evaluation_trigger_max_delay if max_delay is None else max_delay
+        )
+        self.pending: List[int] = []
+        self.first_queued_at: Optional[float] = None
+        self.retry_at: Optional[float] = None
+
+    def add(self, department_number: int) -> None:
+        """Queue an evaluation trigger for a department"""
+        if department_number in self.pending:
+            return
+        if not self.pending:
+            self.first_queued_at = time.time()
+        self.pending.append(department_number)
+
+    def due(self) -> bool:
+        """Whether the queue should be flushed now"""
+        if not self.pending:
+            return False
+        if self.retry_at is not None and time.time() < self.retry_at:
+            return False
+        return (
+            len(self.pending) >= self.max_batch
+            or time.time() - self.first_queued_at >= self.max_delay
+        )
+
+    def flush_if_due(self) -> bool:
+        """Flush the queue if it is full or has waited long enough"""
+        return self.flush() if self.due() else True
+
+    def flush(self, wait: bool = False) -> bool:
+        """
+        Trigger all queued evaluations
+
+        Args:
+            wait: When throttled, wait out the Retry-After (at most max_delay
+                seconds) and try once more, e.g. when the run ends
+
+        Returns:
+            True if every queued evaluation was triggered; throttled triggers
+            stay queued
+        """
+        if not self.pending:
+            return True
+
+        department_numbers = self.pending
+        first_queued_at = self.first_queued_at
+        self.pending = []
+        self.first_queued_at = None
+
+        try:
+            triggered = trigger_department_evaluations(self.project_id, department_numbers)
+        except EvaluationTriggersThrottled as e:
+            self.pending = department_numbers
+            self.first_queued_at = first_queued_at
+            self.retry_at = time.time() + e.retry_after
+            if not wait:
+                return False
+            time.sleep(min(e.retry_after, self.max_delay))
+            return self.flush()
+
+        self.retry_at = None
+        return triggered
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize queued triggers"""
+        return {
+            'project_id': self.project_id,
+            'pending': list(self.pending),
+            'first_queued_at': self.first_queued_at,
+            'retry_at': self.retry_at
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "EvaluationTriggerBatcher":
+        """Restore queued triggers"""
+        batcher = cls(data['project_id'])
+        batcher.pending = list(data.get('pending', []))
+        batcher.first_queued_at = data.get('first_queued_at')
+        batcher.retry_at = data.get('retry_at')
+        return batcher
+
+
+# Global Payload client instance (one connection pool per worker process)
+payload_client = PayloadClient()
+
+
+def query_departments_for_automation(project_id: str) -> List[Dict[str, Any]]:
+    """
+    Query departments with gatherCheck=true, sorted by codeDepNumber
+    DYNAMIC: No hardcoded departments
+
+    Args:
+        project_id: Project identifier
+
+    Returns:
+        List of department configurations
+    """
+    return payload_client.query_departments(project_id)
+
+
+async def query_departments_for_automation_async(project_id: str) -> List[Dict[str, Any]]:
+    """
+    Async variant of query_departments_for_automation
+    """
+    return await payload_client.query_departments_async(project_id)
+
+
+def trigger_department_evaluation(project_id: str, department_number: int) -> bool:
+    """
+    Trigger department evaluation via task service
+
+    Args:
+        project_id: Project identifier
+        department_number: Department code number
+
+    Returns:
+        True if triggered successfully
+    """
+    return payload_client.trigger_evaluation(project_id, department_number)
+
+
+async def trigger_department_evaluation_async(project_id: str, department_number: int) -> bool:
+    """
+    Async variant of trigger_department_evaluation
+    """
+    return await payload_client.trigger_evaluation_async(project_id, department_number)
+
+
+def trigger_department_evaluations(project_id: str, department_numbers: List[int]) -> bool:
+    """
+    Trigger evaluations for several departments with one request
+
+    Args:
+        project_id: Project identifier
+        department_numbers: Department code numbers
+
+    Returns:
+        True if every evaluation was triggered
+    """
+    return payload_client.trigger_evaluations(project_id, department_numbers)
+
+
+async def trigger_department_evaluations_async(project_id: str, department_numbers: List[int]) -> bool:
+    """
+    Async variant of trigger_department_evaluations
+    """
+    return await payload_client.trigger_evaluations_async(project_id, department_numbers)
+
+
 def _get_mock_departments() -> List[Dict[str, Any]]:
     """
     Get mock departments for testing when Payload is not available
@@ -216,11 +720,10 @@ def _get_mock_departments() -> List[Dict[str, Any]]:
             }
         }
     ]
-    
+
     logger.info(
         "Using mock departments",
         count=len(mock_departments)
     )
-    
-    return mock_departments
 
+    return mock_departments
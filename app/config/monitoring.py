@@ -2,6 +2,7 @@
 Monitoring and metrics configuration for Celery task queue
 Provides metrics collection, logging, and alerting capabilities
 """
+import os
 import structlog
 from typing import Dict, Any, Optional
 from datetime import datetime
@@ -12,20 +13,29 @@ from celery.signals import (
     task_retry,
     task_revoked,
     worker_ready,
-    worker_shutdown
+    worker_shutdown,
+    worker_process_shutdown
 )
+from celery.concurrency.prefork import TaskPool as PreforkTaskPool
+
+from .settings import settings
+from .prometheus import observe_task, start_worker_exporter, mark_process_dead
+from ..storage.runtime_stats import runtime_stats
+from ..storage.metrics_store import metrics_store
+from ..utils.histogram import LogHistogram
 
 logger = structlog.get_logger(__name__)
 
 
-# Task metrics storage (in-memory for now, can be replaced with Redis/Prometheus)
+# Per-process task metrics. Handlers also publish to the shared metrics_store,
+# which get_task_metrics/check_task_health read so they cover every worker.
 task_metrics = {
     "total_tasks": 0,
     "completed_tasks": 0,
     "failed_tasks": 0,
     "retried_tasks": 0,
     "cancelled_tasks": 0,
-    "task_durations": {},
+    "task_durations": {},  # task name -> LogHistogram (fixed memory)
     "task_start_times": {},
 }
 
@@ -38,6 +48,10 @@ def task_prerun_handler(sender=None, task_id=None, task=None, args=None, kwargs=
     """
     task_metrics["total_tasks"] += 1
     task_metrics["task_start_times"][task_id] = datetime.utcnow()
+    metrics_store.increment("total_tasks")
+    metrics_store.task_started(
+        task_id, task.name if task else str(sender), task_metrics["task_start_times"][task_id]
+    )
     
     logger.info(
         "Task started",
@@ -61,12 +75,18 @@ def task_postrun_handler(sender=None, task_id=None, task=None, args=None, kwargs
         
         task_name = task.name if task else sender
         if task_name not in task_metrics["task_durations"]:
-            task_metrics["task_durations"][task_name] = []
+            task_metrics["task_durations"][task_name] = LogHistogram()
         
-        task_metrics["task_durations"][task_name].append(duration)
+        task_metrics["task_durations"][task_name].record(duration)
+        metrics_store.observe(task_name, duration)
+        observe_task(task_name, _task_queue(task), state, duration)
         
         # Clean up start time
         del task_metrics["task_start_times"][task_id]
+
+        # Successful runs feed the duration estimates of new submissions
+        if state == 'SUCCESS':
+            runtime_stats.record(task_name, duration)
         
         logger.info(
             "Task completed",
@@ -76,8 +96,11 @@ def task_postrun_handler(sender=None, task_id=None, task=None, args=None, kwargs
             state=state
         )
     
+    metrics_store.task_finished(task_id)
+
     if state == 'SUCCESS':
         task_metrics["completed_tasks"] += 1
+        metrics_store.increment("completed_tasks")
 
 
 @task_failure.connect
@@ -88,6 +111,7 @@ def task_failure_handler(sender=None, task_id=None, exception=None, args=None,
     Records failure metrics and logs error details
     """
     task_metrics["failed_tasks"] += 1
+    metrics_store.increment("failed_tasks")
     
     logger.error(
         "Task failed",
@@ -116,6 +140,7 @@ def task_retry_handler(sender=None, task_id=None, reason=None, einfo=None, **ext
     Records retry metrics and logs retry reason
     """
     task_metrics["retried_tasks"] += 1
+    metrics_store.increment("retried_tasks")
     
     logger.warning(
         "Task retry scheduled",
@@ -134,8 +159,11 @@ def task_revoked_handler(sender=None, request=None, terminated=None,
     Records cancellation metrics
     """
     task_metrics["cancelled_tasks"] += 1
+    metrics_store.increment("cancelled_tasks")
     
     task_id = request.id if request else "unknown"
+    if request:
+        metrics_store.task_finished(task_id)
     
     logger.warning(
         "Task revoked",
@@ -158,6 +186,12 @@ def worker_ready_handler(sender=None, **extra):
         concurrency=sender.concurrency if sender else None
     )
 
+    if settings.enable_metrics and sender is not None:
+        start_worker_exporter(
+            hostname=sender.hostname,
+            child_processes=isinstance(sender.pool, PreforkTaskPool)
+        )
+
 
 @worker_shutdown.connect
 def worker_shutdown_handler(sender=None, **extra):
@@ -168,6 +202,49 @@ def worker_shutdown_handler(sender=None, **extra):
         "Worker shutting down",
         hostname=sender.hostname if sender else "unknown"
     )
+    metrics_store.flush()
+
+
+@worker_process_shutdown.connect
+def worker_process_shutdown_handler(**extra):
+    """
+    Called in each pool process before it exits
+    Publishes metrics still buffered in the process
+    """
+    metrics_store.flush()
+    mark_process_dead(os.getpid())
+
+
+def _task_queue(task) -> Optional[str]:
+    """Queue a running task was delivered from"""
+    delivery_info = getattr(getattr(task, 'request', None), 'delivery_info', None) or {}
+    return delivery_info.get('routing_key')
+
+
+def _aggregate_metrics() -> Dict[str, Any]:
+    """
+    Counters and running task start times across all processes
+
+    Falls back to this process's metrics when the shared store is unavailable
+    """
+    snapshot = metrics_store.snapshot()
+    if snapshot is None:
+        return {
+            "counters": {
+                name: task_metrics[name]
+                for name in ("total_tasks", "completed_tasks", "failed_tasks", "retried_tasks", "cancelled_tasks")
+            },
+            "task_start_times": dict(task_metrics["task_start_times"]),
+            "durations": dict(task_metrics["task_durations"])
+        }
+
+    return {
+        "counters": snapshot["counters"],
+        "durations": snapshot["durations"],
+        "task_start_times": {
+            task_id: entry["started_at"] for task_id, entry in snapshot["running"].items()
+        }
+    }
 
 
 def get_task_metrics() -> Dict[str, Any]:
@@ -177,28 +254,43 @@ def get_task_metrics() -> Dict[str, Any]:
     Returns:
         Dictionary containing task metrics
     """
-    # Calculate average durations
+    return _build_metrics(_aggregate_metrics())
+
+
+def _build_metrics(aggregate: Dict[str, Any]) -> Dict[str, Any]:
+    """Metrics report from aggregated counters and running tasks"""
+    # Average and percentile durations per task
     avg_durations = {}
-    for task_name, durations in task_metrics["task_durations"].items():
-        if durations:
-            avg_durations[task_name] = sum(durations) / len(durations)
+    duration_percentiles = {}
+    for task_name, histogram in aggregate["durations"].items():
+        if histogram.count:
+            avg_durations[task_name] = histogram.mean()
+            duration_percentiles[task_name] = {
+                "p50": histogram.percentile(50),
+                "p95": histogram.percentile(95),
+                "p99": histogram.percentile(99)
+            }
+
+    counters = aggregate["counters"]
+    total_tasks = counters.get("total_tasks", 0)
     
     return {
-        "total_tasks": task_metrics["total_tasks"],
-        "completed_tasks": task_metrics["completed_tasks"],
-        "failed_tasks": task_metrics["failed_tasks"],
-        "retried_tasks": task_metrics["retried_tasks"],
-        "cancelled_tasks": task_metrics["cancelled_tasks"],
+        "total_tasks": total_tasks,
+        "completed_tasks": counters.get("completed_tasks", 0),
+        "failed_tasks": counters.get("failed_tasks", 0),
+        "retried_tasks": counters.get("retried_tasks", 0),
+        "cancelled_tasks": counters.get("cancelled_tasks", 0),
         "success_rate": (
-            task_metrics["completed_tasks"] / task_metrics["total_tasks"] * 100
-            if task_metrics["total_tasks"] > 0 else 0
+            counters.get("completed_tasks", 0) / total_tasks * 100
+            if total_tasks > 0 else 0
         ),
         "failure_rate": (
-            task_metrics["failed_tasks"] / task_metrics["total_tasks"] * 100
-            if task_metrics["total_tasks"] > 0 else 0
+            counters.get("failed_tasks", 0) / total_tasks * 100
+            if total_tasks > 0 else 0
         ),
         "average_durations": avg_durations,
-        "currently_running": len(task_metrics["task_start_times"])
+        "duration_percentiles": duration_percentiles,
+        "currently_running": len(aggregate["task_start_times"])
     }
 
 
@@ -222,7 +314,8 @@ def check_task_health() -> Dict[str, Any]:
     Returns:
         Dictionary containing health status and alerts
     """
-    metrics = get_task_metrics()
+    aggregate = _aggregate_metrics()
+    metrics = _build_metrics(aggregate)
     alerts = []
     
     # Check failure rate
@@ -242,7 +335,7 @@ def check_task_health() -> Dict[str, Any]:
         })
     
     # Check for long-running tasks (> 8 minutes for automated_gather_creation)
-    for task_id, start_time in task_metrics["task_start_times"].items():
+    for task_id, start_time in aggregate["task_start_times"].items():
         duration = (datetime.utcnow() - start_time).total_seconds()
         if duration > 480:  # 8 minutes
             alerts.append({
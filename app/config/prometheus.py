@@ -0,0 +1,215 @@
+"""
+Prometheus metrics for the API and Celery workers
+
+Metrics are recorded with prometheus-client. When PROMETHEUS_MULTIPROC_DIR is
+set (required for uvicorn --workers > 1 and prefork Celery pools), every
+process writes its samples to that directory and the exporters aggregate them.
+"""
+import os
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+import structlog
+from prometheus_client import (
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+    start_http_server,
+)
+from prometheus_client.core import GaugeMetricFamily
+
+from .settings import settings
+
+logger = structlog.get_logger(__name__)
+
+MULTIPROCESS_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+# Seconds; covers quick CPU tasks up to hour-long video renders
+TASK_BUCKETS = (0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1200, 1800, 3600)
+
+# Seconds; covers Redis/Mongo reads up to slow LLM completions
+CALL_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# Seconds; covers small checkpoints up to multi-GB weights from network storage
+MODEL_LOAD_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+
+TASK_DURATION = Histogram(
+    "task_duration_seconds",
+    "Celery task run time",
+    ["task_name", "queue", "state"],
+    buckets=TASK_BUCKETS,
+)
+
+EXTERNAL_CALL_DURATION = Histogram(
+    "external_call_duration_seconds",
+    "Latency of calls to external services (brain, webhook, mongodb, llm)",
+    ["service", "operation", "outcome"],
+    buckets=CALL_BUCKETS,
+)
+
+CACHE_REQUESTS = Counter(
+    "cache_requests_total",
+    "Cache lookups by cache and result (hit/miss)",
+    ["cache", "result"],
+)
+
+MODEL_LOAD_DURATION = Histogram(
+    "model_load_duration_seconds",
+    "Time to load a model into a GPU worker process",
+    ["model"],
+    buckets=MODEL_LOAD_BUCKETS,
+)
+
+REDIS_ROUND_TRIPS = Counter(
+    "redis_round_trips_total",
+    "Commands or pipelines sent to Redis, by component",
+    ["component"],
+)
+
+
+def observe_task(task_name: str, queue: str, state: str, duration: float) -> None:
+    """Record a finished task's run time"""
+    TASK_DURATION.labels(task_name=task_name, queue=queue or "unknown", state=state or "unknown").observe(duration)
+
+
+@contextmanager
+def track_call(service: str, operation: str) -> Iterator[None]:
+    """
+    Time a call to an external service
+
+    Example:
+        with track_call("webhook", "send"):
+            response = await client.post(url, json=payload)
+    """
+    start = time.perf_counter()
+    outcome = "success"
+    try:
+        yield
+    except BaseException:
+        outcome = "error"
+        raise
+    finally:
+        EXTERNAL_CALL_DURATION.labels(
+            service=service, operation=operation, outcome=outcome
+        ).observe(time.perf_counter() - start)
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    """Count a cache lookup"""
+    CACHE_REQUESTS.labels(cache=cache, result="hit" if hit else "miss").inc()
+
+
+def observe_model_load(model: str, duration: float) -> None:
+    """Record how long a model took to load"""
+    MODEL_LOAD_DURATION.labels(model=model).observe(duration)
+
+
+def instrument_redis(client, component: str):
+    """
+    Count Redis round trips made through a client
+
+    New connections of the client's pool send through a subclass of the
+    pool's connection class that counts each packed send (one per command,
+    one per pipeline). TLS connections keep their class.
+
+    Returns:
+        The client
+    """
+    pool = client.connection_pool
+    base_class = pool.connection_class
+
+    def send_packed_command(self, command, check_health=True):
+        REDIS_ROUND_TRIPS.labels(component=component).inc()
+        return base_class.send_packed_command(self, command, check_health)
+
+    pool.connection_class = type(
+        f"Instrumented{base_class.__name__}",
+        (base_class,),
+        {"send_packed_command": send_packed_command},
+    )
+    return client
+
+
+class QueueDepthCollector:
+    """Reports broker queue depths (read at scrape time) as a gauge"""
+
+    def collect(self):
+        from ..scheduling.admission import admission_controller
+
+        gauge = GaugeMetricFamily("task_queue_depth", "Tasks waiting per queue", labels=["queue"])
+        for status in admission_controller.get_queue_status():
+            if status["depth"] is not None:
+                gauge.add_metric([status["queue"]], status["depth"])
+        yield gauge
+
+
+def build_registry(include_queue_depth: bool = False) -> CollectorRegistry:
+    """
+    Registry to export from this process
+
+    Args:
+        include_queue_depth: Add the broker queue depth gauge (API only, so
+            depths are not scraped once per worker)
+    """
+    if MULTIPROCESS_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = CollectorRegistry()
+        for collector in (TASK_DURATION, EXTERNAL_CALL_DURATION, CACHE_REQUESTS, MODEL_LOAD_DURATION,
+                          REDIS_ROUND_TRIPS):
+            registry.register(collector)
+
+    if include_queue_depth:
+        registry.register(QueueDepthCollector())
+    return registry
+
+
+def generate_metrics(include_queue_depth: bool = True) -> bytes:
+    """Prometheus text exposition for the API /metrics endpoint"""
+    return generate_latest(build_registry(include_queue_depth))
+
+
+def start_worker_exporter(
+    hostname: Optional[str] = None,
+    port: Optional[int] = None,
+    child_processes: bool = True
+) -> bool:
+    """
+    Serve worker metrics over HTTP (called once per worker node)
+
+    Tasks of a prefork pool record their metrics in the child processes, which
+    the node's exporter can only read through PROMETHEUS_MULTIPROC_DIR, so
+    without it the exporter is not started.
+
+    Args:
+        hostname: Worker node name, selecting its port from WORKER_METRICS_PORTS
+        port: Port to serve on (overrides the configured one)
+        child_processes: Whether tasks run in pool child processes
+
+    Returns:
+        True if the exporter started
+    """
+    if child_processes and not MULTIPROCESS_DIR:
+        logger.error(
+            "Worker metrics need PROMETHEUS_MULTIPROC_DIR with a prefork pool, exporter not started",
+            hostname=hostname
+        )
+        return False
+
+    port = port or (settings.get_worker_metrics_port(hostname) if hostname else settings.metrics_port)
+    try:
+        start_http_server(port, registry=build_registry())
+        logger.info("Prometheus exporter started", port=port, multiprocess=bool(MULTIPROCESS_DIR))
+        return True
+    except OSError as e:
+        logger.error("Failed to start Prometheus exporter", port=port, hostname=hostname, error=str(e))
+        return False
+
+
+def mark_process_dead(pid: int) -> None:
+    """Drop live-gauge samples of an exited pool process (multiprocess mode)"""
+    if MULTIPROCESS_DIR:
+        multiprocess.mark_process_dead(pid)
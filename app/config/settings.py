@@ -3,7 +3,7 @@ Configuration management for AI Movie Task Service
 Follows constitutional requirements for environment-based configuration
 """
 import os
-from typing import List, Optional
+from typing import Dict, List, Optional
 from pydantic import BaseModel, field_validator, ConfigDict
 from dotenv import load_dotenv
 
@@ -11,6 +11,40 @@ from dotenv import load_dotenv
 load_dotenv()
 
 
+def _parse_named_values(value: str) -> Dict[str, float]:
+    """Parse "name:value" pairs from a comma-separated string"""
+    parsed = {}
+    for pair in value.split(','):
+        name, _, number = pair.strip().rpartition(':')
+        if not name:
+            continue
+        try:
+            parsed[name.strip()] = float(number)
+        except ValueError:
+            continue
+    return parsed
+
+
+_MEMORY_UNITS = {'': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3, 'T': 1024 ** 4}
+
+
+def parse_memory_size(value: str) -> int:
+    """
+    Parse a memory size such as "8GB", "512MB", "1.5G" or "1024" into bytes
+
+    Raises:
+        ValueError: If the value is not a size
+    """
+    text = str(value).strip().upper()
+    for suffix in ('IB', 'B'):
+        if text.endswith(suffix):
+            text = text[:-len(suffix)]
+            break
+    unit = text[-1:] if text[-1:] in _MEMORY_UNITS else ''
+    number = text[:-1] if unit else text
+    return int(float(number.strip()) * _MEMORY_UNITS[unit])
+
+
 class Settings(BaseModel):
     """Application settings with environment variable support"""
     
@@ -30,6 +64,20 @@ class Settings(BaseModel):
     # PayloadCMS Integration (via Auto-Movie App)
     payload_api_url: str = "http://localhost:3010/api"
     payload_api_key: str = ""
+    payload_department_cache_ttl: float = 300.0  # seconds before ETag revalidation
+    evaluation_trigger_batch_size: int = 10
+    evaluation_trigger_max_delay: float = 30.0  # seconds a queued trigger may wait
+    evaluation_prompt_token_budget: int = 12000  # gathered content tokens per evaluation prompt
+    evaluation_model: str = "mock-evaluator-v1"
+    evaluation_cache_enabled: bool = True
+    evaluation_cache_ttl: int = 86400  # 24 hours
+    evaluation_map_reduce_threshold: int = 200  # gather items before chunked evaluation
+    evaluation_chunk_size: int = 50
+    evaluation_map_concurrency: int = 4
+
+    # Claim-check storage for large task payloads
+    payload_offload_threshold: int = 65536  # bytes of JSON before a field is stored by reference
+    payload_store_ttl: int = 86400  # 24 hours
     
     # Webhook configuration
     webhook_base_url: str = "http://localhost:3010/api/webhooks"
@@ -44,20 +92,69 @@ class Settings(BaseModel):
     # GPU Configuration
     cuda_visible_devices: str = "0,1,2,3"
     max_gpu_memory_per_task: str = "8GB"
+    gpu_telemetry_provider: str = "auto"  # auto (NVML if available), nvml, fake or none
+    gpu_telemetry_interval: float = 5.0  # seconds between GPU samples per worker node
+    gpu_admission_enabled: bool = True
+    gpu_admission_queues: str = "gpu_heavy,gpu_medium"  # Queues whose tasks reserve GPU memory
+    gpu_device_memory: str = ""  # Per-device budget; empty uses telemetry (24GB if unknown)
+    gpu_memory_headroom: str = "1GB"  # Kept free on every device
+    gpu_admission_retry_delay: int = 30  # seconds before a requeued task runs again
+    gpu_admission_max_retries: int = 20
+    gpu_pin_processes: bool = True  # Pin each worker pool process to one device
+    gpu_routing_mode: str = "shared"  # shared (one queue per type) or device (per-device queues, bin packed)
+    gpu_model_cache_budget: str = "12GB"  # VRAM each pool process keeps models resident in
+    gpu_model_sizes: str = ""  # Per-model VRAM, e.g. "video-gen-v2.1:10GB,image-gen-v3.0:2.5GB"
+    model_affinity_enabled: bool = False  # Route GPU tasks to workers already holding their model (shared mode)
+    model_affinity_wait: float = 30.0  # seconds a task waits for such a worker before any worker may take it
     
     # Task Configuration
     max_retry_attempts: int = 3
     task_timeout: int = 3600  # 1 hour default
+    worker_max_memory_per_child: int = 2048000  # KB of RSS before a pool process is replaced
+    worker_max_tasks_per_child: int = 0  # Replace pool processes after N tasks (0 = never)
     queue_max_size: int = 1000
+    queue_limits: str = ""  # Per-queue overrides, e.g. "gpu_heavy:100,gpu_medium:500"
+    admission_depth_cache_ttl: float = 2.0  # seconds a queue depth reading is reused
+    admission_retry_after: int = 30  # Retry-After seconds for rejected submissions
+    queue_concurrency: str = ""  # Tasks run in parallel per queue, e.g. "gpu_heavy:1,cpu_intensive:8"
+    default_task_duration: int = 300  # seconds, until runtimes are recorded
+    runtime_stats_alpha: float = 0.2  # weight of the newest run in the moving average
+    runtime_stats_min_samples: int = 3
+
+    # Fair-share dispatch across projects
+    fair_share_enabled: bool = False
+    fair_share_queues: str = "gpu_medium"  # Comma-separated queues held per project
+    fair_share_max_in_flight: int = 8  # Tasks released to the broker per queue
+    fair_share_default_weight: float = 1.0
+    fair_share_weights: str = ""  # e.g. "project-a:3,project-b:0.5"
+    fair_share_project_cap: int = 4  # Concurrent tasks per project per queue
+    fair_share_project_caps: str = ""  # e.g. "project-a:6"
+
+    # Micro-batching of image generation requests
+    image_batching_enabled: bool = False
+    image_batch_max_size: int = 4  # Requests generated together (keep within MAX_GPU_MEMORY_PER_TASK)
+    image_batch_window: float = 2.0  # seconds a batch collects requests before it is sent
     
     # Monitoring
     enable_metrics: bool = True
     metrics_port: int = 9090
+    worker_metrics_ports: str = ""  # Per-node worker exporter ports, e.g. "cpu-worker:9101,gpu-worker:9102"
+    metrics_flush_interval: float = 1.0  # seconds between fleet metrics flushes per process
+    worker_status_refresh_interval: float = 10.0  # seconds between cached inspect() refreshes
+    worker_inspect_timeout: float = 1.0  # seconds to wait for inspect() replies
+    worker_heartbeat_timeout: float = 30.0  # seconds without a heartbeat before a worker is offline
     log_level: str = "INFO"
     
     # Brain Service Integration
     brain_service_base_url: str = "https://brain.ft.tc"
 
+    # Gather item cache (per-project, per worker process)
+    gather_cache_change_streams: bool = True
+    gather_cache_poll_interval: float = 5.0  # seconds, polling fallback
+    gather_cache_max_projects: int = 32  # Cached projects per process (least recently used dropped)
+    gather_cache_idle_ttl: float = 1800.0  # seconds before an unused project cache is dropped
+    gather_cache_poll_overlap: float = 30.0  # seconds polls reach back for clock skew between writers
+
     # Development
     environment: str = "development"
     debug: bool = False
@@ -74,6 +171,58 @@ class Settings(BaseModel):
         """Get list of valid API keys"""
         return [key.strip() for key in self.api_keys.split(',') if key.strip()]
     
+    def get_queue_limits(self) -> Dict[str, int]:
+        """Get per-queue admission limits that override queue_max_size"""
+        return {queue: int(value) for queue, value in _parse_named_values(self.queue_limits).items()}
+
+    def get_worker_metrics_port(self, hostname: str) -> int:
+        """
+        Exporter port of a worker node, matched by its full name
+        (gpu-worker@render-01) or the part before the @, else metrics_port
+        """
+        ports = _parse_named_values(self.worker_metrics_ports)
+        name = hostname.partition('@')[0]
+        port = ports.get(hostname, ports.get(name))
+        return int(port) if port is not None else self.metrics_port
+
+    def get_queue_concurrency(self) -> Dict[str, int]:
+        """Get per-queue parallelism used for wait estimates"""
+        return {queue: int(value) for queue, value in _parse_named_values(self.queue_concurrency).items()}
+
+    def get_fair_share_queues(self) -> List[str]:
+        """Get list of queues dispatched by the fair-share scheduler"""
+        return [queue.strip() for queue in self.fair_share_queues.split(',') if queue.strip()]
+
+    def get_fair_share_weights(self) -> Dict[str, float]:
+        """Get per-project fair-share weights"""
+        return {
+            project: value for project, value in _parse_named_values(self.fair_share_weights).items()
+            if value > 0
+        }
+
+    def get_fair_share_project_caps(self) -> Dict[str, int]:
+        """Get per-project concurrency caps"""
+        return {
+            project: int(value) for project, value in _parse_named_values(self.fair_share_project_caps).items()
+        }
+    
+    def get_gpu_admission_queues(self) -> List[str]:
+        """Get list of queues whose tasks reserve GPU memory before starting"""
+        return [queue.strip() for queue in self.gpu_admission_queues.split(',') if queue.strip()]
+
+    def get_max_gpu_memory_per_task(self) -> int:
+        """Get the largest GPU memory reservation of one task in bytes"""
+        return parse_memory_size(self.max_gpu_memory_per_task)
+
+    def get_gpu_model_sizes(self) -> Dict[str, int]:
+        """Get per-model VRAM footprints in bytes"""
+        sizes = {}
+        for pair in self.gpu_model_sizes.split(','):
+            model, _, size = pair.strip().rpartition(':')
+            if model:
+                sizes[model.strip()] = parse_memory_size(size)
+        return sizes
+    
     def get_redis_url(self) -> str:
         """Get complete Redis URL (same as redis_url since it's already complete)"""
         return self.redis_url
@@ -102,7 +251,9 @@ class Settings(BaseModel):
     
     model_config = ConfigDict(
         case_sensitive=False,
-        validate_assignment=True
+        validate_assignment=True,
+        # model_affinity_* settings are not pydantic's model_ namespace
+        protected_namespaces=()
     )
 
 
@@ -117,6 +268,18 @@ settings = Settings(
     auto_movie_api_url=os.getenv("AUTO_MOVIE_API_URL", "http://localhost:3010/api"),
     payload_api_url=os.getenv("PAYLOAD_API_URL", "http://localhost:3010/api"),
     payload_api_key=os.getenv("PAYLOAD_API_KEY", ""),
+    payload_department_cache_ttl=float(os.getenv("PAYLOAD_DEPARTMENT_CACHE_TTL", "300.0")),
+    evaluation_trigger_batch_size=int(os.getenv("EVALUATION_TRIGGER_BATCH_SIZE", "10")),
+    evaluation_trigger_max_delay=float(os.getenv("EVALUATION_TRIGGER_MAX_DELAY", "30.0")),
+    evaluation_prompt_token_budget=int(os.getenv("EVALUATION_PROMPT_TOKEN_BUDGET", "12000")),
+    evaluation_model=os.getenv("EVALUATION_MODEL", "mock-evaluator-v1"),
+    evaluation_cache_enabled=os.getenv("EVALUATION_CACHE_ENABLED", "true").lower() == "true",
+    evaluation_cache_ttl=int(os.getenv("EVALUATION_CACHE_TTL", "86400")),
+    evaluation_map_reduce_threshold=int(os.getenv("EVALUATION_MAP_REDUCE_THRESHOLD", "200")),
+    evaluation_chunk_size=int(os.getenv("EVALUATION_CHUNK_SIZE", "50")),
+    evaluation_map_concurrency=int(os.getenv("EVALUATION_MAP_CONCURRENCY", "4")),
+    payload_offload_threshold=int(os.getenv("PAYLOAD_OFFLOAD_THRESHOLD", "65536")),
+    payload_store_ttl=int(os.getenv("PAYLOAD_STORE_TTL", "86400")),
     webhook_base_url=os.getenv("WEBHOOK_BASE_URL", "http://localhost:3010/api/webhooks"),
     r2_endpoint=os.getenv("R2_ENDPOINT", ""),
     r2_access_key=os.getenv("R2_ACCESS_KEY", ""),
@@ -125,13 +288,56 @@ settings = Settings(
     r2_public_url=os.getenv("R2_PUBLIC_URL", ""),
     cuda_visible_devices=os.getenv("CUDA_VISIBLE_DEVICES", "0,1,2,3"),
     max_gpu_memory_per_task=os.getenv("MAX_GPU_MEMORY_PER_TASK", "8GB"),
+    gpu_telemetry_provider=os.getenv("GPU_TELEMETRY_PROVIDER", "auto"),
+    gpu_telemetry_interval=float(os.getenv("GPU_TELEMETRY_INTERVAL", "5.0")),
+    gpu_admission_enabled=os.getenv("GPU_ADMISSION_ENABLED", "true").lower() == "true",
+    gpu_admission_queues=os.getenv("GPU_ADMISSION_QUEUES", "gpu_heavy,gpu_medium"),
+    gpu_device_memory=os.getenv("GPU_DEVICE_MEMORY", ""),
+    gpu_memory_headroom=os.getenv("GPU_MEMORY_HEADROOM", "1GB"),
+    gpu_admission_retry_delay=int(os.getenv("GPU_ADMISSION_RETRY_DELAY", "30")),
+    gpu_admission_max_retries=int(os.getenv("GPU_ADMISSION_MAX_RETRIES", "20")),
+    gpu_pin_processes=os.getenv("GPU_PIN_PROCESSES", "true").lower() == "true",
+    gpu_routing_mode=os.getenv("GPU_ROUTING_MODE", "shared"),
+    gpu_model_cache_budget=os.getenv("GPU_MODEL_CACHE_BUDGET", "12GB"),
+    gpu_model_sizes=os.getenv("GPU_MODEL_SIZES", ""),
+    model_affinity_enabled=os.getenv("MODEL_AFFINITY_ENABLED", "false").lower() == "true",
+    model_affinity_wait=float(os.getenv("MODEL_AFFINITY_WAIT", "30.0")),
     max_retry_attempts=int(os.getenv("MAX_RETRY_ATTEMPTS", "3")),
     task_timeout=int(os.getenv("TASK_TIMEOUT", "3600")),
+    worker_max_memory_per_child=int(os.getenv("WORKER_MAX_MEMORY_PER_CHILD", "2048000")),
+    worker_max_tasks_per_child=int(os.getenv("WORKER_MAX_TASKS_PER_CHILD", "0")),
     queue_max_size=int(os.getenv("QUEUE_MAX_SIZE", "1000")),
+    queue_limits=os.getenv("QUEUE_LIMITS", ""),
+    admission_depth_cache_ttl=float(os.getenv("ADMISSION_DEPTH_CACHE_TTL", "2.0")),
+    admission_retry_after=int(os.getenv("ADMISSION_RETRY_AFTER", "30")),
+    queue_concurrency=os.getenv("QUEUE_CONCURRENCY", ""),
+    default_task_duration=int(os.getenv("DEFAULT_TASK_DURATION", "300")),
+    runtime_stats_alpha=float(os.getenv("RUNTIME_STATS_ALPHA", "0.2")),
+    runtime_stats_min_samples=int(os.getenv("RUNTIME_STATS_MIN_SAMPLES", "3")),
+    fair_share_enabled=os.getenv("FAIR_SHARE_ENABLED", "false").lower() == "true",
+    fair_share_queues=os.getenv("FAIR_SHARE_QUEUES", "gpu_medium"),
+    fair_share_max_in_flight=int(os.getenv("FAIR_SHARE_MAX_IN_FLIGHT", "8")),
+    fair_share_default_weight=float(os.getenv("FAIR_SHARE_DEFAULT_WEIGHT", "1.0")),
+    fair_share_weights=os.getenv("FAIR_SHARE_WEIGHTS", ""),
+    fair_share_project_cap=int(os.getenv("FAIR_SHARE_PROJECT_CAP", "4")),
+    fair_share_project_caps=os.getenv("FAIR_SHARE_PROJECT_CAPS", ""),
+    image_batching_enabled=os.getenv("IMAGE_BATCHING_ENABLED", "false").lower() == "true",
+    image_batch_max_size=int(os.getenv("IMAGE_BATCH_MAX_SIZE", "4")),
+    image_batch_window=float(os.getenv("IMAGE_BATCH_WINDOW", "2.0")),
     enable_metrics=os.getenv("ENABLE_METRICS", "true").lower() == "true",
     metrics_port=int(os.getenv("METRICS_PORT", "9090")),
+    worker_metrics_ports=os.getenv("WORKER_METRICS_PORTS", ""),
+    metrics_flush_interval=float(os.getenv("METRICS_FLUSH_INTERVAL", "1.0")),
+    worker_status_refresh_interval=float(os.getenv("WORKER_STATUS_REFRESH_INTERVAL", "10.0")),
+    worker_inspect_timeout=float(os.getenv("WORKER_INSPECT_TIMEOUT", "1.0")),
+    worker_heartbeat_timeout=float(os.getenv("WORKER_HEARTBEAT_TIMEOUT", "30.0")),
     log_level=os.getenv("LOG_LEVEL", "INFO"),
     brain_service_base_url=os.getenv("BRAIN_SERVICE_BASE_URL", "https://brain.ft.tc"),
+    gather_cache_change_streams=os.getenv("GATHER_CACHE_CHANGE_STREAMS", "true").lower() == "true",
+    gather_cache_poll_interval=float(os.getenv("GATHER_CACHE_POLL_INTERVAL", "5.0")),
+    gather_cache_max_projects=int(os.getenv("GATHER_CACHE_MAX_PROJECTS", "32")),
+    gather_cache_idle_ttl=float(os.getenv("GATHER_CACHE_IDLE_TTL", "1800.0")),
+    gather_cache_poll_overlap=float(os.getenv("GATHER_CACHE_POLL_OVERLAP", "30.0")),
     environment=os.getenv("ENVIRONMENT", "development"),
     debug=os.getenv("DEBUG", "false").lower() == "true",
 )
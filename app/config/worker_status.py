@@ -0,0 +1,267 @@
+"""
+Worker status from cached Celery inspection and heartbeat events
+The API refreshes inspect() results in the background and listens for worker
+heartbeats, so /workers/status only reads the cached snapshot
+"""
+import time
+import asyncio
+import threading
+import structlog
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+from .settings import settings
+
+logger = structlog.get_logger(__name__)
+
+# Worker types reported by the API, checked in order against subscribed queues
+WORKER_TYPES = ('gpu_heavy', 'gpu_medium', 'cpu_intensive')
+DEFAULT_WORKER_TYPE = 'cpu_intensive'
+
+
+def worker_type_for(queues: List[str]) -> str:
+    """Worker type from the queues a worker consumes"""
+    for worker_type in WORKER_TYPES:
+        if worker_type in queues:
+            return worker_type
+    return DEFAULT_WORKER_TYPE
+
+
+def build_worker_statuses(
+    active: Dict[str, List[Dict[str, Any]]],
+    reserved: Dict[str, List[Dict[str, Any]]],
+    stats: Dict[str, Dict[str, Any]],
+    active_queues: Dict[str, List[Dict[str, Any]]],
+    heartbeats: Dict[str, Dict[str, Any]],
+    gpu_samples: Optional[Dict[str, List[Dict[str, Any]]]] = None,
+    inspected_at: Optional[float] = None,
+    now: Optional[float] = None
+) -> List[Dict[str, Any]]:
+    """
+    Merge inspect() replies and heartbeats into one status per worker
+
+    Args:
+        active: inspect().active() reply (hostname -> running tasks)
+        reserved: inspect().reserved() reply (hostname -> prefetched tasks)
+        stats: inspect().stats() reply (hostname -> worker stats)
+        active_queues: inspect().active_queues() reply (hostname -> queues)
+        heartbeats: Last heartbeat per hostname ({timestamp, active, processed})
+        gpu_samples: Latest GPU telemetry per hostname (device samples)
+        inspected_at: UNIX time the inspect() replies were collected
+        now: Current UNIX time (defaults to time.time())
+
+    Returns:
+        Worker statuses sorted by worker_id
+    """
+    now = now if now is not None else time.time()
+    hostnames = set(stats) | set(active) | set(heartbeats)
+    workers = []
+
+    for hostname in sorted(hostnames):
+        worker_stats = stats.get(hostname) or {}
+        running = active.get(hostname) or []
+        prefetched = reserved.get(hostname) or []
+        queues = [queue['name'] for queue in active_queues.get(hostname) or []]
+        heartbeat = heartbeats.get(hostname) or {}
+        gpus = (gpu_samples or {}).get(hostname) or []
+        replied = hostname in stats or hostname in active
+
+        concurrency = (worker_stats.get('pool') or {}).get('max-concurrency')
+        processed = worker_stats.get('total') or {}
+        tasks_completed = sum(processed.values()) if processed else heartbeat.get('processed', 0)
+        # maxrss is reported in kilobytes
+        memory_usage = int((worker_stats.get('rusage') or {}).get('maxrss', 0)) * 1024
+
+        # A reply to inspect() is as good as a heartbeat
+        last_heartbeat = heartbeat.get('timestamp')
+        if replied:
+            last_heartbeat = max(last_heartbeat or 0, inspected_at or now)
+        offline = (
+            (heartbeat.get('offline') and not replied)
+            or last_heartbeat is None
+            or now - last_heartbeat > settings.worker_heartbeat_timeout
+        )
+
+        active_count = len(running) if replied else heartbeat.get('active', 0)
+        if offline:
+            status = 'offline'
+        elif concurrency and active_count >= concurrency:
+            status = 'busy'
+        elif active_count:
+            status = 'active'
+        else:
+            status = 'idle'
+
+        workers.append({
+            'worker_id': hostname,
+            'worker_type': worker_type_for(queues),
+            'status': status,
+            'current_task_id': running[0].get('id') if running else None,
+            'active_tasks': [task.get('id') for task in running],
+            'reserved_tasks': len(prefetched),
+            'concurrency': concurrency,
+            'queues': queues,
+            'processed': processed,
+            'tasks_completed': int(tasks_completed),
+            'memory_usage': memory_usage,
+            'gpu_utilization': (
+                sum(gpu['utilization'] for gpu in gpus) / len(gpus) if gpus else 0.0
+            ),
+            'gpus': gpus,
+            'last_heartbeat': (
+                datetime.utcfromtimestamp(last_heartbeat).isoformat() + "Z"
+                if last_heartbeat is not None else None
+            )
+        })
+
+    return workers
+
+
+class WorkerStatusMonitor:
+    """
+    Cached worker status for the API
+
+    start() launches a background refresh of celery inspect() replies every
+    worker_status_refresh_interval seconds and a thread consuming worker
+    heartbeat events. get_status() never touches the broker.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._inspection: Dict[str, Dict[str, Any]] = {
+            'active': {}, 'reserved': {}, 'stats': {}, 'active_queues': {},
+            'gpu_samples': {}
+        }
+        self._heartbeats: Dict[str, Dict[str, Any]] = {}
+        self._refreshed_at: Optional[float] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._receiver = None
+        self._listener: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+
+    def refresh(self) -> bool:
+        """
+        Query workers with inspect(), read GPU telemetry and replace the
+        cached snapshot (blocking)
+
+        Returns:
+            True if the broker could be queried
+        """
+        from ..celery_app import celery_app
+        from ..gpu.telemetry import gpu_telemetry
+
+        try:
+            inspector = celery_app.control.inspect(timeout=settings.worker_inspect_timeout)
+            inspection = {
+                'active': inspector.active() or {},
+                'reserved': inspector.reserved() or {},
+                'stats': inspector.stats() or {},
+                'active_queues': inspector.active_queues() or {},
+                'gpu_samples': gpu_telemetry.get_all()
+            }
+        except Exception as e:
+            logger.error("Failed to inspect workers", error=str(e))
+            return False
+
+        with self._lock:
+            self._inspection = inspection
+            self._refreshed_at = time.time()
+        return True
+
+    def record_heartbeat(self, event: Dict[str, Any]) -> None:
+        """Handle a worker-heartbeat, worker-online or worker-offline event"""
+        hostname = event.get('hostname')
+        if not hostname:
+            return
+
+        with self._lock:
+            self._heartbeats[hostname] = {
+                'timestamp': event.get('timestamp', time.time()),
+                'active': event.get('active', 0),
+                'processed': event.get('processed', 0),
+                'offline': event.get('type') == 'worker-offline'
+            }
+
+    def get_status(self) -> Dict[str, Any]:
+        """
+        Cached status of all workers
+
+        Returns:
+            Dict with workers, total_workers, active_workers, gpu_utilization
+            and refreshed_at (None until the first refresh)
+        """
+        with self._lock:
+            inspection = dict(self._inspection)
+            heartbeats = dict(self._heartbeats)
+            refreshed_at = self._refreshed_at
+
+        workers = build_worker_statuses(heartbeats=heartbeats, inspected_at=refreshed_at, **inspection)
+        online = [worker for worker in workers if worker['status'] != 'offline']
+
+        return {
+            'workers': workers,
+            'total_workers': len(workers),
+            'active_workers': len(online),
+            'gpu_utilization': (
+                sum(worker['gpu_utilization'] for worker in online) / len(online)
+                if online else 0.0
+            ),
+            'refreshed_at': (
+                datetime.utcfromtimestamp(refreshed_at).isoformat() + "Z"
+                if refreshed_at else None
+            )
+        }
+
+    def start(self) -> None:
+        """Start the background refresh and heartbeat listener (call from the event loop)"""
+        if self._refresh_task is not None:
+            return
+
+        self._stopping.clear()
+        self._refresh_task = asyncio.get_running_loop().create_task(self._refresh_loop())
+        self._listener = threading.Thread(
+            target=self._listen_for_heartbeats, name="worker-heartbeats", daemon=True
+        )
+        self._listener.start()
+
+    async def stop(self) -> None:
+        """Stop the background refresh and heartbeat listener"""
+        self._stopping.set()
+        if self._receiver is not None:
+            self._receiver.should_stop = True
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
+
+    async def _refresh_loop(self) -> None:
+        while not self._stopping.is_set():
+            await asyncio.to_thread(self.refresh)
+            await asyncio.sleep(settings.worker_status_refresh_interval)
+
+    def _listen_for_heartbeats(self) -> None:
+        """Consume worker events, reconnecting until stopped"""
+        from ..celery_app import celery_app
+
+        handlers = {
+            'worker-heartbeat': self.record_heartbeat,
+            'worker-online': self.record_heartbeat,
+            'worker-offline': self.record_heartbeat
+        }
+        while not self._stopping.is_set():
+            try:
+                with celery_app.connection_for_read() as connection:
+                    self._receiver = celery_app.events.Receiver(connection, handlers=handlers)
+                    if self._stopping.is_set():
+                        break
+                    self._receiver.capture(limit=None, timeout=None, wakeup=True)
+            except Exception as e:
+                logger.warning("Worker event listener disconnected", error=str(e))
+                self._stopping.wait(settings.worker_status_refresh_interval)
+
+
+# Global worker status monitor instance
+worker_status_monitor = WorkerStatusMonitor()
@@ -0,0 +1,40 @@
+"""
+GPU telemetry, scheduling and model residency for GPU workers
+"""
+from .telemetry import (
+    gpu_telemetry,
+    GpuTelemetry,
+    GpuProvider,
+    NvmlProvider,
+    FakeGpuProvider,
+    create_provider
+)
+from .admission import gpu_admission, GpuAdmission, GpuBudgetExceeded, estimate_gpu_memory
+from .placement import gpu_placement, GpuPlacement, choose_device, device_queue, pin_process
+from .models import model_registry, ModelRegistry, model_for, model_size
+from .affinity import model_affinity, ModelAffinity, model_queue
+
+__all__ = [
+    "gpu_telemetry",
+    "GpuTelemetry",
+    "GpuProvider",
+    "NvmlProvider",
+    "FakeGpuProvider",
+    "create_provider",
+    "gpu_admission",
+    "GpuAdmission",
+    "GpuBudgetExceeded",
+    "estimate_gpu_memory",
+    "gpu_placement",
+    "GpuPlacement",
+    "choose_device",
+    "device_queue",
+    "pin_process",
+    "model_registry",
+    "ModelRegistry",
+    "model_for",
+    "model_size",
+    "model_affinity",
+    "ModelAffinity",
+    "model_queue"
+]
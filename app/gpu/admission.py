@@ -0,0 +1,389 @@
+"""
+GPU-memory-aware task admission using Redis
+Every GPU task declares how much device memory it needs; a worker process
+only starts it once a device on its host has that much unreserved budget, and
+each process only uses one device (pinned at process start, or else by its
+first reservation)
+"""
+import os
+import time
+import socket
+import redis
+from typing import Dict, Any, Callable, List, Optional
+from celery.signals import task_postrun
+import structlog
+
+from ..config.settings import settings, get_gpu_devices, parse_memory_size
+from ..config.prometheus import instrument_redis
+from .models import model_registry, model_size, model_for
+
+logger = structlog.get_logger(__name__)
+
+GB = 1024 ** 3
+
+# Device size assumed when neither GPU_DEVICE_MEMORY nor telemetry knows it
+DEFAULT_DEVICE_MEMORY = 24 * GB
+
+# Reserve a task's memory if the device's live reservations leave room.
+# Reservations are "bytes|expires_at" per task id; expired ones (tasks killed
+# before releasing) are dropped.
+_ACQUIRE_SCRIPT = """
+local now = tonumber(ARGV[3])
+local used = 0
+local entries = redis.call('HGETALL', KEYS[1])
+for i = 1, #entries, 2 do
+    local separator = string.find(entries[i + 1], '|', 1, true)
+    local bytes = tonumber(string.sub(entries[i + 1], 1, separator - 1))
+    local expires_at = tonumber(string.sub(entries[i + 1], separator + 1))
+    if expires_at < now then
+        redis.call('HDEL', KEYS[1], entries[i])
+    elseif entries[i] ~= ARGV[1] then
+        used = used + bytes
+    end
+end
+if used + tonumber(ARGV[2]) > tonumber(ARGV[4]) then
+    return 0
+end
+redis.call('HSET', KEYS[1], ARGV[1], ARGV[2] .. '|' .. ARGV[5])
+return 1
+"""
+
+
+class GpuBudgetExceeded(Exception):
+    """Raised (as the retry reason) when no device has budget for a task"""
+
+    def __init__(self, task_name: str, required: int):
+        self.task_name = task_name
+        self.required = required
+        super().__init__(f"No GPU has {required} bytes free for {task_name}")
+
+
+def _megapixels(width: Any, height: Any) -> float:
+    return int(width) * int(height) / 1_000_000
+
+
+def _resolution(value: Any, default: str) -> float:
+    """Megapixels of a "WIDTHxHEIGHT" resolution"""
+    width, _, height = str(value or default).lower().partition('x')
+    try:
+        return _megapixels(width, height)
+    except ValueError:
+        return _resolution(default, default)
+
+
+def _video_generation_memory(kwargs: Dict[str, Any]) -> float:
+    params = kwargs.get('video_params') or {}
+    megapixels = _resolution(params.get('resolution'), '1920x1080')
+    frames = float(params.get('duration', 30)) * float(params.get('fps', 24))
+    model = model_for('app.tasks.video_tasks.process_video_generation', kwargs)
+    return model_size(model) + 1.5 * GB * megapixels + 0.001 * GB * frames
+
+
+def _video_editing_memory(kwargs: Dict[str, Any]) -> float:
+    return 3 * GB + 0.25 * GB * len(kwargs.get('source_videos') or [])
+
+
+def _image_memory(params: Dict[str, Any]) -> float:
+    """Activations of one image request, on top of the loaded model"""
+    megapixels = _megapixels(params.get('width', 1024), params.get('height', 1024))
+    return 1 * GB * megapixels * int(params.get('num_images', 1))
+
+
+def _image_generation_memory(kwargs: Dict[str, Any]) -> float:
+    model = model_for('app.tasks.image_tasks.process_image_generation', kwargs)
+    return model_size(model) + _image_memory(kwargs.get('image_params') or {})
+
+
+def _image_batch_memory(kwargs: Dict[str, Any]) -> float:
+    # One copy of the model serves every request of the batch
+    model = model_for('app.tasks.image_tasks.process_image_generation_batch', kwargs)
+    return model_size(model) + sum(
+        _image_memory(request.get('image_params') or {}) for request in kwargs.get('requests') or []
+    )
+
+
+# Memory estimators by task name (bytes from task kwargs)
+GPU_MEMORY_ESTIMATORS: Dict[str, Callable[[Dict[str, Any]], float]] = {
+    'app.tasks.video_tasks.process_video_generation': _video_generation_memory,
+    'app.tasks.video_tasks.process_video_editing': _video_editing_memory,
+    'app.tasks.image_tasks.process_image_generation': _image_generation_memory,
+    'app.tasks.image_tasks.process_image_generation_batch': _image_batch_memory,
+}
+
+# Task params that may declare the memory explicitly, e.g. {"gpu_memory": "6GB"}
+_PARAMS_KWARGS = ('video_params', 'image_params', 'edit_instructions')
+
+
+def estimate_gpu_memory(task_name: str, kwargs: Dict[str, Any]) -> int:
+    """
+    GPU memory a task will use, in bytes
+
+    An explicit "gpu_memory" in the task params wins; otherwise the task's
+    estimator scales a base footprint by resolution, duration and batch size.
+    Tasks without an estimator declare max_gpu_memory_per_task, and no
+    estimate exceeds it.
+
+    Args:
+        task_name: Celery task name
+        kwargs: Task keyword arguments
+
+    Returns:
+        Bytes to reserve on the device
+    """
+    limit = settings.get_max_gpu_memory_per_task()
+
+    for params_kwarg in _PARAMS_KWARGS:
+        params = kwargs.get(params_kwarg)
+        declared = params.get('gpu_memory') if isinstance(params, dict) else None
+        if declared:
+            try:
+                return min(parse_memory_size(declared), limit)
+            except ValueError:
+                logger.warning("Ignoring invalid gpu_memory", task_name=task_name, gpu_memory=declared)
+
+    estimator = GPU_MEMORY_ESTIMATORS.get(task_name)
+    if estimator is None:
+        return limit
+
+    try:
+        estimate = int(estimator(kwargs))
+    except (TypeError, ValueError) as e:
+        logger.warning("Failed to estimate GPU memory", task_name=task_name, error=str(e))
+        return limit
+    return min(estimate, limit)
+
+
+class GpuAdmission:
+    """
+    Redis-backed per-device GPU memory budgets shared by all worker processes
+    on a host
+
+    Budgets are keyed by the host name, so separate gpu_heavy and gpu_medium
+    workers on one machine share the same cards.
+    """
+
+    def __init__(self):
+        """Initialize Redis connection"""
+        self.redis_client = instrument_redis(redis.Redis.from_url(
+            settings.redis_url,
+            decode_responses=True
+        ), "gpu_admission")
+        self.key_prefix = "gpu_budget:"
+        self.host = socket.gethostname()
+        self._acquire_script = self.redis_client.register_script(_ACQUIRE_SCRIPT)
+        self.pinned_device: Optional[int] = None
+        self._leases: Dict[str, int] = {}
+        self._lease_bytes: Dict[str, int] = {}
+        self._lease_models: Dict[str, str] = {}
+        self._capacities: Dict[int, int] = {}
+
+    def handles(self, task) -> bool:
+        """Check whether a task reserves GPU memory before it starts"""
+        if not settings.gpu_admission_enabled or not get_gpu_devices():
+            return False
+        return getattr(task, 'queue', None) in settings.get_gpu_admission_queues()
+
+    def admit(self, task, task_id: str, kwargs: Dict[str, Any]) -> Optional[int]:
+        """
+        Wait until a device has budget for a task and reserve it
+
+        Called from the task's before_start. When no device has budget the
+        task goes straight back to the broker (retried after
+        gpu_admission_retry_delay seconds) rather than holding its pool slot.
+
+        Returns:
+            Device the task runs on, or None if admission does not apply
+
+        Raises:
+            celery.exceptions.Retry: If no device had budget in time
+        """
+        if not self.handles(task):
+            return None
+
+        required = estimate_gpu_memory(task.name, kwargs)
+        model = model_for(task.name, kwargs)
+        if self.pinned_device is not None and model_registry.is_resident(model):
+            # The process already holds the model's memory (reserved by the registry)
+            required = max(required - model_size(model), 0)
+        elif model is not None:
+            # Counted here until the model loads and the registry reserves it
+            self._lease_models[task_id] = model
+
+        try:
+            device = self.acquire(task_id, required, hostname=getattr(task.request, 'hostname', None))
+        except Exception as e:
+            # Admission fails open: a Redis outage must not stop GPU work
+            logger.error("GPU admission unavailable", task_id=task_id, error=str(e))
+            self._lease_models.pop(task_id, None)
+            return self.pinned_device
+
+        if device is None:
+            self._lease_models.pop(task_id, None)
+            logger.warning(
+                "No GPU budget, requeueing task",
+                task_id=task_id,
+                task_name=task.name,
+                required=required,
+                pinned_device=self.pinned_device
+            )
+            raise task.retry(
+                exc=GpuBudgetExceeded(task.name, required),
+                countdown=settings.gpu_admission_retry_delay,
+                max_retries=settings.gpu_admission_max_retries
+            )
+
+        logger.info(
+            "GPU memory reserved",
+            task_id=task_id,
+            task_name=task.name,
+            device=device,
+            required=required
+        )
+        return device
+
+    def acquire(self, task_id: str, required: int, hostname: Optional[str] = None) -> Optional[int]:
+        """
+        Reserve memory on this process's device (choosing and pinning one if
+        the process has none yet)
+
+        Args:
+            task_id: Celery task ID holding the reservation
+            required: Bytes to reserve
+            hostname: Worker name whose telemetry reports device sizes
+
+        Returns:
+            Device reserved on, or None if none had budget
+        """
+        if self.pinned_device is not None:
+            candidates = [self.pinned_device]
+        else:
+            candidates = self._devices_by_free_budget(hostname)
+
+        expires_at = time.time() + settings.task_timeout
+        for device in candidates:
+            capacity = self.device_capacity(device, hostname)
+            reserved = self._acquire_script(
+                keys=[self._key(device)],
+                args=[task_id, min(required, capacity), time.time(), capacity, expires_at]
+            )
+            if int(reserved):
+                self._leases[task_id] = device
+                self._lease_bytes[task_id] = min(required, capacity)
+                self._pin(device)
+                return device
+        return None
+
+    def release(self, task_id: str) -> bool:
+        """
+        Return a finished task's reservation
+
+        Returns:
+            True if the task held a reservation in this process
+        """
+        device = self._leases.pop(task_id, None)
+        self._lease_bytes.pop(task_id, None)
+        self._lease_models.pop(task_id, None)
+        if device is None:
+            return False
+        try:
+            self.redis_client.hdel(self._key(device), task_id)
+        except Exception as e:
+            # The reservation expires after the task timeout
+            logger.error("Failed to release GPU memory", task_id=task_id, device=device, error=str(e))
+        return True
+
+    def model_reserved(self, model: str) -> None:
+        """
+        Shrink the reservations of running tasks that counted a model which
+        the model registry now reserves for this process, so the model is
+        not held twice
+        """
+        for task_id, task_model in list(self._lease_models.items()):
+            device = self._leases.get(task_id)
+            if task_model != model or device is None:
+                continue
+            del self._lease_models[task_id]
+            remaining = max(self._lease_bytes.get(task_id, 0) - model_size(model), 0)
+            self._lease_bytes[task_id] = remaining
+            try:
+                self.redis_client.hset(
+                    self._key(device), task_id, f"{remaining}|{time.time() + settings.task_timeout}"
+                )
+            except Exception as e:
+                # The larger reservation stays until the task finishes
+                logger.error("Failed to shrink GPU reservation", task_id=task_id, device=device, error=str(e))
+
+    def get_device_usage(self, hostname: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Reserved and total budget per device of this host
+
+        Returns:
+            List of {device, reserved, capacity, tasks}
+        """
+        devices = get_gpu_devices()
+        pipe = self.redis_client.pipeline(transaction=False)
+        for device in devices:
+            pipe.hgetall(self._key(device))
+
+        now = time.time()
+        usage = []
+        for device, entries in zip(devices, pipe.execute()):
+            live = {}
+            for task_id, entry in entries.items():
+                bytes_, _, expires_at = entry.partition('|')
+                if float(expires_at) >= now:
+                    live[task_id] = int(bytes_)
+            usage.append({
+                'device': device,
+                'reserved': sum(live.values()),
+                'capacity': self.device_capacity(device, hostname),
+                'tasks': sorted(live)
+            })
+        return usage
+
+    def device_capacity(self, device: int, hostname: Optional[str] = None) -> int:
+        """
+        Reservable bytes on a device: GPU_DEVICE_MEMORY, else the size
+        reported by telemetry, else DEFAULT_DEVICE_MEMORY, less the headroom
+        """
+        if device not in self._capacities:
+            total = None
+            if settings.gpu_device_memory:
+                total = parse_memory_size(settings.gpu_device_memory)
+            elif hostname:
+                from .telemetry import gpu_telemetry
+
+                for sample in gpu_telemetry.get_node_samples(hostname):
+                    if sample['device'] == device:
+                        total = sample['memory_total']
+            if total is None:
+                return DEFAULT_DEVICE_MEMORY - parse_memory_size(settings.gpu_memory_headroom)
+            self._capacities[device] = total - parse_memory_size(settings.gpu_memory_headroom)
+        return self._capacities[device]
+
+    def _devices_by_free_budget(self, hostname: Optional[str]) -> List[int]:
+        usage = self.get_device_usage(hostname)
+        usage.sort(key=lambda entry: entry['capacity'] - entry['reserved'], reverse=True)
+        return [entry['device'] for entry in usage]
+
+    def _pin(self, device: int) -> None:
+        """Restrict this process to one device (effective before CUDA is initialized)"""
+        if self.pinned_device is not None:
+            return
+        self.pinned_device = device
+        os.environ['CUDA_VISIBLE_DEVICES'] = str(device)
+        logger.info("Worker process pinned to GPU", device=device, pid=os.getpid())
+
+    def _key(self, device: int) -> str:
+        return f"{self.key_prefix}{self.host}:{device}"
+
+
+# Global GPU admission instance
+gpu_admission = GpuAdmission()
+
+
+@task_postrun.connect
+def gpu_admission_postrun_handler(sender=None, task_id=None, **extra):
+    """Return a task's GPU memory once it finishes, whatever its state"""
+    if task_id:
+        gpu_admission.release(task_id)
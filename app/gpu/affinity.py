@@ -0,0 +1,347 @@
+"""
+Model-affinity routing for GPU queues using Redis
+Pool processes advertise the models they hold resident; their worker node
+consumes a per-model queue for each of them, and GPU tasks are sent to the
+queue of their model when a node serves it. A periodic sweep moves tasks
+still waiting there after model_affinity_wait seconds back to the shared
+queue, so any worker can take them
+"""
+import os
+import json
+import time
+import socket
+import threading
+import redis
+from typing import List, Optional, Set
+from celery import Signature
+from celery.signals import worker_ready, worker_shutdown
+import structlog
+
+from ..config.settings import settings
+from ..config.prometheus import instrument_redis
+from .models import model_for
+
+logger = structlog.get_logger(__name__)
+
+MODEL_QUEUE_SEP = '.model.'
+
+# Seconds a node's model queue registration lives without a refresh
+REGISTRATION_TTL = 30
+
+# Seconds between sweeps of each model queue (by whichever node gets to it)
+SWEEP_INTERVAL = REGISTRATION_TTL / 3
+
+# Messages moved per priority list and sweep
+SWEEP_BATCH = 100
+
+# Header with the time a task was routed to its model queue
+ROUTED_AT_HEADER = 'model_affinity_routed_at'
+
+# Move the oldest messages of a model queue (its consuming end) to the
+# consuming end of the shared queue in the same order, unless a worker took
+# one of them first. ARGV holds the messages as read, then as rewritten.
+_SWEEP_SCRIPT = """
+local n = #ARGV / 2
+local tail = redis.call('LRANGE', KEYS[1], -n, -1)
+if #tail ~= n then
+    return 0
+end
+for i = 1, n do
+    if tail[i] ~= ARGV[i] then
+        return 0
+    end
+end
+redis.call('LTRIM', KEYS[1], 0, -n - 1)
+for i = 1, n do
+    redis.call('RPUSH', KEYS[2], ARGV[n + i])
+end
+return n
+"""
+
+
+def model_queue(queue: str, model: str) -> str:
+    """Queue of one model, e.g. gpu_medium.model.image-gen-v3.0"""
+    return f"{queue}{MODEL_QUEUE_SEP}{model}"
+
+
+class ModelAffinity:
+    """
+    Redis-backed model queues of worker nodes
+
+    Pool processes advertise their resident models per node; each node keeps
+    consuming (and registering) the model queues of what its processes hold.
+    Submitters only route to a model queue that a live node registered.
+    """
+
+    def __init__(self):
+        """Initialize Redis connections (the broker's for moving messages)"""
+        self.redis_client = instrument_redis(redis.Redis.from_url(
+            settings.redis_url,
+            decode_responses=True
+        ), "model_affinity")
+        self.broker_client = instrument_redis(redis.Redis.from_url(
+            settings.get_celery_broker_url(),
+            decode_responses=True
+        ), "model_affinity_broker")
+        self.key_prefix = "model_affinity:"
+        self.queues_key = "model_affinity:queues"
+        self.host = socket.gethostname()
+        self._sweep_script = self.broker_client.register_script(_SWEEP_SCRIPT)
+        self._consumer = None
+        self._base_queues: List[str] = []
+        self._consumed: Set[str] = set()
+        self._refresher: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+
+    def routes(self, queue: str) -> bool:
+        """Check whether tasks for a queue are routed by model"""
+        return (
+            settings.model_affinity_enabled
+            and settings.gpu_routing_mode == 'shared'
+            and queue in settings.get_gpu_admission_queues()
+        )
+
+    def route(self, signature: Signature, queue: str) -> Signature:
+        """
+        Route a GPU task to the queue of its model when a node serves it
+
+        The message is stamped with the routing time, so the sweep returns
+        it to the shared queue if no worker holding the model takes it in
+        time. Tasks without a registry model, models no node holds and Redis
+        errors use the shared queue.
+
+        Args:
+            signature: Task signature (frozen here so the task ID is known)
+            queue: Shared queue the task would otherwise go to
+
+        Returns:
+            The signature, with its queue set when routed by model
+        """
+        if not self.routes(queue):
+            return signature
+
+        model = model_for(signature.task, signature.kwargs)
+        if model is None:
+            return signature
+
+        target = model_queue(queue, model)
+        try:
+            if not self.redis_client.zcount(self._consumers_key(target), time.time(), '+inf'):
+                return signature
+        except Exception as e:
+            logger.error("Model affinity unavailable", queue=queue, error=str(e))
+            return signature
+
+        headers = dict(signature.options.get('headers') or {})
+        headers[ROUTED_AT_HEADER] = time.time()
+
+        logger.info("Task routed by model", task_id=signature.freeze().id, queue=target, model=model)
+        return signature.set(queue=target, headers=headers)
+
+    def sweep(self, source: str) -> int:
+        """
+        Move tasks waiting in a model queue for longer than
+        model_affinity_wait to its shared queue
+
+        Only the consuming end of each priority list is read (the broker
+        pushes new messages at the other end), up to the first task still
+        within its wait. Moved tasks keep their priority step and go to the
+        consuming end of the shared queue, since they have already waited
+        their turn. Tasks without a routing time (e.g. retries) are moved.
+
+        Args:
+            source: Model queue, e.g. gpu_medium.model.sdxl
+
+        Returns:
+            Number of tasks moved
+        """
+        from ..scheduling.admission import priority_queue_keys
+
+        queue = source.split(MODEL_QUEUE_SEP, 1)[0]
+        cutoff = time.time() - settings.model_affinity_wait
+        moved = 0
+        for source_key, target_key in zip(priority_queue_keys(source), priority_queue_keys(queue)):
+            overdue = []
+            for raw in reversed(self.broker_client.lrange(source_key, -SWEEP_BATCH, -1)):
+                message = json.loads(raw)
+                routed_at = message.get('headers', {}).get(ROUTED_AT_HEADER)
+                if routed_at is not None and float(routed_at) > cutoff:
+                    break
+
+                # Redelivery (e.g. after a lost worker) follows the delivery info
+                delivery_info = message.setdefault('properties', {}).setdefault('delivery_info', {})
+                delivery_info.update(exchange=queue, routing_key=queue)
+                overdue.append((raw, json.dumps(message)))
+
+            if not overdue:
+                continue
+            # Back to list order; a worker taking one of them defers the batch to the next sweep
+            overdue.reverse()
+            moved += int(self._sweep_script(
+                keys=[source_key, target_key],
+                args=[raw for raw, _ in overdue] + [message for _, message in overdue]
+            ))
+
+        if moved:
+            logger.info("Tasks fell back to shared queue", source=source, queue=queue, count=moved)
+        return moved
+
+    def sweep_model_queues(self) -> int:
+        """
+        Sweep every registered model queue that no other node swept within
+        the sweep interval
+
+        Returns:
+            Number of tasks moved
+        """
+        moved = 0
+        for name in sorted(self.redis_client.smembers(self.queues_key)):
+            if not self.redis_client.set(self._sweep_key(name), self.host, nx=True, px=int(SWEEP_INTERVAL * 1000)):
+                continue
+            try:
+                moved += self.sweep(name)
+            except Exception as e:
+                logger.error("Failed to sweep model queue", queue=name, error=str(e))
+        return moved
+
+    def get_model_queues(self, queue: str) -> List[str]:
+        """Model queues registered for a shared queue"""
+        prefix = f"{queue}{MODEL_QUEUE_SEP}"
+        return sorted(name for name in self.redis_client.smembers(self.queues_key) if name.startswith(prefix))
+
+    def advertise(self, models: List[str]) -> None:
+        """
+        Publish the models resident in this pool process to its worker node
+
+        Called by the model registry when models load or unload and after
+        every task; the advert lapses after the task timeout.
+        """
+        if not settings.model_affinity_enabled:
+            return
+        try:
+            key = self._adverts_key(self.host, os.getppid())
+            if models:
+                expires_at = time.time() + settings.task_timeout
+                self.redis_client.hset(key, str(os.getpid()), f"{','.join(models)}|{expires_at}")
+            else:
+                self.redis_client.hdel(key, str(os.getpid()))
+        except Exception as e:
+            logger.error("Failed to advertise resident models", error=str(e))
+
+    def get_node_models(self, host: str, node_pid: int) -> List[str]:
+        """Models resident in a node's pool processes (expired adverts are dropped)"""
+        key = self._adverts_key(host, node_pid)
+        now = time.time()
+        models = set()
+        expired = []
+        for pid, advert in self.redis_client.hgetall(key).items():
+            names, _, expires_at = advert.rpartition('|')
+            if float(expires_at) < now:
+                expired.append(pid)
+            else:
+                models.update(name for name in names.split(',') if name)
+        if expired:
+            self.redis_client.hdel(key, *expired)
+        return sorted(models)
+
+    def start_node(self, consumer, base_queues: List[str]) -> None:
+        """
+        Follow this node's resident models with model queues
+
+        Args:
+            consumer: Celery worker consumer (worker_ready sender)
+            base_queues: GPU queues the node consumes
+        """
+        self._consumer = consumer
+        self._base_queues = list(base_queues)
+        self._consumed = set()
+        self._stopping.clear()
+        self._refresher = threading.Thread(target=self._refresh_loop, name="model-affinity", daemon=True)
+        self._refresher.start()
+
+    def refresh_node(self) -> Set[str]:
+        """
+        Consume the model queues of the models this node's processes hold,
+        stop consuming the others and register the consumed ones
+
+        Returns:
+            Model queues consumed
+        """
+        models = self.get_node_models(self.host, os.getpid())
+        wanted = {model_queue(queue, model) for queue in self._base_queues for model in models}
+
+        # Queue changes run on the consumer's event loop, not this thread
+        for name in sorted(wanted - self._consumed):
+            self._consumer.call_soon(self._consumer.add_task_queue, name)
+        for name in sorted(self._consumed - wanted):
+            self._consumer.call_soon(self._consumer.cancel_task_queue, name)
+
+        expires_at = time.time() + REGISTRATION_TTL
+        pipe = self.redis_client.pipeline(transaction=False)
+        for name in wanted:
+            pipe.zadd(self._consumers_key(name), {self._consumer.hostname: expires_at})
+            pipe.zremrangebyscore(self._consumers_key(name), '-inf', time.time())
+            pipe.sadd(self.queues_key, name)
+        for name in self._consumed - wanted:
+            pipe.zrem(self._consumers_key(name), self._consumer.hostname)
+        pipe.execute()
+
+        if wanted != self._consumed:
+            logger.info("Model queues updated", queues=sorted(wanted), models=models)
+        self._consumed = wanted
+        return wanted
+
+    def stop_node(self) -> None:
+        """Withdraw this node's model queue registrations"""
+        self._stopping.set()
+        if not self._consumed or self._consumer is None:
+            return
+        try:
+            pipe = self.redis_client.pipeline(transaction=False)
+            for name in self._consumed:
+                pipe.zrem(self._consumers_key(name), self._consumer.hostname)
+            pipe.execute()
+        except Exception as e:
+            logger.error("Failed to withdraw model queues", error=str(e))
+        self._consumed = set()
+
+    def _refresh_loop(self) -> None:
+        while not self._stopping.wait(SWEEP_INTERVAL):
+            try:
+                self.refresh_node()
+            except Exception as e:
+                logger.error("Failed to refresh model queues", error=str(e))
+            try:
+                self.sweep_model_queues()
+            except Exception as e:
+                logger.error("Failed to sweep model queues", error=str(e))
+
+    def _consumers_key(self, name: str) -> str:
+        return f"{self.key_prefix}consumers:{name}"
+
+    def _sweep_key(self, name: str) -> str:
+        return f"{self.key_prefix}sweep:{name}"
+
+    def _adverts_key(self, host: str, node_pid: int) -> str:
+        return f"{self.key_prefix}procs:{host}:{node_pid}"
+
+
+# Global model affinity instance
+model_affinity = ModelAffinity()
+
+
+@worker_ready.connect
+def model_affinity_worker_ready_handler(sender=None, **extra):
+    """Consume model queues for the models this node's processes hold"""
+    if sender is None or not settings.model_affinity_enabled or settings.gpu_routing_mode != 'shared':
+        return
+    consumed = [queue.name for queue in sender.task_consumer.queues]
+    base_queues = [queue for queue in settings.get_gpu_admission_queues() if queue in consumed]
+    if base_queues:
+        model_affinity.start_node(sender, base_queues)
+
+
+@worker_shutdown.connect
+def model_affinity_worker_shutdown_handler(sender=None, **extra):
+    """Stop routing to this node's model queues"""
+    model_affinity.stop_node()
@@ -0,0 +1,277 @@
+"""
+Per-process registry of models resident on the GPU
+Models load on first use and stay loaded across tasks, so a pool process
+only pays the load cost again after the model was evicted to make room
+under the process's VRAM budget (least recently used first)
+"""
+import os
+import sys
+import time
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Callable, List, Optional
+from celery.signals import task_postrun, worker_process_shutdown
+import structlog
+
+from ..config.settings import settings, parse_memory_size
+from ..config.prometheus import record_cache, observe_model_load
+
+logger = structlog.get_logger(__name__)
+
+GB = 1024 ** 3
+
+DEFAULT_IMAGE_MODEL = 'image-gen-v3.0'
+DEFAULT_VIDEO_MODEL = 'video-gen-v2.1'
+
+# VRAM of the weights of known models (GPU_MODEL_SIZES overrides)
+DEFAULT_MODEL_SIZES = {
+    DEFAULT_IMAGE_MODEL: int(2.5 * GB),
+    DEFAULT_VIDEO_MODEL: 4 * GB,
+}
+
+# Assumed for models without a known size
+FALLBACK_MODEL_SIZE = 4 * GB
+
+# Model each GPU task runs: task name -> (params kwarg naming the model, default model)
+TASK_MODELS = {
+    'app.tasks.video_tasks.process_video_generation': ('video_params', DEFAULT_VIDEO_MODEL),
+    'app.tasks.image_tasks.process_image_generation': ('image_params', DEFAULT_IMAGE_MODEL),
+    'app.tasks.image_tasks.process_image_generation_batch': ('requests', DEFAULT_IMAGE_MODEL),
+}
+
+
+def model_size(model: str) -> int:
+    """VRAM a model's weights take, in bytes"""
+    configured = settings.get_gpu_model_sizes()
+    if model in configured:
+        return configured[model]
+    return DEFAULT_MODEL_SIZES.get(model, FALLBACK_MODEL_SIZE)
+
+
+def model_for(task_name: str, kwargs: Dict[str, Any]) -> Optional[str]:
+    """
+    Model a task runs, from a "model" in its params or the task's default
+
+    Returns:
+        Model name, or None for tasks that use no registry model
+    """
+    if task_name not in TASK_MODELS:
+        return None
+    params_kwarg, default = TASK_MODELS[task_name]
+    params = kwargs.get(params_kwarg)
+    if params_kwarg == 'requests':
+        # Batches share one model, so the first request names it
+        params = (params[0].get('image_params') if params else None)
+    if isinstance(params, dict) and params.get('model'):
+        return str(params['model'])
+    return default
+
+
+def _simulated_loader(model: str) -> Dict[str, Any]:
+    """Handle of a model served by the simulated generation tasks"""
+    return {'model': model, 'loaded_at': time.time(), 'pid': os.getpid()}
+
+
+class ModelRegistry:
+    """
+    Models loaded in this worker process, kept resident between tasks
+
+    get() returns a loaded model, loading it first if needed. Loaded models
+    are kept within gpu_model_cache_budget bytes of VRAM by unloading the
+    least recently used ones. When the process is pinned to a device, the
+    VRAM of resident models is reserved in that device's GPU admission
+    budget so tasks on other processes do not count on it.
+    """
+
+    cache_name = "gpu_models"
+
+    def __init__(self, budget: Optional[int] = None):
+        self._budget = budget
+        self._models: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._loaders: Dict[str, Callable[[str], Any]] = {}
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def budget(self) -> int:
+        """Bytes of VRAM resident models may take"""
+        if self._budget is not None:
+            return self._budget
+        return parse_memory_size(settings.gpu_model_cache_budget)
+
+    def register_loader(self, model: str, loader: Callable[[str], Any]) -> None:
+        """
+        Set how a model is loaded
+
+        Args:
+            model: Model name
+            loader: Called with the model name, returns the loaded model. The
+                model's close() (if any) is called when it is unloaded
+        """
+        self._loaders[model] = loader
+
+    def get(self, model: str) -> Any:
+        """
+        A loaded model, loading it (and making room for it) on first use
+
+        Args:
+            model: Model name
+
+        Returns:
+            The loaded model
+        """
+        with self._lock:
+            entry = self._models.get(model)
+            if entry is not None:
+                self._models.move_to_end(model)
+                entry['last_used'] = time.time()
+                self.hits += 1
+                record_cache(self.cache_name, True)
+                return entry['model']
+
+            self.misses += 1
+            record_cache(self.cache_name, False)
+
+            size = model_size(model)
+            self._make_room(size)
+
+            start = time.perf_counter()
+            loaded = self._loaders.get(model, _simulated_loader)(model)
+            load_time = time.perf_counter() - start
+            observe_model_load(model, load_time)
+
+            self._models[model] = {
+                'model': loaded,
+                'size': size,
+                'load_time': load_time,
+                'last_used': time.time()
+            }
+            self._reserve(loaded_model=model)
+            self._advertise()
+            logger.info("Model loaded", model=model, size=size, load_time=round(load_time, 3), pid=os.getpid())
+            return loaded
+
+    def is_resident(self, model: Optional[str]) -> bool:
+        """Check whether a model is loaded in this process"""
+        return model is not None and model in self._models
+
+    def evict(self, model: str) -> bool:
+        """
+        Unload a model
+
+        Returns:
+            True if the model was loaded
+        """
+        with self._lock:
+            entry = self._models.pop(model, None)
+            if entry is None:
+                return False
+            _unload(entry['model'])
+            self._reserve()
+            self._advertise()
+            logger.info("Model unloaded", model=model, size=entry['size'], pid=os.getpid())
+            return True
+
+    def clear(self) -> None:
+        """Unload all models (when the process exits)"""
+        with self._lock:
+            for model in list(self._models):
+                self.evict(model)
+
+    def resident(self) -> List[Dict[str, Any]]:
+        """Loaded models, least recently used first"""
+        return [
+            {'model': model, 'size': entry['size'], 'load_time': entry['load_time'], 'last_used': entry['last_used']}
+            for model, entry in self._models.items()
+        ]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit rate and VRAM use of this process's registry"""
+        lookups = self.hits + self.misses
+        return {
+            'models': list(self._models),
+            'resident_bytes': self.resident_bytes(),
+            'budget': self.budget,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
+
+    def resident_bytes(self) -> int:
+        """VRAM taken by loaded models"""
+        return sum(entry['size'] for entry in self._models.values())
+
+    def refresh_reservation(self) -> None:
+        """Keep the admission reservation and advert of resident models from expiring"""
+        if self._models:
+            self._reserve()
+            self._advertise()
+
+    def _make_room(self, size: int) -> None:
+        """Unload least recently used models until size more bytes fit the budget"""
+        while self._models and self.resident_bytes() + size > self.budget:
+            self.evict(next(iter(self._models)))
+        if size > self.budget:
+            logger.warning("Model exceeds the model cache budget", size=size, budget=self.budget)
+
+    def _reserve(self, loaded_model: Optional[str] = None) -> None:
+        """
+        Reserve the VRAM of resident models on this process's device
+
+        Args:
+            loaded_model: Model just loaded, whose memory running tasks reserved
+                themselves and now hand over to this reservation
+        """
+        from .admission import gpu_admission
+
+        device = gpu_admission.pinned_device
+        if device is None or not settings.gpu_admission_enabled:
+            return
+
+        field = f"models:{os.getpid()}"
+        try:
+            if self._models:
+                expires_at = time.time() + settings.task_timeout
+                gpu_admission.redis_client.hset(
+                    gpu_admission._key(device), field, f"{self.resident_bytes()}|{expires_at}"
+                )
+                if loaded_model is not None:
+                    gpu_admission.model_reserved(loaded_model)
+            else:
+                gpu_admission.redis_client.hdel(gpu_admission._key(device), field)
+        except Exception as e:
+            # The reservation expires after the task timeout
+            logger.error("Failed to reserve model memory", device=device, error=str(e))
+
+    def _advertise(self) -> None:
+        """Tell this process's worker node which models it holds (model-affinity routing)"""
+        from .affinity import model_affinity
+
+        model_affinity.advertise(list(self._models))
+
+
+def _unload(model: Any) -> None:
+    """Free a model's memory"""
+    close = getattr(model, 'close', None)
+    if callable(close):
+        close()
+    torch = sys.modules.get('torch')
+    if torch is not None and torch.cuda.is_available():
+        torch.cuda.empty_cache()
+
+
+# Global model registry of this worker process
+model_registry = ModelRegistry()
+
+
+@task_postrun.connect
+def model_registry_postrun_handler(**extra):
+    """Extend the admission reservation of resident models"""
+    model_registry.refresh_reservation()
+
+
+@worker_process_shutdown.connect
+def model_registry_process_shutdown_handler(**extra):
+    """Unload models and return their reservation when a pool process exits"""
+    model_registry.clear()
@@ -0,0 +1,338 @@
+"""
+GPU device placement for worker processes and tasks
+Pool processes are pinned to one device each when they start. In the
+"device" routing mode, GPU tasks are sent to per-device queues chosen by
+best-fit bin packing on their memory estimate
+"""
+import os
+import json
+import time
+import threading
+import redis
+from typing import Dict, Any, List, Optional
+from celery import Signature
+from celery.signals import worker_process_init, worker_ready, worker_shutdown
+import structlog
+
+from ..config.settings import settings, get_gpu_devices
+from ..config.prometheus import instrument_redis
+from .admission import gpu_admission, estimate_gpu_memory
+from .affinity import model_affinity
+
+logger = structlog.get_logger(__name__)
+
+DEVICE_QUEUE_SEP = '.'
+
+# Seconds a device queue registration lives without a refresh from its node
+REGISTRATION_TTL = 30
+
+
+def device_queue(queue: str, host: str, device: int) -> str:
+    """Queue of one device, e.g. gpu_heavy.render-01.gpu2"""
+    return f"{queue}{DEVICE_QUEUE_SEP}{host}{DEVICE_QUEUE_SEP}gpu{device}"
+
+
+def device_for_process(index: int, devices: List[int]) -> int:
+    """Device of the pool process with the given index (round-robin)"""
+    return devices[index % len(devices)]
+
+
+def choose_device(required: int, devices: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    Best-fit bin packing: the device that is left with the least free memory
+    after taking the task, so small tasks fill partly used devices and large
+    ones keep finding empty devices
+
+    Args:
+        required: Bytes the task needs
+        devices: Candidates with capacity and load (reserved plus pending bytes)
+
+    Returns:
+        The chosen device, or None if the task fits on none
+    """
+    best = None
+    best_left = None
+    for device in devices:
+        left = device['capacity'] - device['load'] - required
+        if left < 0:
+            continue
+        if best_left is None or left < best_left:
+            best, best_left = device, left
+    return best
+
+
+class GpuPlacement:
+    """
+    Redis-backed registry of per-device queues and the tasks routed to them
+
+    Worker nodes serving one device register its queues (refreshed while the
+    node runs). Routed tasks count against their device as pending until they
+    start and hold a GPU admission reservation instead.
+    """
+
+    def __init__(self):
+        """Initialize Redis connection"""
+        self.redis_client = instrument_redis(redis.Redis.from_url(
+            settings.redis_url,
+            decode_responses=True
+        ), "gpu_placement")
+        self.key_prefix = "gpu_placement:"
+        self.queues_key = "gpu_placement:queues"
+        self._registrations: List[Dict[str, Any]] = []
+        self._refresher: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+
+    def routes(self, queue: str) -> bool:
+        """Check whether tasks for a queue are routed to device queues"""
+        return settings.gpu_routing_mode == 'device' and queue in settings.get_gpu_admission_queues()
+
+    def place(self, signature: Signature, queue: str) -> Signature:
+        """
+        Route a GPU task to the device queue that packs it best, or in the
+        shared routing mode to the queue of its model (see ModelAffinity)
+
+        Falls back to the shared queue when no registered device has room
+        (or Redis is unavailable); worker-side admission still applies.
+
+        Args:
+            signature: Task signature (frozen here so the task ID is known)
+            queue: Queue the task would otherwise go to
+
+        Returns:
+            The signature, with its queue set when a device or model queue was chosen
+        """
+        if not self.routes(queue):
+            return model_affinity.route(signature, queue)
+
+        required = estimate_gpu_memory(signature.task, signature.kwargs)
+        try:
+            chosen = choose_device(required, self.get_devices(queue))
+            if chosen is None:
+                logger.info("No GPU device fits task, using shared queue", queue=queue, required=required)
+                return signature
+
+            task_id = signature.freeze().id
+            expires_at = time.time() + settings.task_timeout
+            self.redis_client.hset(
+                self._pending_key(chosen['queue']), task_id, f"{required}|{expires_at}"
+            )
+        except Exception as e:
+            logger.error("GPU placement unavailable", queue=queue, error=str(e))
+            return signature
+
+        logger.info(
+            "Task placed on GPU device",
+            task_id=task_id,
+            queue=chosen['queue'],
+            device=chosen['device'],
+            required=required
+        )
+        return signature.set(queue=chosen['queue'])
+
+    def task_started(self, task_id: str, routing_key: Optional[str]) -> None:
+        """Stop counting a routed task as pending once it holds a reservation"""
+        if settings.gpu_routing_mode != 'device' or not routing_key:
+            return
+        try:
+            self.redis_client.hdel(self._pending_key(routing_key), task_id)
+        except Exception as e:
+            logger.error("Failed to clear pending GPU placement", task_id=task_id, error=str(e))
+
+    def get_devices(self, queue: str) -> List[Dict[str, Any]]:
+        """
+        Registered devices serving a queue with their current load
+
+        Returns:
+            List of {queue, host, device, capacity, load}
+        """
+        registrations = [
+            registration for registration in self.get_registrations()
+            if registration['base_queue'] == queue
+        ]
+        if not registrations:
+            return []
+
+        pipe = self.redis_client.pipeline(transaction=False)
+        for registration in registrations:
+            pipe.hgetall(f"{gpu_admission.key_prefix}{registration['host']}:{registration['device']}")
+            pipe.hgetall(self._pending_key(registration['queue']))
+        replies = pipe.execute()
+
+        now = time.time()
+        devices = []
+        for index, registration in enumerate(registrations):
+            reserved, pending = replies[2 * index], replies[2 * index + 1]
+            devices.append(dict(registration, load=_live_bytes(reserved, now) + _live_bytes(pending, now)))
+        return devices
+
+    def get_registrations(self) -> List[Dict[str, Any]]:
+        """Device queues of running worker nodes (expired ones are pruned)"""
+        queues = sorted(self.redis_client.smembers(self.queues_key))
+        if not queues:
+            return []
+
+        pipe = self.redis_client.pipeline(transaction=False)
+        for name in queues:
+            pipe.get(f"{self.key_prefix}queue:{name}")
+        raw_registrations = pipe.execute()
+
+        registrations = []
+        expired = []
+        for name, raw in zip(queues, raw_registrations):
+            if raw is None:
+                expired.append(name)
+            else:
+                registrations.append(json.loads(raw))
+        if expired:
+            self.redis_client.srem(self.queues_key, *expired)
+        return registrations
+
+    def register(self, registrations: List[Dict[str, Any]]) -> bool:
+        """
+        Publish this node's device queues (one pipeline)
+
+        Returns:
+            True if successful
+        """
+        try:
+            pipe = self.redis_client.pipeline(transaction=False)
+            for registration in registrations:
+                pipe.set(
+                    f"{self.key_prefix}queue:{registration['queue']}",
+                    json.dumps(registration),
+                    ex=REGISTRATION_TTL
+                )
+                pipe.sadd(self.queues_key, registration['queue'])
+            pipe.execute()
+            return True
+        except Exception as e:
+            logger.error("Failed to register GPU device queues", error=str(e))
+            return False
+
+    def start_node(self, consumer, base_queues: List[str]) -> List[str]:
+        """
+        Consume and register this node's device queues
+
+        Only nodes serving exactly one device take device queues, since a
+        node's pool processes share one consumer; run one worker node per
+        device (each with its own CUDA_VISIBLE_DEVICES) for device routing.
+
+        Args:
+            consumer: Celery worker consumer (worker_ready sender)
+            base_queues: GPU queues the node consumes
+
+        Returns:
+            Names of the device queues consumed
+        """
+        devices = get_gpu_devices()
+        if len(devices) != 1:
+            logger.warning(
+                "Device routing needs one GPU per worker node, not consuming device queues",
+                devices=devices
+            )
+            return []
+
+        device = devices[0]
+        self._registrations = [
+            {
+                'queue': device_queue(queue, gpu_admission.host, device),
+                'base_queue': queue,
+                'host': gpu_admission.host,
+                'device': device,
+                'capacity': gpu_admission.device_capacity(device, consumer.hostname)
+            }
+            for queue in base_queues
+        ]
+        for registration in self._registrations:
+            consumer.add_task_queue(registration['queue'])
+
+        self.register(self._registrations)
+        self._stopping.clear()
+        self._refresher = threading.Thread(target=self._refresh_loop, name="gpu-placement", daemon=True)
+        self._refresher.start()
+        return [registration['queue'] for registration in self._registrations]
+
+    def stop_node(self) -> None:
+        """Withdraw this node's device queues"""
+        self._stopping.set()
+        if not self._registrations:
+            return
+        try:
+            pipe = self.redis_client.pipeline(transaction=False)
+            for registration in self._registrations:
+                pipe.delete(f"{self.key_prefix}queue:{registration['queue']}")
+                pipe.srem(self.queues_key, registration['queue'])
+            pipe.execute()
+        except Exception as e:
+            logger.error("Failed to withdraw GPU device queues", error=str(e))
+        self._registrations = []
+
+    def _refresh_loop(self) -> None:
+        while not self._stopping.wait(REGISTRATION_TTL / 3):
+            self.register(self._registrations)
+
+    def _pending_key(self, queue: str) -> str:
+        return f"{self.key_prefix}pending:{queue}"
+
+
+def _live_bytes(entries: Dict[str, str], now: float) -> int:
+    """Sum of unexpired "bytes|expires_at" entries"""
+    total = 0
+    for entry in entries.values():
+        bytes_, _, expires_at = entry.partition('|')
+        if float(expires_at) >= now:
+            total += int(bytes_)
+    return total
+
+
+def pin_process(index: int, devices: Optional[List[int]] = None) -> Optional[int]:
+    """
+    Pin the current pool process to its device
+
+    Sets CUDA_VISIBLE_DEVICES before any task code initializes CUDA and tells
+    GPU admission to reserve memory on that device only.
+
+    Returns:
+        The device, or None if the host has no GPUs
+    """
+    devices = devices if devices is not None else get_gpu_devices()
+    if not devices:
+        return None
+
+    device = device_for_process(index, devices)
+    os.environ['CUDA_VISIBLE_DEVICES'] = str(device)
+    gpu_admission.pinned_device = device
+    logger.info("Worker process pinned to GPU", device=device, process_index=index, pid=os.getpid())
+    return device
+
+
+# Global GPU placement instance
+gpu_placement = GpuPlacement()
+
+
+@worker_process_init.connect
+def gpu_worker_process_init_handler(**extra):
+    """Pin each new pool process to a device (replacements keep their index)"""
+    if not settings.gpu_pin_processes:
+        return
+    from billiard.process import current_process
+
+    index = getattr(current_process(), 'index', None)
+    pin_process(index if index is not None else os.getpid())
+
+
+@worker_ready.connect
+def gpu_placement_worker_ready_handler(sender=None, **extra):
+    """Consume this node's device queues when routing by device"""
+    if settings.gpu_routing_mode != 'device' or sender is None:
+        return
+    consumed = [queue.name for queue in sender.task_consumer.queues]
+    base_queues = [queue for queue in settings.get_gpu_admission_queues() if queue in consumed]
+    if base_queues:
+        gpu_placement.start_node(sender, base_queues)
+
+
+@worker_shutdown.connect
+def gpu_placement_worker_shutdown_handler(sender=None, **extra):
+    """Stop routing to this node's device queues"""
+    gpu_placement.stop_node()
@@ -0,0 +1,294 @@
+"""
+GPU telemetry sampling using NVML and Redis
+Each GPU worker node samples utilization and memory of its devices at a fixed
+interval and publishes them to Redis for the workers endpoint and scheduler
+"""
+import json
+import time
+import socket
+import threading
+import redis
+from abc import ABC, abstractmethod
+from typing import Dict, Any, List, Optional
+from celery.signals import worker_ready, worker_shutdown
+import structlog
+
+from ..config.settings import settings, get_gpu_devices
+from ..config.prometheus import instrument_redis
+
+try:
+    import pynvml
+    NVML_AVAILABLE = True
+except ImportError:
+    pynvml = None
+    NVML_AVAILABLE = False
+
+logger = structlog.get_logger(__name__)
+
+
+class GpuProvider(ABC):
+    """Reads current utilization and memory of GPU devices"""
+
+    name = "none"
+
+    @abstractmethod
+    def sample(self, devices: List[int]) -> List[Dict[str, Any]]:
+        """
+        Sample devices
+
+        Args:
+            devices: Device indices to sample
+
+        Returns:
+            One dict per device with device, utilization (0-1),
+            memory_used and memory_total (bytes)
+        """
+        pass
+
+    def close(self) -> None:
+        """Release provider resources"""
+
+
+class NvmlProvider(GpuProvider):
+    """NVIDIA devices through NVML (pynvml)"""
+
+    name = "nvml"
+
+    def __init__(self):
+        if not NVML_AVAILABLE:
+            raise RuntimeError("pynvml is not installed")
+        pynvml.nvmlInit()
+        self._handles: Dict[int, Any] = {}
+
+    def sample(self, devices: List[int]) -> List[Dict[str, Any]]:
+        samples = []
+        for device in devices:
+            try:
+                handle = self._handles.get(device)
+                if handle is None:
+                    handle = self._handles[device] = pynvml.nvmlDeviceGetHandleByIndex(device)
+                rates = pynvml.nvmlDeviceGetUtilizationRates(handle)
+                memory = pynvml.nvmlDeviceGetMemoryInfo(handle)
+            except pynvml.NVMLError as e:
+                logger.warning("Failed to sample GPU", device=device, error=str(e))
+                continue
+            samples.append({
+                'device': device,
+                'utilization': rates.gpu / 100.0,
+                'memory_used': int(memory.used),
+                'memory_total': int(memory.total)
+            })
+        return samples
+
+    def close(self) -> None:
+        pynvml.nvmlShutdown()
+
+
+class FakeGpuProvider(GpuProvider):
+    """
+    In-memory devices for tests and CPU-only machines
+
+    Every device reads idle with memory_total bytes until set() says otherwise.
+    """
+
+    name = "fake"
+
+    def __init__(self, memory_total: int = 24 * 1024 ** 3):
+        self.memory_total = memory_total
+        self._devices: Dict[int, Dict[str, Any]] = {}
+
+    def set(self, device: int, utilization: float = 0.0, memory_used: int = 0) -> None:
+        """Set what a device reports"""
+        self._devices[device] = {'utilization': utilization, 'memory_used': memory_used}
+
+    def sample(self, devices: List[int]) -> List[Dict[str, Any]]:
+        samples = []
+        for device in devices:
+            state = self._devices.get(device, {})
+            samples.append({
+                'device': device,
+                'utilization': state.get('utilization', 0.0),
+                'memory_used': state.get('memory_used', 0),
+                'memory_total': self.memory_total
+            })
+        return samples
+
+
+def create_provider(name: Optional[str] = None) -> Optional[GpuProvider]:
+    """
+    GPU provider selected by settings.gpu_telemetry_provider
+
+    Args:
+        name: 'auto' (NVML if usable), 'nvml', 'fake' or 'none'
+
+    Returns:
+        Provider, or None when telemetry is off or NVML is unusable
+    """
+    name = (name or settings.gpu_telemetry_provider).lower()
+    if name == 'fake':
+        return FakeGpuProvider()
+    if name not in ('auto', 'nvml'):
+        return None
+
+    try:
+        return NvmlProvider()
+    except Exception as e:
+        log = logger.warning if name == 'nvml' else logger.debug
+        log("NVML unavailable, GPU telemetry disabled", error=str(e))
+        return None
+
+
+class GpuTelemetry:
+    """
+    Redis-backed per-node GPU samples
+
+    Each node writes its devices to gpu_telemetry:node:{hostname} with a TTL
+    of a few sampling intervals, so nodes that stop sampling drop out.
+    """
+
+    def __init__(self):
+        """Initialize Redis connection"""
+        self.redis_client = instrument_redis(redis.Redis.from_url(
+            settings.redis_url,
+            decode_responses=True
+        ), "gpu_telemetry")
+        self.key_prefix = "gpu_telemetry:"
+        self.nodes_key = "gpu_telemetry:nodes"
+        self._sampler: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+
+    def publish(self, hostname: str, samples: List[Dict[str, Any]]) -> bool:
+        """
+        Store a node's latest device samples (one pipeline)
+
+        Returns:
+            True if successful
+        """
+        sampled_at = time.time()
+        node_key = f"{self.key_prefix}node:{hostname}"
+        try:
+            pipe = self.redis_client.pipeline(transaction=False)
+            pipe.delete(node_key)
+            if samples:
+                pipe.hset(node_key, mapping={
+                    str(sample['device']): json.dumps(dict(sample, sampled_at=sampled_at))
+                    for sample in samples
+                })
+                pipe.expire(node_key, self._ttl())
+            pipe.sadd(self.nodes_key, hostname)
+            pipe.execute()
+            return True
+        except Exception as e:
+            logger.error("Failed to publish GPU telemetry", hostname=hostname, error=str(e))
+            return False
+
+    def get_node_samples(self, hostname: str) -> List[Dict[str, Any]]:
+        """Latest samples of a node's devices (empty if stale or unknown)"""
+        try:
+            raw_samples = self.redis_client.hgetall(f"{self.key_prefix}node:{hostname}")
+        except Exception as e:
+            logger.error("Failed to read GPU telemetry", hostname=hostname, error=str(e))
+            return []
+        return sorted((json.loads(raw) for raw in raw_samples.values()), key=lambda s: s['device'])
+
+    def get_all(self) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Latest samples of every sampling node
+
+        Returns:
+            Dict of hostname -> device samples
+        """
+        try:
+            hostnames = sorted(self.redis_client.smembers(self.nodes_key))
+            pipe = self.redis_client.pipeline(transaction=False)
+            for hostname in hostnames:
+                pipe.hgetall(f"{self.key_prefix}node:{hostname}")
+            raw_nodes = pipe.execute() if hostnames else []
+        except Exception as e:
+            logger.error("Failed to read GPU telemetry", error=str(e))
+            return {}
+
+        nodes = {}
+        expired = []
+        for hostname, raw_samples in zip(hostnames, raw_nodes):
+            if not raw_samples:
+                expired.append(hostname)
+                continue
+            nodes[hostname] = sorted(
+                (json.loads(raw) for raw in raw_samples.values()), key=lambda s: s['device']
+            )
+
+        if expired:
+            try:
+                self.redis_client.srem(self.nodes_key, *expired)
+            except Exception as e:
+                logger.error("Failed to prune GPU telemetry nodes", error=str(e))
+        return nodes
+
+    def start_sampler(self, hostname: str, provider: Optional[GpuProvider] = None,
+                      devices: Optional[List[int]] = None) -> bool:
+        """
+        Sample this node's devices every gpu_telemetry_interval seconds
+
+        Args:
+            hostname: Worker node name (as reported by celery inspect)
+            provider: GPU provider (create_provider() by default)
+            devices: Devices to sample (get_gpu_devices() by default)
+
+        Returns:
+            True if the sampler started
+        """
+        if self._sampler is not None and self._sampler.is_alive():
+            return True
+
+        provider = provider or create_provider()
+        devices = devices if devices is not None else get_gpu_devices()
+        if provider is None or not devices:
+            return False
+
+        self._stopping.clear()
+        self._sampler = threading.Thread(
+            target=self._sample_loop,
+            args=(hostname, provider, devices),
+            name="gpu-telemetry",
+            daemon=True
+        )
+        self._sampler.start()
+        logger.info("GPU telemetry sampler started", hostname=hostname,
+                    provider=provider.name, devices=devices)
+        return True
+
+    def stop_sampler(self) -> None:
+        """Stop the sampler thread"""
+        self._stopping.set()
+        if self._sampler is not None:
+            self._sampler.join(timeout=settings.gpu_telemetry_interval + 1)
+            self._sampler = None
+
+    def _sample_loop(self, hostname: str, provider: GpuProvider, devices: List[int]) -> None:
+        try:
+            while not self._stopping.is_set():
+                self.publish(hostname, provider.sample(devices))
+                self._stopping.wait(settings.gpu_telemetry_interval)
+        finally:
+            provider.close()
+
+    def _ttl(self) -> int:
+        return max(int(settings.gpu_telemetry_interval * 3), 1)
+
+
+# Global GPU telemetry instance
+gpu_telemetry = GpuTelemetry()
+
+
+@worker_ready.connect
+def gpu_telemetry_worker_ready_handler(sender=None, **extra):
+    """Start sampling the node's GPUs once the worker is up"""
+    hostname = getattr(sender, 'hostname', None) or socket.gethostname()
+    gpu_telemetry.start_sampler(hostname)
+
+
+@worker_shutdown.connect
+def gpu_telemetry_worker_shutdown_handler(sender=None, **extra):
+    """Stop sampling when the worker exits"""
+    gpu_telemetry.stop_sampler()
@@ -4,10 +4,13 @@ Follows constitutional requirements for service-first architecture
 """
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
+from prometheus_client import CONTENT_TYPE_LATEST
 import structlog
 from datetime import datetime
 from .config import settings
+from .config.prometheus import generate_metrics
+from .config.worker_status import worker_status_monitor
 
 # Configure structured logging
 structlog.configure(
@@ -57,7 +60,8 @@ async def http_exception_handler(request, exc):
             "error": exc.detail,
             "message": exc.detail,
             "timestamp": datetime.utcnow().isoformat() + "Z"
-        }
+        },
+        headers=getattr(exc, "headers", None)
     )
 
 
@@ -97,6 +101,15 @@ async def root_health():
     return await health_check()
 
 
+# Prometheus scrape endpoint (no authentication required)
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Prometheus metrics for the API processes and broker queue depths"""
+    if not settings.enable_metrics:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return Response(generate_metrics(), media_type=CONTENT_TYPE_LATEST)
+
+
 # Import and include API routers (will be implemented in later tasks)
 try:
     from .api import tasks, projects, workers
@@ -120,12 +133,14 @@ async def startup_event():
         api_port=settings.api_port,
         debug=settings.debug,
     )
+    worker_status_monitor.start()
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Application shutdown event"""
     logger.info("AI Movie Task Service shutting down")
+    await worker_status_monitor.stop()
 
 
 if __name__ == "__main__":
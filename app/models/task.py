@@ -4,9 +4,9 @@ Follows constitutional requirements for data validation and type safety
 """
 from datetime import datetime
 from enum import Enum
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from uuid import UUID
-from pydantic import BaseModel, field_validator, ConfigDict
+from pydantic import BaseModel, Field, field_validator, ConfigDict
 
 
 class TaskType(str, Enum):
@@ -79,6 +79,17 @@ class TaskSubmissionResponse(BaseModel):
     estimated_duration: int
     queue_position: int
     created_at: datetime
+    estimated_completion: Optional[datetime] = None
+
+
+class BatchTaskSubmissionRequest(BaseModel):
+    """Request model for submitting several tasks in one call"""
+    tasks: List[TaskSubmissionRequest] = Field(..., min_length=1, max_length=100)
+
+
+class BatchTaskSubmissionResponse(BaseModel):
+    """Response model for batch task submission (same order as the request)"""
+    tasks: List[TaskSubmissionResponse]
 
 
 class TaskResult(BaseModel):
@@ -99,6 +110,9 @@ class TaskStatusResponse(BaseModel):
     error: Optional[str] = None
     started_at: Optional[datetime] = None
     completed_at: Optional[datetime] = None
+    queue_position: Optional[int] = None
+    estimated_duration: Optional[int] = None
+    estimated_completion: Optional[datetime] = None
     
     @field_validator('progress')
     @classmethod
@@ -133,6 +147,7 @@ class Task(BaseModel):
     completed_at: Optional[datetime] = None
     estimated_duration: int = 0
     queue_position: int = 0
+    estimated_start: Optional[datetime] = None
     
     @field_validator('progress')
     @classmethod
@@ -0,0 +1,22 @@
+"""
+Scheduling modules for dispatching tasks to the broker
+"""
+from .fair_share import fair_share_dispatcher, FairShareDispatcher, plan_dispatch
+from .admission import admission_controller, AdmissionController, QueueFullError
+from .estimates import estimate_wait, estimate_completion, get_queue_concurrency
+from .image_batching import image_batcher, ImageBatcher, image_batch_key
+
+__all__ = [
+    "fair_share_dispatcher",
+    "FairShareDispatcher",
+    "plan_dispatch",
+    "admission_controller",
+    "AdmissionController",
+    "QueueFullError",
+    "estimate_wait",
+    "estimate_completion",
+    "get_queue_concurrency",
+    "image_batcher",
+    "ImageBatcher",
+    "image_batch_key"
+]
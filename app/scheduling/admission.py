@@ -0,0 +1,193 @@
+"""
+Admission control for task submissions
+Broker queue depths are read from Redis (cached briefly) and submissions to a
+queue at its limit are rejected with a Retry-After hint
+"""
+import time
+import redis
+from typing import Dict, Any, Iterable, List, Optional
+import structlog
+
+from ..config.settings import settings
+from ..config.prometheus import instrument_redis
+from .fair_share import fair_share_dispatcher
+from ..gpu.placement import gpu_placement
+from ..gpu.affinity import model_affinity
+
+logger = structlog.get_logger(__name__)
+
+# Queues served by the worker pools (see celery_app.task_routes)
+MONITORED_QUEUES = ['gpu_heavy', 'gpu_medium', 'cpu_intensive', 'celery']
+
+# Matches celery_app.conf.broker_transport_options
+PRIORITY_STEPS = list(range(10))
+PRIORITY_SEP = ':'
+
+
+class QueueFullError(Exception):
+    """A queue is at its admission limit"""
+
+    def __init__(self, queue: str, depth: int, limit: int, retry_after: int):
+        super().__init__(f"Queue {queue} is full ({depth}/{limit} tasks)")
+        self.queue = queue
+        self.depth = depth
+        self.limit = limit
+        self.retry_after = retry_after
+
+
+def priority_queue_keys(queue: str) -> List[str]:
+    """
+    Redis list names holding a queue's messages, one per priority step
+    (step 0 uses the bare queue name)
+    """
+    return [queue if step == 0 else f"{queue}{PRIORITY_SEP}{step}" for step in PRIORITY_STEPS]
+
+
+class AdmissionController:
+    """
+    Queue depth based admission control
+
+    Depths count messages waiting on the broker plus tasks held by the
+    fair-share dispatcher, and are cached per process for
+    admission_depth_cache_ttl seconds so a burst of submissions costs one
+    round trip per queue.
+    """
+
+    def __init__(self):
+        """Initialize broker Redis connection"""
+        self.redis_client = instrument_redis(redis.Redis.from_url(
+            settings.get_celery_broker_url(),
+            decode_responses=True
+        ), "admission")
+        self._depth_cache: Dict[str, Dict[str, Any]] = {}
+
+    def get_limit(self, queue: str) -> int:
+        """Maximum queued tasks for a queue"""
+        return settings.get_queue_limits().get(queue, settings.queue_max_size)
+
+    def get_depth(self, queue: str) -> Optional[int]:
+        """
+        Queued task count for a queue
+
+        Returns:
+            Depth, or None if the broker could not be read
+        """
+        reading = self._read(queue)
+        if reading['steps'] is None:
+            return None
+        return sum(reading['steps']) + reading['held'] + reading['reserved']
+
+    def get_queue_position(self, queue: str, priority_step: int) -> Optional[int]:
+        """
+        Position a task with the given broker priority would take in a queue
+
+        Counts messages at the same or a more urgent priority step, held
+        fair-share tasks and tasks admitted since the last broker reading
+
+        Returns:
+            1-based position, or None if the broker could not be read
+        """
+        reading = self._read(queue)
+        if reading['steps'] is None:
+            return None
+        ahead = sum(reading['steps'][:priority_step + 1]) + reading['held'] + reading['reserved']
+        return ahead + 1
+
+    def check(self, queue: str, count: int = 1) -> None:
+        """
+        Admit count new tasks to a queue
+
+        Raises:
+            QueueFullError: If the queue would exceed its limit
+        """
+        self.check_all([queue] * count)
+
+    def check_all(self, queues: Iterable[str]) -> None:
+        """
+        Check one new task per entry in queues can be admitted, all or none
+
+        Fails open: if a depth cannot be read, that queue admits the tasks.
+
+        Raises:
+            QueueFullError: If any queue would exceed its limit
+        """
+        counts: Dict[str, int] = {}
+        for queue in queues:
+            counts[queue] = counts.get(queue, 0) + 1
+
+        for queue, count in counts.items():
+            depth = self.get_depth(queue)
+            limit = self.get_limit(queue)
+            if depth is not None and depth + count > limit:
+                logger.warning(
+                    "Submission rejected by admission control",
+                    queue=queue,
+                    depth=depth,
+                    limit=limit,
+                    requested=count
+                )
+                raise QueueFullError(queue, depth, limit, settings.admission_retry_after)
+
+    def reserve(self, queue: str, priority_step: int) -> Optional[int]:
+        """
+        Count an admitted task against the cached depth until the next
+        broker reading
+
+        Returns:
+            The task's queue position, or None if the broker could not be read
+        """
+        position = self.get_queue_position(queue, priority_step)
+        self._read(queue)['reserved'] += 1
+        return position
+
+    def _read(self, queue: str) -> Dict[str, Any]:
+        """Per-priority-step message counts for a queue, cached briefly"""
+        cached = self._depth_cache.get(queue)
+        if cached and time.monotonic() - cached['fetched_at'] < settings.admission_depth_cache_ttl:
+            return cached
+
+        steps = None
+        held = 0
+        try:
+            # Tasks routed to per-device queues still count against the queue
+            queues = [queue] + [
+                device['queue'] for device in gpu_placement.get_registrations()
+                if device['base_queue'] == queue
+            ] if gpu_placement.routes(queue) else [queue]
+            if model_affinity.routes(queue):
+                # ... and so do tasks waiting for a worker holding their model
+                queues += model_affinity.get_model_queues(queue)
+
+            pipe = self.redis_client.pipeline()
+            for name in queues:
+                for key in priority_queue_keys(name):
+                    pipe.llen(key)
+            lengths = pipe.execute()
+            steps = [sum(lengths[step::len(PRIORITY_STEPS)]) for step in range(len(PRIORITY_STEPS))]
+
+            if settings.fair_share_enabled and queue in settings.get_fair_share_queues():
+                held = sum(fair_share_dispatcher.get_queue_stats(queue)['held'].values())
+        except Exception as e:
+            logger.error("Failed to read queue depth", queue=queue, error=str(e))
+
+        reading = {'steps': steps, 'held': held, 'reserved': 0, 'fetched_at': time.monotonic()}
+        self._depth_cache[queue] = reading
+        return reading
+
+    def get_queue_status(self) -> List[Dict[str, Any]]:
+        """Depth, limit and whether submissions are accepted, per queue"""
+        statuses = []
+        for queue in MONITORED_QUEUES:
+            depth = self.get_depth(queue)
+            limit = self.get_limit(queue)
+            statuses.append({
+                "queue": queue,
+                "depth": depth,
+                "limit": limit,
+                "accepting": depth is None or depth < limit
+            })
+        return statuses
+
+
+# Global admission controller instance
+admission_controller = AdmissionController()
@@ -0,0 +1,72 @@
+"""
+Wait and completion time estimates for queued and running tasks
+"""
+from datetime import datetime, timedelta
+from typing import Optional
+
+from ..config.settings import settings
+from ..models.task import TaskStatus
+
+# Worker pool concurrency (celery_app.conf.worker_concurrency) when a queue has no override
+DEFAULT_QUEUE_CONCURRENCY = 2
+
+
+def get_queue_concurrency(queue: str) -> int:
+    """Tasks a queue runs in parallel across its workers"""
+    return max(settings.get_queue_concurrency().get(queue, DEFAULT_QUEUE_CONCURRENCY), 1)
+
+
+def estimate_wait(queue_position: int, estimated_duration: int, concurrency: int) -> int:
+    """
+    Seconds until a queued task starts
+
+    Tasks ahead of it are assumed to take as long as it does and to run
+    concurrency at a time.
+    """
+    ahead = max(queue_position - 1, 0)
+    return int(ahead * estimated_duration / max(concurrency, 1))
+
+
+def estimate_completion(
+    status: TaskStatus,
+    created_at: datetime,
+    estimated_duration: int,
+    estimated_start: Optional[datetime] = None,
+    started_at: Optional[datetime] = None,
+    progress: float = 0.0,
+    now: Optional[datetime] = None
+) -> Optional[datetime]:
+    """
+    Estimated completion time of a task, updated from what is known now
+
+    - Queued: expected start (or now, if that has passed) plus the run time
+    - Processing with progress: extrapolated from the elapsed run time
+    - Processing without progress: start plus run time, never in the past
+
+    Args:
+        status: Current task status
+        created_at: Submission time (UTC)
+        estimated_duration: Expected run time in seconds
+        estimated_start: Expected start time from the submission estimate
+        started_at: Start of execution (UTC), if known
+        progress: Fraction complete (0.0-1.0)
+        now: Current time (UTC), defaults to utcnow
+
+    Returns:
+        Estimated completion time, or None once the task has finished
+    """
+    if status not in (TaskStatus.QUEUED, TaskStatus.PROCESSING):
+        return None
+
+    now = now or datetime.utcnow()
+    duration = timedelta(seconds=estimated_duration)
+
+    if status == TaskStatus.QUEUED:
+        return max(estimated_start or created_at, now) + duration
+
+    start = started_at or created_at
+    if 0.0 < progress < 1.0:
+        elapsed = (now - start).total_seconds()
+        return now + timedelta(seconds=elapsed * (1.0 - progress) / progress)
+
+    return max(start + duration, now)
@@ -0,0 +1,421 @@
+"""
+Fair-share dispatch across projects using Redis
+Tasks for fair-share queues are held in per-project virtual queues and
+released to the Celery broker by deficit round-robin, so one project
+submitting hundreds of tasks cannot starve the others
+"""
+import json
+import time
+import redis
+from typing import Dict, Any, List, Optional, Tuple
+from celery import Signature
+from celery.result import AsyncResult
+from celery.signals import task_postrun, task_revoked
+from redis.exceptions import LockError
+import structlog
+
+from ..config.settings import settings
+from ..config.prometheus import instrument_redis
+
+logger = structlog.get_logger(__name__)
+
+DEFAULT_QUEUE = 'celery'
+
+
+def plan_dispatch(
+    ring: List[str],
+    deficits: Dict[str, float],
+    current: Optional[str],
+    backlogs: Dict[str, int],
+    in_flight: Dict[str, int],
+    capacity: int,
+    weights: Dict[str, float],
+    caps: Dict[str, int],
+    default_weight: float = 1.0,
+    default_cap: int = 1
+) -> Tuple[List[str], Dict[str, Any]]:
+    """
+    Choose which projects to release tasks for (deficit round-robin)
+
+    Each time the round reaches a project it earns its weight in credit and
+    releases one task per whole credit, so over time projects receive broker
+    slots in proportion to their weights. A project at its concurrency cap is
+    skipped without earning credit. When capacity runs out while the current
+    project still has credit, the round resumes with it on the next call.
+
+    Args:
+        ring: Projects with held tasks, in round order
+        deficits: Unspent credit per project
+        current: Project at the head of the ring that already earned its credit
+        backlogs: Held task count per project
+        in_flight: Released, unfinished task count per project
+        capacity: Tasks that may be released now
+        weights: Per-project weights (default_weight otherwise)
+        caps: Per-project concurrency caps (default_cap otherwise)
+
+    Returns:
+        Tuple of (projects to release one task for each, in order, and the
+        new state with ring, deficits and current)
+    """
+    ring = list(ring)
+    deficits = dict(deficits)
+    backlogs = dict(backlogs)
+    in_flight = dict(in_flight)
+    dispatched = []
+
+    def capped(project: str) -> bool:
+        return in_flight.get(project, 0) >= caps.get(project, default_cap)
+
+    while capacity > 0 and ring and not all(capped(project) for project in ring):
+        project = ring[0]
+
+        if capped(project):
+            ring.append(ring.pop(0))
+            current = None
+            continue
+
+        if project != current:
+            deficits[project] = deficits.get(project, 0.0) + weights.get(project, default_weight)
+            current = project
+
+        while (
+            capacity > 0
+            and deficits[project] >= 1
+            and backlogs.get(project, 0) > 0
+            and not capped(project)
+        ):
+            dispatched.append(project)
+            deficits[project] -= 1
+            backlogs[project] -= 1
+            in_flight[project] = in_flight.get(project, 0) + 1
+            capacity -= 1
+
+        if backlogs.get(project, 0) <= 0:
+            # Idle projects do not bank credit
+            ring.pop(0)
+            deficits.pop(project, None)
+            current = None
+        elif capacity == 0 and deficits[project] >= 1 and not capped(project):
+            break
+        else:
+            ring.append(ring.pop(0))
+            current = None
+
+    return dispatched, {'ring': ring, 'deficits': deficits, 'current': current}
+
+
+class FairShareDispatcher:
+    """
+    Redis-backed per-project virtual queues in front of the broker
+
+    For each fair-share queue, at most fair_share_max_in_flight tasks are
+    released to the broker at a time. Released tasks are leased until they
+    finish (or the task timeout passes), and every finish releases the next
+    tasks by deficit round-robin.
+    """
+
+    def __init__(self):
+        """Initialize Redis connection"""
+        self.redis_client = instrument_redis(redis.Redis.from_url(
+            settings.redis_url,
+            decode_responses=True
+        ), "fair_share")
+        self.key_prefix = "fair_share:"
+
+    def handles(self, signature: Signature) -> bool:
+        """Check whether a signature's queue is dispatched fair-share"""
+        if not settings.fair_share_enabled:
+            return False
+        return self.queue_for(signature) in settings.get_fair_share_queues()
+
+    @staticmethod
+    def queue_for(signature: Signature) -> str:
+        """Queue a signature will be routed to"""
+        queue = signature.options.get('queue') or getattr(signature.type, 'queue', None)
+        return queue or DEFAULT_QUEUE
+
+    def submit(self, project_id: str, signature: Signature) -> AsyncResult:
+        """
+        Hold a task in its project's virtual queue and release what fits
+
+        Args:
+            project_id: Project the task belongs to
+            signature: Task signature (its options are kept, e.g. priority)
+
+        Returns:
+            Result handle for the task (PENDING until it is released and run)
+        """
+        from ..gpu.placement import gpu_placement
+
+        queue = self.queue_for(signature)
+        task_result = signature.freeze()
+        message = json.dumps({'task_id': task_result.id, 'signature': dict(signature)}, default=str)
+
+        lock = self._lock(queue)
+        if not lock.acquire():
+            # The scheduler is congested; running the task out of turn beats failing it
+            logger.warning(
+                "Fair-share queue busy, dispatching task directly",
+                task_id=task_result.id,
+                project_id=project_id,
+                queue=queue
+            )
+            return gpu_placement.place(signature, queue).apply_async()
+
+        try:
+            self.redis_client.rpush(self._backlog_key(queue, project_id), message)
+            self.redis_client.set(self._held_key(task_result.id), f"{queue}|{project_id}")
+            if self.redis_client.lpos(self._key(queue, 'ring'), project_id) is None:
+                self.redis_client.rpush(self._key(queue, 'ring'), project_id)
+            released = self._pump(queue)
+        finally:
+            try:
+                lock.release()
+            except LockError:
+                # Expired while held; the task is queued either way
+                logger.warning("Fair-share lock expired during submit", queue=queue)
+
+        logger.info(
+            "Task held for fair-share dispatch",
+            task_id=task_result.id,
+            project_id=project_id,
+            queue=queue,
+            released=released
+        )
+
+        return task_result
+
+    def release(self, task_id: str) -> bool:
+        """
+        Free a finished task's slot and release the next tasks
+
+        Args:
+            task_id: Celery task ID
+
+        Returns:
+            True if the task was dispatched by the fair-share scheduler
+        """
+        try:
+            queue = self.redis_client.get(f"{self.key_prefix}task:{task_id}")
+            if not queue:
+                return False
+
+            with self._lock(queue):
+                pipe = self.redis_client.pipeline()
+                pipe.zrem(self._key(queue, 'in_flight'), task_id)
+                pipe.hdel(self._key(queue, 'projects'), task_id)
+                pipe.delete(f"{self.key_prefix}task:{task_id}")
+                pipe.execute()
+                self._pump(queue)
+
+            return True
+        except Exception as e:
+            logger.error(
+                "Failed to release fair-share slot",
+                task_id=task_id,
+                error=str(e)
+            )
+            return False
+
+    def discard(self, task_id: str) -> bool:
+        """
+        Drop a task that is still held (revoked before it was released)
+
+        Held tasks never reach a worker, so revoking them alone would not stop
+        their later release.
+
+        Args:
+            task_id: Celery task ID
+
+        Returns:
+            True if the task was held and has been removed
+        """
+        try:
+            held = self.redis_client.get(self._held_key(task_id))
+            if not held:
+                return False
+            queue, _, project_id = held.partition('|')
+
+            with self._lock(queue):
+                backlog_key = self._backlog_key(queue, project_id)
+                removed = 0
+                for message in self.redis_client.lrange(backlog_key, 0, -1):
+                    if json.loads(message)['task_id'] == task_id:
+                        removed = self.redis_client.lrem(backlog_key, 1, message)
+                        break
+                self.redis_client.delete(self._held_key(task_id))
+
+            if removed:
+                logger.info("Discarded held fair-share task", task_id=task_id, project_id=project_id, queue=queue)
+            return bool(removed)
+        except Exception as e:
+            logger.error(
+                "Failed to discard held fair-share task",
+                task_id=task_id,
+                error=str(e)
+            )
+            return False
+
+    def pump(self, queue: str) -> int:
+        """
+        Release held tasks for a queue up to the in-flight limit
+
+        Returns:
+            Number of tasks released to the broker
+        """
+        with self._lock(queue):
+            return self._pump(queue)
+
+    def get_queue_stats(self, queue: str) -> Dict[str, Any]:
+        """
+        Held and in-flight task counts per project for a queue
+        """
+        ring = self.redis_client.lrange(self._key(queue, 'ring'), 0, -1)
+        projects = self.redis_client.hvals(self._key(queue, 'projects'))
+        in_flight = {}
+        for project in projects:
+            in_flight[project] = in_flight.get(project, 0) + 1
+
+        return {
+            'queue': queue,
+            'held': {
+                project: self.redis_client.llen(self._backlog_key(queue, project))
+                for project in ring
+            },
+            'in_flight': in_flight
+        }
+
+    def _pump(self, queue: str) -> int:
+        """Release held tasks; the caller holds the queue lock"""
+        in_flight = self._in_flight(queue)
+        capacity = settings.fair_share_max_in_flight - sum(in_flight.values())
+        if capacity <= 0:
+            return 0
+
+        ring = self.redis_client.lrange(self._key(queue, 'ring'), 0, -1)
+        if not ring:
+            return 0
+
+        pipe = self.redis_client.pipeline()
+        for project in ring:
+            pipe.llen(self._backlog_key(queue, project))
+        backlogs = dict(zip(ring, pipe.execute()))
+
+        deficits = {
+            project: float(value)
+            for project, value in self.redis_client.hgetall(self._key(queue, 'deficits')).items()
+        }
+
+        dispatched, state = plan_dispatch(
+            ring=ring,
+            deficits=deficits,
+            current=self.redis_client.get(self._key(queue, 'current')),
+            backlogs=backlogs,
+            in_flight=in_flight,
+            capacity=capacity,
+            weights=settings.get_fair_share_weights(),
+            caps=settings.get_fair_share_project_caps(),
+            default_weight=settings.fair_share_default_weight,
+            default_cap=settings.fair_share_project_cap
+        )
+
+        released = 0
+        for project in dispatched:
+            message = self.redis_client.lpop(self._backlog_key(queue, project))
+            if message is None:
+                continue
+            self._dispatch(queue, project, json.loads(message))
+            released += 1
+
+        pipe = self.redis_client.pipeline()
+        pipe.delete(self._key(queue, 'ring'), self._key(queue, 'deficits'), self._key(queue, 'current'))
+        if state['ring']:
+            pipe.rpush(self._key(queue, 'ring'), *state['ring'])
+        if state['deficits']:
+            pipe.hset(self._key(queue, 'deficits'), mapping=state['deficits'])
+        if state['current']:
+            pipe.set(self._key(queue, 'current'), state['current'])
+        pipe.execute()
+
+        return released
+
+    def _dispatch(self, queue: str, project_id: str, message: Dict[str, Any]) -> None:
+        """Send a held task to the broker and lease its slot"""
+        from ..celery_app import celery_app
+        from ..gpu.placement import gpu_placement
+
+        task_id = message['task_id']
+        lease_timeout = settings.task_timeout
+
+        pipe = self.redis_client.pipeline()
+        pipe.zadd(self._key(queue, 'in_flight'), {task_id: time.time()})
+        pipe.hset(self._key(queue, 'projects'), task_id, project_id)
+        pipe.set(f"{self.key_prefix}task:{task_id}", queue, ex=lease_timeout)
+        pipe.delete(self._held_key(task_id))
+        pipe.execute()
+
+        signature = gpu_placement.place(Signature(message['signature'], app=celery_app), queue)
+        signature.apply_async(task_id=task_id)
+
+        logger.info(
+            "Released fair-share task",
+            task_id=task_id,
+            project_id=project_id,
+            queue=queue
+        )
+
+    def _in_flight(self, queue: str) -> Dict[str, int]:
+        """In-flight counts per project, dropping leases older than the task timeout"""
+        in_flight_key = self._key(queue, 'in_flight')
+        projects_key = self._key(queue, 'projects')
+
+        expired = self.redis_client.zrangebyscore(
+            in_flight_key, '-inf', time.time() - settings.task_timeout
+        )
+        if expired:
+            pipe = self.redis_client.pipeline()
+            pipe.zrem(in_flight_key, *expired)
+            pipe.hdel(projects_key, *expired)
+            pipe.execute()
+            logger.warning("Expired fair-share leases", queue=queue, task_ids=expired)
+
+        counts = {}
+        for project in self.redis_client.hvals(projects_key):
+            counts[project] = counts.get(project, 0) + 1
+        return counts
+
+    def _lock(self, queue: str):
+        """Per-queue lock serializing enqueue, release and dispatch"""
+        return self.redis_client.lock(self._key(queue, 'lock'), timeout=30, blocking_timeout=10)
+
+    def _key(self, queue: str, name: str) -> str:
+        return f"{self.key_prefix}{queue}:{name}"
+
+    def _backlog_key(self, queue: str, project_id: str) -> str:
+        return f"{self.key_prefix}{queue}:project:{project_id}"
+
+    def _held_key(self, task_id: str) -> str:
+        return f"{self.key_prefix}held:{task_id}"
+
+
+# Global fair-share dispatcher instance
+fair_share_dispatcher = FairShareDispatcher()
+
+
+@task_postrun.connect
+def fair_share_postrun_handler(sender=None, task_id=None, state=None, **extra):
+    """
+    Release the next held task when a fair-share task finishes
+
+    A retrying task is back on the broker and keeps its slot until its final run.
+    """
+    if settings.fair_share_enabled and task_id and state != 'RETRY':
+        fair_share_dispatcher.release(task_id)
+
+
+@task_revoked.connect
+def fair_share_revoked_handler(sender=None, request=None, **extra):
+    """Revoked tasks never reach task_postrun, so release their slot here"""
+    task_id = getattr(request, 'id', None)
+    if settings.fair_share_enabled and task_id:
+        fair_share_dispatcher.release(task_id)
@@ -0,0 +1,207 @@
+"""
+Micro-batching of image generation requests using Redis
+Compatible image requests (same model, size and steps) are collected for a
+short window, or until a batch is full, and sent to the GPU as one task that
+generates every image in a single execution. On a fair-share queue batches
+are per project and each batch is held as one fair-share task
+"""
+import json
+import redis
+from uuid import uuid4
+from typing import Dict, Any, Optional
+from celery import Signature
+from celery.result import AsyncResult
+from celery.signals import worker_ready
+import structlog
+
+from ..config.settings import settings
+from ..config.prometheus import instrument_redis
+from ..gpu.placement import gpu_placement
+from ..gpu.models import DEFAULT_IMAGE_MODEL
+from .fair_share import FairShareDispatcher, fair_share_dispatcher
+
+logger = structlog.get_logger(__name__)
+
+BATCHED_TASK = 'app.tasks.image_tasks.process_image_generation'
+
+# Lightweight queue of window flushes, consumed by every GPU worker node so a
+# flush never waits behind long CPU tasks
+FLUSH_QUEUE = 'gpu_control'
+
+# Broker priority of flushes: ahead of any GPU task once a slot frees up
+FLUSH_PRIORITY = 0
+
+# Add a request to the open batch of its key, opening one if there is none.
+# The open pointer expires when the window closes and is dropped when the
+# batch fills up, so later requests start a new batch.
+_ADD_SCRIPT = """
+local batch_id = redis.call('GET', KEYS[1])
+local opened = 0
+if not batch_id then
+    batch_id = ARGV[1]
+    opened = 1
+    redis.call('SET', KEYS[1], batch_id, 'PX', ARGV[4])
+end
+local members_key = ARGV[6] .. 'members:' .. batch_id
+local size = redis.call('RPUSH', members_key, ARGV[2])
+redis.call('EXPIRE', members_key, ARGV[5])
+local full = 0
+if size >= tonumber(ARGV[3]) then
+    redis.call('DEL', KEYS[1])
+    full = 1
+end
+return {batch_id, opened, full}
+"""
+
+# Take all requests of a batch (once) and close it
+_CLAIM_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    redis.call('DEL', KEYS[1])
+end
+local members = redis.call('LRANGE', KEYS[2], 0, -1)
+redis.call('DEL', KEYS[2])
+return members
+"""
+
+
+def image_batch_key(image_params: Dict[str, Any]) -> str:
+    """Requests with the same key can be generated together"""
+    return "{model}:{width}x{height}:{steps}".format(
+        model=image_params.get('model', DEFAULT_IMAGE_MODEL),
+        width=image_params.get('width', 1024),
+        height=image_params.get('height', 1024),
+        steps=image_params.get('steps', 50)
+    )
+
+
+class ImageBatcher:
+    """
+    Redis-backed open batches of image generation requests
+
+    The first request of a batch schedules a flush after image_batch_window
+    seconds; a request that fills the batch flushes it at once. Flushing
+    claims the batch atomically, so a batch is sent to the GPU only once.
+    """
+
+    def __init__(self):
+        """Initialize Redis connection"""
+        self.redis_client = instrument_redis(redis.Redis.from_url(
+            settings.redis_url,
+            decode_responses=True
+        ), "image_batching")
+        self.key_prefix = "image_batch:"
+        self._add_script = self.redis_client.register_script(_ADD_SCRIPT)
+        self._claim_script = self.redis_client.register_script(_CLAIM_SCRIPT)
+
+    def handles(self, signature: Signature) -> bool:
+        """Check whether a signature is an image generation request to batch"""
+        return settings.image_batching_enabled and signature.task == BATCHED_TASK
+
+    def submit(self, signature: Signature) -> AsyncResult:
+        """
+        Add an image generation request to the open batch for its parameters
+
+        Falls back to sending the task on its own when Redis is unavailable.
+
+        Args:
+            signature: process_image_generation signature (its priority is kept)
+
+        Returns:
+            Result handle for the request, completed by the batch task
+        """
+        task_result = signature.freeze()
+        image_params = signature.kwargs.get('image_params') or {}
+        batch_key = image_batch_key(image_params)
+        if fair_share_dispatcher.handles(signature):
+            # A held batch counts against one project's fair share
+            batch_key = f"{signature.kwargs.get('project_id')}:{batch_key}"
+        request = dict(signature.kwargs, task_id=task_result.id, priority=signature.options.get('priority'))
+
+        try:
+            batch_id, opened, full = self._add_script(
+                keys=[self._open_key(batch_key)],
+                args=[
+                    uuid4().hex,
+                    json.dumps(request, default=str),
+                    settings.image_batch_max_size,
+                    max(int(settings.image_batch_window * 1000), 1),
+                    settings.task_timeout,
+                    self.key_prefix
+                ]
+            )
+        except Exception as e:
+            logger.error("Image batching unavailable, sending task alone", task_id=task_result.id, error=str(e))
+            return self._send(signature, signature.kwargs.get('project_id'))
+
+        if int(full):
+            self.flush(batch_key, batch_id)
+        elif int(opened):
+            from ..tasks.image_tasks import flush_image_batch
+
+            flush_image_batch.apply_async(
+                (batch_key, batch_id), countdown=settings.image_batch_window, priority=FLUSH_PRIORITY
+            )
+
+        logger.info("Image request added to batch", task_id=task_result.id, batch_id=batch_id, batch_key=batch_key)
+        return task_result
+
+    def flush(self, batch_key: str, batch_id: str) -> Optional[AsyncResult]:
+        """
+        Send a batch to the GPU as one process_image_generation_batch task
+
+        Args:
+            batch_key: Compatibility key of the batch
+            batch_id: Batch to send
+
+        Returns:
+            Result handle of the batch task, or None if the batch was already sent
+        """
+        from ..tasks.image_tasks import process_image_generation_batch
+
+        requests = [json.loads(raw) for raw in self._claim_script(
+            keys=[self._open_key(batch_key), f"{self.key_prefix}members:{batch_id}"],
+            args=[batch_id]
+        )]
+        if not requests:
+            return None
+
+        priorities = [request.pop('priority') for request in requests]
+        signature = process_image_generation_batch.s(batch_key=batch_key, requests=requests)
+        priorities = [priority for priority in priorities if priority is not None]
+        if priorities:
+            # The batch is as urgent as its most urgent request
+            signature = signature.set(priority=min(priorities))
+
+        batch_result = self._send(signature, requests[0].get('project_id'))
+
+        logger.info(
+            "Image batch sent",
+            batch_id=batch_id,
+            batch_key=batch_key,
+            batch_task_id=batch_result.id,
+            batch_size=len(requests)
+        )
+        return batch_result
+
+    def _send(self, signature: Signature, project_id: Optional[str]) -> AsyncResult:
+        """Hold a task on a fair-share queue for its project, or send it to the GPU"""
+        if fair_share_dispatcher.handles(signature):
+            return fair_share_dispatcher.submit(project_id, signature)
+        return gpu_placement.place(signature, FairShareDispatcher.queue_for(signature)).apply_async()
+
+    def _open_key(self, batch_key: str) -> str:
+        return f"{self.key_prefix}open:{batch_key}"
+
+
+# Global image batcher instance
+image_batcher = ImageBatcher()
+
+
+@worker_ready.connect
+def image_batch_worker_ready_handler(sender=None, **extra):
+    """Have GPU worker nodes take image batch flushes"""
+    if sender is None or not settings.image_batching_enabled:
+        return
+    consumed = [queue.name for queue in sender.task_consumer.queues]
+    if FLUSH_QUEUE not in consumed and any(queue in consumed for queue in settings.get_gpu_admission_queues()):
+        sender.add_task_queue(FLUSH_QUEUE)
@@ -2,6 +2,25 @@
 Storage module for task persistence
 """
 from .task_storage import task_storage, TaskStorage
+from .gather_item_store import GatherItemStore
+from .evaluation_cache import evaluation_cache, EvaluationCache, evaluation_cache_key
+from .payload_store import payload_store, PayloadStore, PayloadNotFoundError
+from .runtime_stats import runtime_stats, RuntimeStats
+from .metrics_store import metrics_store, MetricsStore
 
-__all__ = ["task_storage", "TaskStorage"]
+__all__ = [
+    "task_storage",
+    "TaskStorage",
+    "GatherItemStore",
+    "evaluation_cache",
+    "EvaluationCache",
+    "evaluation_cache_key",
+    "payload_store",
+    "PayloadStore",
+    "PayloadNotFoundError",
+    "runtime_stats",
+    "RuntimeStats",
+    "metrics_store",
+    "MetricsStore"
+]
 
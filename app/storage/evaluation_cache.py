@@ -0,0 +1,137 @@
+"""
+Evaluation cache using Redis
+Memoizes department evaluations by a canonical hash of their inputs
+"""
+import json
+import hashlib
+import redis
+from typing import Dict, Any, List, Optional
+import structlog
+
+from ..config.settings import settings
+from ..config.prometheus import instrument_redis
+
+logger = structlog.get_logger(__name__)
+
+
+def gather_item_hash(item: Dict[str, Any]) -> str:
+    """
+    Hash the fields of a gather item that reach the evaluation prompt
+    """
+    canonical = json.dumps(
+        {
+            "content": item.get("content", ""),
+            "summary": item.get("summary", ""),
+            "context": item.get("context", "")
+        },
+        sort_keys=True,
+        default=str
+    )
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def evaluation_cache_key(
+    department_slug: str,
+    gather_data: List[Dict[str, Any]],
+    previous_evaluations: List[Dict[str, Any]],
+    threshold: int,
+    model: str,
+    token_budget: int
+) -> str:
+    """
+    Canonical hash of everything that determines an evaluation
+
+    Gather items are hashed individually and sorted, so the same set of
+    items in a different order maps to the same key.
+
+    Args:
+        department_slug: Department name
+        gather_data: Gathered content items
+        previous_evaluations: Previous department evaluations (ratings are used)
+        threshold: Minimum passing score
+        model: Evaluator model
+        token_budget: Prompt token budget the evaluation was built with
+
+    Returns:
+        Hex digest identifying the evaluation
+    """
+    canonical = json.dumps(
+        {
+            "department": department_slug,
+            "items": sorted(gather_item_hash(item) for item in gather_data),
+            "previous_ratings": sorted(
+                [str(evaluation.get("department", "")), evaluation.get("rating", 0)]
+                for evaluation in previous_evaluations
+            ),
+            "threshold": threshold,
+            "model": model,
+            "token_budget": token_budget
+        },
+        sort_keys=True,
+        default=str
+    )
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class EvaluationCache:
+    """Redis-based cache of department evaluation results"""
+
+    def __init__(self):
+        """Initialize Redis connection"""
+        self.redis_client = instrument_redis(redis.Redis.from_url(
+            settings.redis_url,
+            decode_responses=True
+        ), "evaluation_cache")
+        self.cache_prefix = "evaluation_cache:"
+
+    def get(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        """
+        Get a cached evaluation
+
+        Args:
+            cache_key: Key from evaluation_cache_key
+
+        Returns:
+            Cached entry or None if not found
+        """
+        try:
+            raw_entry = self.redis_client.get(f"{self.cache_prefix}{cache_key}")
+            return json.loads(raw_entry) if raw_entry else None
+        except Exception as e:
+            logger.error(
+                "Failed to get cached evaluation",
+                cache_key=cache_key,
+                error=str(e)
+            )
+            return None
+
+    def set(self, cache_key: str, entry: Dict[str, Any], ttl: Optional[int] = None) -> bool:
+        """
+        Cache an evaluation
+
+        Args:
+            cache_key: Key from evaluation_cache_key
+            entry: JSON-serializable evaluation entry
+            ttl: Expiration in seconds (defaults to settings)
+
+        Returns:
+            True if successful
+        """
+        try:
+            self.redis_client.set(
+                f"{self.cache_prefix}{cache_key}",
+                json.dumps(entry, default=str),
+                ex=ttl or settings.evaluation_cache_ttl
+            )
+            return True
+        except Exception as e:
+            logger.error(
+                "Failed to cache evaluation",
+                cache_key=cache_key,
+                error=str(e)
+            )
+            return False
+
+
+# Global evaluation cache instance
+evaluation_cache = EvaluationCache()
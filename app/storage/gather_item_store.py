@@ -0,0 +1,87 @@
+"""
+In-memory gather item store for automated gather creation
+Indexes gather items by department so agents don't re-filter the full list
+"""
+from typing import Dict, Any, List, Iterable, Iterator, Optional, Sequence
+
+
+class GatherItemStore:
+    """
+    Append-only gather item log with a per-department position index
+
+    Department lookups cost O(items in department) instead of a scan over
+    every gather item, and "last N" views slice the log (or a window spanning
+    the log plus extra context sources) without building concatenated lists.
+    """
+
+    def __init__(self, items: Optional[Iterable[Dict[str, Any]]] = None):
+        self._log: List[Dict[str, Any]] = []
+        self._by_department: Dict[str, List[int]] = {}
+        if items:
+            self.extend(items)
+
+    def append(self, item: Dict[str, Any]) -> None:
+        """Append an item to the log and index it by department"""
+        dept_slug = item.get('automationMetadata', {}).get('department')
+        if dept_slug:
+            self._by_department.setdefault(dept_slug, []).append(len(self._log))
+        self._log.append(item)
+
+    def extend(self, items: Iterable[Dict[str, Any]]) -> None:
+        """Append several items"""
+        for item in items:
+            self.append(item)
+
+    def __len__(self) -> int:
+        return len(self._log)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return iter(self._log)
+
+    def departments(self) -> List[str]:
+        """Department slugs that have at least one item"""
+        return list(self._by_department)
+
+    def department_count(self, dept_slug: str) -> int:
+        """Number of items for a department"""
+        return len(self._by_department.get(dept_slug, ()))
+
+    def department_items(self, dept_slug: str) -> List[Dict[str, Any]]:
+        """All items for a department, in log order"""
+        return [self._log[i] for i in self._by_department.get(dept_slug, ())]
+
+    def last(self, n: int) -> List[Dict[str, Any]]:
+        """Last n items of the log"""
+        return self._log[-n:] if n > 0 else []
+
+    def last_for_department(self, dept_slug: str, n: int) -> List[Dict[str, Any]]:
+        """Last n items for a department"""
+        if n <= 0:
+            return []
+        positions = self._by_department.get(dept_slug, [])
+        return [self._log[i] for i in positions[-n:]]
+
+    def context_window(
+        self,
+        n: int,
+        *extra_sources: Sequence[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """
+        Last n items of the log followed by the extra sources
+
+        Equivalent to (log + extra_1 + ... + extra_k)[-n:] without building the
+        full concatenation.
+        """
+        chunks = []
+        remaining = n
+        for source in reversed((self._log,) + extra_sources):
+            if remaining <= 0:
+                break
+            chunk = source[-remaining:] if remaining < len(source) else source
+            chunks.append(chunk)
+            remaining -= len(chunk)
+
+        window: List[Dict[str, Any]] = []
+        for chunk in reversed(chunks):
+            window.extend(chunk)
+        return window
@@ -0,0 +1,208 @@
+"""
+Fleet-wide task metrics using Redis
+Worker processes buffer counter increments and running-task changes and flush
+them in one pipeline per interval; the API reads the aggregate
+"""
+import os
+import json
+import time
+import threading
+import redis
+from datetime import datetime
+from typing import Dict, Any, Optional
+import structlog
+
+from ..config.settings import settings
+from ..config.prometheus import instrument_redis
+from ..utils.histogram import LogHistogram
+
+logger = structlog.get_logger(__name__)
+
+
+class MetricsStore:
+    """
+    Redis-based task counters and running tasks shared by all processes
+
+    Updates are buffered in the recording process and written by a daemon
+    thread every metrics_flush_interval seconds (or on flush()), so a task
+    costs no extra Redis round trips on its hot path.
+    """
+
+    def __init__(self):
+        """Initialize Redis connection"""
+        self.redis_client = instrument_redis(redis.Redis.from_url(
+            settings.redis_url,
+            decode_responses=True
+        ), "metrics_store")
+        self.counters_key = "fleet_metrics:counters"
+        self.running_key = "fleet_metrics:running"
+        self.durations_key = "fleet_metrics:durations"
+        self.durations_prefix = "fleet_metrics:durations:"
+        self._lock = threading.Lock()
+        self._flusher_pid = None
+        self._reset_buffers()
+
+    def increment(self, name: str, value: int = 1) -> None:
+        """Buffer a counter increment"""
+        self._ensure_flusher()
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def observe(self, task_name: str, duration: float) -> None:
+        """Buffer a task duration for the task's latency histogram"""
+        self._ensure_flusher()
+        with self._lock:
+            self._durations.setdefault(task_name, LogHistogram()).record(duration)
+
+    def task_started(self, task_id: str, task_name: str, started_at: datetime) -> None:
+        """Buffer a task start"""
+        entry = json.dumps({
+            'task_name': task_name,
+            'started_at': started_at.isoformat(),
+            'pid': os.getpid()
+        })
+        self._ensure_flusher()
+        with self._lock:
+            self._started[task_id] = entry
+
+    def task_finished(self, task_id: str) -> None:
+        """Buffer a task finish"""
+        self._ensure_flusher()
+        with self._lock:
+            # Started and finished within one interval: nothing to publish
+            if self._started.pop(task_id, None) is None:
+                self._finished.add(task_id)
+
+    def flush(self) -> bool:
+        """
+        Write buffered updates in one pipeline
+
+        Returns:
+            True if successful (or nothing was buffered)
+        """
+        with self._lock:
+            counters, started, finished = self._counters, self._started, self._finished
+            durations = self._durations
+            self._reset_buffers()
+
+        if not (counters or started or finished or durations):
+            return True
+
+        try:
+            pipe = self.redis_client.pipeline(transaction=False)
+            for name, value in counters.items():
+                pipe.hincrby(self.counters_key, name, value)
+            if started:
+                pipe.hset(self.running_key, mapping=started)
+            if finished:
+                pipe.hdel(self.running_key, *finished)
+            for task_name, histogram in durations.items():
+                histogram_key = f"{self.durations_prefix}{task_name}"
+                for index, count in histogram.counts.items():
+                    pipe.hincrby(histogram_key, str(index), count)
+                pipe.hincrbyfloat(histogram_key, "total", histogram.total)
+            if durations:
+                pipe.sadd(self.durations_key, *durations)
+            pipe.execute()
+            return True
+        except Exception as e:
+            logger.error("Failed to flush task metrics", error=str(e))
+            return False
+
+    def snapshot(self) -> Optional[Dict[str, Any]]:
+        """
+        Fleet-wide counters and running tasks
+
+        Running entries older than the task timeout belong to lost workers
+        and are pruned.
+
+        Returns:
+            Dict with counters, running ({task_id: {task_name, started_at}})
+            and durations ({task_name: LogHistogram}), or None if Redis is
+            unavailable
+        """
+        try:
+            pipe = self.redis_client.pipeline(transaction=False)
+            pipe.hgetall(self.counters_key)
+            pipe.hgetall(self.running_key)
+            pipe.smembers(self.durations_key)
+            raw_counters, raw_running, task_names = pipe.execute()
+
+            task_names = sorted(task_names)
+            pipe = self.redis_client.pipeline(transaction=False)
+            for task_name in task_names:
+                pipe.hgetall(f"{self.durations_prefix}{task_name}")
+            raw_durations = pipe.execute() if task_names else []
+        except Exception as e:
+            logger.error("Failed to read fleet metrics", error=str(e))
+            return None
+
+        now = datetime.utcnow()
+        running = {}
+        stale = []
+        for task_id, raw_entry in raw_running.items():
+            entry = json.loads(raw_entry)
+            started_at = datetime.fromisoformat(entry['started_at'])
+            if (now - started_at).total_seconds() > settings.task_timeout:
+                stale.append(task_id)
+                continue
+            running[task_id] = {'task_name': entry['task_name'], 'started_at': started_at}
+
+        if stale:
+            try:
+                self.redis_client.hdel(self.running_key, *stale)
+            except Exception as e:
+                logger.error("Failed to prune stale running tasks", error=str(e))
+
+        durations = {}
+        for task_name, raw_histogram in zip(task_names, raw_durations):
+            total = float(raw_histogram.pop("total", 0.0))
+            durations[task_name] = LogHistogram.from_dict({"counts": raw_histogram, "total": total})
+
+        return {
+            'counters': {name: int(value) for name, value in raw_counters.items()},
+            'running': running,
+            'durations': durations
+        }
+
+    def reset(self) -> None:
+        """Clear buffers and fleet metrics (useful for testing)"""
+        with self._lock:
+            self._reset_buffers()
+        try:
+            task_names = self.redis_client.smembers(self.durations_key)
+            self.redis_client.delete(
+                self.counters_key,
+                self.running_key,
+                self.durations_key,
+                *(f"{self.durations_prefix}{task_name}" for task_name in task_names)
+            )
+        except Exception as e:
+            logger.error("Failed to reset fleet metrics", error=str(e))
+
+    def _reset_buffers(self) -> None:
+        self._counters: Dict[str, int] = {}
+        self._started: Dict[str, str] = {}
+        self._finished = set()
+        self._durations: Dict[str, LogHistogram] = {}
+
+    def _ensure_flusher(self) -> None:
+        """Start the flush thread once per process (prefork children included)"""
+        if self._flusher_pid == os.getpid():
+            return
+
+        # A forked child inherits the parent's buffers and possibly a held lock
+        self._flusher_pid = os.getpid()
+        self._lock = threading.Lock()
+        self._reset_buffers()
+        thread = threading.Thread(target=self._flush_loop, name="metrics-flush", daemon=True)
+        thread.start()
+
+    def _flush_loop(self) -> None:
+        while True:
+            time.sleep(settings.metrics_flush_interval)
+            self.flush()
+
+
+# Global metrics store instance
+metrics_store = MetricsStore()
@@ -0,0 +1,128 @@
+"""
+Claim-check payload store using Redis
+Large task payloads are stored once and tasks receive a small reference
+"""
+import json
+import hashlib
+import redis
+from typing import Dict, Any, Iterable, Optional
+import structlog
+
+from ..config.settings import settings
+from ..config.prometheus import instrument_redis
+
+logger = structlog.get_logger(__name__)
+
+PAYLOAD_REF_KEY = "__payload_ref__"
+
+
+class PayloadNotFoundError(Exception):
+    """Referenced payload expired or was never stored"""
+    pass
+
+
+def is_payload_ref(value: Any) -> bool:
+    """Check whether a value is a payload reference"""
+    return isinstance(value, dict) and PAYLOAD_REF_KEY in value
+
+
+class PayloadStore:
+    """
+    Content-addressed Redis blob store for large task payloads
+
+    Payloads are keyed by the SHA-256 of their canonical JSON, so submitting
+    the same data twice stores it once (and refreshes its TTL).
+    """
+
+    def __init__(self):
+        """Initialize Redis connection"""
+        self.redis_client = instrument_redis(redis.Redis.from_url(
+            settings.redis_url,
+            decode_responses=True
+        ), "payload_store")
+        self.payload_prefix = "payload:"
+
+    def put(self, value: Any, ttl: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Store a payload
+
+        Args:
+            value: JSON-serializable payload
+            ttl: Expiration in seconds (defaults to settings)
+
+        Returns:
+            Reference to pass instead of the payload
+        """
+        serialized = json.dumps(value, sort_keys=True, default=str)
+        digest = hashlib.sha256(serialized.encode()).hexdigest()
+        payload_key = f"{self.payload_prefix}{digest}"
+        ttl = ttl or settings.payload_store_ttl
+
+        if not self.redis_client.set(payload_key, serialized, ex=ttl, nx=True):
+            self.redis_client.expire(payload_key, ttl)
+
+        logger.info(
+            "Stored task payload",
+            digest=digest,
+            size=len(serialized)
+        )
+
+        return {PAYLOAD_REF_KEY: digest, "size": len(serialized)}
+
+    def get(self, ref: Dict[str, Any]) -> Any:
+        """
+        Load a payload by reference
+
+        Args:
+            ref: Reference returned by put
+
+        Returns:
+            The stored payload
+
+        Raises:
+            PayloadNotFoundError: If the payload expired or does not exist
+        """
+        digest = ref[PAYLOAD_REF_KEY]
+        serialized = self.redis_client.get(f"{self.payload_prefix}{digest}")
+
+        if serialized is None:
+            raise PayloadNotFoundError(f"Task payload {digest} not found or expired")
+
+        return json.loads(serialized)
+
+    def resolve(self, value: Any) -> Any:
+        """Load the payload if value is a reference, otherwise return it unchanged"""
+        return self.get(value) if is_payload_ref(value) else value
+
+    def offload(
+        self,
+        data: Dict[str, Any],
+        fields: Iterable[str],
+        threshold: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Replace large fields of a dict with payload references
+
+        Args:
+            data: Task data
+            fields: Fields that may be offloaded (the worker must resolve them)
+            threshold: Minimum serialized size in bytes (defaults to settings)
+
+        Returns:
+            Copy of data with large fields replaced by references
+        """
+        threshold = settings.payload_offload_threshold if threshold is None else threshold
+        offloaded = dict(data)
+
+        for field in fields:
+            value = offloaded.get(field)
+            if value is None or is_payload_ref(value):
+                continue
+            if len(json.dumps(value, default=str)) >= threshold:
+                offloaded[field] = self.put(value)
+
+        return offloaded
+
+
+# Global payload store instance
+payload_store = PayloadStore()
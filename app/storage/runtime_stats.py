@@ -0,0 +1,107 @@
+"""
+Rolling task runtime statistics using Redis
+Workers record successful run durations per task name and the API uses them
+to estimate how long new tasks will take
+"""
+import redis
+from typing import Dict, Any, Optional
+import structlog
+
+from ..config.settings import settings
+from ..config.prometheus import instrument_redis
+
+logger = structlog.get_logger(__name__)
+
+# Exponentially weighted moving average, updated atomically across workers
+_RECORD_SCRIPT = """
+local previous = redis.call('HGET', KEYS[1], 'ewma')
+local duration = tonumber(ARGV[1])
+local alpha = tonumber(ARGV[2])
+local value = duration
+if previous then
+    value = alpha * duration + (1 - alpha) * tonumber(previous)
+end
+redis.call('HSET', KEYS[1], 'ewma', tostring(value), 'last', ARGV[1])
+redis.call('HINCRBY', KEYS[1], 'count', 1)
+return tostring(value)
+"""
+
+
+class RuntimeStats:
+    """Redis-based per-task-name runtime averages"""
+
+    def __init__(self):
+        """Initialize Redis connection"""
+        self.redis_client = instrument_redis(redis.Redis.from_url(
+            settings.redis_url,
+            decode_responses=True
+        ), "runtime_stats")
+        self.stats_prefix = "runtime_stats:"
+        self._record_script = self.redis_client.register_script(_RECORD_SCRIPT)
+
+    def record(self, task_name: str, duration: float) -> Optional[float]:
+        """
+        Record a task run duration
+
+        Args:
+            task_name: Celery task name
+            duration: Run time in seconds
+
+        Returns:
+            Updated average or None on error
+        """
+        try:
+            value = self._record_script(
+                keys=[f"{self.stats_prefix}{task_name}"],
+                args=[duration, settings.runtime_stats_alpha]
+            )
+            return float(value)
+        except Exception as e:
+            logger.error(
+                "Failed to record task runtime",
+                task_name=task_name,
+                error=str(e)
+            )
+            return None
+
+    def get_stats(self, task_name: str) -> Optional[Dict[str, Any]]:
+        """
+        Get runtime statistics for a task name
+
+        Returns:
+            Dict with average, last and count, or None if nothing recorded
+        """
+        try:
+            raw_stats = self.redis_client.hgetall(f"{self.stats_prefix}{task_name}")
+        except Exception as e:
+            logger.error(
+                "Failed to get task runtime stats",
+                task_name=task_name,
+                error=str(e)
+            )
+            return None
+
+        if not raw_stats:
+            return None
+
+        return {
+            'average': float(raw_stats['ewma']),
+            'last': float(raw_stats.get('last', raw_stats['ewma'])),
+            'count': int(raw_stats.get('count', 0))
+        }
+
+    def estimate_duration(self, task_name: str) -> int:
+        """
+        Expected run time of a task in seconds
+
+        Uses the rolling average once enough runs are recorded, otherwise
+        settings.default_task_duration
+        """
+        stats = self.get_stats(task_name)
+        if not stats or stats['count'] < settings.runtime_stats_min_samples:
+            return settings.default_task_duration
+        return max(int(round(stats['average'])), 1)
+
+
+# Global runtime stats instance
+runtime_stats = RuntimeStats()
@@ -9,6 +9,7 @@ from datetime import datetime
 import structlog
 
 from ..config.settings import settings
+from ..config.prometheus import instrument_redis
 from ..models.task import Task, TaskStatus
 
 logger = structlog.get_logger(__name__)
@@ -19,14 +20,17 @@ class TaskStorage:
     
     def __init__(self):
         """Initialize Redis connection"""
-        self.redis_client = redis.Redis.from_url(
+        self.redis_client = instrument_redis(redis.Redis.from_url(
             settings.redis_url,
             decode_responses=True
-        )
+        ), "task_storage")
         self.task_prefix = "task:"
         self.project_tasks_prefix = "project_tasks:"
         self.task_metrics_key = "task_metrics"
-    
+        self.run_state_prefix = "run_state:"
+        self.run_lock_prefix = "run_lock:"
+        self.run_step_prefix = "run_step:"
+
     def save_task(self, task: Task) -> bool:
         """
         Save task to Redis
@@ -55,6 +59,7 @@ class TaskStorage:
                 "updated_at": datetime.utcnow().isoformat(),
                 "estimated_duration": task.estimated_duration or 0,
                 "queue_position": task.queue_position or 0,
+                "estimated_start": task.estimated_start.isoformat() if task.estimated_start else "",
                 "result": json.dumps(task.result) if task.result else "",
                 "error": task.error or ""
             }
@@ -283,6 +288,101 @@ class TaskStorage:
             logger.error(f"Failed to get metrics: {e}")
             return {}
 
+    def save_run_state(self, run_id: str, state: Dict[str, Any], ttl: int = 86400) -> bool:
+        """
+        Checkpoint the state of a multi-step run
+
+        Args:
+            run_id: Run identifier (usually the parent task ID)
+            state: JSON-serializable run state
+            ttl: Expiration in seconds
+
+        Returns:
+            True if successful
+        """
+        try:
+            state_key = f"{self.run_state_prefix}{run_id}"
+            self.redis_client.set(state_key, json.dumps(state, default=str), ex=ttl)
+            return True
+        except Exception as e:
+            logger.error(
+                "Failed to save run state",
+                run_id=run_id,
+                error=str(e)
+            )
+            return False
+
+    def get_run_state(self, run_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Load the checkpointed state of a multi-step run
+
+        Args:
+            run_id: Run identifier
+
+        Returns:
+            Run state dict or None if not found
+        """
+        try:
+            state_key = f"{self.run_state_prefix}{run_id}"
+            raw_state = self.redis_client.get(state_key)
+            return json.loads(raw_state) if raw_state else None
+        except Exception as e:
+            logger.error(
+                "Failed to get run state",
+                run_id=run_id,
+                error=str(e)
+            )
+            return None
+
+    def run_lock(self, run_id: str, timeout: int):
+        """
+        Lock serializing the steps of a multi-step run
+
+        Args:
+            run_id: Run identifier
+            timeout: Seconds after which a lock left by a dead worker expires
+
+        Returns:
+            Redis lock (not yet acquired)
+        """
+        return self.redis_client.lock(f"{self.run_lock_prefix}{run_id}", timeout=timeout)
+
+    def mark_run_step(self, run_id: str, step: int, ttl: int = 86400) -> bool:
+        """
+        Record that a step of a multi-step run was enqueued
+
+        Args:
+            run_id: Run identifier
+            step: Step sequence number
+            ttl: Expiration in seconds
+
+        Returns:
+            True if the step was not marked before (or the mark could not be
+            read, so the step is enqueued rather than lost)
+        """
+        try:
+            return bool(self.redis_client.set(f"{self.run_step_prefix}{run_id}:{step}", 1, nx=True, ex=ttl))
+        except Exception as e:
+            logger.error(
+                "Failed to mark run step",
+                run_id=run_id,
+                step=step,
+                error=str(e)
+            )
+            return True
+
+    def unmark_run_step(self, run_id: str, step: int) -> None:
+        """Forget a step mark, e.g. when enqueuing the step failed"""
+        try:
+            self.redis_client.delete(f"{self.run_step_prefix}{run_id}:{step}")
+        except Exception as e:
+            logger.error(
+                "Failed to unmark run step",
+                run_id=run_id,
+                step=step,
+                error=str(e)
+            )
+
 
 # Global task storage instance
 task_storage = TaskStorage()
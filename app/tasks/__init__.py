@@ -6,7 +6,10 @@ from .video_tasks import process_video_generation
 from .image_tasks import process_image_generation
 from .audio_tasks import process_audio_generation
 from .evaluation_tasks import evaluate_department
-from .automated_gather_tasks import automated_gather_creation
+from .automated_gather_tasks import (
+    automated_gather_creation,
+    automated_gather_department_step
+)
 
 __all__ = [
     "BaseTaskWithBrain",
@@ -14,5 +17,6 @@ __all__ = [
     "process_image_generation",
     "process_audio_generation",
     "evaluate_department",
-    "automated_gather_creation"
+    "automated_gather_creation",
+    "automated_gather_department_step"
 ]
\ No newline at end of file
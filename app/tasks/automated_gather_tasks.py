@@ -1,21 +1,28 @@
 """
 Automated Gather Creation Task
 Dynamically processes all departments with gatherCheck=true
+
+Two execution modes are supported:
+- Monolithic (default): one task walks every department in a single worker slot
+- Orchestrated (task_data['orchestrated']=True): the parent task checkpoints the
+  run in Redis and enqueues one short `automated_gather_department_step` subtask
+  per department iteration, chained in cascade (codeDepNumber) order
 """
 import structlog
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime
 from celery.exceptions import SoftTimeLimitExceeded
+from redis.exceptions import LockError
 
 from ..celery_app import celery_app
 from ..agents.gather_content_generator import generate_content_batch
 from ..agents.duplicate_detector import deduplicate_items
-from ..agents.quality_analyzer import analyze_department_quality
+from ..agents.quality_analyzer import IncrementalQualityScorer
 from ..clients.mongodb_client import (
-    read_gather_items,
     save_to_gather_db,
     get_gather_collection
 )
+from ..clients.gather_cache import get_gather_cache, read_cached_gather_items
 from ..clients.brain_client import (
     get_brain_context,
     index_in_brain,
@@ -23,12 +30,22 @@ from ..clients.brain_client import (
 )
 from ..clients.payload_client import (
     query_departments_for_automation,
-    trigger_department_evaluation
+    EvaluationTriggerBatcher
 )
 from ..clients.websocket_client import send_websocket_event
+from ..storage import task_storage, GatherItemStore
 
 logger = structlog.get_logger(__name__)
 
+# Consecutive failed iterations before an orchestrated run gives up on a department
+MAX_STEP_ERRORS_PER_DEPARTMENT = 3
+
+# Number of most recent items (gather + brain context) shown to the generator
+GENERATOR_CONTEXT_WINDOW = 20
+
+# Seconds an orchestrated run's lock outlives a crashed step (above its time limit)
+STEP_LOCK_TIMEOUT = 150
+
 
 @celery_app.task(
     bind=True,
@@ -45,15 +62,17 @@ def automated_gather_creation(self, task_data: Dict[str, Any]) -> Dict[str, Any]
     """
     Main task for automated gather creation
     IMPORTANT: Handles dynamic departments (no hardcoded list)
-    
+
     Args:
         task_data: {
             'project_id': str,
             'user_id': str,
             'max_iterations': int (default 50),
-            'callback_url': str (optional)
+            'callback_url': str (optional),
+            'orchestrated': bool (default False, run as chained subtasks),
+            'resume_run_id': str (optional, resume an orchestrated run)
         }
-    
+
     Returns:
         {
             'status': 'completed',
@@ -62,29 +81,50 @@ def automated_gather_creation(self, task_data: Dict[str, Any]) -> Dict[str, Any]
             'items_created': int,
             'summary': List[Dict]
         }
+        or, in orchestrated mode:
+        {
+            'status': 'orchestrated',
+            'run_id': str,
+            'departments_count': int
+        }
     """
     project_id = task_data['project_id']
     user_id = task_data['user_id']
     max_iterations = task_data.get('max_iterations', 50)
     task_id = self.request.id
-    
+
     logger.info(
         "Starting automated gather creation",
         project_id=project_id,
         user_id=user_id,
         task_id=task_id,
-        max_iterations=max_iterations
+        max_iterations=max_iterations,
+        orchestrated=task_data.get('orchestrated', False)
     )
-    
+
+    if task_data.get('resume_run_id'):
+        return _resume_orchestrated_run(task_data['resume_run_id'])
+
+    if task_data.get('orchestrated', False):
+        return _start_orchestrated_run(task_id, project_id, user_id, max_iterations)
+
+    # Evaluation triggers of departments finishing close together go out as one batch
+    evaluation_batcher = EvaluationTriggerBatcher(project_id)
+
     try:
-        # 1. Read existing gather items from MongoDB
-        gather_items = read_gather_items(project_id)
+        # 1. Read existing gather items (cached per project, only deltas are
+        #    fetched from MongoDB after the first load), indexed by department
+        gather_items = GatherItemStore(read_cached_gather_items(project_id))
         logger.info(
             "Loaded existing gather items",
             project_id=project_id,
             count=len(gather_items)
         )
-        
+
+        # Index existing items per department for incremental quality scoring
+        quality_scorer = IncrementalQualityScorer()
+        quality_scorer.index_items(gather_items)
+
         # 2. Get Brain context (semantic search)
         brain_context = get_brain_context(project_id)
         logger.info(
@@ -92,7 +132,7 @@ def automated_gather_creation(self, task_data: Dict[str, Any]) -> Dict[str, Any]
             project_id=project_id,
             context_items=len(brain_context)
         )
-        
+
         # 3. DYNAMIC: Query departments with gatherCheck=true, sorted by codeDepNumber
         departments = query_departments_for_automation(project_id)
         logger.info(
@@ -100,20 +140,14 @@ def automated_gather_creation(self, task_data: Dict[str, Any]) -> Dict[str, Any]
             project_id=project_id,
             department_count=len(departments)
         )
-        
+
         if not departments:
             logger.warning(
                 "No departments with gatherCheck=true found",
                 project_id=project_id
             )
-            return {
-                'status': 'completed',
-                'iterations': 0,
-                'departments_processed': 0,
-                'items_created': 0,
-                'message': 'No departments configured for automation'
-            }
-        
+            return _no_departments_result()
+
         # Send initial event
         send_websocket_event(project_id, {
             'type': 'automation_started',
@@ -121,11 +155,11 @@ def automated_gather_creation(self, task_data: Dict[str, Any]) -> Dict[str, Any]
             'departments_count': len(departments),
             'max_iterations': max_iterations
         })
-        
+
         total_iterations = 0
         processed_departments = []
         total_items_created = 0
-        
+
         # Process each department sequentially
         for dept_index, dept in enumerate(departments):
             # Skip if gatherCheck is false (defensive check)
@@ -135,161 +169,57 @@ def automated_gather_creation(self, task_data: Dict[str, Any]) -> Dict[str, Any]
                     department=dept.get('slug')
                 )
                 continue
-            
-            dept_slug = dept['slug']
-            dept_name = dept.get('name', dept_slug)
-            dept_number = dept.get('codeDepNumber', dept_index + 1)
-            
+
+            dept_config = _department_config(dept, dept_index)
+            dept_slug = dept_config['slug']
+
             logger.info(
                 "Processing department",
                 department=dept_slug,
-                department_name=dept_name,
-                department_number=dept_number
+                department_name=dept_config['name'],
+                department_number=dept_config['number']
             )
-            
+
             dept_iterations = 0
             quality_score = 0
             dept_items_created = 0
-            
-            # Use department-specific threshold (default 80)
-            threshold = dept.get('coordinationSettings', {}).get('minQualityThreshold', 80)
-            
-            # Use department-specific model
-            model = dept.get('defaultModel', 'anthropic/claude-sonnet-4.5')
-            
+
             # Send department started event
-            send_websocket_event(project_id, {
-                'type': 'department_started',
-                'department': dept_slug,
-                'department_name': dept_name,
-                'department_number': dept_number,
-                'threshold': threshold,
-                'model': model,
-                'total_iterations': total_iterations
-            })
-            
+            _send_department_started(project_id, dept_config, total_iterations)
+
             # Iteration loop for this department
-            while quality_score < threshold and total_iterations < max_iterations:
+            while quality_score < dept_config['threshold'] and total_iterations < max_iterations:
                 try:
-                    # Check for soft timeout
-                    iteration_start = datetime.utcnow()
-                    
-                    logger.info(
-                        "Starting iteration",
-                        department=dept_slug,
-                        iteration=dept_iterations + 1,
-                        total_iterations=total_iterations + 1,
-                        quality_score=quality_score,
-                        threshold=threshold
-                    )
-                    
-                    # Get context from ALL previously processed departments (cascading)
-                    previous_dept_context = processed_departments.copy()
-                    
-                    # Get department-specific context from Brain
-                    dept_brain_context = get_department_context(project_id, dept_slug)
-                    
-                    # Generate content batch using @codebuff/sdk
-                    new_items = generate_content_batch(
+                    outcome = _run_department_iteration(
                         project_id=project_id,
-                        department=dept,
-                        existing_context=gather_items + brain_context + dept_brain_context,
-                        previous_departments=previous_dept_context,
-                        model=model
-                    )
-                    
-                    logger.info(
-                        "Generated content batch",
-                        department=dept_slug,
-                        new_items_count=len(new_items)
-                    )
-                    
-                    if not new_items:
-                        logger.warning(
-                            "No new items generated",
-                            department=dept_slug,
-                            iteration=dept_iterations + 1
-                        )
-                        break
-                    
-                    # Deduplicate (LLM-based, 90% similarity, keep newer)
-                    send_websocket_event(project_id, {
-                        'type': 'deduplicating',
-                        'department': dept_slug,
-                        'department_name': dept_name,
-                        'items_to_check': len(new_items)
-                    })
-                    
-                    deduplicated = deduplicate_items(new_items, gather_items, dept_slug)
-                    
-                    logger.info(
-                        "Deduplicated items",
-                        department=dept_slug,
-                        original_count=len(new_items),
-                        deduplicated_count=len(deduplicated),
-                        duplicates_removed=len(new_items) - len(deduplicated)
-                    )
-                    
-                    if not deduplicated:
-                        logger.info(
-                            "All items were duplicates, stopping iteration",
-                            department=dept_slug
-                        )
-                        break
-                    
-                    # Save to MongoDB
-                    saved_items = save_to_gather_db(
-                        project_id=project_id,
-                        items=deduplicated,
                         user_id=user_id,
-                        automation_metadata={
-                            'taskId': task_id,
-                            'department': dept_slug,
-                            'departmentName': dept_name,
-                            'departmentNumber': dept_number,
-                            'iteration': dept_iterations + 1,
-                            'qualityScore': quality_score,
-                            'model': model
-                        }
+                        task_id=task_id,
+                        dept=dept,
+                        dept_config=dept_config,
+                        gather_items=gather_items,
+                        brain_context=brain_context,
+                        quality_scorer=quality_scorer,
+                        previous_departments=processed_departments.copy(),
+                        dept_iterations=dept_iterations,
+                        total_iterations=total_iterations,
+                        quality_score=quality_score
                     )
-                    
-                    # Index in Brain (Neo4j with projectId isolation)
-                    index_in_brain(project_id, saved_items, dept)
-                    
-                    # Update gather items list
-                    gather_items.extend(saved_items)
+
+                    if outcome is None:
+                        break
+
+                    saved_items, quality_score = outcome
                     dept_items_created += len(saved_items)
                     total_items_created += len(saved_items)
-                    
-                    # Check quality (department-specific scoring)
-                    quality_score = analyze_department_quality(
-                        project_id, dept, gather_items
-                    )
-                    
                     total_iterations += 1
                     dept_iterations += 1
-                    
-                    # Send iteration complete event
-                    send_websocket_event(project_id, {
-                        'type': 'iteration_complete',
-                        'department': dept_slug,
-                        'department_name': dept_name,
-                        'iteration': dept_iterations,
-                        'total_iterations': total_iterations,
-                        'quality_score': quality_score,
-                        'items_created': len(saved_items),
-                        'threshold': threshold,
-                        'max_iterations': max_iterations
-                    })
-                    
-                    logger.info(
-                        "Iteration complete",
-                        department=dept_slug,
-                        iteration=dept_iterations,
-                        quality_score=quality_score,
-                        items_created=len(saved_items)
+
+                    _send_iteration_complete(
+                        project_id, dept_config, dept_iterations, total_iterations,
+                        quality_score, len(saved_items), max_iterations
                     )
-                    
+                    evaluation_batcher.flush_if_due()
+
                 except SoftTimeLimitExceeded:
                     logger.warning(
                         "Soft time limit exceeded, stopping gracefully",
@@ -307,75 +237,19 @@ def automated_gather_creation(self, task_data: Dict[str, Any]) -> Dict[str, Any]
                     )
                     # Continue to next iteration
                     continue
-            
-            # Department complete - trigger evaluation
-            try:
-                trigger_department_evaluation(project_id, dept_number)
-            except Exception as e:
-                logger.error(
-                    "Failed to trigger department evaluation",
-                    department=dept_slug,
-                    error=str(e)
-                )
-            
-            # Store department results for next department's context
-            processed_departments.append({
-                'department': dept_slug,
-                'name': dept_name,
-                'number': dept_number,
-                'quality_score': quality_score,
-                'iterations': dept_iterations,
-                'items_created': dept_items_created,
-                'threshold': threshold,
-                'model': model
-            })
-            
-            # Send department complete event
-            send_websocket_event(project_id, {
-                'type': 'department_complete',
-                'department': dept_slug,
-                'department_name': dept_name,
-                'quality_score': quality_score,
-                'iterations_used': dept_iterations,
-                'items_created': dept_items_created,
-                'threshold': threshold
-            })
-            
-            logger.info(
-                "Department processing complete",
-                department=dept_slug,
-                quality_score=quality_score,
-                iterations=dept_iterations,
-                items_created=dept_items_created
-            )
-        
-        # Final completion event
-        send_websocket_event(project_id, {
-            'type': 'automation_complete',
-            'task_id': task_id,
-            'total_iterations': total_iterations,
-            'departments_processed': len(processed_departments),
-            'items_created': total_items_created,
-            'summary': processed_departments
-        })
-        
-        logger.info(
-            "Automated gather creation complete",
-            project_id=project_id,
-            task_id=task_id,
-            total_iterations=total_iterations,
-            departments_processed=len(processed_departments),
-            items_created=total_items_created
+
+            # Department complete - queue evaluation and store results for
+            # the next department's context
+            processed_departments.append(_finish_department(
+                project_id, dept_config, quality_score, dept_iterations,
+                dept_items_created, evaluation_batcher
+            ))
+
+        evaluation_batcher.flush(wait=True)
+        return _complete_automation(
+            project_id, task_id, total_iterations, total_items_created, processed_departments
         )
-        
-        return {
-            'status': 'completed',
-            'iterations': total_iterations,
-            'departments_processed': len(processed_departments),
-            'items_created': total_items_created,
-            'summary': processed_departments
-        }
-        
+
     except SoftTimeLimitExceeded:
         logger.warning(
             "Task soft time limit exceeded",
@@ -387,8 +261,9 @@ def automated_gather_creation(self, task_data: Dict[str, Any]) -> Dict[str, Any]
             'task_id': task_id,
             'message': 'Task exceeded time limit, partial results saved'
         })
+        evaluation_batcher.flush()
         raise
-        
+
     except Exception as e:
         logger.error(
             "Automated gather creation failed",
@@ -402,5 +277,649 @@ def automated_gather_creation(self, task_data: Dict[str, Any]) -> Dict[str, Any]
             'task_id': task_id,
             'error': str(e)
         })
+        evaluation_batcher.flush()
         raise
 
+
+@celery_app.task(
+    bind=True,
+    name='automated_gather_department_step',
+    soft_time_limit=110,  # Short per-iteration budget
+    time_limit=120,
+    max_retries=3,
+    autoretry_for=(ConnectionError, TimeoutError),
+    retry_backoff=True,
+    retry_backoff_max=60,
+    retry_jitter=True
+)
+def automated_gather_department_step(self, run_id: str, step: int) -> Dict[str, Any]:
+    """
+    Advance an orchestrated gather run by one unit of work
+
+    Each step either runs one iteration for the current department or closes
+    the department (evaluation trigger + completion event), then checkpoints
+    the run state and enqueues the next step. Because the next step is only
+    enqueued after the current one is checkpointed, departments are processed
+    strictly in cascade order while any idle cpu_intensive worker can pick up
+    the next step.
+
+    The broker may deliver a step more than once, so a step only runs while
+    holding the run's lock and when the checkpoint is still at that step, and
+    each step is enqueued at most once. A step that is redelivered after a
+    worker crash resumes from the last checkpoint; if the crash came after its
+    checkpoint, the next step is enqueued unless that already happened. Other
+    duplicate deliveries are ignored.
+
+    Args:
+        run_id: Orchestrated run identifier (the parent task ID)
+        step: Sequence number of this step within the run
+
+    Returns:
+        Step status, or the final run summary for the last step
+    """
+    lock = task_storage.run_lock(run_id, timeout=STEP_LOCK_TIMEOUT)
+    if not lock.acquire(blocking=False):
+        # Another delivery is stepping the run (or died holding the lock);
+        # check the checkpoint again once that step is over
+        logger.info("Orchestrated run busy, retrying step later", run_id=run_id, step=step)
+        raise self.retry(countdown=STEP_LOCK_TIMEOUT)
+
+    try:
+        return _run_step(run_id, step)
+    finally:
+        try:
+            lock.release()
+        except LockError:
+            # Expired; the hard time limit keeps steps shorter than the lock
+            logger.warning("Orchestrated run lock expired during step", run_id=run_id, step=step)
+
+
+def _run_step(run_id: str, step: int) -> Dict[str, Any]:
+    """
+    Apply one step of an orchestrated run while holding the run's lock
+    """
+    state = task_storage.get_run_state(run_id)
+
+    if state is None:
+        logger.warning("Orchestrated run state not found", run_id=run_id, step=step)
+        return {'status': 'missing_state', 'run_id': run_id}
+
+    if state['status'] == 'running' and state['step'] == step + 1:
+        # Checkpointed, but the worker may have died before enqueuing the next step
+        if _enqueue_step(run_id, step + 1):
+            logger.info("Re-enqueued step after redelivery", run_id=run_id, step=step + 1)
+            return {'status': 'resumed', 'run_id': run_id, 'step': step}
+        return {'status': 'skipped', 'run_id': run_id, 'step': step}
+
+    if state['status'] != 'running' or state['step'] != step:
+        logger.info(
+            "Skipping stale orchestrated step",
+            run_id=run_id,
+            step=step,
+            current_step=state['step'],
+            run_status=state['status']
+        )
+        return {'status': 'skipped', 'run_id': run_id, 'step': step}
+
+    project_id = state['project_id']
+    departments = state['departments']
+    dept_index = state['dept_index']
+    evaluation_batcher = EvaluationTriggerBatcher.from_dict(
+        state.get('pending_evaluations') or {'project_id': project_id}
+    )
+
+    if dept_index >= len(departments):
+        evaluation_batcher.flush(wait=True)
+        state['pending_evaluations'] = evaluation_batcher.to_dict()
+        state['status'] = 'completed'
+        _checkpoint_run(run_id, state)
+        return _complete_automation(
+            project_id, run_id, state['total_iterations'],
+            state['total_items_created'], state['processed_departments']
+        )
+
+    dept = departments[dept_index]
+
+    if not dept.get('gatherCheck', False):
+        logger.warning(
+            "Skipping department without gatherCheck",
+            department=dept.get('slug')
+        )
+        _advance_department(state)
+    else:
+        dept_config = _department_config(dept, dept_index)
+
+        if not state['dept_started']:
+            _send_department_started(project_id, dept_config, state['total_iterations'])
+            state['dept_started'] = True
+
+        dept_done = (
+            state['dept_stopped']
+            or state['quality_score'] >= dept_config['threshold']
+            or state['total_iterations'] >= state['max_iterations']
+        )
+
+        if dept_done:
+            state['processed_departments'].append(_finish_department(
+                project_id, dept_config, state['quality_score'],
+                state['dept_iterations'], state['dept_items_created'],
+                evaluation_batcher
+            ))
+            _advance_department(state)
+        else:
+            _run_orchestrated_iteration(run_id, state, dept, dept_config)
+
+    evaluation_batcher.flush_if_due()
+    state['pending_evaluations'] = evaluation_batcher.to_dict()
+    state['step'] = step + 1
+    _checkpoint_run(run_id, state)
+    _enqueue_step(run_id, step + 1)
+
+    return {'status': 'advanced', 'run_id': run_id, 'step': step}
+
+
+def _start_orchestrated_run(
+    task_id: str,
+    project_id: str,
+    user_id: str,
+    max_iterations: int
+) -> Dict[str, Any]:
+    """
+    Checkpoint a new orchestrated run and enqueue its first step
+    """
+    departments = query_departments_for_automation(project_id)
+    logger.info(
+        "Loaded departments for orchestrated automation",
+        project_id=project_id,
+        department_count=len(departments)
+    )
+
+    if not departments:
+        logger.warning(
+            "No departments with gatherCheck=true found",
+            project_id=project_id
+        )
+        return _no_departments_result()
+
+    state = {
+        'run_id': task_id,
+        'project_id': project_id,
+        'user_id': user_id,
+        'max_iterations': max_iterations,
+        'departments': departments,
+        'status': 'running',
+        'step': 0,
+        'dept_index': 0,
+        'total_iterations': 0,
+        'total_items_created': 0,
+        'processed_departments': [],
+        'started_at': datetime.utcnow().isoformat()
+    }
+    _reset_department_state(state)
+    _checkpoint_run(task_id, state)
+
+    send_websocket_event(project_id, {
+        'type': 'automation_started',
+        'task_id': task_id,
+        'departments_count': len(departments),
+        'max_iterations': max_iterations,
+        'orchestrated': True
+    })
+
+    _enqueue_step(task_id, 0)
+
+    logger.info(
+        "Orchestrated gather run started",
+        project_id=project_id,
+        run_id=task_id,
+        department_count=len(departments)
+    )
+
+    return {
+        'status': 'orchestrated',
+        'run_id': task_id,
+        'departments_count': len(departments)
+    }
+
+
+def _resume_orchestrated_run(run_id: str) -> Dict[str, Any]:
+    """
+    Re-enqueue the pending step of an interrupted orchestrated run
+    """
+    state = task_storage.get_run_state(run_id)
+
+    if state is None:
+        logger.warning("Cannot resume orchestrated run, state not found", run_id=run_id)
+        return {'status': 'missing_state', 'run_id': run_id}
+
+    if state['status'] == 'running':
+        # The pending step's message was lost, so enqueue it even if it was marked
+        _enqueue_step(run_id, state['step'], force=True)
+        logger.info("Resumed orchestrated gather run", run_id=run_id, step=state['step'])
+
+    return {
+        'status': 'orchestrated' if state['status'] == 'running' else state['status'],
+        'run_id': run_id,
+        'departments_count': len(state['departments']),
+        'resumed': state['status'] == 'running'
+    }
+
+
+def _run_orchestrated_iteration(
+    run_id: str,
+    state: Dict[str, Any],
+    dept: Dict[str, Any],
+    dept_config: Dict[str, Any]
+) -> None:
+    """
+    Run one department iteration for an orchestrated run, updating state in place
+    """
+    project_id = state['project_id']
+    gather_items = GatherItemStore(read_cached_gather_items(project_id))
+
+    quality_scorer = IncrementalQualityScorer.from_dict(state.get('quality_scorer'))
+    if not quality_scorer.indexed:
+        quality_scorer.index_items(gather_items)
+
+    try:
+        outcome = _run_department_iteration(
+            project_id=project_id,
+            user_id=state['user_id'],
+            task_id=run_id,
+            dept=dept,
+            dept_config=dept_config,
+            gather_items=gather_items,
+            brain_context=get_brain_context(project_id),
+            quality_scorer=quality_scorer,
+            previous_departments=list(state['processed_departments']),
+            dept_iterations=state['dept_iterations'],
+            total_iterations=state['total_iterations'],
+            quality_score=state['quality_score']
+        )
+    except SoftTimeLimitExceeded:
+        logger.warning(
+            "Step soft time limit exceeded, closing department",
+            run_id=run_id,
+            department=dept_config['slug']
+        )
+        state['dept_stopped'] = True
+        return
+    except Exception as e:
+        state['dept_errors'] += 1
+        logger.error(
+            "Error in orchestrated iteration",
+            run_id=run_id,
+            department=dept_config['slug'],
+            iteration=state['dept_iterations'] + 1,
+            consecutive_errors=state['dept_errors'],
+            error=str(e),
+            exc_info=True
+        )
+        if state['dept_errors'] >= MAX_STEP_ERRORS_PER_DEPARTMENT:
+            state['dept_stopped'] = True
+        return
+
+    if outcome is None:
+        state['dept_stopped'] = True
+        return
+
+    saved_items, quality_score = outcome
+    state['quality_score'] = quality_score
+    state['quality_scorer'] = quality_scorer.to_dict()
+    state['dept_errors'] = 0
+    state['dept_items_created'] += len(saved_items)
+    state['total_items_created'] += len(saved_items)
+    state['total_iterations'] += 1
+    state['dept_iterations'] += 1
+
+    _send_iteration_complete(
+        project_id, dept_config, state['dept_iterations'], state['total_iterations'],
+        quality_score, len(saved_items), state['max_iterations']
+    )
+
+
+def _run_department_iteration(
+    project_id: str,
+    user_id: str,
+    task_id: str,
+    dept: Dict[str, Any],
+    dept_config: Dict[str, Any],
+    gather_items: GatherItemStore,
+    brain_context: List[Dict[str, Any]],
+    quality_scorer: IncrementalQualityScorer,
+    previous_departments: List[Dict[str, Any]],
+    dept_iterations: int,
+    total_iterations: int,
+    quality_score: float
+) -> Optional[Tuple[List[Dict[str, Any]], float]]:
+    """
+    Run a single generate -> deduplicate -> save -> score iteration
+
+    Saved items are appended to gather_items in place and added to the
+    incremental quality scorer, which only scores the new items.
+
+    Returns:
+        (saved_items, new_quality_score), or None if the department should stop
+        because nothing new was generated
+    """
+    dept_slug = dept_config['slug']
+    dept_name = dept_config['name']
+    model = dept_config['model']
+
+    logger.info(
+        "Starting iteration",
+        department=dept_slug,
+        iteration=dept_iterations + 1,
+        total_iterations=total_iterations + 1,
+        quality_score=quality_score,
+        threshold=dept_config['threshold']
+    )
+
+    # Get department-specific context from Brain
+    dept_brain_context = get_department_context(project_id, dept_slug)
+
+    # Generate content batch using @codebuff/sdk
+    new_items = generate_content_batch(
+        project_id=project_id,
+        department=dept,
+        existing_context=gather_items.context_window(
+            GENERATOR_CONTEXT_WINDOW, brain_context, dept_brain_context
+        ),
+        previous_departments=previous_departments,
+        model=model
+    )
+
+    logger.info(
+        "Generated content batch",
+        department=dept_slug,
+        new_items_count=len(new_items)
+    )
+
+    if not new_items:
+        logger.warning(
+            "No new items generated",
+            department=dept_slug,
+            iteration=dept_iterations + 1
+        )
+        return None
+
+    # Deduplicate (LLM-based, 90% similarity, keep newer)
+    send_websocket_event(project_id, {
+        'type': 'deduplicating',
+        'department': dept_slug,
+        'department_name': dept_name,
+        'items_to_check': len(new_items)
+    })
+
+    deduplicated = deduplicate_items(new_items, gather_items, dept_slug)
+
+    logger.info(
+        "Deduplicated items",
+        department=dept_slug,
+        original_count=len(new_items),
+        deduplicated_count=len(deduplicated),
+        duplicates_removed=len(new_items) - len(deduplicated)
+    )
+
+    if not deduplicated:
+        logger.info(
+            "All items were duplicates, stopping iteration",
+            department=dept_slug
+        )
+        return None
+
+    # Save to MongoDB
+    saved_items = save_to_gather_db(
+        project_id=project_id,
+        items=deduplicated,
+        user_id=user_id,
+        automation_metadata={
+            'taskId': task_id,
+            'department': dept_slug,
+            'departmentName': dept_name,
+            'departmentNumber': dept_config['number'],
+            'iteration': dept_iterations + 1,
+            'qualityScore': quality_score,
+            'model': model
+        }
+    )
+
+    # Make the new items visible to later cached reads right away
+    get_gather_cache(project_id).add_items(saved_items)
+
+    # Index in Brain (Neo4j with projectId isolation)
+    index_in_brain(project_id, saved_items, dept)
+
+    # Update gather items list
+    gather_items.extend(saved_items)
+
+    # Check quality (department-specific, incremental scoring)
+    quality_scorer.add_items(dept_slug, saved_items)
+    new_quality_score = quality_scorer.score(project_id, dept)
+
+    return saved_items, new_quality_score
+
+
+def _department_config(dept: Dict[str, Any], dept_index: int) -> Dict[str, Any]:
+    """
+    Resolve the per-department settings used by the iteration loop
+    """
+    dept_slug = dept['slug']
+    return {
+        'slug': dept_slug,
+        'name': dept.get('name', dept_slug),
+        'number': dept.get('codeDepNumber', dept_index + 1),
+        # Use department-specific threshold (default 80)
+        'threshold': dept.get('coordinationSettings', {}).get('minQualityThreshold', 80),
+        # Use department-specific model
+        'model': dept.get('defaultModel', 'anthropic/claude-sonnet-4.5')
+    }
+
+
+def _send_department_started(
+    project_id: str,
+    dept_config: Dict[str, Any],
+    total_iterations: int
+) -> None:
+    """
+    Send department started event
+    """
+    send_websocket_event(project_id, {
+        'type': 'department_started',
+        'department': dept_config['slug'],
+        'department_name': dept_config['name'],
+        'department_number': dept_config['number'],
+        'threshold': dept_config['threshold'],
+        'model': dept_config['model'],
+        'total_iterations': total_iterations
+    })
+
+
+def _send_iteration_complete(
+    project_id: str,
+    dept_config: Dict[str, Any],
+    dept_iterations: int,
+    total_iterations: int,
+    quality_score: float,
+    items_created: int,
+    max_iterations: int
+) -> None:
+    """
+    Send iteration complete event
+    """
+    send_websocket_event(project_id, {
+        'type': 'iteration_complete',
+        'department': dept_config['slug'],
+        'department_name': dept_config['name'],
+        'iteration': dept_iterations,
+        'total_iterations': total_iterations,
+        'quality_score': quality_score,
+        'items_created': items_created,
+        'threshold': dept_config['threshold'],
+        'max_iterations': max_iterations
+    })
+
+    logger.info(
+        "Iteration complete",
+        department=dept_config['slug'],
+        iteration=dept_iterations,
+        quality_score=quality_score,
+        items_created=items_created
+    )
+
+
+def _finish_department(
+    project_id: str,
+    dept_config: Dict[str, Any],
+    quality_score: float,
+    dept_iterations: int,
+    dept_items_created: int,
+    evaluation_batcher: EvaluationTriggerBatcher
+) -> Dict[str, Any]:
+    """
+    Queue department evaluation and send the completion event
+
+    Returns:
+        Department summary used as cascading context for later departments
+    """
+    dept_slug = dept_config['slug']
+
+    evaluation_batcher.add(dept_config['number'])
+    try:
+        evaluation_batcher.flush_if_due()
+    except Exception as e:
+        logger.error(
+            "Failed to trigger department evaluation",
+            department=dept_slug,
+            error=str(e)
+        )
+
+    # Send department complete event
+    send_websocket_event(project_id, {
+        'type': 'department_complete',
+        'department': dept_slug,
+        'department_name': dept_config['name'],
+        'quality_score': quality_score,
+        'iterations_used': dept_iterations,
+        'items_created': dept_items_created,
+        'threshold': dept_config['threshold']
+    })
+
+    logger.info(
+        "Department processing complete",
+        department=dept_slug,
+        quality_score=quality_score,
+        iterations=dept_iterations,
+        items_created=dept_items_created
+    )
+
+    return {
+        'department': dept_slug,
+        'name': dept_config['name'],
+        'number': dept_config['number'],
+        'quality_score': quality_score,
+        'iterations': dept_iterations,
+        'items_created': dept_items_created,
+        'threshold': dept_config['threshold'],
+        'model': dept_config['model']
+    }
+
+
+def _complete_automation(
+    project_id: str,
+    task_id: str,
+    total_iterations: int,
+    total_items_created: int,
+    processed_departments: List[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """
+    Send the final completion event and build the run result
+    """
+    send_websocket_event(project_id, {
+        'type': 'automation_complete',
+        'task_id': task_id,
+        'total_iterations': total_iterations,
+        'departments_processed': len(processed_departments),
+        'items_created': total_items_created,
+        'summary': processed_departments
+    })
+
+    logger.info(
+        "Automated gather creation complete",
+        project_id=project_id,
+        task_id=task_id,
+        total_iterations=total_iterations,
+        departments_processed=len(processed_departments),
+        items_created=total_items_created
+    )
+
+    return {
+        'status': 'completed',
+        'iterations': total_iterations,
+        'departments_processed': len(processed_departments),
+        'items_created': total_items_created,
+        'summary': processed_departments
+    }
+
+
+def _no_departments_result() -> Dict[str, Any]:
+    """
+    Result returned when no department is configured for automation
+    """
+    return {
+        'status': 'completed',
+        'iterations': 0,
+        'departments_processed': 0,
+        'items_created': 0,
+        'message': 'No departments configured for automation'
+    }
+
+
+def _advance_department(state: Dict[str, Any]) -> None:
+    """
+    Move an orchestrated run on to the next department
+    """
+    state['dept_index'] += 1
+    _reset_department_state(state)
+
+
+def _reset_department_state(state: Dict[str, Any]) -> None:
+    """
+    Reset the per-department counters of an orchestrated run
+    """
+    state['dept_started'] = False
+    state['dept_stopped'] = False
+    state['dept_iterations'] = 0
+    state['dept_items_created'] = 0
+    state['dept_errors'] = 0
+    state['quality_score'] = 0
+
+
+def _enqueue_step(run_id: str, step: int, force: bool = False) -> bool:
+    """
+    Enqueue a step of an orchestrated run unless it was enqueued before
+
+    The broker does not deduplicate task IDs, so a mark per step keeps a
+    redelivered step from enqueuing its successor again.
+
+    Returns:
+        True if the step was enqueued
+    """
+    if not task_storage.mark_run_step(run_id, step) and not force:
+        logger.info("Orchestrated step already enqueued", run_id=run_id, step=step)
+        return False
+
+    try:
+        automated_gather_department_step.apply_async(args=[run_id, step], task_id=f"{run_id}:step:{step}")
+    except BaseException:
+        task_storage.unmark_run_step(run_id, step)
+        raise
+    return True
+
+
+def _checkpoint_run(run_id: str, state: Dict[str, Any]) -> None:
+    """
+    Persist orchestrated run state, raising so the step is retried on failure
+    """
+    if not task_storage.save_run_state(run_id, state):
+        raise ConnectionError(f"Failed to checkpoint orchestrated run {run_id}")
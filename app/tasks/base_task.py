@@ -18,6 +18,8 @@ from ..utils.webhook import (
     build_failure_webhook_payload
 )
 from ..storage import task_storage
+from ..gpu.admission import gpu_admission
+from ..gpu.placement import gpu_placement
 
 logger = structlog.get_logger(__name__)
 
@@ -281,6 +283,14 @@ class BaseTaskWithBrain(Task, ABC):
             logger.error("Failed to store task success in brain service",
                         task_id=task_id, error=str(e))
 
+    def before_start(self, task_id, args, kwargs):
+        """
+        Called before the task body runs
+        GPU tasks wait here until their device has memory budget
+        """
+        if gpu_admission.admit(self, task_id, kwargs) is not None:
+            gpu_placement.task_started(task_id, (self.request.delivery_info or {}).get('routing_key'))
+
     @abstractmethod
     def execute_task(self, *args, **kwargs) -> Dict[str, Any]:
         """
@@ -4,12 +4,17 @@ Evaluates movie production departments using AI-powered analysis
 """
 import json
 import structlog
-from typing import Dict, Any, List, Optional
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime
 
 from .base_task import BaseTaskWithBrain
 from ..celery_app import celery_app
 from ..config.settings import settings
+from ..storage import task_storage, evaluation_cache, evaluation_cache_key, payload_store
+from ..utils.prompt_budget import build_budgeted_content
+from ..config.prometheus import track_call, record_cache
 
 logger = structlog.get_logger(__name__)
 
@@ -42,8 +47,8 @@ class EvaluateDepartmentTask(BaseTaskWithBrain):
             project_id: Project identifier
             department_slug: Department name (e.g., "story", "character")
             department_number: Sequential department number (1-12)
-            gather_data: Array of gathered content items
-            previous_evaluations: Array of previous department evaluations
+            gather_data: Array of gathered content items (or a payload reference)
+            previous_evaluations: Array of previous department evaluations (or a payload reference)
             threshold: Minimum passing score (0-100)
             
         Returns:
@@ -51,6 +56,10 @@ class EvaluateDepartmentTask(BaseTaskWithBrain):
         """
         start_time = datetime.utcnow()
         
+        # Large payloads arrive as claim-check references; load them here
+        gather_data = payload_store.resolve(gather_data)
+        previous_evaluations = payload_store.resolve(previous_evaluations)
+        
         if previous_evaluations is None:
             previous_evaluations = []
         
@@ -68,32 +77,50 @@ class EvaluateDepartmentTask(BaseTaskWithBrain):
             logger.warning("No gather data provided", department=department_slug)
             return self._create_insufficient_data_result(department_slug, threshold)
         
-        # 1. Query brain service for relevant context
-        brain_context = self.run_async_in_sync(
-            self._get_department_context(project_id, department_slug)
-        )
-        
-        # 2. Prepare evaluation prompt
-        evaluation_prompt = self._build_evaluation_prompt(
+        # 1. Identical inputs (same items, previous ratings, threshold and model)
+        #    return the memoized evaluation without calling the evaluator
+        cache_key = evaluation_cache_key(
             department_slug=department_slug,
-            department_number=department_number,
             gather_data=gather_data,
             previous_evaluations=previous_evaluations,
             threshold=threshold,
-            brain_context=brain_context
-        )
-        
-        # 3. Call AI service for evaluation
-        evaluation_result = self._call_ai_evaluator(
-            prompt=evaluation_prompt,
-            department=department_slug,
-            threshold=threshold
+            model=settings.evaluation_model,
+            token_budget=settings.evaluation_prompt_token_budget
         )
+        cached = evaluation_cache.get(cache_key) if settings.evaluation_cache_enabled else None
+
+        if cached:
+            evaluation_result = cached["evaluation"]
+            prompt_stats = cached["prompt_stats"]
+            task_storage.increment_metric("evaluation_cache_hits")
+            record_cache("evaluation", hit=True)
+            logger.info(
+                "Using cached department evaluation",
+                project_id=project_id,
+                department=department_slug,
+                cache_key=cache_key
+            )
+        else:
+            evaluation_result, prompt_stats = self._evaluate(
+                project_id=project_id,
+                department_slug=department_slug,
+                department_number=department_number,
+                gather_data=gather_data,
+                previous_evaluations=previous_evaluations,
+                threshold=threshold
+            )
+            if settings.evaluation_cache_enabled and evaluation_result.get("model") != "fallback":
+                evaluation_cache.set(cache_key, {
+                    "evaluation": evaluation_result,
+                    "prompt_stats": prompt_stats
+                })
+            task_storage.increment_metric("evaluation_cache_misses")
+            record_cache("evaluation", hit=False)
         
-        # 4. Calculate processing time
+        # 2. Calculate processing time
         processing_time = (datetime.utcnow() - start_time).total_seconds()
         
-        # 5. Build result
+        # 3. Build result
         result = {
             "department": department_slug,
             "rating": evaluation_result["rating"],
@@ -106,7 +133,13 @@ class EvaluateDepartmentTask(BaseTaskWithBrain):
             "metadata": {
                 "model": evaluation_result.get("model", "gpt-4"),
                 "tokens_used": evaluation_result.get("tokens_used", 0),
-                "confidence_score": evaluation_result.get("confidence", 0.0)
+                "confidence_score": evaluation_result.get("confidence", 0.0),
+                "prompt_tokens": prompt_stats["prompt_tokens"],
+                "prompt_tokens_saved": prompt_stats["tokens_saved"],
+                "items_included": prompt_stats["items_included"],
+                "items_summarized": prompt_stats["items_summarized"],
+                "cache_hit": bool(cached),
+                "chunks": prompt_stats.get("chunks", 1)
             }
         }
         
@@ -121,6 +154,170 @@ class EvaluateDepartmentTask(BaseTaskWithBrain):
         
         return result
     
+    def _evaluate(
+        self,
+        project_id: str,
+        department_slug: str,
+        department_number: int,
+        gather_data: List[Dict[str, Any]],
+        previous_evaluations: List[Dict[str, Any]],
+        threshold: int
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        Build the prompt and call the evaluator
+
+        Returns:
+            Tuple of (evaluator result, prompt budgeting stats)
+        """
+        # 1. Query brain service for relevant context
+        brain_context = self.run_async_in_sync(
+            self._get_department_context(project_id, department_slug)
+        )
+
+        if len(gather_data) > settings.evaluation_map_reduce_threshold:
+            return self._evaluate_map_reduce(
+                department_slug=department_slug,
+                department_number=department_number,
+                gather_data=gather_data,
+                previous_evaluations=previous_evaluations,
+                threshold=threshold,
+                brain_context=brain_context
+            )
+        
+        # 2. Prepare evaluation prompt (gather content fitted to the token budget)
+        content_summary, prompt_stats = self._assemble_gather_content(
+            department_slug=department_slug,
+            gather_data=gather_data
+        )
+        evaluation_prompt = self._build_evaluation_prompt(
+            department_slug=department_slug,
+            department_number=department_number,
+            gather_data=gather_data,
+            previous_evaluations=previous_evaluations,
+            threshold=threshold,
+            brain_context=brain_context,
+            content_summary=content_summary
+        )
+        
+        # 3. Call AI service for evaluation
+        evaluation_result = self._call_ai_evaluator(
+            prompt=evaluation_prompt,
+            department=department_slug,
+            threshold=threshold
+        )
+
+        return evaluation_result, prompt_stats
+    
+    def _evaluate_map_reduce(
+        self,
+        department_slug: str,
+        department_number: int,
+        gather_data: List[Dict[str, Any]],
+        previous_evaluations: List[Dict[str, Any]],
+        threshold: int,
+        brain_context: Dict[str, Any]
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        Evaluate a large gather set chunk by chunk and reduce the results
+
+        Chunks are evaluated concurrently in a bounded thread pool rather
+        than as a Celery chord, so the task never blocks on subtasks.
+
+        Returns:
+            Tuple of (reduced evaluator result, summed prompt budgeting stats)
+        """
+        chunk_size = settings.evaluation_chunk_size
+        chunks = [
+            gather_data[i:i + chunk_size]
+            for i in range(0, len(gather_data), chunk_size)
+        ]
+
+        logger.info(
+            "Evaluating department in chunks",
+            department=department_slug,
+            gather_count=len(gather_data),
+            chunks=len(chunks),
+            concurrency=settings.evaluation_map_concurrency
+        )
+
+        def evaluate_chunk(chunk: List[Dict[str, Any]]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+            content_summary, prompt_stats = self._assemble_gather_content(
+                department_slug=department_slug,
+                gather_data=chunk
+            )
+            prompt = self._build_evaluation_prompt(
+                department_slug=department_slug,
+                department_number=department_number,
+                gather_data=chunk,
+                previous_evaluations=previous_evaluations,
+                threshold=threshold,
+                brain_context=brain_context,
+                content_summary=content_summary
+            )
+            return self._call_ai_evaluator(
+                prompt=prompt,
+                department=department_slug,
+                threshold=threshold
+            ), prompt_stats
+
+        with ThreadPoolExecutor(max_workers=settings.evaluation_map_concurrency) as executor:
+            chunk_results = list(executor.map(evaluate_chunk, chunks))
+
+        prompt_stats = {
+            key: sum(stats[key] for _, stats in chunk_results)
+            for key in chunk_results[0][1]
+        }
+        prompt_stats["chunks"] = len(chunks)
+
+        evaluation_result = self._reduce_chunk_evaluations(
+            [result for result, _ in chunk_results],
+            [len(chunk) for chunk in chunks]
+        )
+
+        return evaluation_result, prompt_stats
+
+    def _reduce_chunk_evaluations(
+        self,
+        chunk_results: List[Dict[str, Any]],
+        chunk_sizes: List[int]
+    ) -> Dict[str, Any]:
+        """
+        Combine chunk evaluations into one result in the evaluator schema
+
+        The rating and confidence are averaged, weighted by chunk size. Issues
+        and suggestions are deduplicated and ordered by how many chunks
+        raised them. Chunks whose evaluation fell back are ignored unless
+        every chunk fell back.
+        """
+        scored = [
+            (result, size) for result, size in zip(chunk_results, chunk_sizes)
+            if result.get("model") != "fallback"
+        ]
+        if not scored:
+            return chunk_results[0]
+
+        total_weight = sum(size for _, size in scored)
+        rating = round(sum(result["rating"] * size for result, size in scored) / total_weight)
+        confidence = sum(result.get("confidence", 0.0) * size for result, size in scored) / total_weight
+
+        ratings = [result["rating"] for result, _ in scored]
+        representative = min(scored, key=lambda pair: abs(pair[0]["rating"] - rating))[0]
+        summary = (
+            f"Evaluated {sum(chunk_sizes)} items in {len(chunk_results)} chunks "
+            f"(chunk ratings {min(ratings)}-{max(ratings)}). {representative['summary']}"
+        )
+
+        return {
+            "rating": rating,
+            "summary": summary,
+            "issues": _merge_findings([result["issues"] for result, _ in scored]),
+            "suggestions": _merge_findings([result["suggestions"] for result, _ in scored]),
+            "iteration_count": max(result.get("iteration_count", 1) for result, _ in scored),
+            "confidence": confidence,
+            "model": representative.get("model", settings.evaluation_model),
+            "tokens_used": sum(result.get("tokens_used", 0) for result in chunk_results)
+        }
+
     async def _get_department_context(
         self,
         project_id: str,
@@ -146,6 +343,34 @@ class EvaluateDepartmentTask(BaseTaskWithBrain):
             )
             return {}
     
+    def _assemble_gather_content(
+        self,
+        department_slug: str,
+        gather_data: List[Dict[str, Any]]
+    ) -> Tuple[str, Dict[str, Any]]:
+        """
+        Fit gathered content into the prompt token budget
+
+        Items are deduplicated and ranked by relevance to the department and
+        recency; items that do not fit are summarized. Tokens saved are
+        recorded as a task metric.
+
+        Returns:
+            Tuple of (content text, budgeting stats)
+        """
+        content_summary, prompt_stats = build_budgeted_content(
+            gather_data,
+            token_budget=settings.evaluation_prompt_token_budget,
+            query=department_slug.replace('-', ' ').replace('_', ' ')
+        )
+
+        if prompt_stats["tokens_saved"]:
+            task_storage.increment_metric(
+                "evaluation_prompt_tokens_saved", prompt_stats["tokens_saved"]
+            )
+
+        return content_summary, prompt_stats
+
     def _build_evaluation_prompt(
         self,
         department_slug: str,
@@ -153,15 +378,14 @@ class EvaluateDepartmentTask(BaseTaskWithBrain):
         gather_data: List[Dict[str, Any]],
         previous_evaluations: List[Dict[str, Any]],
         threshold: int,
-        brain_context: Dict[str, Any]
+        brain_context: Dict[str, Any],
+        content_summary: Optional[str] = None
     ) -> str:
         """Build comprehensive evaluation prompt for AI"""
         
-        # Aggregate all gathered content
-        content_summary = "\n\n".join([
-            f"Item {i+1}:\n{item.get('content', '')}\nSummary: {item.get('summary', 'N/A')}\nContext: {item.get('context', 'N/A')}"
-            for i, item in enumerate(gather_data)
-        ])
+        # Aggregate gathered content within the token budget
+        if content_summary is None:
+            content_summary, _ = self._assemble_gather_content(department_slug, gather_data)
         
         # Format previous evaluations
         prev_eval_summary = "\n".join([
@@ -233,35 +457,36 @@ Return your evaluation as JSON:
             # result_text = response.choices[0].message.content
             # result = json.loads(result_text)
             
-            # Mock implementation for testing
-            logger.info("Using mock AI evaluator", department=department)
+            with track_call("llm", settings.evaluation_model):
+                # Mock implementation for testing
+                logger.info("Using mock AI evaluator", department=department)
             
-            # Generate realistic mock evaluation
-            rating = 75 + (hash(department) % 20)  # 75-94
+                # Generate realistic mock evaluation
+                rating = 75 + (hash(department) % 20)  # 75-94
             
-            result = {
-                "rating": rating,
-                "summary": f"The {department} department shows strong foundational work with clear direction. "
-                          f"Content demonstrates professional quality and aligns well with production requirements. "
-                          f"Some areas need refinement before final approval.",
-                "issues": [
-                    f"{department.capitalize()} documentation needs more detail in technical specifications",
-                    f"Timeline estimates for {department} tasks appear optimistic",
-                    f"Resource allocation for {department} needs clarification",
-                    f"Dependencies with other departments not fully mapped"
-                ],
-                "suggestions": [
-                    f"Add detailed technical specifications for {department} deliverables",
-                    f"Review and adjust {department} timeline with 20% buffer",
-                    f"Create resource allocation matrix for {department}",
-                    f"Document cross-department dependencies clearly",
-                    f"Schedule review meeting with {department} stakeholders"
-                ],
-                "iteration_count": 1,
-                "confidence": 0.85,
-                "model": "mock-evaluator-v1",
-                "tokens_used": 1500
-            }
+                result = {
+                    "rating": rating,
+                    "summary": f"The {department} department shows strong foundational work with clear direction. "
+                              f"Content demonstrates professional quality and aligns well with production requirements. "
+                              f"Some areas need refinement before final approval.",
+                    "issues": [
+                        f"{department.capitalize()} documentation needs more detail in technical specifications",
+                        f"Timeline estimates for {department} tasks appear optimistic",
+                        f"Resource allocation for {department} needs clarification",
+                        f"Dependencies with other departments not fully mapped"
+                    ],
+                    "suggestions": [
+                        f"Add detailed technical specifications for {department} deliverables",
+                        f"Review and adjust {department} timeline with 20% buffer",
+                        f"Create resource allocation matrix for {department}",
+                        f"Document cross-department dependencies clearly",
+                        f"Schedule review meeting with {department} stakeholders"
+                    ],
+                    "iteration_count": 1,
+                    "confidence": 0.85,
+                    "model": settings.evaluation_model,
+                    "tokens_used": 1500
+                }
             
             return result
             
@@ -310,6 +535,22 @@ Return your evaluation as JSON:
         }
 
 
+def _merge_findings(findings: List[List[str]], limit: int = 5) -> List[str]:
+    """
+    Deduplicate issues/suggestions from several chunks, most frequent first
+    """
+    counts = Counter()
+    first_seen = {}
+    for chunk_findings in findings:
+        for finding in dict.fromkeys(chunk_findings):
+            key = ' '.join(finding.lower().split())
+            counts[key] += 1
+            first_seen.setdefault(key, finding)
+
+    ordered = sorted(counts, key=lambda key: -counts[key])
+    return [first_seen[key] for key in ordered[:limit]]
+
+
 # Create Celery task instance
 @celery_app.task(bind=True, base=EvaluateDepartmentTask, queue='cpu_intensive')
 def evaluate_department(
@@ -6,6 +6,7 @@ from typing import Dict, Any
 import structlog
 from ..celery_app import celery_app
 from .base_task import BaseTaskWithBrain
+from ..gpu.models import model_registry, DEFAULT_VIDEO_MODEL
 
 logger = structlog.get_logger(__name__)
 
@@ -44,6 +45,10 @@ class VideoGenerationTask(BaseTaskWithBrain):
                 self.store_task_context_in_brain(self.request.id, context)
             )
 
+            # Loaded once per worker process and kept resident between tasks
+            model = video_params.get('model', DEFAULT_VIDEO_MODEL)
+            model_registry.get(model)
+
             # Simulate video generation process
             # In a real implementation, this would call AI video generation models
             result = {
@@ -62,7 +67,7 @@ class VideoGenerationTask(BaseTaskWithBrain):
                 "quality_score": 0.92,
                 "similar_videos_used": len(similar_videos),
                 "processing_metadata": {
-                    "model_version": "video-gen-v2.1",
+                    "model_version": model,
                     "gpu_used": "A100",
                     "memory_peak": "12GB"
                 }
@@ -0,0 +1,121 @@
+"""
+Fixed-memory log-bucketed latency histograms
+
+Values are counted in buckets whose bounds grow geometrically, so every
+recorded value is known to within BUCKET_GROWTH relative error and memory is
+bounded by the number of buckets between MIN_VALUE and the largest value,
+no matter how many values are recorded. Histograms with the same bucketing
+merge by adding counts, which is how per-worker histograms are combined.
+"""
+import math
+from typing import Dict, Any, Iterable, Optional
+
+# Smallest distinguished value (seconds); anything below lands in bucket 0
+MIN_VALUE = 0.001
+
+# Ratio between consecutive bucket bounds (about 2.5% error around the midpoint)
+BUCKET_GROWTH = 1.05
+
+# Values above ~1 day share the last bucket
+MAX_BUCKET = int(math.log(86400 / MIN_VALUE) / math.log(BUCKET_GROWTH)) + 1
+
+_LOG_GROWTH = math.log(BUCKET_GROWTH)
+
+
+def bucket_index(value: float) -> int:
+    """Bucket holding a value"""
+    if value <= MIN_VALUE:
+        return 0
+    return min(int(math.log(value / MIN_VALUE) / _LOG_GROWTH) + 1, MAX_BUCKET)
+
+
+def bucket_value(index: int) -> float:
+    """Representative value of a bucket (geometric midpoint of its bounds)"""
+    if index <= 0:
+        return MIN_VALUE
+    lower = MIN_VALUE * BUCKET_GROWTH ** (index - 1)
+    return lower * math.sqrt(BUCKET_GROWTH)
+
+
+class LogHistogram:
+    """
+    Log-bucketed histogram of durations in seconds
+
+    Example:
+        >>> histogram = LogHistogram()
+        >>> for duration in (1.0, 2.0, 3.0):
+        ...     histogram.record(duration)
+        >>> round(histogram.percentile(50))
+        2
+    """
+
+    def __init__(self, counts: Optional[Dict[int, int]] = None, total: float = 0.0):
+        self.counts: Dict[int, int] = dict(counts or {})
+        self.total = total
+
+    @property
+    def count(self) -> int:
+        """Number of recorded values"""
+        return sum(self.counts.values())
+
+    def record(self, value: float, count: int = 1) -> None:
+        """Record a value"""
+        index = bucket_index(value)
+        self.counts[index] = self.counts.get(index, 0) + count
+        self.total += value * count
+
+    def merge(self, other: "LogHistogram") -> "LogHistogram":
+        """Add another histogram's counts to this one"""
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.total += other.total
+        return self
+
+    def mean(self) -> Optional[float]:
+        """Exact mean of recorded values"""
+        count = self.count
+        return self.total / count if count else None
+
+    def percentile(self, percent: float) -> Optional[float]:
+        """
+        Value below which percent of recorded values fall
+
+        Args:
+            percent: Percentile between 0 and 100
+
+        Returns:
+            Approximate value, or None if nothing is recorded
+        """
+        count = self.count
+        if not count:
+            return None
+
+        rank = max(math.ceil(count * percent / 100.0), 1)
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return bucket_value(index)
+        return bucket_value(max(self.counts))
+
+    def summary(self, percents: Iterable[float] = (50, 95, 99)) -> Dict[str, Any]:
+        """Count, mean and percentiles, e.g. {"count": 3, "mean": 2.0, "p50": 1.99, ...}"""
+        result = {"count": self.count, "mean": self.mean()}
+        for percent in percents:
+            result[f"p{percent:g}"] = self.percentile(percent)
+        return result
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize (bucket keys as strings, as stored in Redis hashes)"""
+        return {
+            "counts": {str(index): count for index, count in self.counts.items()},
+            "total": self.total
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "LogHistogram":
+        """Deserialize from to_dict output"""
+        return cls(
+            counts={int(index): int(count) for index, count in data.get("counts", {}).items()},
+            total=float(data.get("total", 0.0))
+        )
@@ -0,0 +1,258 @@
+"""
+Token-budgeted assembly of gather items for LLM prompts
+
+Items are deduplicated, ranked by relevance and recency, and included in full
+while they fit the budget. Items that do not fit are summarized as one line each.
+If those lines still overflow the budget, they are merged in groups, repeatedly,
+until the tail fits; a merged line states how many items it covers and keeps
+the first clause of as many of them as fit.
+"""
+import re
+import bisect
+import hashlib
+import structlog
+from typing import Dict, Any, List, Optional, Tuple
+
+logger = structlog.get_logger(__name__)
+
+# Rough average for English prose with GPT/Claude style tokenizers
+CHARS_PER_TOKEN = 4
+
+# Share of the budget reserved for the summarized tail
+TAIL_BUDGET_SHARE = 0.2
+
+# Items merged into one line per level of tail summarization
+TAIL_GROUP_SIZE = 5
+
+TAIL_LINE_CHARS = 160
+
+# Shortest per-item head kept on a merged line; items beyond that are counted
+TAIL_HEAD_MIN_CHARS = 32
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_CLAUSE_END_RE = re.compile(r"(?<=[.!?;:])\s")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the token count of a text
+
+    Args:
+        text: Text to estimate
+
+    Returns:
+        Approximate number of tokens
+    """
+    if not text:
+        return 0
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def format_gather_item(index: int, item: Dict[str, Any]) -> str:
+    """
+    Format one gather item the way evaluation prompts list them
+    """
+    return (
+        f"Item {index}:\n{item.get('content', '')}\n"
+        f"Summary: {item.get('summary', 'N/A')}\n"
+        f"Context: {item.get('context', 'N/A')}"
+    )
+
+
+def build_budgeted_content(
+    items: List[Dict[str, Any]],
+    token_budget: int,
+    query: str = ""
+) -> Tuple[str, Dict[str, Any]]:
+    """
+    Assemble gather items into prompt text within a token budget
+
+    Args:
+        items: Gather items (content, summary, context, optional createdAt)
+        token_budget: Maximum estimated tokens for the assembled text
+        query: Text describing what the prompt is about (ranks relevance)
+
+    Returns:
+        Tuple of (prompt text, stats) where stats holds original_tokens,
+        prompt_tokens, tokens_saved, items_included, items_summarized and
+        duplicates_removed
+    """
+    unique_items = _deduplicate(items)
+    duplicates_removed = len(items) - len(unique_items)
+
+    formatted = [format_gather_item(i + 1, item) for i, item in enumerate(unique_items)]
+    original_tokens = estimate_tokens("\n\n".join(
+        format_gather_item(i + 1, item) for i, item in enumerate(items)
+    ))
+
+    full_text = "\n\n".join(formatted)
+    if estimate_tokens(full_text) <= token_budget:
+        return full_text, _stats(
+            original_tokens, full_text, len(unique_items), 0, duplicates_removed
+        )
+
+    # Rank, then fill the head budget with full items in rank order
+    ranked = _rank(unique_items, query)
+    head_budget = int(token_budget * (1 - TAIL_BUDGET_SHARE))
+
+    included = set()
+    used = 0
+    for position in ranked:
+        cost = estimate_tokens(formatted[position]) + 1
+        if used + cost > head_budget:
+            continue
+        included.add(position)
+        used += cost
+
+    # Keep the original order for readability
+    head = [
+        format_gather_item(rank + 1, unique_items[position])
+        for rank, position in enumerate(sorted(included))
+    ]
+    tail_items = [unique_items[position] for position in ranked if position not in included]
+    tail_header = f"Additional items (summarized, {len(tail_items)} items):"
+    tail = _summarize_tail(tail_items, token_budget - used - estimate_tokens(tail_header) - 1)
+
+    sections = head
+    if tail:
+        sections = head + [f"{tail_header}\n{tail}"]
+    text = "\n\n".join(sections)
+
+    stats = _stats(original_tokens, text, len(included), len(tail_items), duplicates_removed)
+    logger.info("Applied prompt token budget", token_budget=token_budget, **stats)
+
+    return text, stats
+
+
+def _stats(
+    original_tokens: int,
+    text: str,
+    items_included: int,
+    items_summarized: int,
+    duplicates_removed: int
+) -> Dict[str, Any]:
+    """Budgeting statistics for metrics"""
+    prompt_tokens = estimate_tokens(text)
+    return {
+        'original_tokens': original_tokens,
+        'prompt_tokens': prompt_tokens,
+        'tokens_saved': max(original_tokens - prompt_tokens, 0),
+        'items_included': items_included,
+        'items_summarized': items_summarized,
+        'duplicates_removed': duplicates_removed
+    }
+
+
+def _deduplicate(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Drop items whose normalized content repeats an earlier item"""
+    seen = set()
+    unique = []
+    for item in items:
+        normalized = ' '.join(str(item.get('content', '')).lower().split())
+        key = hashlib.md5(normalized.encode()).hexdigest() if normalized else None
+        if key is not None and key in seen:
+            continue
+        if key is not None:
+            seen.add(key)
+        unique.append(item)
+    return unique
+
+
+def _rank(items: List[Dict[str, Any]], query: str) -> List[int]:
+    """
+    Positions of items ordered by relevance to the query, then recency
+    Items without timestamps count as newer the later they appear
+    """
+    query_terms = set(_WORD_RE.findall(query.lower()))
+    timestamps = [_timestamp(item) for item in items]
+    ordered_times = sorted(t for t in timestamps if t)
+
+    def score(position: int) -> Tuple[float, float, int]:
+        item = items[position]
+        if query_terms:
+            words = set(_WORD_RE.findall(
+                f"{item.get('content', '')} {item.get('summary', '')} {item.get('context', '')}".lower()
+            ))
+            relevance = len(query_terms & words) / len(query_terms)
+        else:
+            relevance = 0.0
+
+        stamp = timestamps[position]
+        if stamp and len(ordered_times) > 1:
+            recency = bisect.bisect_left(ordered_times, stamp) / (len(ordered_times) - 1)
+        else:
+            recency = position / max(len(items) - 1, 1)
+
+        return (relevance, recency, -position)
+
+    return sorted(range(len(items)), key=score, reverse=True)
+
+
+def _timestamp(item: Dict[str, Any]) -> Optional[str]:
+    """Sortable creation/update timestamp of an item, if any"""
+    value = item.get('lastUpdated') or item.get('createdAt')
+    if value is None:
+        return None
+    return value.isoformat() if hasattr(value, 'isoformat') else str(value)
+
+
+def _summary_text(item: Dict[str, Any]) -> str:
+    """An item's summary, or its content, on one line"""
+    text = item.get('summary') or item.get('content') or ''
+    return ' '.join(str(text).split())
+
+
+def _clip(text: str, max_chars: int) -> str:
+    """Shorten text to max_chars, marking the cut with an ellipsis"""
+    if len(text) <= max_chars:
+        return text
+    return text[:max(max_chars - 1, 0)].rstrip() + "…"
+
+
+def _merged_line(heads: List[str]) -> str:
+    """
+    One line standing for several items: their count, then the head of each
+    item while heads of at least TAIL_HEAD_MIN_CHARS fit, then how many more
+    """
+    if len(heads) == 1:
+        return _clip(heads[0], TAIL_LINE_CHARS)
+
+    prefix = f"[{len(heads)} items] "
+    for shown in range(len(heads), 0, -1):
+        more = f"; +{len(heads) - shown} more" if shown < len(heads) else ""
+        room = TAIL_LINE_CHARS - len(prefix) - len(more) - 2 * (shown - 1)
+        if room // shown >= TAIL_HEAD_MIN_CHARS or shown == 1:
+            return prefix + "; ".join(_clip(head, room // shown) for head in heads[:shown]) + more
+    return prefix
+
+
+def _summarize_tail(items: List[Dict[str, Any]], token_budget: int) -> str:
+    """
+    Summarize items that did not fit, merging lines level by level until the
+    result fits the remaining budget
+
+    First every item gets a line of its own. Each merge level then replaces
+    TAIL_GROUP_SIZE lines by one that names the number of items it covers
+    and the first clause of each (as many as fit on a line).
+    """
+    if not items or token_budget <= 0:
+        return ""
+
+    texts = [text for text in (_summary_text(item) for item in items) if text]
+    groups = [[text] for text in texts]
+    lines = [_merged_line(group) for group in groups]
+    text = "\n".join(f"- {line}" for line in lines)
+
+    while lines and estimate_tokens(text) > token_budget:
+        if len(lines) == 1:
+            max_chars = max(token_budget * CHARS_PER_TOKEN - 2, 0)
+            lines = [_clip(lines[0], max_chars)] if max_chars else []
+        else:
+            groups = [
+                [_CLAUSE_END_RE.split(head, 1)[0] for group in groups[i:i + TAIL_GROUP_SIZE] for head in group]
+                for i in range(0, len(groups), TAIL_GROUP_SIZE)
+            ]
+            lines = [_merged_line(group) for group in groups]
+        text = "\n".join(f"- {line}" for line in lines)
+
+    return text
@@ -7,6 +7,8 @@ import structlog
 from typing import Dict, Any, Optional
 from datetime import datetime
 
+from ..config.prometheus import track_call
+
 logger = structlog.get_logger(__name__)
 
 
@@ -40,11 +42,12 @@ async def send_webhook_async(
     for attempt in range(max_retries):
         try:
             async with httpx.AsyncClient(timeout=timeout) as client:
-                response = await client.post(
-                    callback_url,
-                    json=payload,
-                    headers=headers
-                )
+                with track_call("webhook", "send"):
+                    response = await client.post(
+                        callback_url,
+                        json=payload,
+                        headers=headers
+                    )
                 
                 if response.status_code in (200, 201, 202, 204):
                     logger.info(
@@ -43,7 +43,7 @@ elif [ "$SERVICE_TYPE" = "worker" ]; then
     exec celery -A app.celery_app worker \
         --loglevel=${LOG_LEVEL:-info} \
         --concurrency=${WORKER_CONCURRENCY:-4} \
-        --queues=${WORKER_QUEUES:-celery,gpu_heavy,gpu_medium,cpu_intensive} \
+        --queues=${WORKER_QUEUES:-cpu_intensive,celery,gpu_heavy,gpu_medium} \
         --hostname=worker@%h \
         --time-limit=${TASK_TIMEOUT:-3600} \
         --soft-time-limit=3300
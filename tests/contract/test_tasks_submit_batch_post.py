@@ -0,0 +1,75 @@
+"""
+Contract test for POST /api/v1/tasks/submit/batch endpoint
+"""
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+
+
+@pytest.fixture
+def client():
+    """Test client for FastAPI app"""
+    return TestClient(app)
+
+
+@pytest.fixture
+def valid_batch_request():
+    """Valid batch submission request with two department evaluations"""
+    return {
+        "tasks": [
+            {
+                "project_id": "detective_series_001",
+                "task_type": "evaluate_department",
+                "task_data": {
+                    "department_slug": "story",
+                    "department_number": 1,
+                    "gather_data": [],
+                    "threshold": 80
+                }
+            },
+            {
+                "project_id": "detective_series_001",
+                "task_type": "evaluate_department",
+                "task_data": {
+                    "department_slug": "character",
+                    "department_number": 2,
+                    "gather_data": [],
+                    "threshold": 80
+                }
+            }
+        ]
+    }
+
+
+def test_task_submit_batch_requires_auth(client, valid_batch_request):
+    """Test that batch submission requires API key"""
+    response = client.post("/api/v1/tasks/submit/batch", json=valid_batch_request)
+    assert response.status_code == 401
+
+
+def test_task_submit_batch_with_auth(client, valid_batch_request):
+    """Test successful batch submission returns one entry per task, in order"""
+    headers = {"X-API-Key": "test-api-key"}
+    response = client.post("/api/v1/tasks/submit/batch", json=valid_batch_request, headers=headers)
+    assert response.status_code == 201
+
+    data = response.json()
+    assert len(data["tasks"]) == 2
+    for task in data["tasks"]:
+        assert "task_id" in task
+        assert task["project_id"] == "detective_series_001"
+
+
+def test_task_submit_batch_rejects_empty_batch(client):
+    """Test that an empty batch is rejected"""
+    headers = {"X-API-Key": "test-api-key"}
+    response = client.post("/api/v1/tasks/submit/batch", json={"tasks": []}, headers=headers)
+    assert response.status_code == 422
+
+
+def test_task_submit_batch_rejects_unsupported_task_type(client, valid_batch_request):
+    """Test that one unsupported task fails the whole batch before enqueueing"""
+    headers = {"X-API-Key": "test-api-key"}
+    valid_batch_request["tasks"][1]["task_type"] = "render_animation"
+    response = client.post("/api/v1/tasks/submit/batch", json=valid_batch_request, headers=headers)
+    assert response.status_code == 400
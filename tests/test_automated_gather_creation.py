@@ -120,3 +120,740 @@ class TestQualityAnalyzer:
         assert 0 <= score <= 100
         assert score > 50  # Should have decent score with 2 items
 
+    def test_incremental_scorer_matches_heuristic(self):
+        """Test that running aggregates give the same heuristic score as a full scan"""
+        from app.agents.quality_analyzer import (
+            IncrementalQualityScorer,
+            _calculate_mock_quality
+        )
+        
+        items = [
+            {'_id': str(i), 'content': 'C' * (100 * i), 'summary': f'Item {i}' if i % 2 else '',
+             'automationMetadata': {'department': 'story'}}
+            for i in range(1, 6)
+        ]
+        
+        scorer = IncrementalQualityScorer()
+        scorer.index_items(items[:3])
+        scorer.add_items('story', items[3:])
+        
+        with patch.dict('os.environ', {}, clear=True):
+            score = scorer.score('project-1', {'slug': 'story'})
+        
+        assert score == pytest.approx(_calculate_mock_quality(items))
+        features = scorer.features('story')
+        assert features['count'] == 5
+        assert features['min_length'] == 100
+        assert features['max_length'] == 500
+        assert features['summary_coverage'] == pytest.approx(0.6)
+    
+    def test_incremental_scorer_ignores_already_indexed_items(self):
+        """Test that re-adding known items does not change aggregates"""
+        from app.agents.quality_analyzer import IncrementalQualityScorer
+        
+        item = {'_id': 'a', 'content': 'Some content', 'summary': 'S'}
+        scorer = IncrementalQualityScorer()
+        
+        assert scorer.add_items('story', [item]) == 1
+        assert scorer.add_items('story', [item]) == 0
+        assert scorer.features('story')['count'] == 1
+    
+    def test_incremental_scorer_reuses_previous_assessment(self):
+        """Test that the last LLM score is reused while no new items arrive"""
+        from app.agents.quality_analyzer import IncrementalQualityScorer
+        
+        scorer = IncrementalQualityScorer()
+        scorer.add_items('story', [{'_id': 'a', 'content': 'x', 'summary': 's'}])
+        state = scorer._department_state('story')
+        state['llm_score'] = 72.0
+        state['llm_items_count'] = 1
+        
+        assert scorer.score('project-1', {'slug': 'story'}) == 72.0
+    
+    def test_incremental_scorer_round_trip(self):
+        """Test that scorer state survives serialization for checkpoints"""
+        from app.agents.quality_analyzer import IncrementalQualityScorer
+        
+        scorer = IncrementalQualityScorer()
+        scorer.index_items([
+            {'_id': 'a', 'content': 'abc', 'summary': 'A',
+             'automationMetadata': {'department': 'story'}}
+        ])
+        
+        restored = IncrementalQualityScorer.from_dict(scorer.to_dict())
+        
+        assert restored.indexed is True
+        assert restored.features('story') == scorer.features('story')
+        assert restored.add_items('story', [{'_id': 'a', 'content': 'abc'}]) == 0
+
+    def test_incremental_scorer_state_stays_compact(self):
+        """Test that pending items are capped and cleared and checkpoints omit the key set"""
+        from app.agents.quality_analyzer import (
+            IncrementalQualityScorer,
+            PENDING_ITEMS_LIMIT,
+            RECENT_KEYS_LIMIT
+        )
+
+        items = [
+            {'_id': str(i), 'content': 'x' * 50, 'createdAt': datetime(2024, 1, 1, 0, 0, i % 60, i)}
+            for i in range(200)
+        ]
+        scorer = IncrementalQualityScorer()
+        scorer.add_items('story', items)
+        state = scorer._department_state('story')
+
+        assert len(state['pending']) == PENDING_ITEMS_LIMIT
+        assert scorer.features('story')['pending_count'] == 200
+
+        with patch.dict('os.environ', {}, clear=True):
+            scorer.score('project-1', {'slug': 'story'})
+        assert len(state['pending']) == 0
+        assert scorer.features('story')['pending_count'] == 0
+
+        checkpoint = scorer.to_dict()['departments']['story']
+        assert 'item_keys' not in checkpoint
+        assert len(checkpoint['recent_keys']) == RECENT_KEYS_LIMIT
+
+        restored = IncrementalQualityScorer.from_dict(scorer.to_dict())
+        assert restored.add_items('story', items) == 0
+        assert restored.add_items('story', [
+            {'_id': 'new', 'content': 'y', 'createdAt': datetime(2024, 1, 2)}
+        ]) == 1
+
+
+
+class TestOrchestratedGather:
+    """Test orchestrated (per-department subtask) gather mode"""
+
+    def setup_method(self):
+        from app.tasks import automated_gather_tasks as module
+
+        self.patches = [
+            patch.object(module.task_storage, 'run_lock'),
+            patch.object(module.task_storage, 'mark_run_step', return_value=True),
+            patch.object(module.task_storage, 'unmark_run_step')
+        ]
+        self.run_lock, self.mark_run_step, self.unmark_run_step = [p.start() for p in self.patches]
+        self.run_lock.return_value.acquire.return_value = True
+
+    def teardown_method(self):
+        for p in self.patches:
+            p.stop()
+
+    def _state(self, **overrides):
+        state = {
+            'run_id': 'run-1',
+            'project_id': 'project-1',
+            'user_id': 'user-1',
+            'max_iterations': 5,
+            'departments': [{
+                'slug': 'story',
+                'name': 'Story',
+                'codeDepNumber': 1,
+                'gatherCheck': True,
+                'coordinationSettings': {'minQualityThreshold': 80}
+            }],
+            'status': 'running',
+            'step': 0,
+            'dept_index': 0,
+            'total_iterations': 0,
+            'total_items_created': 0,
+            'processed_departments': [],
+            'dept_started': False,
+            'dept_stopped': False,
+            'dept_iterations': 0,
+            'dept_items_created': 0,
+            'dept_errors': 0,
+            'quality_score': 0
+        }
+        state.update(overrides)
+        return state
+
+    def test_step_task_configuration(self):
+        """Test that the step task has a short time limit and its own route"""
+        from app.celery_app import celery_app
+        from app.tasks.automated_gather_tasks import automated_gather_department_step
+
+        assert automated_gather_department_step.name == 'automated_gather_department_step'
+        assert automated_gather_department_step.time_limit == 120
+        assert celery_app.conf.task_routes['automated_gather_department_step']['queue'] == 'cpu_intensive'
+
+    def test_step_runs_iteration_and_chains_next_step(self):
+        """Test that a step runs one iteration, checkpoints and enqueues the next step"""
+        from app.tasks import automated_gather_tasks as module
+
+        state = self._state()
+        saved = [{'_id': 'a', 'content': 'x'}, {'_id': 'b', 'content': 'y'}]
+
+        with patch.object(module.task_storage, 'get_run_state', return_value=state), \
+             patch.object(module.task_storage, 'save_run_state', return_value=True) as mock_save, \
+             patch.object(module, '_run_department_iteration', return_value=(saved, 55.0)), \
+             patch.object(module, 'read_cached_gather_items', return_value=[]), \
+             patch.object(module, 'get_brain_context', return_value=[]), \
+             patch.object(module, 'send_websocket_event'), \
+             patch.object(module.automated_gather_department_step, 'apply_async') as mock_next:
+            result = module.automated_gather_department_step.run('run-1', 0)
+
+        assert result['status'] == 'advanced'
+        saved_state = mock_save.call_args[0][1]
+        assert saved_state['step'] == 1
+        assert saved_state['dept_iterations'] == 1
+        assert saved_state['total_items_created'] == 2
+        assert saved_state['quality_score'] == 55.0
+        mock_next.assert_called_once_with(args=['run-1', 1], task_id='run-1:step:1')
+
+    def test_step_closes_department_when_threshold_met(self):
+        """Test that a department meeting its threshold is closed and its evaluation queued"""
+        from app.clients import payload_client
+        from app.tasks import automated_gather_tasks as module
+
+        state = self._state(dept_started=True, quality_score=90, dept_iterations=2)
+
+        with patch.object(module.task_storage, 'get_run_state', return_value=state), \
+             patch.object(module.task_storage, 'save_run_state', return_value=True) as mock_save, \
+             patch.object(payload_client, 'trigger_department_evaluations') as mock_trigger, \
+             patch.object(module, 'send_websocket_event'), \
+             patch.object(module.automated_gather_department_step, 'apply_async'):
+            module.automated_gather_department_step.run('run-1', 0)
+
+        mock_trigger.assert_not_called()
+        saved_state = mock_save.call_args[0][1]
+        assert saved_state['dept_index'] == 1
+        assert saved_state['processed_departments'][0]['department'] == 'story'
+        assert saved_state['dept_iterations'] == 0
+        assert saved_state['pending_evaluations']['pending'] == [1]
+
+    def test_final_step_flushes_queued_evaluations(self):
+        """Test that queued evaluation triggers are sent as one batch when the run completes"""
+        from app.clients import payload_client
+        from app.tasks import automated_gather_tasks as module
+
+        state = self._state(
+            dept_index=1,
+            pending_evaluations={'project_id': 'project-1', 'pending': [1, 2], 'first_queued_at': None}
+        )
+
+        with patch.object(module.task_storage, 'get_run_state', return_value=state), \
+             patch.object(module.task_storage, 'save_run_state', return_value=True) as mock_save, \
+             patch.object(payload_client, 'trigger_department_evaluations', return_value=True) as mock_trigger, \
+             patch.object(module, 'send_websocket_event'):
+            result = module.automated_gather_department_step.run('run-1', 0)
+
+        assert result['status'] == 'completed'
+        mock_trigger.assert_called_once_with('project-1', [1, 2])
+        assert mock_save.call_args[0][1]['pending_evaluations']['pending'] == []
+
+    def test_stale_step_is_skipped(self):
+        """Test that a duplicate delivery of an applied step does nothing"""
+        from app.tasks import automated_gather_tasks as module
+
+        state = self._state(step=3)
+
+        with patch.object(module.task_storage, 'get_run_state', return_value=state), \
+             patch.object(module.task_storage, 'save_run_state') as mock_save, \
+             patch.object(module.automated_gather_department_step, 'apply_async') as mock_next:
+            result = module.automated_gather_department_step.run('run-1', 1)
+
+        assert result['status'] == 'skipped'
+        mock_save.assert_not_called()
+        mock_next.assert_not_called()
+
+    def test_crash_after_checkpoint_reenqueues_next_step(self):
+        """Test that a step redelivered after its checkpoint still enqueues the next step"""
+        from app.tasks import automated_gather_tasks as module
+
+        state = self._state()
+        saved = [{'_id': 'a', 'content': 'x'}]
+
+        # The worker checkpoints step 1, then dies before enqueuing it
+        with patch.object(module.task_storage, 'get_run_state', return_value=state), \
+             patch.object(module.task_storage, 'save_run_state', return_value=True) as mock_save, \
+             patch.object(module, '_run_department_iteration', return_value=(saved, 55.0)), \
+             patch.object(module, 'read_cached_gather_items', return_value=[]), \
+             patch.object(module, 'get_brain_context', return_value=[]), \
+             patch.object(module, 'send_websocket_event'), \
+             patch.object(module.automated_gather_department_step, 'apply_async',
+                          side_effect=SystemExit("worker lost")):
+            with pytest.raises(SystemExit):
+                module.automated_gather_department_step.run('run-1', 0)
+
+        checkpointed = mock_save.call_args[0][1]
+        assert checkpointed['step'] == 1
+
+        # Late-ack redelivery of step 0 sees the checkpoint
+        with patch.object(module.task_storage, 'get_run_state', return_value=checkpointed), \
+             patch.object(module.task_storage, 'save_run_state') as mock_save, \
+             patch.object(module, '_run_department_iteration') as mock_iteration, \
+             patch.object(module.automated_gather_department_step, 'apply_async') as mock_next:
+            result = module.automated_gather_department_step.run('run-1', 0)
+
+        assert result['status'] == 'resumed'
+        mock_iteration.assert_not_called()
+        mock_save.assert_not_called()
+        mock_next.assert_called_once_with(args=['run-1', 1], task_id='run-1:step:1')
+        # The failed enqueue released its mark, so the redelivery could claim it
+        self.unmark_run_step.assert_called_once_with('run-1', 1)
+
+    def test_redelivered_step_does_not_enqueue_next_step_twice(self):
+        """Test that a duplicate of an applied step leaves the already enqueued next step alone"""
+        from app.tasks import automated_gather_tasks as module
+
+        self.mark_run_step.return_value = False
+
+        with patch.object(module.task_storage, 'get_run_state', return_value=self._state(step=1)), \
+             patch.object(module.task_storage, 'save_run_state') as mock_save, \
+             patch.object(module.automated_gather_department_step, 'apply_async') as mock_next:
+            result = module.automated_gather_department_step.run('run-1', 0)
+
+        assert result['status'] == 'skipped'
+        self.mark_run_step.assert_called_once_with('run-1', 1)
+        mock_save.assert_not_called()
+        mock_next.assert_not_called()
+
+    def test_concurrent_duplicate_step_waits_for_run_lock(self):
+        """Test that a copy of a step arriving while another runs does not run the iteration"""
+        from celery.exceptions import Retry
+        from app.tasks import automated_gather_tasks as module
+
+        self.run_lock.return_value.acquire.return_value = False
+
+        with patch.object(module.task_storage, 'get_run_state') as mock_state, \
+             patch.object(module, '_run_department_iteration') as mock_iteration, \
+             patch.object(module.automated_gather_department_step, 'retry', side_effect=Retry()) as mock_retry:
+            with pytest.raises(Retry):
+                module.automated_gather_department_step.run('run-1', 0)
+
+        mock_state.assert_not_called()
+        mock_iteration.assert_not_called()
+        assert mock_retry.call_args.kwargs['countdown'] == module.STEP_LOCK_TIMEOUT
+        self.run_lock.return_value.release.assert_not_called()
+
+
+class TestGatherItemStore:
+    """Test department-indexed gather item store"""
+
+    def _items(self):
+        return [
+            {'_id': '1', 'content': 'a', 'automationMetadata': {'department': 'story'}},
+            {'_id': '2', 'content': 'b', 'automationMetadata': {'department': 'character'}},
+            {'_id': '3', 'content': 'c'},
+            {'_id': '4', 'content': 'd', 'automationMetadata': {'department': 'story'}},
+        ]
+
+    def test_department_index(self):
+        """Test that items are indexed by department in log order"""
+        from app.storage import GatherItemStore
+
+        store = GatherItemStore(self._items())
+
+        assert len(store) == 4
+        assert [item['_id'] for item in store.department_items('story')] == ['1', '4']
+        assert store.department_count('character') == 1
+        assert store.department_items('missing') == []
+        assert [item['_id'] for item in store.last_for_department('story', 1)] == ['4']
+
+    def test_context_window_matches_concatenation(self):
+        """Test that the context window equals the tail of the concatenated sources"""
+        from app.storage import GatherItemStore
+
+        items = self._items()
+        store = GatherItemStore(items)
+        brain = [{'content': f'brain {i}'} for i in range(3)]
+        dept_brain = [{'content': 'dept brain'}]
+
+        assert store.context_window(0, brain, dept_brain) == []
+        for n in (1, 3, 5, 8, 20):
+            assert store.context_window(n, brain, dept_brain) == (items + brain + dept_brain)[-n:]
+
+    def test_agents_accept_store(self):
+        """Test that dedup and quality agents use the department index"""
+        from app.storage import GatherItemStore
+        from app.agents.duplicate_detector import deduplicate_items
+        from app.agents.quality_analyzer import analyze_department_quality
+
+        store = GatherItemStore(self._items())
+        new_items = [{'content': 'a'}, {'content': 'completely new words here'}]
+
+        with patch.dict('os.environ', {}, clear=True):
+            deduplicated = deduplicate_items(new_items, store, 'story')
+            score = analyze_department_quality('project-1', {'slug': 'story'}, store)
+
+        assert deduplicated == [new_items[1]]
+        assert score > 0
+
+
+class TestMongoDBGatherReads:
+    """Test projected, streamed and indexed gather reads"""
+
+    def _collection(self, docs):
+        collection = MagicMock()
+        collection.name = 'aladdin-gather-project-1'
+        cursor = MagicMock()
+        cursor.sort.return_value = cursor
+        cursor.batch_size.return_value = cursor
+        cursor.__iter__.return_value = iter(docs)
+        collection.find.return_value = cursor
+        return collection, cursor
+
+    def test_iter_gather_items_streams_with_projection(self):
+        """Test that streamed reads pass projection and batch size to the cursor"""
+        from app.clients import mongodb_client
+
+        collection, cursor = self._collection([{'_id': 1, 'content': 'a'}])
+
+        with patch.object(mongodb_client, 'get_gather_collection', return_value=collection):
+            items = list(mongodb_client.iter_gather_items(
+                'project-1',
+                query={'isAutomated': True},
+                projection=mongodb_client.GATHER_CONTEXT_PROJECTION,
+                batch_size=50
+            ))
+
+        assert items == [{'_id': '1', 'content': 'a'}]
+        collection.find.assert_called_once_with(
+            {'isAutomated': True}, mongodb_client.GATHER_CONTEXT_PROJECTION
+        )
+        cursor.batch_size.assert_called_once_with(50)
+        assert 'extractedText' not in mongodb_client.GATHER_CONTEXT_PROJECTION
+
+    def test_indexes_created_once_per_collection(self):
+        """Test that gather indexes are ensured only on first use"""
+        from app.clients import mongodb_client
+
+        collection, _ = self._collection([])
+        collection.name = 'aladdin-gather-index-test'
+
+        mongodb_client.ensure_gather_indexes(collection)
+        mongodb_client.ensure_gather_indexes(collection)
+
+        assert collection.create_index.call_count == len(mongodb_client.GATHER_INDEXES)
+        indexed_fields = [keys[0][0] for keys in mongodb_client.GATHER_INDEXES]
+        assert indexed_fields == [
+            'createdAt', 'automationMetadata.department', 'isAutomated', 'lastUpdated'
+        ]
+
+
+class TestGatherItemCache:
+    """Test change-stream backed gather item cache"""
+
+    def test_polling_fetches_only_deltas(self):
+        """Test that after the first load only items updated since are fetched"""
+        from datetime import timedelta
+        from app.clients import gather_cache
+        from app.config.settings import settings
+
+        first = [
+            {'_id': 'a', 'content': 'a', 'createdAt': datetime(2024, 1, 1), 'lastUpdated': datetime(2024, 1, 1)},
+            {'_id': 'b', 'content': 'b', 'createdAt': datetime(2024, 1, 2), 'lastUpdated': datetime(2024, 1, 2)},
+        ]
+        delta = [
+            {'_id': 'a', 'content': 'a2', 'createdAt': datetime(2024, 1, 1), 'lastUpdated': datetime(2024, 1, 3)},
+        ]
+
+        cache = gather_cache.GatherItemCache('project-1', use_change_streams=False, poll_interval=0)
+
+        with patch.object(gather_cache, 'iter_gather_items', side_effect=[iter(first), iter(delta)]) as mock_iter:
+            assert [item['_id'] for item in cache.get_items()] == ['b', 'a']
+            items = cache.get_items()
+
+        assert mock_iter.call_args_list[1].kwargs['query'] == {
+            'lastUpdated': {'$gt': datetime(2024, 1, 2) - timedelta(seconds=settings.gather_cache_poll_overlap)}
+        }
+        assert {item['_id']: item['content'] for item in items} == {'a': 'a2', 'b': 'b'}
+        assert cache.mode == 'polling'
+
+    def test_change_events_and_local_writes_are_applied(self):
+        """Test that change stream events and local writes update the cache"""
+        from app.clients import gather_cache
+
+        cache = gather_cache.GatherItemCache('project-1', use_change_streams=False, poll_interval=3600)
+
+        with patch.object(gather_cache, 'iter_gather_items', return_value=iter([
+            {'_id': 'a', 'content': 'a', 'createdAt': datetime(2024, 1, 1)}
+        ])):
+            cache.load()
+
+        cache._apply_change({'operationType': 'delete', 'documentKey': {'_id': 'a'}})
+        cache._apply_change({
+            'operationType': 'insert',
+            'documentKey': {'_id': 'b'},
+            'fullDocument': {'_id': 'b', 'content': 'b', 'createdAt': datetime(2024, 1, 2)}
+        })
+        cache.add_items([{'_id': 'c', 'content': 'c', 'extractedText': 'large',
+                          'createdAt': datetime(2024, 1, 3)}])
+
+        items = cache.get_items()
+        assert [item['_id'] for item in items] == ['c', 'b']
+        assert 'extractedText' not in items[0]
+
+    def test_local_writes_do_not_skip_unpolled_items(self):
+        """Test that items this process writes do not move the poll watermark"""
+        from app.clients import gather_cache
+        from app.config.settings import settings
+
+        cache = gather_cache.GatherItemCache('project-1', use_change_streams=False, poll_interval=0)
+
+        with patch.object(gather_cache, 'iter_gather_items', side_effect=[
+            iter([{'_id': 'a', 'content': 'a', 'lastUpdated': datetime(2024, 1, 1)}]),
+            iter([])
+        ]) as mock_iter, patch.object(settings, 'gather_cache_poll_overlap', 0):
+            cache.load()
+            cache.add_items([{'_id': 'mine', 'content': 'mine', 'lastUpdated': datetime(2024, 1, 5)}])
+            cache.get_items()
+
+        assert mock_iter.call_args_list[1].kwargs['query'] == {'lastUpdated': {'$gt': datetime(2024, 1, 1)}}
+
+    def test_change_stream_start_catches_up_with_a_poll(self):
+        """Test that items written before the change stream opened are still fetched"""
+        import threading
+        from app.clients import gather_cache
+
+        closed = threading.Event()
+
+        def stream():
+            closed.wait(5)
+            yield from ()
+
+        cache = gather_cache.GatherItemCache('project-1', use_change_streams=True, poll_interval=3600)
+        collection = MagicMock()
+        collection.watch.return_value = stream()
+        late = {'_id': 'late', 'content': 'late', 'lastUpdated': datetime(2024, 1, 2)}
+
+        with patch.object(gather_cache, 'get_gather_collection', return_value=collection), \
+             patch.object(gather_cache, 'iter_gather_items', side_effect=[
+                 iter([{'_id': 'a', 'content': 'a', 'lastUpdated': datetime(2024, 1, 1)}]),
+                 iter([late])
+             ]) as mock_iter:
+            cache.load()
+
+        assert 'query' in mock_iter.call_args_list[1].kwargs
+        assert set(cache._items) == {'a', 'late'}
+        closed.set()
+        cache.close()
+
+    def test_polling_never_rereads_whole_collection(self):
+        """Test that polling an empty collection filters by the load time"""
+        from app.clients import gather_cache
+
+        cache = gather_cache.GatherItemCache('project-1', use_change_streams=False, poll_interval=0)
+
+        with patch.object(gather_cache, 'iter_gather_items', side_effect=[iter([]), iter([])]) as mock_iter:
+            cache.get_items()
+            cache.get_items()
+
+        query = mock_iter.call_args_list[1].kwargs['query']
+        assert isinstance(query['lastUpdated']['$gt'], datetime)
+
+    def test_project_caches_are_bounded(self):
+        """Test that least recently used and idle project caches are closed and dropped"""
+        from app.clients import gather_cache
+        from app.config.settings import settings
+
+        gather_cache.clear_gather_caches()
+        try:
+            with patch.object(settings, 'gather_cache_max_projects', 2), \
+                 patch.object(gather_cache.GatherItemCache, 'close') as mock_close:
+                first = gather_cache.get_gather_cache('project-1')
+                gather_cache.get_gather_cache('project-2')
+                gather_cache.get_gather_cache('project-1')
+                gather_cache.get_gather_cache('project-3')
+
+                assert list(gather_cache._gather_caches) == ['project-1', 'project-3']
+                assert gather_cache.get_gather_cache('project-1') is first
+                assert mock_close.call_count == 1
+
+                with patch.object(settings, 'gather_cache_idle_ttl', -1):
+                    gather_cache.get_gather_cache('project-4')
+                assert list(gather_cache._gather_caches) == ['project-4']
+        finally:
+            gather_cache.clear_gather_caches()
+
+
+class TestPayloadClient:
+    """Test pooled Payload client and department cache"""
+
+    def _client(self, handler, ttl=0):
+        import os
+        import httpx
+        from app.clients.payload_client import PayloadClient
+
+        client = PayloadClient(department_cache_ttl=ttl)
+        client._client = httpx.Client(transport=httpx.MockTransport(handler))
+        client._client_pid = os.getpid()
+        return client
+
+    def test_departments_revalidated_with_etag(self):
+        """Test that an expired cache entry is revalidated and 304 reuses it"""
+        import httpx
+
+        requests_seen = []
+
+        def handler(request):
+            requests_seen.append(request)
+            if request.headers.get('If-None-Match') == '"v1"':
+                return httpx.Response(304)
+            return httpx.Response(
+                200,
+                json={'docs': [{'id': 'd1', 'slug': 'story', 'codeDepNumber': 1}]},
+                headers={'ETag': '"v1"'}
+            )
+
+        client = self._client(handler, ttl=0)
+        first = client.query_departments('project-1')
+        second = client.query_departments('project-1')
+
+        assert [d['slug'] for d in first] == ['story']
+        assert second == first
+        assert 'If-None-Match' not in requests_seen[0].headers
+        assert requests_seen[1].headers['If-None-Match'] == '"v1"'
+
+    def test_departments_served_from_cache_within_ttl(self):
+        """Test that a fresh cache entry avoids the request entirely"""
+        import httpx
+
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            return httpx.Response(200, json={'docs': [{'slug': 'story'}]})
+
+        client = self._client(handler, ttl=3600)
+        client.query_departments('project-1')
+        client.query_departments('project-1')
+
+        assert len(calls) == 1
+
+    def test_stale_departments_used_on_error(self):
+        """Test that errors fall back to the last cached list before mocks"""
+        import httpx
+
+        responses = [
+            httpx.Response(200, json={'docs': [{'slug': 'story'}]}),
+            httpx.Response(500)
+        ]
+
+        client = self._client(lambda request: responses.pop(0), ttl=0)
+        client.query_departments('project-1')
+
+        assert [d['slug'] for d in client.query_departments('project-1')] == ['story']
+
+    def test_async_query_uses_shared_cache(self):
+        """Test that the async variant shares the department cache"""
+        import asyncio
+        import time
+        import httpx
+
+        client = self._client(lambda request: httpx.Response(500), ttl=3600)
+        client._department_cache['project-1'] = {
+            'departments': [{'slug': 'story'}],
+            'etag': None,
+            'fetched_at': time.monotonic()
+        }
+
+        departments = asyncio.run(client.query_departments_async('project-1'))
+        assert departments == [{'slug': 'story'}]
+
+    def test_batch_trigger_falls_back_to_single_requests(self):
+        """Test that a failed batch request is retried one department at a time"""
+        import httpx
+
+        paths = []
+
+        def handler(request):
+            paths.append(request.url.path)
+            if request.url.path.endswith('/batch'):
+                return httpx.Response(404)
+            return httpx.Response(201, json={'task_id': 'task-1'})
+
+        client = self._client(handler)
+
+        assert client.trigger_evaluations('project-1', [1, 2]) is True
+        assert paths == [
+            '/api/v1/tasks/submit/batch',
+            '/api/v1/tasks/submit',
+            '/api/v1/tasks/submit'
+        ]
+
+    def test_batch_trigger_not_resent_when_maybe_enqueued(self):
+        """Test that a batch that timed out, failed server-side or was invalid is not triggered again"""
+        import httpx
+
+        for failure in (httpx.ReadTimeout("timed out"), httpx.Response(503), httpx.Response(422)):
+            paths = []
+
+            def handler(request, failure=failure):
+                paths.append(request.url.path)
+                if isinstance(failure, Exception):
+                    raise failure
+                return failure
+
+            client = self._client(handler)
+
+            assert client.trigger_evaluations('project-1', [1, 2]) is False
+            assert paths == ['/api/v1/tasks/submit/batch']
+
+    def test_batch_trigger_falls_back_when_unreachable(self):
+        """Test that a batch that never reached the service is retried one department at a time"""
+        import httpx
+
+        paths = []
+
+        def handler(request):
+            paths.append(request.url.path)
+            if request.url.path.endswith('/batch'):
+                raise httpx.ConnectError("connection refused")
+            return httpx.Response(201, json={'task_id': 'task-1'})
+
+        client = self._client(handler)
+
+        assert client.trigger_evaluations('project-1', [1, 2]) is True
+        assert len(paths) == 3
+
+    def test_throttled_triggers_stay_queued_until_retry_after(self):
+        """Test that a 429 keeps the triggers queued instead of resending them one by one"""
+        import time
+        import httpx
+        from app.clients import payload_client
+
+        paths = []
+
+        def handler(request):
+            paths.append(request.url.path)
+            return httpx.Response(429, headers={'Retry-After': '60'})
+
+        client = self._client(handler)
+        batcher = payload_client.EvaluationTriggerBatcher('project-1', max_batch=2, max_delay=3600)
+        batcher.add(1)
+        batcher.add(2)
+
+        with patch.object(payload_client, 'payload_client', client):
+            assert batcher.flush_if_due() is False
+
+        assert paths == ['/api/v1/tasks/submit/batch']
+        assert batcher.pending == [1, 2]
+        assert batcher.retry_at >= time.time() + 59
+        assert not batcher.due()
+        restored = payload_client.EvaluationTriggerBatcher.from_dict(batcher.to_dict())
+        assert restored.retry_at == batcher.retry_at
+
+    def test_evaluation_batcher_flushes_when_full_or_late(self):
+        """Test that queued triggers flush by size or age, once per department"""
+        from app.clients import payload_client
+
+        batcher = payload_client.EvaluationTriggerBatcher('project-1', max_batch=2, max_delay=3600)
+
+        with patch.object(payload_client, 'trigger_department_evaluations', return_value=True) as mock_trigger:
+            batcher.add(1)
+            batcher.add(1)
+            batcher.flush_if_due()
+            mock_trigger.assert_not_called()
+
+            batcher.add(2)
+            batcher.flush_if_due()
+            mock_trigger.assert_called_once_with('project-1', [1, 2])
+
+            batcher.add(3)
+            batcher.first_queued_at -= 7200
+            restored = payload_client.EvaluationTriggerBatcher.from_dict(batcher.to_dict())
+            restored.max_delay = 3600
+            assert restored.due()
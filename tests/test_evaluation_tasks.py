@@ -5,6 +5,15 @@ import pytest
 from unittest.mock import Mock, patch, AsyncMock
 from datetime import datetime
 from app.tasks.evaluation_tasks import EvaluateDepartmentTask, evaluate_department
+from app.config.settings import settings
+
+
+@pytest.fixture(autouse=True)
+def no_evaluation_cache():
+    """Run evaluations without the Redis evaluation cache unless a test opts in"""
+    with patch('app.tasks.evaluation_tasks.evaluation_cache') as mock_cache:
+        mock_cache.get.return_value = None
+        yield mock_cache
 
 
 class TestEvaluateDepartmentTask:
@@ -225,6 +234,270 @@ class TestEvaluateDepartmentTask:
         assert result["processing_time"] == 0.0
 
 
+class TestPromptBudget:
+    """Test token-budgeted gather content assembly"""
+
+    def test_small_gather_set_is_kept_verbatim(self):
+        """Test that content under budget keeps every item in full"""
+        from app.utils.prompt_budget import build_budgeted_content
+
+        items = [
+            {"content": "Content 1", "summary": "Summary 1", "context": "Context 1"},
+            {"content": "Content 2", "summary": "Summary 2"}
+        ]
+
+        text, stats = build_budgeted_content(items, token_budget=1000)
+
+        assert "Item 1:\nContent 1" in text
+        assert "Item 2:\nContent 2" in text
+        assert stats["items_included"] == 2
+        assert stats["items_summarized"] == 0
+        assert stats["tokens_saved"] == 0
+
+    def test_large_gather_set_fits_budget(self):
+        """Test that oversized content is deduplicated, ranked and summarized"""
+        from app.utils.prompt_budget import build_budgeted_content, estimate_tokens
+
+        items = [
+            {"content": f"Scene {i} " + "filler text " * 50, "summary": f"Scene {i} summary"}
+            for i in range(200)
+        ]
+        items.append({"content": "Lighting plan for the visual department", "summary": "Lighting"})
+        items.append(dict(items[0]))
+
+        text, stats = build_budgeted_content(items, token_budget=2000, query="visual")
+
+        assert estimate_tokens(text) <= 2000
+        assert stats["duplicates_removed"] == 1
+        assert stats["items_summarized"] > 0
+        assert stats["tokens_saved"] > 0
+        assert "Lighting plan for the visual department" in text
+        assert "Additional items (summarized" in text
+
+    def test_merged_tail_lines_name_their_items(self):
+        """Test that merged tail lines count their items and keep each item's first clause"""
+        from app.utils.prompt_budget import _summarize_tail, estimate_tokens
+
+        items = [
+            {"summary": f"Shot {i} establishes the harbor. Camera drifts over the rooftops at dusk"}
+            for i in range(30)
+        ]
+
+        text = _summarize_tail(items, token_budget=150)
+
+        assert estimate_tokens(text) <= 150
+        lines = text.splitlines()
+        assert len(lines) < 30
+        assert all(line.startswith("- [") and " items] " in line for line in lines)
+        assert sum(int(line[3:line.index(" items]")]) for line in lines) == 30
+        assert "Shot 0 establishes the harbor." in lines[0]
+        assert "Camera drifts" not in text
+        assert "more" in lines[0]
+
+    def test_evaluation_metadata_reports_prompt_tokens(self):
+        """Test that evaluation results report prompt token usage and savings"""
+        task = EvaluateDepartmentTask()
+
+        gather_data = [{"content": "word " * 2000, "summary": f"Item {i}"} for i in range(50)]
+
+        with patch.object(task, 'run_async_in_sync', return_value={}), \
+             patch('app.tasks.evaluation_tasks.task_storage') as mock_storage, \
+             patch.object(settings, 'evaluation_prompt_token_budget', 5000):
+            result = task.execute_task(
+                project_id="test-project-123",
+                department_slug="story",
+                department_number=1,
+                gather_data=gather_data,
+                threshold=80
+            )
+
+        assert result["metadata"]["prompt_tokens"] <= 5000
+        assert result["metadata"]["prompt_tokens_saved"] > 0
+        mock_storage.increment_metric.assert_any_call(
+            "evaluation_prompt_tokens_saved", result["metadata"]["prompt_tokens_saved"]
+        )
+
+
+class TestEvaluationCache:
+    """Test content-hash memoized evaluations"""
+
+    def test_cache_key_is_canonical(self):
+        """Test that item order does not matter but any input change does"""
+        from app.storage.evaluation_cache import evaluation_cache_key
+
+        items = [{"content": "A", "summary": "a"}, {"content": "B"}]
+        previous = [{"department": "story", "rating": 85, "summary": "Good"}]
+        key = evaluation_cache_key("character", items, previous, 80, "model-a", 12000)
+
+        assert key == evaluation_cache_key("character", list(reversed(items)), previous, 80, "model-a", 12000)
+        assert key != evaluation_cache_key("character", items, previous, 85, "model-a", 12000)
+        assert key != evaluation_cache_key("character", items, previous, 80, "model-b", 12000)
+        assert key != evaluation_cache_key(
+            "character", items, [{"department": "story", "rating": 70}], 80, "model-a", 12000
+        )
+        assert key != evaluation_cache_key(
+            "character", [{"content": "A", "summary": "changed"}, {"content": "B"}],
+            previous, 80, "model-a", 12000
+        )
+
+    def test_identical_request_skips_evaluator(self, no_evaluation_cache):
+        """Test that a second identical evaluation is served from the cache"""
+        task = EvaluateDepartmentTask()
+        gather_data = [{"content": "Story outline", "summary": "Outline"}]
+        stored = {}
+
+        no_evaluation_cache.get.side_effect = lambda key: stored.get(key)
+        no_evaluation_cache.set.side_effect = lambda key, entry: stored.setdefault(key, entry)
+
+        with patch.object(task, 'run_async_in_sync', return_value={}), \
+             patch('app.tasks.evaluation_tasks.task_storage'):
+            first = task.execute_task(
+                project_id="test-project-123",
+                department_slug="story",
+                department_number=1,
+                gather_data=gather_data,
+                threshold=80
+            )
+            with patch.object(task, '_call_ai_evaluator') as mock_ai:
+                second = task.execute_task(
+                    project_id="test-project-123",
+                    department_slug="story",
+                    department_number=1,
+                    gather_data=gather_data,
+                    threshold=80
+                )
+
+        mock_ai.assert_not_called()
+        assert first["metadata"]["cache_hit"] is False
+        assert second["metadata"]["cache_hit"] is True
+        assert second["rating"] == first["rating"]
+        assert second["issues"] == first["issues"]
+
+
+class TestMapReduceEvaluation:
+    """Test chunked evaluation of large gather sets"""
+
+    def test_large_gather_set_is_evaluated_in_chunks(self):
+        """Test that items are partitioned and chunk results reduced into the usual schema"""
+        task = EvaluateDepartmentTask()
+        gather_data = [{"content": f"Item {i}", "summary": f"Summary {i}"} for i in range(25)]
+        chunk_ratings = iter([90, 60, 70])
+
+        def fake_evaluator(prompt, department, threshold):
+            return {
+                "rating": next(chunk_ratings),
+                "summary": "Chunk summary",
+                "issues": ["Shared issue", f"Issue {len(prompt)}"],
+                "suggestions": ["Shared suggestion"],
+                "confidence": 0.8,
+                "model": "test-model",
+                "tokens_used": 100
+            }
+
+        with patch.object(task, 'run_async_in_sync', return_value={}), \
+             patch.object(task, '_call_ai_evaluator', side_effect=fake_evaluator) as mock_ai, \
+             patch('app.tasks.evaluation_tasks.task_storage'), \
+             patch.object(settings, 'evaluation_map_reduce_threshold', 20), \
+             patch.object(settings, 'evaluation_chunk_size', 10), \
+             patch.object(settings, 'evaluation_map_concurrency', 1):
+            result = task.execute_task(
+                project_id="test-project-123",
+                department_slug="story",
+                department_number=1,
+                gather_data=gather_data,
+                threshold=80
+            )
+
+        assert mock_ai.call_count == 3
+        # Weighted by chunk size: (90*10 + 60*10 + 70*5) / 25
+        assert result["rating"] == 74
+        assert result["evaluation_result"] == "fail"
+        assert result["issues"][0] == "Shared issue"
+        assert result["issues"].count("Shared issue") == 1
+        assert result["suggestions"] == ["Shared suggestion"]
+        assert result["metadata"]["tokens_used"] == 300
+        assert result["metadata"]["chunks"] == 3
+        assert result["metadata"]["items_included"] == 25
+
+    def test_reduce_ignores_fallback_chunks(self):
+        """Test that chunks whose evaluation failed do not drag the rating down"""
+        task = EvaluateDepartmentTask()
+
+        reduced = task._reduce_chunk_evaluations(
+            [
+                {"rating": 80, "summary": "Good", "issues": [], "suggestions": [], "model": "m"},
+                {"rating": 50, "summary": "Failed", "issues": [], "suggestions": [], "model": "fallback"}
+            ],
+            [10, 10]
+        )
+
+        assert reduced["rating"] == 80
+
+
+class TestPayloadClaimCheck:
+    """Test passing large task payloads by reference"""
+
+    def _store(self):
+        from app.storage.payload_store import PayloadStore
+
+        blobs = {}
+        store = PayloadStore()
+        store.redis_client = Mock()
+        store.redis_client.set.side_effect = (
+            lambda key, value, ex=None, nx=False: None if nx and key in blobs else blobs.setdefault(key, value)
+        )
+        store.redis_client.get.side_effect = blobs.get
+        return store, blobs
+
+    def test_large_fields_are_offloaded_once(self):
+        """Test that only large fields become references and identical payloads are stored once"""
+        from app.storage.payload_store import is_payload_ref
+
+        store, blobs = self._store()
+        gather_data = [{"content": "x" * 100} for _ in range(20)]
+        task_data = {"department_slug": "story", "gather_data": gather_data, "previous_evaluations": []}
+
+        first = store.offload(task_data, ("gather_data", "previous_evaluations"), threshold=1000)
+        second = store.offload(task_data, ("gather_data", "previous_evaluations"), threshold=1000)
+
+        assert is_payload_ref(first["gather_data"])
+        assert first["previous_evaluations"] == []
+        assert first["department_slug"] == "story"
+        assert first["gather_data"] == second["gather_data"]
+        assert len(blobs) == 1
+        assert store.resolve(first["gather_data"]) == gather_data
+
+    def test_missing_payload_raises(self):
+        """Test that an expired reference fails loudly instead of evaluating nothing"""
+        from app.storage.payload_store import PayloadNotFoundError, PAYLOAD_REF_KEY
+
+        store, _ = self._store()
+
+        with pytest.raises(PayloadNotFoundError):
+            store.resolve({PAYLOAD_REF_KEY: "missing"})
+
+    def test_evaluation_resolves_references(self):
+        """Test that the evaluation task loads referenced gather data"""
+        task = EvaluateDepartmentTask()
+        store, _ = self._store()
+        gather_data = [{"content": "Story outline", "summary": "Outline"}]
+        ref = store.put(gather_data)
+
+        with patch('app.tasks.evaluation_tasks.payload_store', store), \
+             patch.object(task, 'run_async_in_sync', return_value={}), \
+             patch('app.tasks.evaluation_tasks.task_storage'):
+            result = task.execute_task(
+                project_id="test-project-123",
+                department_slug="story",
+                department_number=1,
+                gather_data=ref,
+                threshold=80
+            )
+
+        assert result["rating"] > 0
+        assert result["metadata"]["items_included"] == 1
+
+
 class TestEvaluateDepartmentCeleryTask:
     """Test the Celery task wrapper"""
     
@@ -0,0 +1,557 @@
+"""
+Test GPU telemetry, GPU admission, placement and model affinity
+"""
+import pytest
+from unittest.mock import Mock, patch, MagicMock
+
+
+class TestGpuTelemetry:
+    """Test GPU telemetry sampling"""
+
+    def test_provider_must_implement_sample(self):
+        """Test that the provider base class cannot be used without a sample method"""
+        from app.gpu.telemetry import GpuProvider
+
+        with pytest.raises(TypeError):
+            GpuProvider()
+
+    def test_fake_provider_samples(self):
+        """Test that the fake provider reports configured devices"""
+        from app.gpu import FakeGpuProvider
+
+        provider = FakeGpuProvider(memory_total=16 * 1024 ** 3)
+        provider.set(1, utilization=0.75, memory_used=4 * 1024 ** 3)
+
+        samples = provider.sample([0, 1])
+
+        assert samples[0] == {"device": 0, "utilization": 0.0, "memory_used": 0, "memory_total": 16 * 1024 ** 3}
+        assert samples[1]["utilization"] == 0.75
+        assert samples[1]["memory_used"] == 4 * 1024 ** 3
+
+    def test_create_provider(self):
+        """Test provider selection from settings"""
+        from app.gpu import FakeGpuProvider, create_provider
+        from app.gpu import telemetry
+
+        assert isinstance(create_provider("fake"), FakeGpuProvider)
+        assert create_provider("none") is None
+        with patch.object(telemetry, 'NVML_AVAILABLE', False):
+            assert create_provider("auto") is None
+
+    def test_publish_writes_node_hash_in_one_pipeline(self):
+        """Test that a node's samples are stored with a TTL"""
+        import json
+        from app.gpu import GpuTelemetry
+
+        store = GpuTelemetry()
+        store.redis_client = MagicMock()
+        pipe = store.redis_client.pipeline.return_value
+
+        assert store.publish("gpu-worker@host", [{"device": 0, "utilization": 0.5,
+                                                  "memory_used": 1, "memory_total": 2}]) is True
+
+        node_key = f"{store.key_prefix}node:gpu-worker@host"
+        mapping = pipe.hset.call_args.kwargs["mapping"]
+        assert json.loads(mapping["0"])["utilization"] == 0.5
+        pipe.expire.assert_called_once_with(node_key, store._ttl())
+        pipe.sadd.assert_called_once_with(store.nodes_key, "gpu-worker@host")
+        pipe.execute.assert_called_once()
+
+    def test_sampler_requires_devices_and_provider(self):
+        """Test that CPU-only nodes do not start a sampler"""
+        from app.gpu import GpuTelemetry, FakeGpuProvider
+
+        store = GpuTelemetry()
+        with patch('app.gpu.telemetry.create_provider', return_value=None):
+            assert store.start_sampler("cpu-worker@host") is False
+        assert store.start_sampler("gpu-worker@host", provider=FakeGpuProvider(), devices=[]) is False
+
+    def test_worker_gpu_utilization_from_telemetry(self):
+        """Test that the workers endpoint averages device utilization"""
+        from app.config.worker_status import build_worker_statuses
+
+        gpu_samples = {"gpu-worker@host": [
+            {"device": 0, "utilization": 0.5, "memory_used": 0, "memory_total": 1},
+            {"device": 1, "utilization": 1.0, "memory_used": 0, "memory_total": 1}
+        ]}
+        workers = build_worker_statuses(
+            active={"gpu-worker@host": []}, reserved={}, stats={"gpu-worker@host": {}},
+            active_queues={}, heartbeats={}, gpu_samples=gpu_samples, now=1000.0
+        )
+
+        assert workers[0]["gpu_utilization"] == 0.75
+        assert len(workers[0]["gpus"]) == 2
+
+
+class TestGpuAdmission:
+    """Test GPU-memory-aware admission on GPU workers"""
+
+    def setup_method(self):
+        from app.gpu.admission import GpuAdmission
+
+        self.admission = GpuAdmission()
+        self.admission.redis_client = MagicMock()
+        self.admission._acquire_script = MagicMock(return_value=1)
+
+    def test_parse_memory_size(self):
+        """Test memory size strings from settings"""
+        from app.config.settings import parse_memory_size
+
+        assert parse_memory_size("8GB") == 8 * 1024 ** 3
+        assert parse_memory_size("512MiB") == 512 * 1024 ** 2
+        assert parse_memory_size("1.5G") == int(1.5 * 1024 ** 3)
+        assert parse_memory_size("1024") == 1024
+        with pytest.raises(ValueError):
+            parse_memory_size("lots")
+
+    def test_estimate_scales_with_params(self):
+        """Test that larger jobs declare more memory, up to the per-task maximum"""
+        from app.config.settings import settings
+        from app.gpu import estimate_gpu_memory
+
+        video = 'app.tasks.video_tasks.process_video_generation'
+        small = estimate_gpu_memory(video, {"video_params": {"resolution": "1280x720", "duration": 10}})
+        large = estimate_gpu_memory(video, {"video_params": {"resolution": "1920x1080", "duration": 60}})
+        assert small < large
+
+        with patch.object(settings, 'max_gpu_memory_per_task', '6GB'):
+            assert estimate_gpu_memory(video, {"video_params": {"resolution": "3840x2160"}}) == 6 * 1024 ** 3
+            assert estimate_gpu_memory("unknown_gpu_task", {}) == 6 * 1024 ** 3
+
+    def test_declared_memory_wins(self):
+        """Test an explicit gpu_memory in the task params"""
+        from app.gpu import estimate_gpu_memory
+
+        kwargs = {"image_params": {"width": 2048, "height": 2048, "gpu_memory": "2GB"}}
+        assert estimate_gpu_memory('app.tasks.image_tasks.process_image_generation', kwargs) == 2 * 1024 ** 3
+
+    def test_acquire_pins_process_to_device(self):
+        """Test that the first reservation pins the process to that device"""
+        import os
+
+        self.admission._devices_by_free_budget = Mock(return_value=[2, 0])
+        self.admission.device_capacity = Mock(return_value=23 * 1024 ** 3)
+
+        with patch.dict(os.environ, {}, clear=False):
+            assert self.admission.acquire("task-1", 4 * 1024 ** 3) == 2
+            assert os.environ["CUDA_VISIBLE_DEVICES"] == "2"
+
+        assert self.admission.pinned_device == 2
+        self.admission._acquire_script.reset_mock()
+        self.admission.acquire("task-2", 4 * 1024 ** 3)
+        keys = self.admission._acquire_script.call_args.kwargs["keys"]
+        assert keys == [self.admission._key(2)]
+
+    def test_acquire_without_budget(self):
+        """Test that no device is returned when every budget is used"""
+        self.admission._acquire_script.return_value = 0
+        self.admission._devices_by_free_budget = Mock(return_value=[0, 1])
+        self.admission.device_capacity = Mock(return_value=23 * 1024 ** 3)
+
+        assert self.admission.acquire("task-1", 8 * 1024 ** 3) is None
+        assert self.admission.pinned_device is None
+
+    def test_admit_requeues_without_budget(self):
+        """Test that a task without budget is retried at once instead of waiting in its slot"""
+        from celery.exceptions import Retry
+        from app.config.settings import settings
+        from app.tasks.video_tasks import process_video_generation
+
+        self.admission.acquire = Mock(return_value=None)
+        with patch.object(process_video_generation, 'retry', side_effect=Retry()) as retry, \
+             patch('app.gpu.admission.time.sleep') as sleep:
+            with pytest.raises(Retry):
+                self.admission.admit(process_video_generation, "task-1", {"video_params": {}})
+
+        self.admission.acquire.assert_called_once()
+        sleep.assert_not_called()
+        assert retry.call_args.kwargs["countdown"] == settings.gpu_admission_retry_delay
+
+    def test_model_load_hands_reservation_to_registry(self):
+        """Test that a first load is not counted by both the task and the registry"""
+        import os
+        from app.gpu import model_size
+        from app.gpu.models import DEFAULT_VIDEO_MODEL
+        from app.tasks.video_tasks import process_video_generation
+
+        self.admission._devices_by_free_budget = Mock(return_value=[0])
+        self.admission.device_capacity = Mock(return_value=23 * 1024 ** 3)
+        with patch.dict(os.environ, {}, clear=False), \
+             patch('app.gpu.admission.model_registry.is_resident', return_value=False), \
+             patch('app.gpu.admission.estimate_gpu_memory', return_value=6 * 1024 ** 3):
+            assert self.admission.admit(process_video_generation, "task-1", {"video_params": {}}) == 0
+
+        self.admission.model_reserved(DEFAULT_VIDEO_MODEL)
+
+        key, field, value = self.admission.redis_client.hset.call_args.args
+        assert (key, field) == (self.admission._key(0), "task-1")
+        assert int(value.split('|')[0]) == 6 * 1024 ** 3 - model_size(DEFAULT_VIDEO_MODEL)
+
+        # Later loads of the same model leave the task alone
+        self.admission.redis_client.hset.reset_mock()
+        self.admission.model_reserved(DEFAULT_VIDEO_MODEL)
+        self.admission.redis_client.hset.assert_not_called()
+
+    def test_admit_fails_open(self):
+        """Test that a Redis outage does not block GPU tasks"""
+        from app.tasks.video_tasks import process_video_generation
+
+        self.admission.acquire = Mock(side_effect=ConnectionError("redis down"))
+        assert self.admission.admit(process_video_generation, "task-1", {}) is None
+
+    def test_admit_skips_cpu_tasks(self):
+        """Test that CPU queue tasks start without a reservation"""
+        from app.tasks.audio_tasks import process_audio_generation
+
+        self.admission.acquire = Mock()
+        assert self.admission.admit(process_audio_generation, "task-1", {}) is None
+        self.admission.acquire.assert_not_called()
+
+    def test_release_returns_reservation(self):
+        """Test that finishing a task frees its memory"""
+        self.admission._leases["task-1"] = 1
+
+        assert self.admission.release("task-1") is True
+        self.admission.redis_client.hdel.assert_called_once_with(self.admission._key(1), "task-1")
+        assert self.admission.release("task-1") is False
+
+
+class TestGpuPlacement:
+    """Test per-device process pinning and task placement"""
+
+    def setup_method(self):
+        from app.gpu.placement import GpuPlacement
+
+        self.placement = GpuPlacement()
+        self.placement.redis_client = MagicMock()
+
+    def _devices(self, *loads):
+        from app.gpu import device_queue
+
+        return [
+            {
+                'queue': device_queue('gpu_medium', 'render-01', device),
+                'base_queue': 'gpu_medium',
+                'host': 'render-01',
+                'device': device,
+                'capacity': 23 * 1024 ** 3,
+                'load': load * 1024 ** 3
+            }
+            for device, load in enumerate(loads)
+        ]
+
+    def test_choose_device_best_fit(self):
+        """Test that a task goes to the fullest device it still fits on"""
+        from app.gpu import choose_device
+
+        devices = self._devices(0, 15, 20)
+
+        assert choose_device(6 * 1024 ** 3, devices)['device'] == 1
+        assert choose_device(2 * 1024 ** 3, devices)['device'] == 2
+        assert choose_device(20 * 1024 ** 3, devices)['device'] == 0
+        assert choose_device(24 * 1024 ** 3, devices) is None
+
+    def test_pin_process_round_robin(self):
+        """Test that pool processes are spread over the devices"""
+        import os
+        from app.gpu import gpu_admission, pin_process
+
+        with patch.dict(os.environ, {}, clear=False), \
+             patch.object(gpu_admission, 'pinned_device', None):
+            assert pin_process(0, [0, 1]) == 0
+            assert pin_process(3, [0, 1]) == 1
+            assert os.environ["CUDA_VISIBLE_DEVICES"] == "1"
+            assert gpu_admission.pinned_device == 1
+
+        assert pin_process(0, []) is None
+
+    def test_place_routes_to_device_queue(self):
+        """Test that a GPU task is sent to its device queue and counted as pending"""
+        from app.config.settings import settings
+        from app.tasks.image_tasks import process_image_generation
+
+        self.placement.get_devices = Mock(return_value=self._devices(0, 15))
+        signature = process_image_generation.s(image_params={"gpu_memory": "4GB"})
+
+        with patch.object(settings, 'gpu_routing_mode', 'device'):
+            placed = self.placement.place(signature, 'gpu_medium')
+
+        assert placed.options['queue'] == 'gpu_medium.render-01.gpu1'
+        key, task_id, entry = self.placement.redis_client.hset.call_args.args
+        assert key == 'gpu_placement:pending:gpu_medium.render-01.gpu1'
+        assert task_id == placed.options['task_id']
+        assert entry.startswith(f"{4 * 1024 ** 3}|")
+
+    def test_place_falls_back_to_shared_queue(self):
+        """Test that a task no device has room for stays on the shared queue"""
+        from app.config.settings import settings
+        from app.tasks.image_tasks import process_image_generation
+
+        self.placement.get_devices = Mock(return_value=self._devices(22, 22))
+        signature = process_image_generation.s(image_params={"gpu_memory": "4GB"})
+
+        with patch.object(settings, 'gpu_routing_mode', 'device'):
+            placed = self.placement.place(signature, 'gpu_medium')
+
+        assert 'queue' not in placed.options
+        self.placement.redis_client.hset.assert_not_called()
+
+    def test_place_shared_mode_is_noop(self):
+        """Test that shared routing leaves signatures untouched"""
+        from app.tasks.image_tasks import process_image_generation
+
+        self.placement.get_devices = Mock()
+        signature = process_image_generation.s(image_params={})
+
+        assert self.placement.place(signature, 'gpu_medium') is signature
+        self.placement.get_devices.assert_not_called()
+
+    def test_queue_depth_includes_device_queues(self):
+        """Test that admission control counts tasks waiting on device queues"""
+        from app.config.settings import settings
+        from app.scheduling import AdmissionController
+        from app.gpu import gpu_placement
+
+        controller = AdmissionController()
+        controller.redis_client = MagicMock()
+        controller.redis_client.pipeline.return_value.execute.return_value = (
+            [2] + [0] * 9 + [3] + [0] * 9 + [0, 4] + [0] * 8
+        )
+
+        with patch.object(settings, 'gpu_routing_mode', 'device'), \
+             patch.object(gpu_placement, 'get_registrations', return_value=self._devices(0, 0)):
+            assert controller.get_depth('gpu_medium') == 9
+
+
+class TestModelRegistry:
+    """Test warm model residency in GPU worker processes"""
+
+    GB = 1024 ** 3
+
+    def setup_method(self):
+        from app.gpu import ModelRegistry
+
+        self.registry = ModelRegistry(budget=10 * self.GB)
+        self.loads = []
+        for model in ("model-a", "model-b", "model-c"):
+            self.registry.register_loader(model, self._loader)
+
+    def _loader(self, model):
+        self.loads.append(model)
+        return Mock(name=model)
+
+    def test_models_stay_resident(self):
+        """Test that a model is loaded once and reused by later tasks"""
+        from app.config.settings import settings
+
+        with patch.object(settings, 'gpu_model_sizes', 'model-a:4GB'):
+            first = self.registry.get("model-a")
+            assert self.registry.get("model-a") is first
+
+        assert self.loads == ["model-a"]
+        stats = self.registry.get_stats()
+        assert stats["hits"] == 1 and stats["misses"] == 1
+        assert stats["hit_rate"] == 0.5
+
+    def test_lru_eviction_by_vram_budget(self):
+        """Test that the least recently used model is unloaded to make room"""
+        from app.config.settings import settings
+
+        with patch.object(settings, 'gpu_model_sizes', 'model-a:4GB,model-b:4GB,model-c:4GB'):
+            model_a = self.registry.get("model-a")
+            self.registry.get("model-b")
+            self.registry.get("model-a")
+            self.registry.get("model-c")
+
+        assert [entry["model"] for entry in self.registry.resident()] == ["model-a", "model-c"]
+        assert self.registry.resident_bytes() == 8 * self.GB
+        model_a.close.assert_not_called()
+
+    def test_unloaded_model_is_closed(self):
+        """Test that evicting a model releases it"""
+        model = self.registry.get("model-a")
+
+        assert self.registry.evict("model-a") is True
+        model.close.assert_called_once()
+        assert not self.registry.is_resident("model-a")
+        assert self.registry.evict("model-a") is False
+
+    def test_resident_models_reserve_admission_budget(self):
+        """Test that resident models hold memory on the pinned device"""
+        import os
+        from app.gpu import gpu_admission
+
+        with patch.object(gpu_admission, 'pinned_device', 1), \
+             patch.object(gpu_admission, 'redis_client') as redis_client:
+            self.registry.get("model-a")
+
+        key, field, entry = redis_client.hset.call_args.args
+        assert key == gpu_admission._key(1)
+        assert field == f"models:{os.getpid()}"
+        assert entry.startswith(f"{self.registry.resident_bytes()}|")
+
+    def test_admission_skips_resident_model(self):
+        """Test that a task on a process holding its model reserves only the rest"""
+        from app.gpu import GpuAdmission, estimate_gpu_memory, model_registry, model_size
+        from app.tasks.image_tasks import process_image_generation
+
+        admission = GpuAdmission()
+        admission.pinned_device = 0
+        admission.acquire = Mock(return_value=0)
+        kwargs = {"image_params": {"model": "image-gen-v3.0"}}
+
+        with patch.object(model_registry, 'is_resident', return_value=True):
+            admission.admit(process_image_generation, "task-1", kwargs)
+
+        required = admission.acquire.call_args.args[1]
+        assert required == estimate_gpu_memory(process_image_generation.name, kwargs) - model_size("image-gen-v3.0")
+
+    def test_model_for_task(self):
+        """Test that tasks name their model in params or fall back to a default"""
+        from app.gpu import model_for
+
+        assert model_for('app.tasks.image_tasks.process_image_generation', {"image_params": {"model": "sdxl"}}) == "sdxl"
+        assert model_for('app.tasks.video_tasks.process_video_generation', {}) == "video-gen-v2.1"
+        assert model_for('app.tasks.image_tasks.process_image_generation_batch',
+                         {"requests": [{"image_params": {"model": "sdxl"}}]}) == "sdxl"
+        assert model_for('app.tasks.audio_tasks.process_audio_generation', {}) is None
+
+
+class TestModelAffinity:
+    """Test routing GPU tasks to workers that hold their model"""
+
+    def setup_method(self):
+        from app.gpu import ModelAffinity
+
+        self.affinity = ModelAffinity()
+        self.affinity.redis_client = MagicMock()
+        self.affinity.broker_client = MagicMock()
+
+    def _message(self, task_id, queue, routed_at=None):
+        import json
+
+        headers = {'id': task_id}
+        if routed_at is not None:
+            headers['model_affinity_routed_at'] = routed_at
+        return json.dumps({
+            'body': '',
+            'headers': headers,
+            'properties': {'priority': 5, 'delivery_info': {'exchange': queue, 'routing_key': queue}}
+        })
+
+    def test_model_queue_name(self):
+        """Test that model queues are named after their shared queue and model"""
+        from app.gpu import model_queue
+
+        assert model_queue('gpu_medium', 'image-gen-v3.0') == 'gpu_medium.model.image-gen-v3.0'
+
+    def test_routes_only_to_served_models(self):
+        """Test that a task goes to its model queue only when a node holds the model"""
+        import time
+        from app.config.settings import settings
+        from app.tasks.image_tasks import process_image_generation
+
+        signature = process_image_generation.s(
+            project_id="p1", image_prompt="castle", image_params={"model": "sdxl"}
+        )
+
+        with patch.object(settings, 'model_affinity_enabled', True):
+            self.affinity.redis_client.zcount.return_value = 0
+            assert self.affinity.route(signature.clone(), 'gpu_medium').options.get('queue') is None
+
+            self.affinity.redis_client.zcount.return_value = 1
+            before = time.time()
+            routed = self.affinity.route(signature, 'gpu_medium')
+
+        assert routed.options['queue'] == 'gpu_medium.model.sdxl'
+        assert routed.options['headers']['model_affinity_routed_at'] >= before
+
+    def test_route_noop_when_disabled_or_device_mode(self):
+        """Test that affinity only applies to shared GPU queues when enabled"""
+        from app.config.settings import settings
+        from app.tasks.image_tasks import process_image_generation
+
+        signature = process_image_generation.s(project_id="p1", image_prompt="castle", image_params={})
+        self.affinity.redis_client.zcount.return_value = 1
+
+        assert self.affinity.route(signature, 'gpu_medium') is signature
+        with patch.object(settings, 'model_affinity_enabled', True):
+            with patch.object(settings, 'gpu_routing_mode', 'device'):
+                assert self.affinity.route(signature, 'gpu_medium') is signature
+            assert self.affinity.route(signature, 'cpu_intensive') is signature
+        self.affinity.redis_client.zcount.assert_not_called()
+
+    def test_sweep_moves_overdue_messages_in_order(self):
+        """Test that tasks waiting past the wait move to the shared queue, oldest at the consuming end"""
+        import json
+        import time
+        from app.config.settings import settings
+
+        source = 'gpu_medium.model.sdxl'
+        now = time.time()
+        # Newest on the left; the broker consumes from the right
+        waiting = [
+            self._message("fresh", source, now),
+            self._message("overdue-2", source, now - 40),
+            self._message("overdue-1", source, now - 50)
+        ]
+        self.affinity.broker_client.lrange.side_effect = lambda key, start, end: (
+            waiting if key == f"{source}:5" else []
+        )
+        self.affinity._sweep_script = Mock(return_value=2)
+
+        with patch.object(settings, 'model_affinity_wait', 30.0):
+            assert self.affinity.sweep(source) == 2
+
+        self.affinity.broker_client.lrange.assert_any_call(f"{source}:5", -100, -1)
+        kwargs = self.affinity._sweep_script.call_args.kwargs
+        assert kwargs['keys'] == [f"{source}:5", "gpu_medium:5"]
+        assert kwargs['args'][:2] == waiting[1:]
+        moved = [json.loads(raw) for raw in kwargs['args'][2:]]
+        assert [message['headers']['id'] for message in moved] == ["overdue-2", "overdue-1"]
+        assert moved[0]['properties']['delivery_info'] == {'exchange': 'gpu_medium', 'routing_key': 'gpu_medium'}
+
+    def test_sweep_leaves_waiting_tasks(self):
+        """Test that tasks within their wait are left in the model queue"""
+        import time
+
+        source = 'gpu_medium.model.sdxl'
+        self.affinity.broker_client.lrange.return_value = [self._message("task-1", source, time.time())]
+        self.affinity._sweep_script = Mock()
+
+        assert self.affinity.sweep(source) == 0
+        self.affinity._sweep_script.assert_not_called()
+
+    def test_sweep_model_queues_once_per_interval(self):
+        """Test that a model queue another node swept recently is skipped"""
+        self.affinity.redis_client.smembers.return_value = {'gpu_medium.model.flux', 'gpu_medium.model.sdxl'}
+        self.affinity.redis_client.set.side_effect = lambda key, *args, **kwargs: key.endswith('sdxl')
+        self.affinity.sweep = Mock(return_value=3)
+
+        assert self.affinity.sweep_model_queues() == 3
+        self.affinity.sweep.assert_called_once_with('gpu_medium.model.sdxl')
+
+    def test_node_follows_resident_models(self):
+        """Test that a node consumes the queues of the models its processes hold"""
+        import os
+        import time
+
+        consumer = MagicMock(hostname="gpu-worker@render-01")
+        self.affinity._consumer = consumer
+        self.affinity._base_queues = ['gpu_medium']
+        now = time.time()
+        self.affinity.redis_client.hgetall.return_value = {
+            "101": f"sdxl,image-gen-v3.0|{now + 600}",
+            "102": f"flux|{now - 1}"
+        }
+
+        assert self.affinity.refresh_node() == {'gpu_medium.model.sdxl', 'gpu_medium.model.image-gen-v3.0'}
+        self.affinity.redis_client.hdel.assert_called_once_with(
+            self.affinity._adverts_key(self.affinity.host, os.getpid()), "102"
+        )
+        assert consumer.call_soon.call_count == 2
+
+        consumer.call_soon.reset_mock()
+        self.affinity.redis_client.hgetall.return_value = {"101": f"sdxl|{now + 600}"}
+        assert self.affinity.refresh_node() == {'gpu_medium.model.sdxl'}
+        consumer.call_soon.assert_called_once_with(consumer.cancel_task_queue, 'gpu_medium.model.image-gen-v3.0')
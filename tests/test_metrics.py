@@ -0,0 +1,415 @@
+"""
+Test fleet metrics, latency histograms, Prometheus export and worker status
+"""
+import pytest
+from unittest.mock import Mock, patch, MagicMock
+from datetime import datetime
+from fastapi.testclient import TestClient
+from app.main import app
+from app.middleware.auth import verify_api_key
+from app.config.monitoring import (
+    reset_task_metrics,
+    check_task_health,
+    task_metrics
+)
+
+
+# Mock API key verification for tests
+async def mock_verify_api_key():
+    return "test-api-key"
+
+
+# Override the dependency
+app.dependency_overrides[verify_api_key] = mock_verify_api_key
+
+
+class TestFleetMetrics:
+    """Test the shared Redis-backed metrics store"""
+
+    def setup_method(self):
+        """Create a store with a mocked Redis client"""
+        from app.storage import MetricsStore
+
+        self.store = MetricsStore()
+        self.store.redis_client = MagicMock()
+        # No background flush thread in tests
+        self.store._flusher_pid = __import__('os').getpid()
+        self.pipe = self.store.redis_client.pipeline.return_value
+
+    def test_flush_batches_updates_in_one_pipeline(self):
+        """Test that buffered updates are written together"""
+        self.store.increment("total_tasks")
+        self.store.increment("total_tasks")
+        self.store.increment("completed_tasks")
+        self.store.task_started("task-1", "process_image_generation", datetime.utcnow())
+
+        assert self.store.flush() is True
+
+        self.pipe.hincrby.assert_any_call(self.store.counters_key, "total_tasks", 2)
+        self.pipe.hincrby.assert_any_call(self.store.counters_key, "completed_tasks", 1)
+        assert "task-1" in self.pipe.hset.call_args.kwargs["mapping"]
+        self.pipe.execute.assert_called_once()
+
+    def test_task_started_and_finished_within_interval_not_published(self):
+        """Test that short tasks cost no running-task writes"""
+        self.store.task_started("task-1", "process_image_generation", datetime.utcnow())
+        self.store.task_finished("task-1")
+
+        self.store.flush()
+
+        self.store.redis_client.pipeline.assert_not_called()
+
+    def test_snapshot_prunes_stale_running_tasks(self):
+        """Test that tasks of lost workers are dropped after the task timeout"""
+        import json
+        from datetime import timedelta
+
+        fresh = datetime.utcnow() - timedelta(minutes=9)
+        stale = datetime.utcnow() - timedelta(days=2)
+        self.pipe.execute.return_value = [
+            {"total_tasks": "3"},
+            {
+                "fresh": json.dumps({"task_name": "a", "started_at": fresh.isoformat()}),
+                "stale": json.dumps({"task_name": "a", "started_at": stale.isoformat()})
+            },
+            set()
+        ]
+
+        snapshot = self.store.snapshot()
+
+        assert snapshot["counters"] == {"total_tasks": 3}
+        assert list(snapshot["running"]) == ["fresh"]
+        self.store.redis_client.hdel.assert_called_once_with(self.store.running_key, "stale")
+
+    def test_health_reflects_fleet_running_tasks(self):
+        """Test that long-running tasks on other workers raise alerts"""
+        from datetime import timedelta
+
+        reset_task_metrics()
+        fleet = {
+            "counters": {"total_tasks": 10, "completed_tasks": 9, "failed_tasks": 0},
+            "durations": {},
+            "running": {
+                "worker-task": {
+                    "task_name": "automated_gather_creation",
+                    "started_at": datetime.utcnow() - timedelta(minutes=9)
+                }
+            }
+        }
+
+        with patch('app.config.monitoring.metrics_store.snapshot', return_value=fleet):
+            health = check_task_health()
+
+        assert health["metrics"]["total_tasks"] == 10
+        assert health["metrics"]["currently_running"] == 1
+        assert any(alert.get("task_id") == "worker-task" for alert in health["alerts"])
+
+
+class TestLatencyHistograms:
+    """Test fixed-memory duration histograms"""
+
+    def test_percentiles_within_bucket_error(self):
+        """Test that percentiles are accurate to the bucket growth"""
+        from app.utils.histogram import LogHistogram, BUCKET_GROWTH
+
+        histogram = LogHistogram()
+        for i in range(1, 1001):
+            histogram.record(i / 10)
+
+        assert histogram.count == 1000
+        assert histogram.mean() == pytest.approx(50.05)
+        assert histogram.percentile(50) == pytest.approx(50.0, rel=BUCKET_GROWTH - 1)
+        assert histogram.percentile(99) == pytest.approx(99.0, rel=BUCKET_GROWTH - 1)
+
+    def test_memory_bounded_by_buckets(self):
+        """Test that recording many values does not grow the histogram"""
+        from app.utils.histogram import LogHistogram, MAX_BUCKET
+
+        histogram = LogHistogram()
+        for i in range(100000):
+            histogram.record((i % 500) * 0.37)
+
+        assert len(histogram.counts) <= MAX_BUCKET + 1
+
+    def test_merge_adds_counts(self):
+        """Test that per-worker histograms merge into the combined distribution"""
+        from app.utils.histogram import LogHistogram
+
+        first, second, combined = LogHistogram(), LogHistogram(), LogHistogram()
+        for value in (1.0, 2.0, 3.0):
+            first.record(value)
+            combined.record(value)
+        for value in (10.0, 20.0):
+            second.record(value)
+            combined.record(value)
+
+        merged = LogHistogram.from_dict(first.to_dict()).merge(second)
+
+        assert merged.counts == combined.counts
+        assert merged.percentile(95) == combined.percentile(95)
+
+    def test_flush_merges_histograms_in_redis(self):
+        """Test that buffered durations are added to the shared histogram"""
+        import os
+        from app.storage import MetricsStore
+        from app.utils.histogram import bucket_index
+
+        store = MetricsStore()
+        store.redis_client = MagicMock()
+        store._flusher_pid = os.getpid()
+        pipe = store.redis_client.pipeline.return_value
+
+        store.observe("process_image_generation", 2.0)
+        store.observe("process_image_generation", 2.0)
+        store.flush()
+
+        histogram_key = f"{store.durations_prefix}process_image_generation"
+        pipe.hincrby.assert_called_once_with(histogram_key, str(bucket_index(2.0)), 2)
+        pipe.hincrbyfloat.assert_called_once_with(histogram_key, "total", 4.0)
+        pipe.sadd.assert_called_once()
+
+    def test_postrun_records_into_histogram(self):
+        """Test that task durations are histogrammed, not appended to lists"""
+        from datetime import timedelta
+        from app.config.monitoring import task_postrun_handler
+        from app.utils.histogram import LogHistogram
+
+        reset_task_metrics()
+        task = Mock()
+        task.name = "process_image_generation"
+        task_metrics["task_start_times"]["task-1"] = datetime.utcnow() - timedelta(seconds=2)
+
+        with patch('app.config.monitoring.metrics_store') as mock_store, \
+             patch('app.config.monitoring.runtime_stats'):
+            task_postrun_handler(task_id="task-1", task=task, state='SUCCESS')
+
+        assert isinstance(task_metrics["task_durations"]["process_image_generation"], LogHistogram)
+        mock_store.observe.assert_called_once()
+
+    def test_metrics_endpoint_reports_percentiles(self):
+        """Test that /tasks/metrics exposes averages and percentiles"""
+        from app.utils.histogram import LogHistogram
+
+        histogram = LogHistogram()
+        for value in (1.0, 2.0, 4.0, 8.0):
+            histogram.record(value)
+        fleet = {"counters": {}, "running": {}, "durations": {"process_image_generation": histogram}}
+
+        with patch('app.config.monitoring.metrics_store.snapshot', return_value=fleet):
+            response = TestClient(app).get("/api/v1/tasks/metrics", headers={"X-API-Key": "test-api-key"})
+
+        metrics = response.json()["metrics"]
+        assert metrics["average_durations"]["process_image_generation"] == pytest.approx(3.75)
+        assert set(metrics["duration_percentiles"]["process_image_generation"]) == {"p50", "p95", "p99"}
+
+
+class TestPrometheusMetrics:
+    """Test Prometheus exporter for the API and workers"""
+
+    def test_metrics_endpoint_serves_exposition(self):
+        """Test that /metrics returns Prometheus text without an API key"""
+        from app.config.prometheus import observe_task
+
+        observe_task("process_image_generation", "gpu_medium", "SUCCESS", 12.0)
+
+        with patch('app.scheduling.admission.admission_controller.get_queue_status',
+                   return_value=[{"queue": "gpu_medium", "depth": 4}]):
+            response = TestClient(app).get("/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert 'task_duration_seconds_count{queue="gpu_medium",state="SUCCESS",task_name="process_image_generation"}' in response.text
+        assert 'task_queue_depth{queue="gpu_medium"} 4.0' in response.text
+
+    def test_metrics_endpoint_disabled(self):
+        """Test that /metrics is hidden when metrics are disabled"""
+        from app.config.settings import settings
+
+        with patch.object(settings, 'enable_metrics', False):
+            response = TestClient(app).get("/metrics")
+
+        assert response.status_code == 404
+
+    def test_track_call_records_outcome(self):
+        """Test that external call latency is labelled by outcome"""
+        from prometheus_client import REGISTRY
+        from app.config.prometheus import track_call
+
+        labels = {"service": "brain", "operation": "test_failure", "outcome": "error"}
+        before = REGISTRY.get_sample_value("external_call_duration_seconds_count", labels) or 0
+
+        with pytest.raises(RuntimeError):
+            with track_call("brain", "test_failure"):
+                raise RuntimeError("boom")
+
+        assert REGISTRY.get_sample_value("external_call_duration_seconds_count", labels) == before + 1
+
+    def test_record_cache_counts_hits_and_misses(self):
+        """Test cache hit/miss counters"""
+        from prometheus_client import REGISTRY
+        from app.config.prometheus import record_cache
+
+        def count(result):
+            return REGISTRY.get_sample_value(
+                "cache_requests_total", {"cache": "test_cache", "result": result}
+            ) or 0
+
+        record_cache("test_cache", hit=True)
+        record_cache("test_cache", hit=False)
+        record_cache("test_cache", hit=False)
+
+        assert count("hit") == 1
+        assert count("miss") == 2
+
+    def test_instrument_redis_counts_round_trips(self):
+        """Test that each command or pipeline sent to Redis is counted once"""
+        import redis
+        from prometheus_client import REGISTRY
+        from app.config.prometheus import instrument_redis
+
+        client = instrument_redis(redis.Redis.from_url("redis://localhost:6379/0"), "test_component")
+        connection = client.connection_pool.connection_class()
+        labels = {"component": "test_component"}
+        before = REGISTRY.get_sample_value("redis_round_trips_total", labels) or 0
+
+        with patch.object(redis.connection.Connection, 'send_packed_command') as send:
+            connection.send_packed_command(b"PING")
+
+        send.assert_called_once()
+        assert REGISTRY.get_sample_value("redis_round_trips_total", labels) == before + 1
+
+    def test_worker_exporter_requires_multiprocess_dir_for_prefork(self):
+        """Test that a prefork worker does not serve an exporter missing its pool's metrics"""
+        from app.config import prometheus
+
+        with patch.object(prometheus, 'MULTIPROCESS_DIR', None), \
+             patch.object(prometheus, 'start_http_server') as serve:
+            assert prometheus.start_worker_exporter("cpu-worker@host-1") is False
+            serve.assert_not_called()
+
+            assert prometheus.start_worker_exporter("cpu-worker@host-1", child_processes=False) is True
+            serve.assert_called_once()
+
+    def test_worker_exporter_port_per_node(self):
+        """Test that worker nodes on one host get their own exporter ports"""
+        from app.config import prometheus
+        from app.config.settings import settings
+
+        with patch.object(settings, 'worker_metrics_ports', 'cpu-worker:9101,gpu-worker@host-1:9102'), \
+             patch.object(prometheus, 'MULTIPROCESS_DIR', '/tmp/prometheus'), \
+             patch.object(prometheus, 'build_registry'), \
+             patch.object(prometheus, 'start_http_server') as serve:
+            prometheus.start_worker_exporter("cpu-worker@host-1")
+            prometheus.start_worker_exporter("gpu-worker@host-1")
+            prometheus.start_worker_exporter("worker@host-1")
+
+        assert [call.args[0] for call in serve.call_args_list] == [9101, 9102, settings.metrics_port]
+
+    def test_postrun_observes_task_duration_by_queue(self):
+        """Test that the postrun handler labels task durations with the queue"""
+        from datetime import timedelta
+        from app.config.monitoring import task_postrun_handler
+
+        reset_task_metrics()
+        task = Mock()
+        task.name = "process_video_generation"
+        task.request.delivery_info = {"routing_key": "gpu_heavy"}
+        task_metrics["task_start_times"]["task-1"] = datetime.utcnow() - timedelta(seconds=3)
+
+        with patch('app.config.monitoring.metrics_store'), \
+             patch('app.config.monitoring.runtime_stats'), \
+             patch('app.config.monitoring.observe_task') as observe:
+            task_postrun_handler(task_id="task-1", task=task, state='SUCCESS')
+
+        name, queue, state, duration = observe.call_args[0]
+        assert (name, queue, state) == ("process_video_generation", "gpu_heavy", "SUCCESS")
+        assert duration >= 3
+
+
+class TestWorkerStatus:
+    """Test worker status from cached inspection and heartbeats"""
+
+    INSPECTION = {
+        "active": {"gpu-worker@host": [{"id": "task-1"}, {"id": "task-2"}], "cpu-worker@host": []},
+        "reserved": {"gpu-worker@host": [{"id": "task-3"}], "cpu-worker@host": []},
+        "stats": {
+            "gpu-worker@host": {
+                "pool": {"max-concurrency": 2},
+                "total": {"process_video_generation": 7, "process_image_generation": 3},
+                "rusage": {"maxrss": 2048}
+            },
+            "cpu-worker@host": {"pool": {"max-concurrency": 4}, "total": {}, "rusage": {"maxrss": 1024}}
+        },
+        "active_queues": {
+            "gpu-worker@host": [{"name": "gpu_heavy"}, {"name": "celery"}],
+            "cpu-worker@host": [{"name": "cpu_intensive"}]
+        }
+    }
+
+    def test_build_worker_statuses(self):
+        """Test that inspect replies are merged per worker"""
+        from app.config.worker_status import build_worker_statuses
+
+        workers = build_worker_statuses(heartbeats={}, inspected_at=1000.0, now=1005.0, **self.INSPECTION)
+        by_id = {worker["worker_id"]: worker for worker in workers}
+
+        gpu = by_id["gpu-worker@host"]
+        assert gpu["worker_type"] == "gpu_heavy"
+        assert gpu["status"] == "busy"
+        assert gpu["current_task_id"] == "task-1"
+        assert gpu["reserved_tasks"] == 1
+        assert gpu["tasks_completed"] == 10
+        assert gpu["memory_usage"] == 2048 * 1024
+        assert gpu["queues"] == ["gpu_heavy", "celery"]
+
+        assert by_id["cpu-worker@host"]["worker_type"] == "cpu_intensive"
+        assert by_id["cpu-worker@host"]["status"] == "idle"
+
+    def test_silent_worker_is_offline(self):
+        """Test that a worker known only from an old heartbeat is offline"""
+        from app.config.worker_status import build_worker_statuses
+
+        heartbeats = {"old-worker@host": {"timestamp": 1000.0, "active": 1, "processed": 5}}
+        workers = build_worker_statuses(
+            active={}, reserved={}, stats={}, active_queues={},
+            heartbeats=heartbeats, now=1000.0 + 3600
+        )
+
+        assert workers[0]["status"] == "offline"
+        assert workers[0]["tasks_completed"] == 5
+
+    def test_refresh_caches_inspection(self):
+        """Test that refresh() stores inspect replies for get_status()"""
+        from app.config.worker_status import WorkerStatusMonitor
+
+        monitor = WorkerStatusMonitor()
+        inspector = MagicMock()
+        for name, reply in self.INSPECTION.items():
+            getattr(inspector, name).return_value = reply
+
+        with patch('app.celery_app.celery_app.control.inspect', return_value=inspector), \
+             patch('app.gpu.telemetry.gpu_telemetry.get_all', return_value={}):
+            assert monitor.refresh() is True
+
+        status = monitor.get_status()
+        assert status["total_workers"] == 2
+        assert status["active_workers"] == 2
+        assert status["refreshed_at"] is not None
+
+    def test_endpoint_reads_cache_without_inspecting(self):
+        """Test that polling the endpoint never queries the broker"""
+        from app.config.worker_status import worker_status_monitor
+
+        worker_status_monitor.record_heartbeat({
+            "type": "worker-heartbeat", "hostname": "gpu-worker@host", "active": 1, "processed": 4
+        })
+        try:
+            with patch('app.celery_app.celery_app.control.inspect') as inspect:
+                response = TestClient(app).get("/api/v1/workers/status", headers={"X-API-Key": "test-api-key"})
+
+            inspect.assert_not_called()
+            data = response.json()
+            assert data["total_workers"] == 1
+            assert data["workers"][0]["status"] == "active"
+        finally:
+            worker_status_monitor._heartbeats.clear()
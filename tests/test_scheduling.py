@@ -0,0 +1,647 @@
+"""
+Test fair-share scheduling, admission control, queue estimates and image batching
+"""
+import pytest
+import uuid
+from unittest.mock import Mock, patch, MagicMock
+from datetime import datetime
+from fastapi.testclient import TestClient
+from app.main import app
+from app.middleware.auth import verify_api_key
+from app.config.monitoring import task_metrics
+
+
+# Mock API key verification for tests
+async def mock_verify_api_key():
+    return "test-api-key"
+
+
+# Override the dependency
+app.dependency_overrides[verify_api_key] = mock_verify_api_key
+
+
+class TestFairShareScheduling:
+    """Test per-project fair-share dispatch"""
+
+    def _plan(self, backlogs, capacity, in_flight=None, weights=None, caps=None, state=None):
+        from app.scheduling import plan_dispatch
+
+        state = state or {'ring': list(backlogs), 'deficits': {}, 'current': None}
+        return plan_dispatch(
+            ring=state['ring'],
+            deficits=state['deficits'],
+            current=state['current'],
+            backlogs=backlogs,
+            in_flight=in_flight or {},
+            capacity=capacity,
+            weights=weights or {},
+            caps=caps or {},
+            default_weight=1.0,
+            default_cap=100
+        )
+
+    def test_small_project_not_starved_by_large_backlog(self):
+        """Test that a project with one task is served in the first round"""
+        dispatched, _ = self._plan({'bulk': 500, 'small': 1}, capacity=2)
+
+        assert dispatched == ['bulk', 'small']
+
+    def test_weights_share_slots_proportionally(self):
+        """Test that slots follow project weights over successive releases"""
+        backlogs = {'a': 100, 'b': 100}
+        state = None
+        dispatched = []
+
+        # One slot frees at a time, as when tasks finish one by one
+        for _ in range(8):
+            released, state = self._plan(backlogs, capacity=1, weights={'a': 3.0}, state=state)
+            for project in released:
+                backlogs[project] -= 1
+            dispatched.extend(released)
+
+        assert dispatched.count('a') == 6
+        assert dispatched.count('b') == 2
+
+    def test_project_cap_limits_concurrency(self):
+        """Test that a capped project is skipped and others get the slots"""
+        dispatched, _ = self._plan(
+            {'a': 10, 'b': 10}, capacity=4, in_flight={'a': 1}, caps={'a': 2}
+        )
+
+        assert dispatched.count('a') == 1
+        assert dispatched.count('b') == 3
+
+    def test_all_projects_capped_releases_nothing(self):
+        """Test that the round terminates when every project is capped"""
+        dispatched, state = self._plan({'a': 5}, capacity=3, in_flight={'a': 2}, caps={'a': 2})
+
+        assert dispatched == []
+        assert state['ring'] == ['a']
+
+    def test_drained_projects_leave_the_ring(self):
+        """Test that idle projects do not keep credit"""
+        dispatched, state = self._plan({'a': 1, 'b': 3}, capacity=10)
+
+        assert dispatched == ['a', 'b', 'b', 'b']
+        assert state['ring'] == []
+        assert state['deficits'] == {}
+
+    def test_parse_weights_and_caps(self):
+        """Test project value parsing from settings strings"""
+        from app.config.settings import settings
+
+        with patch.object(settings, 'fair_share_weights', 'proj-a:3, proj-b:0.5,bad,proj-c:0'), \
+             patch.object(settings, 'fair_share_project_caps', 'proj-a:6'):
+            assert settings.get_fair_share_weights() == {'proj-a': 3.0, 'proj-b': 0.5}
+            assert settings.get_fair_share_project_caps() == {'proj-a': 6}
+
+    def test_handles_only_configured_queues(self):
+        """Test that only enabled fair-share queues are held"""
+        from app.config.settings import settings
+        from app.scheduling import fair_share_dispatcher
+        from app.tasks import process_image_generation, evaluate_department
+
+        with patch.object(settings, 'fair_share_enabled', True), \
+             patch.object(settings, 'fair_share_queues', 'gpu_medium'):
+            assert fair_share_dispatcher.handles(process_image_generation.s())
+            assert not fair_share_dispatcher.handles(evaluate_department.s())
+
+        with patch.object(settings, 'fair_share_enabled', False):
+            assert not fair_share_dispatcher.handles(process_image_generation.s())
+
+    def test_submission_held_when_fair_share_enabled(self):
+        """Test that image submissions go through the dispatcher"""
+        from app.api.tasks import _dispatch
+        from app.config.settings import settings
+        from app.models.task import TaskSubmissionRequest
+
+        request = TaskSubmissionRequest(
+            project_id="project-1",
+            task_type="generate_image",
+            task_data={"prompt": "a castle"}
+        )
+        signature = MagicMock()
+
+        with patch.object(settings, 'fair_share_enabled', True), \
+             patch('app.api.tasks.fair_share_dispatcher') as mock_dispatcher:
+            mock_dispatcher.handles.return_value = True
+            _dispatch(request, signature)
+
+        mock_dispatcher.submit.assert_called_once_with("project-1", signature)
+        signature.apply_async.assert_not_called()
+
+    def test_release_ignores_unknown_tasks(self):
+        """Test that tasks not dispatched fair-share are ignored on finish"""
+        from app.scheduling import fair_share_dispatcher
+
+        with patch.object(fair_share_dispatcher, 'redis_client') as mock_redis:
+            mock_redis.get.return_value = None
+            assert fair_share_dispatcher.release("task-1") is False
+
+        mock_redis.lock.assert_not_called()
+
+    def test_retrying_task_keeps_its_slot(self):
+        """Test that a retry does not release the task's slot"""
+        from app.config.settings import settings
+        from app.scheduling.fair_share import fair_share_postrun_handler
+
+        with patch.object(settings, 'fair_share_enabled', True), \
+             patch('app.scheduling.fair_share.fair_share_dispatcher') as mock_dispatcher:
+            fair_share_postrun_handler(task_id="task-1", state='RETRY')
+            mock_dispatcher.release.assert_not_called()
+
+            fair_share_postrun_handler(task_id="task-1", state='SUCCESS')
+            mock_dispatcher.release.assert_called_once_with("task-1")
+
+    def test_discard_removes_held_task(self):
+        """Test that revoking a held task removes it from its project backlog"""
+        import json
+        from app.scheduling import FairShareDispatcher
+
+        dispatcher = FairShareDispatcher()
+        dispatcher.redis_client = MagicMock()
+        held = json.dumps({'task_id': 'task-2', 'signature': {}})
+        dispatcher.redis_client.get.return_value = "gpu_medium|project-1"
+        dispatcher.redis_client.lrange.return_value = [json.dumps({'task_id': 'task-1', 'signature': {}}), held]
+        dispatcher.redis_client.lrem.return_value = 1
+
+        assert dispatcher.discard("task-2") is True
+
+        dispatcher.redis_client.lrem.assert_called_once_with(
+            dispatcher._backlog_key('gpu_medium', 'project-1'), 1, held
+        )
+        dispatcher.redis_client.delete.assert_called_once_with(dispatcher._held_key("task-2"))
+
+    def test_busy_lock_dispatches_directly(self):
+        """Test that a submission is sent to the broker when the fair-share lock stays busy"""
+        from app.scheduling import FairShareDispatcher
+        from app.tasks import process_image_generation
+
+        dispatcher = FairShareDispatcher()
+        dispatcher.redis_client = MagicMock()
+        dispatcher.redis_client.lock.return_value.acquire.return_value = False
+        signature = process_image_generation.s(project_id="project-1", image_prompt="a castle", image_params={})
+
+        with patch.object(process_image_generation, 'apply_async') as apply_async:
+            dispatcher.submit("project-1", signature)
+
+        apply_async.assert_called_once()
+        assert apply_async.call_args.kwargs["task_id"] == signature.options["task_id"]
+        dispatcher.redis_client.rpush.assert_not_called()
+
+    def test_cancel_discards_held_task(self):
+        """Test that cancelling a queued task drops it from the fair-share backlog"""
+        from app.config.settings import settings
+
+        with patch.object(settings, 'fair_share_enabled', True), \
+             patch('app.api.tasks.fair_share_dispatcher') as mock_dispatcher, \
+             patch('app.celery_app.celery_app.AsyncResult') as mock_result, \
+             patch('app.celery_app.celery_app.control') as mock_control:
+            mock_result.return_value.state = 'PENDING'
+            response = TestClient(app).delete(
+                "/api/v1/tasks/123e4567-e89b-12d3-a456-426614174000",
+                headers={"X-API-Key": "test-api-key"}
+            )
+
+        assert response.status_code == 200
+        mock_dispatcher.discard.assert_called_once_with("123e4567-e89b-12d3-a456-426614174000")
+        mock_control.revoke.assert_called_once()
+
+
+class TestAdmissionControl:
+    """Test queue depth admission control"""
+
+    def setup_method(self):
+        """Setup test client and a fresh admission controller"""
+        from app.scheduling import AdmissionController
+
+        self.client = TestClient(app)
+        self.headers = {"X-API-Key": "test-api-key"}
+        self.controller = AdmissionController()
+        self.controller.redis_client = MagicMock()
+
+    def _set_depths(self, *step_lengths):
+        self.controller.redis_client.pipeline.return_value.execute.return_value = list(step_lengths)
+
+    def test_depth_sums_priority_steps(self):
+        """Test that every priority list of a queue is counted"""
+        from app.scheduling.admission import priority_queue_keys
+
+        self._set_depths(3, 0, 0, 0, 0, 4, 0, 0, 0, 2)
+
+        assert self.controller.get_depth('gpu_medium') == 9
+        assert priority_queue_keys('gpu_medium')[:2] == ['gpu_medium', 'gpu_medium:1']
+
+    def test_depth_is_cached(self):
+        """Test that depth readings are reused within the cache interval"""
+        self._set_depths(5)
+
+        self.controller.get_depth('gpu_medium')
+        self.controller.get_depth('gpu_medium')
+
+        assert self.controller.redis_client.pipeline.call_count == 1
+
+    def test_rejects_when_queue_full(self):
+        """Test that a queue at its limit rejects new tasks"""
+        from app.config.settings import settings
+        from app.scheduling import QueueFullError
+
+        self._set_depths(10)
+
+        with patch.object(settings, 'queue_limits', 'gpu_medium:10'):
+            with pytest.raises(QueueFullError) as exc_info:
+                self.controller.check('gpu_medium')
+
+        assert exc_info.value.limit == 10
+        assert exc_info.value.retry_after == settings.admission_retry_after
+
+    def test_admitted_tasks_count_against_cached_depth(self):
+        """Test that admissions between refreshes add to the depth"""
+        from app.config.settings import settings
+        from app.scheduling import QueueFullError
+
+        self._set_depths(8)
+
+        with patch.object(settings, 'queue_limits', 'gpu_medium:10'):
+            self.controller.check_all(['gpu_medium', 'gpu_medium'])
+            self.controller.reserve('gpu_medium', 5)
+            self.controller.reserve('gpu_medium', 5)
+            with pytest.raises(QueueFullError):
+                self.controller.check('gpu_medium')
+
+    def test_fails_open_when_broker_unreadable(self):
+        """Test that submissions are admitted if depths cannot be read"""
+        self.controller.redis_client.pipeline.side_effect = ConnectionError("redis down")
+
+        self.controller.check('gpu_medium', 5000)
+
+        assert self.controller.get_queue_status()[0]['accepting'] is True
+
+    def test_submit_returns_429_with_retry_after(self):
+        """Test the submit endpoint surfaces rejection as 429"""
+        from app.scheduling import QueueFullError
+
+        with patch('app.api.tasks.admission_controller') as mock_controller:
+            mock_controller.check_all.side_effect = QueueFullError('gpu_medium', 1000, 1000, 30)
+            response = self.client.post(
+                "/api/v1/tasks/submit",
+                headers=self.headers,
+                json={
+                    "project_id": "project-1",
+                    "task_type": "generate_image",
+                    "task_data": {"prompt": "a castle"}
+                }
+            )
+
+        assert response.status_code == 429
+        assert response.headers["Retry-After"] == "30"
+
+    def test_rejected_submission_offloads_no_payload(self):
+        """Test that payloads are only stored for tasks that are accepted"""
+        from app.scheduling import QueueFullError
+
+        with patch('app.api.tasks.admission_controller') as mock_controller, \
+             patch('app.api.tasks.payload_store') as mock_store:
+            mock_controller.check_all.side_effect = QueueFullError('cpu_intensive', 1000, 1000, 30)
+            response = self.client.post(
+                "/api/v1/tasks/submit",
+                headers=self.headers,
+                json={
+                    "project_id": "project-1",
+                    "task_type": "evaluate_department",
+                    "task_data": {"department_slug": "story", "gather_data": [{"content": "x" * 1000}]}
+                }
+            )
+
+        assert response.status_code == 429
+        mock_store.offload.assert_not_called()
+
+    def test_queues_endpoint(self):
+        """Test that queue thresholds are exposed"""
+        with patch('app.api.tasks.admission_controller') as mock_controller:
+            mock_controller.get_queue_status.return_value = [
+                {"queue": "gpu_medium", "depth": 12, "limit": 1000, "accepting": True}
+            ]
+            response = self.client.get("/api/v1/tasks/queues", headers=self.headers)
+
+        assert response.status_code == 200
+        assert response.json()["queues"][0]["limit"] == 1000
+
+
+class TestQueueEstimates:
+    """Test queue position and ETA estimation"""
+
+    def test_queue_position_counts_more_urgent_steps(self):
+        """Test that only messages at the same or a lower step are ahead"""
+        from app.scheduling import AdmissionController
+
+        controller = AdmissionController()
+        controller.redis_client = MagicMock()
+        controller.redis_client.pipeline.return_value.execute.return_value = [2, 0, 0, 0, 0, 3, 0, 0, 0, 50]
+
+        assert controller.get_queue_position('gpu_medium', 0) == 3
+        assert controller.reserve('gpu_medium', 5) == 6
+        assert controller.get_queue_position('gpu_medium', 5) == 7
+
+    def test_estimate_wait_divides_by_concurrency(self):
+        """Test the wait for tasks ahead across parallel workers"""
+        from app.scheduling import estimate_wait
+
+        assert estimate_wait(1, 120, 2) == 0
+        assert estimate_wait(5, 120, 2) == 240
+
+    def test_completion_for_queued_task(self):
+        """Test queued ETA is the expected start plus the run time"""
+        from datetime import timedelta
+        from app.models.task import TaskStatus
+        from app.scheduling import estimate_completion
+
+        now = datetime(2025, 1, 1, 12, 0, 0)
+        created = now - timedelta(seconds=60)
+
+        eta = estimate_completion(
+            TaskStatus.QUEUED, created, 100, estimated_start=created + timedelta(seconds=300), now=now
+        )
+        assert eta == created + timedelta(seconds=400)
+
+        # Once the expected start has passed, a full run from now
+        late = estimate_completion(TaskStatus.QUEUED, created, 100, estimated_start=created, now=now)
+        assert late == now + timedelta(seconds=100)
+
+    def test_completion_extrapolates_progress(self):
+        """Test processing ETA from elapsed time and progress"""
+        from datetime import timedelta
+        from app.models.task import TaskStatus
+        from app.scheduling import estimate_completion
+
+        now = datetime(2025, 1, 1, 12, 0, 0)
+        started = now - timedelta(seconds=30)
+
+        eta = estimate_completion(TaskStatus.PROCESSING, started, 300, started_at=started, progress=0.25, now=now)
+
+        assert eta == now + timedelta(seconds=90)
+        assert estimate_completion(TaskStatus.COMPLETED, started, 300, now=now) is None
+
+    def test_runtime_estimate_needs_min_samples(self):
+        """Test the default duration is used until enough runs are recorded"""
+        from app.config.settings import settings
+        from app.storage import RuntimeStats
+
+        stats = RuntimeStats()
+        stats.redis_client = MagicMock()
+        stats.redis_client.hgetall.return_value = {'ewma': '42.4', 'last': '40', 'count': '1'}
+
+        assert stats.estimate_duration('process_image_generation') == settings.default_task_duration
+
+        stats.redis_client.hgetall.return_value = {'ewma': '42.4', 'last': '40', 'count': '10'}
+        assert stats.estimate_duration('process_image_generation') == 42
+
+    def test_postrun_records_successful_runtime(self):
+        """Test that the task_postrun handler feeds runtime statistics"""
+        from datetime import timedelta
+        from app.config.monitoring import task_postrun_handler
+
+        task = Mock()
+        task.name = "process_image_generation"
+        task_metrics["task_start_times"]["task-1"] = datetime.utcnow() - timedelta(seconds=5)
+
+        with patch('app.config.monitoring.runtime_stats') as mock_stats:
+            task_postrun_handler(task_id="task-1", task=task, state='SUCCESS')
+
+        name, duration = mock_stats.record.call_args[0]
+        assert name == "process_image_generation"
+        assert duration >= 5
+
+    def test_submission_reports_position_and_estimate(self):
+        """Test that submit returns the computed position and duration"""
+        client = TestClient(app)
+
+        with patch('app.api.tasks.admission_controller') as mock_controller, \
+             patch('app.api.tasks.runtime_stats') as mock_stats, \
+             patch('app.api.tasks.process_image_generation') as mock_task, \
+             patch('app.api.tasks.task_storage'):
+            mock_controller.reserve.return_value = 7
+            mock_stats.estimate_duration.return_value = 90
+            signature = mock_task.s.return_value.set.return_value
+            signature.options = {'queue': 'gpu_medium', 'priority': 5}
+            signature.apply_async.return_value = Mock(id=str(uuid.uuid4()))
+
+            response = client.post(
+                "/api/v1/tasks/submit",
+                headers={"X-API-Key": "test-api-key"},
+                json={
+                    "project_id": "project-1",
+                    "task_type": "generate_image",
+                    "task_data": {"prompt": "a castle"}
+                }
+            )
+
+        assert response.status_code == 201
+        data = response.json()
+        assert data["queue_position"] == 7
+        assert data["estimated_duration"] == 90
+        assert data["estimated_completion"] is not None
+
+
+class TestImageBatching:
+    """Test micro-batching of image generation requests"""
+
+    def setup_method(self):
+        from app.scheduling.image_batching import ImageBatcher
+
+        self.batcher = ImageBatcher()
+        self.batcher.redis_client = MagicMock()
+        self.batcher._add_script = MagicMock()
+        self.batcher._claim_script = MagicMock()
+
+    def _request(self, task_id, priority=5, **image_params):
+        import json
+
+        return json.dumps({
+            "task_id": task_id,
+            "project_id": "project-1",
+            "image_prompt": "a castle",
+            "image_params": image_params,
+            "callback_url": None,
+            "metadata": None,
+            "priority": priority
+        })
+
+    def test_batch_key_groups_compatible_requests(self):
+        """Test that only model, size and steps decide compatibility"""
+        from app.scheduling import image_batch_key
+
+        assert image_batch_key({"width": 512, "height": 512, "style": "anime"}) == \
+            image_batch_key({"width": 512, "height": 512, "steps": 50})
+        assert image_batch_key({"steps": 30}) != image_batch_key({"steps": 50})
+        assert image_batch_key({"model": "sdxl"}) != image_batch_key({})
+
+    def test_handles_only_when_enabled(self):
+        """Test that batching is opt-in and limited to image generation"""
+        from app.config.settings import settings
+        from app.tasks import process_image_generation, process_video_generation
+
+        assert not self.batcher.handles(process_image_generation.s())
+        with patch.object(settings, 'image_batching_enabled', True):
+            assert self.batcher.handles(process_image_generation.s())
+            assert not self.batcher.handles(process_video_generation.s())
+
+    def test_first_request_schedules_flush(self):
+        """Test that opening a batch schedules its flush after the window"""
+        from app.config.settings import settings
+        from app.tasks import process_image_generation
+        from app.tasks.image_tasks import flush_image_batch
+
+        self.batcher._add_script.return_value = ["batch-1", 1, 0]
+        signature = process_image_generation.s(project_id="project-1", image_prompt="a castle", image_params={})
+
+        with patch.object(flush_image_batch, 'apply_async') as flush:
+            result = self.batcher.submit(signature)
+
+        assert result.id == signature.options['task_id']
+        flush.assert_called_once()
+        assert flush.call_args.args[0][1] == "batch-1"
+        assert flush.call_args.kwargs["countdown"] == settings.image_batch_window
+        assert flush.call_args.kwargs["priority"] == 0
+        assert flush_image_batch.queue == 'gpu_control'
+
+    def test_gpu_nodes_consume_flush_queue(self):
+        """Test that GPU worker nodes take batch flushes and CPU nodes do not"""
+        from types import SimpleNamespace
+        from app.config.settings import settings
+        from app.scheduling.image_batching import image_batch_worker_ready_handler
+
+        gpu_node = MagicMock()
+        gpu_node.task_consumer.queues = [SimpleNamespace(name='gpu_medium')]
+        cpu_node = MagicMock()
+        cpu_node.task_consumer.queues = [SimpleNamespace(name='cpu_intensive')]
+
+        with patch.object(settings, 'image_batching_enabled', True):
+            image_batch_worker_ready_handler(sender=gpu_node)
+            image_batch_worker_ready_handler(sender=cpu_node)
+
+        gpu_node.add_task_queue.assert_called_once_with('gpu_control')
+        cpu_node.add_task_queue.assert_not_called()
+
+    def test_full_batch_flushes_immediately(self):
+        """Test that the request filling a batch sends it at once"""
+        from app.tasks import process_image_generation
+
+        self.batcher._add_script.return_value = ["batch-1", 0, 1]
+        self.batcher.flush = Mock()
+
+        self.batcher.submit(process_image_generation.s(project_id="project-1", image_prompt="", image_params={}))
+
+        self.batcher.flush.assert_called_once()
+        assert self.batcher.flush.call_args.args[1] == "batch-1"
+
+    def test_flush_sends_one_batch_task(self):
+        """Test that a batch runs as one task at its most urgent priority"""
+        from app.tasks.image_tasks import process_image_generation_batch
+
+        self.batcher._claim_script.return_value = [self._request("task-1", 5), self._request("task-2", 0)]
+
+        with patch.object(process_image_generation_batch, 'apply_async') as apply_async:
+            self.batcher.flush("image-gen-v3.0:1024x1024:50", "batch-1")
+
+        kwargs = apply_async.call_args.args[1]
+        assert [request["task_id"] for request in kwargs["requests"]] == ["task-1", "task-2"]
+        assert "priority" not in kwargs["requests"][0]
+        assert apply_async.call_args.kwargs["priority"] == 0
+
+    def test_fair_share_batches_are_per_project_and_held(self):
+        """Test that on a fair-share queue a batch is one project's held task"""
+        from app.config.settings import settings
+        from app.tasks import process_image_generation
+        from app.tasks.image_tasks import flush_image_batch
+
+        self.batcher._add_script.return_value = ["batch-1", 1, 0]
+        self.batcher._claim_script.return_value = [self._request("task-1"), self._request("task-2")]
+        signature = process_image_generation.s(project_id="project-1", image_prompt="a castle", image_params={})
+
+        with patch.object(settings, 'fair_share_enabled', True), \
+             patch.object(settings, 'fair_share_queues', 'gpu_medium'), \
+             patch('app.scheduling.image_batching.fair_share_dispatcher.submit') as held, \
+             patch.object(flush_image_batch, 'apply_async') as flush:
+            self.batcher.submit(signature)
+            batch_key = flush.call_args.args[0][0]
+            self.batcher.flush(batch_key, "batch-1")
+
+        assert batch_key.startswith("project-1:")
+        project_id, batch_signature = held.call_args.args
+        assert project_id == "project-1"
+        assert batch_signature.task == 'app.tasks.image_tasks.process_image_generation_batch'
+
+    def test_dispatch_batches_before_fair_share(self):
+        """Test that image requests on a fair-share queue still go to a micro-batch"""
+        from app.api.tasks import _dispatch
+        from app.config.settings import settings
+        from app.tasks import process_image_generation
+
+        signature = process_image_generation.s(project_id="project-1", image_prompt="a castle", image_params={})
+        request = Mock(project_id="project-1")
+
+        with patch.object(settings, 'image_batching_enabled', True), \
+             patch.object(settings, 'fair_share_enabled', True), \
+             patch('app.api.tasks.image_batcher.submit') as batched, \
+             patch('app.api.tasks.fair_share_dispatcher.submit') as held:
+            _dispatch(request, signature)
+
+        batched.assert_called_once_with(signature)
+        held.assert_not_called()
+
+    def test_flush_of_sent_batch_is_noop(self):
+        """Test that the delayed flush of a batch that filled up does nothing"""
+        self.batcher._claim_script.return_value = []
+
+        assert self.batcher.flush("image-gen-v3.0:1024x1024:50", "batch-1") is None
+
+    def test_batch_results_fan_out(self):
+        """Test that each request gets its own result, record and webhook"""
+        import json
+        from app.tasks.image_tasks import process_image_generation_batch
+
+        requests = [json.loads(self._request("task-1")), json.loads(self._request("task-2"))]
+        requests[1]["callback_url"] = "http://localhost:3010/api/webhooks/images"
+        results = {"task-1": {"image_url": "a.jpg"}, "task-2": {"image_url": "b.jpg"}}
+
+        with patch.object(process_image_generation_batch, '_backend') as backend, \
+             patch('app.tasks.image_tasks.task_storage') as storage, \
+             patch('app.tasks.image_tasks.send_webhook_sync') as send_webhook:
+            process_image_generation_batch.on_success(
+                {"results": results}, "batch-task", (), {"batch_key": "k", "requests": requests}
+            )
+
+        backend.mark_as_done.assert_any_call("task-1", results["task-1"])
+        backend.mark_as_done.assert_any_call("task-2", results["task-2"])
+        assert storage.update_task_status.call_count == 2
+        send_webhook.assert_called_once()
+        assert send_webhook.call_args.args[1]["task_id"] == "task-2"
+
+    def test_batch_failure_fails_every_request(self):
+        """Test that a failed batch fails each of its requests"""
+        import json
+        from app.tasks.image_tasks import process_image_generation_batch
+
+        requests = [json.loads(self._request("task-1")), json.loads(self._request("task-2"))]
+        einfo = Mock(traceback="Traceback")
+
+        with patch.object(process_image_generation_batch, '_backend') as backend, \
+             patch('app.tasks.image_tasks.task_storage') as storage:
+            process_image_generation_batch.on_failure(
+                RuntimeError("CUDA error"), "batch-task", (), {"requests": requests}, einfo
+            )
+
+        assert backend.mark_as_failure.call_count == 2
+        storage.update_task_status.assert_any_call(task_id="task-1", status="failed", error="CUDA error")
+
+    def test_batch_memory_shares_model(self):
+        """Test that a batch reserves the model once plus every image"""
+        import json
+        from app.gpu import estimate_gpu_memory
+
+        single = estimate_gpu_memory('app.tasks.image_tasks.process_image_generation', {"image_params": {}})
+        requests = [json.loads(self._request(f"task-{i}")) for i in range(3)]
+        batch = estimate_gpu_memory('app.tasks.image_tasks.process_image_generation_batch', {"requests": requests})
+
+        assert single < batch < 3 * single
@@ -65,12 +65,41 @@ class TestCeleryConfiguration:
         assert retry_kwargs['countdown'] == 60
     
     def test_worker_memory_limits(self):
-        """Test that worker memory limits are configured"""
+        """Test that pool processes are recycled by memory, not task count"""
         from app.celery_app import celery_app
         
-        assert celery_app.conf.worker_max_tasks_per_child == 10
+        assert celery_app.conf.worker_max_tasks_per_child is None  # models stay resident
         assert celery_app.conf.worker_max_memory_per_child == 2048000  # 2GB in KB
 
+    def test_priority_steps_configured(self):
+        """Test that the Redis broker splits queues into priority steps"""
+        from app.celery_app import celery_app, get_celery_priority
+        from app.models.task import TaskPriority
+
+        options = celery_app.conf.broker_transport_options
+        assert options['queue_order_strategy'] == 'priority'
+        assert get_celery_priority(TaskPriority.HIGH) in options['priority_steps']
+        assert get_celery_priority(TaskPriority.HIGH) < get_celery_priority(TaskPriority.NORMAL) \
+            < get_celery_priority(TaskPriority.LOW)
+        assert celery_app.conf.task_default_priority == get_celery_priority(TaskPriority.NORMAL)
+
+    def test_submission_carries_broker_priority(self):
+        """Test that a submitted task's signature carries its mapped priority"""
+        from app.api.tasks import _task_signature
+        from app.celery_app import get_celery_priority
+        from app.models.task import TaskSubmissionRequest, TaskPriority
+
+        request = TaskSubmissionRequest(
+            project_id="project-1",
+            task_type="evaluate_department",
+            task_data={"department_slug": "story", "department_number": 1},
+            priority=TaskPriority.HIGH
+        )
+
+        signature = _task_signature(request, request.task_data)
+
+        assert signature.options['priority'] == get_celery_priority(TaskPriority.HIGH)
+
 
 class TestTaskCancellation:
     """Test task cancellation API endpoint"""
@@ -210,10 +239,17 @@ class TestMonitoring:
     def setup_method(self):
         """Reset metrics before each test"""
         reset_task_metrics()
+        # Read this process's metrics rather than a shared Redis store
+        self.snapshot_patcher = patch('app.config.monitoring.metrics_store.snapshot', return_value=None)
+        self.snapshot_patcher.start()
         self.client = TestClient(app)
         # Use the actual API key from settings
         self.api_key = "test-api-key"
         self.headers = {"X-API-Key": self.api_key}
+
+    def teardown_method(self):
+        """Stop patches"""
+        self.snapshot_patcher.stop()
     
     def test_get_task_metrics(self):
         """Test getting task metrics"""
@@ -327,4 +363,3 @@ class TestWorkerConfiguration:
         assert WORKER_CONFIG['max_memory_per_child'] == 2048000
         assert WORKER_CONFIG['task_time_limit'] == 600
         assert WORKER_CONFIG['task_soft_time_limit'] == 540
-